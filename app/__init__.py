@@ -131,7 +131,18 @@ def create_app(config_class=Config):
         
         # Register terminal socket handlers
         register_terminal_handlers(socketio)
-        
+
+        # Register MetaSpidey progress event handlers
+        from app.metaspidey.events import register_metaspidey_handlers
+        from app.metaspidey.routes import operation_events
+        register_metaspidey_handlers(socketio, operation_events)
+
+        # Register live directory handlers of the file manager
+        from app.file_manager.events import register_file_manager_handlers
+        from app.file_manager.routes import live_directories
+        live_directories.init_app(app)
+        register_file_manager_handlers(socketio, live_directories)
+
         # Register enhanced error handlers with logging
         register_error_handlers(app)
         
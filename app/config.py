@@ -32,7 +32,44 @@ class Config:
     REMEMBER_COOKIE_HTTPONLY = True
     
     # File upload settings
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max upload
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max request body; larger files are uploaded in chunks
+    
+    # MetaSpidey wordlist catalog location
+    WORDLISTS_DIR = os.environ.get('WORDLISTS_DIR') or os.path.expanduser('~/wordlists')
+    
+    # MetaSpidey analysis result cache (SQLite)
+    METASPIDEY_ANALYSIS_CACHE = (os.environ.get('METASPIDEY_ANALYSIS_CACHE') or
+                                 os.path.expanduser('~/.metaspidey/analysis_cache.db'))
+    
+    # YARA-like rule file or directory of *.yar/*.yara/*.rules files for the security scan
+    METASPIDEY_THREAT_RULES = (os.environ.get('METASPIDEY_THREAT_RULES') or
+                               os.path.expanduser('~/.metaspidey/rules'))
+
+    # Optional file manager filename index (SQLite with the FTS5 trigram tokenizer, 3.34+) used by
+    # search, e.g. ~/.coresecframe/file_index.db; unset to always walk the tree
+    FILE_MANAGER_SEARCH_INDEX = os.environ.get('FILE_MANAGER_SEARCH_INDEX')
+    # Seconds between incremental refreshes of an indexed root, triggered by searches
+    FILE_MANAGER_SEARCH_INDEX_MAX_AGE = int(os.environ.get('FILE_MANAGER_SEARCH_INDEX_MAX_AGE', 60))
+
+    # File manager content search: worker processes (None for the CPU count), total match limit
+    # and searches one user may run at once
+    FILE_MANAGER_CONTENT_SEARCH_WORKERS = int(os.environ.get('FILE_MANAGER_CONTENT_SEARCH_WORKERS', 0)) or None
+    FILE_MANAGER_CONTENT_SEARCH_MAX_MATCHES = int(os.environ.get('FILE_MANAGER_CONTENT_SEARCH_MAX_MATCHES', 1000))
+    FILE_MANAGER_CONTENT_SEARCH_MAX_PER_USER = int(os.environ.get('FILE_MANAGER_CONTENT_SEARCH_MAX_PER_USER', 2))
+
+    # Hand file downloads to the front-end server: X-Sendfile (Apache, lighttpd), or
+    # X-Accel-Redirect to an nginx internal location aliased to / (e.g. /_protected)
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', 'false').lower() == 'true'
+    FILE_MANAGER_X_ACCEL_PREFIX = os.environ.get('FILE_MANAGER_X_ACCEL_PREFIX')
+
+    # Resumable file manager uploads: session metadata directory and size limit in bytes (0 for none)
+    FILE_MANAGER_UPLOAD_STATE_DIR = (os.environ.get('FILE_MANAGER_UPLOAD_STATE_DIR') or
+                                     os.path.expanduser('~/.coresecframe/uploads'))
+    FILE_MANAGER_UPLOAD_MAX_SIZE = int(os.environ.get('FILE_MANAGER_UPLOAD_MAX_SIZE', 0))
+
+    # Live file manager listings: inotify, or polling every N seconds where it is unavailable or disabled
+    FILE_MANAGER_WATCH_INOTIFY = os.environ.get('FILE_MANAGER_WATCH_INOTIFY', 'true').lower() == 'true'
+    FILE_MANAGER_WATCH_POLL_INTERVAL = float(os.environ.get('FILE_MANAGER_WATCH_POLL_INTERVAL', 2.0))
 
 class ProductionConfig(Config):
     """Production configuration"""
@@ -68,4 +105,7 @@ class TestingConfig(Config):
    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
    
    # Disable CSRF for testing
-   WTF_CSRF_ENABLED = False
\ No newline at end of file
+   WTF_CSRF_ENABLED = False
+   
+   # Tests that need the filename index point it at a temporary file
+   FILE_MANAGER_SEARCH_INDEX = None
\ No newline at end of file
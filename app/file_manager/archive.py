@@ -0,0 +1,204 @@
+import os
+import stat
+import tarfile
+import time
+import zipfile
+import zlib
+
+# format -> (MIME type, file name extension)
+ARCHIVE_FORMATS = {
+    'zip': ('application/zip', '.zip'),
+    'tar': ('application/x-tar', '.tar'),
+    'tar.gz': ('application/gzip', '.tar.gz'),
+}
+READ_CHUNK = 1024 * 1024
+
+
+def iter_archive_entries(base, show_hidden=True, exclude=()):
+    """
+    (path, name in the archive, lstat) of base and everything below it
+
+    Names start with the base directory's own name. Symlinks are reported
+    but never followed; directories in exclude and entries that cannot
+    be listed or stat'ed are left out.
+    """
+    root_name = os.path.basename(os.path.normpath(base)) or 'root'
+    yield base, root_name, os.stat(base)
+
+    exclude = frozenset(exclude)
+    stack = [(base, root_name)]
+    while stack:
+        directory, arc_directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                entries = sorted(entries, key=lambda entry: entry.name)
+        except OSError:
+            continue
+        for entry in entries:
+            if not show_hidden and entry.name.startswith('.'):
+                continue
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if stat.S_ISDIR(st.st_mode) and entry.path in exclude:
+                continue
+            arcname = f'{arc_directory}/{entry.name}'
+            yield entry.path, arcname, st
+            if stat.S_ISDIR(st.st_mode):
+                stack.append((entry.path, arcname))
+
+
+def _copy_chunks(f, size):
+    """size bytes of an open file in READ_CHUNK pieces, NUL padded if it shrank meanwhile"""
+    remaining = size
+    while remaining > 0:
+        try:
+            chunk = f.read(min(READ_CHUNK, remaining))
+        except OSError:
+            chunk = b''
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+    while remaining > 0:
+        yield b'\0' * min(READ_CHUNK, remaining)
+        remaining -= READ_CHUNK
+
+
+def stream_tar(base, compress=False, show_hidden=True, exclude=()):
+    """
+    A tar (or tar.gz) archive of base as a stream of byte chunks
+
+    Headers come from tarfile and file data is copied in READ_CHUNK
+    pieces straight into the response, so memory use stays at one chunk
+    and no temporary archive is written. Directories, regular files and
+    symlinks are archived; files that cannot be opened and special files
+    are skipped.
+    """
+    chunks = _tar_chunks(base, show_hidden, exclude)
+    return _gzip_chunks(chunks) if compress else chunks
+
+
+def _gzip_chunks(chunks, level=6):
+    gzip = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = gzip.compress(chunk)
+        if data:
+            yield data
+    yield gzip.flush()
+
+
+def _tar_chunks(base, show_hidden, exclude):
+    written = 0
+    for path, arcname, st in iter_archive_entries(base, show_hidden, exclude):
+        info = tarfile.TarInfo(arcname)
+        info.mode = stat.S_IMODE(st.st_mode)
+        info.uid, info.gid = st.st_uid, st.st_gid
+        info.mtime = st.st_mtime
+        source = None
+        if stat.S_ISDIR(st.st_mode):
+            info.type = tarfile.DIRTYPE
+        elif stat.S_ISLNK(st.st_mode):
+            info.type = tarfile.SYMTYPE
+            try:
+                info.linkname = os.readlink(path)
+            except OSError:
+                continue
+        elif stat.S_ISREG(st.st_mode):
+            try:
+                source = open(path, 'rb')
+            except OSError:
+                continue
+            info.size = st.st_size
+        else:
+            continue
+
+        # PAX headers carry long names and sizes over 8 GB
+        header = info.tobuf(tarfile.PAX_FORMAT, 'utf-8', 'surrogateescape')
+        yield header
+        padding = 0
+        if source is not None:
+            with source:
+                for chunk in _copy_chunks(source, info.size):
+                    yield chunk
+            padding = -info.size % tarfile.BLOCKSIZE
+            if padding:
+                yield b'\0' * padding
+        written += len(header) + info.size + padding
+
+    # End of archive: two empty blocks, padded to a whole record
+    trailer = 2 * tarfile.BLOCKSIZE
+    trailer += -(written + trailer) % tarfile.RECORDSIZE
+    yield b'\0' * trailer
+
+
+class _ChunkWriter:
+    """Write-only file object whose contents are taken out as they are produced"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _zip_info(arcname, st):
+    # Zip dates start in 1980
+    date_time = time.localtime(max(st.st_mtime, 315532800))[:6]
+    info = zipfile.ZipInfo(arcname, date_time=date_time)
+    info.external_attr = (st.st_mode & 0xFFFF) << 16
+    return info
+
+
+def stream_zip(base, show_hidden=True, exclude=()):
+    """
+    A zip archive of base as a stream of byte chunks
+
+    zipfile writes to a non-seekable stream by putting sizes and CRCs in
+    data descriptors after each file, so the archive is produced in one
+    pass without a temporary file. Symlinks are stored as links, the way
+    Info-ZIP does; files that cannot be opened and special files are skipped.
+    """
+    writer = _ChunkWriter()
+    with zipfile.ZipFile(writer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for path, arcname, st in iter_archive_entries(base, show_hidden, exclude):
+            if stat.S_ISDIR(st.st_mode):
+                info = _zip_info(arcname + '/', st)
+                info.external_attr |= 0x10  # MS-DOS directory flag
+                archive.writestr(info, b'')
+            elif stat.S_ISLNK(st.st_mode):
+                try:
+                    target = os.readlink(path)
+                except OSError:
+                    continue
+                archive.writestr(_zip_info(arcname, st), target)
+            elif stat.S_ISREG(st.st_mode):
+                try:
+                    source = open(path, 'rb')
+                except OSError:
+                    continue
+                info = _zip_info(arcname, st)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.file_size = st.st_size  # Lets zipfile pick ZIP64 headers for large files
+                with source, archive.open(info, 'w') as target:
+                    for chunk in _copy_chunks(source, st.st_size):
+                        target.write(chunk)
+                        data = writer.take()
+                        if data:
+                            yield data
+            else:
+                continue
+            data = writer.take()
+            if data:
+                yield data
+    yield writer.take()  # Central directory
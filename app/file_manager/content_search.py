@@ -0,0 +1,442 @@
+import fnmatch
+import mmap
+import multiprocessing
+import os
+import re
+import stat
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+BINARY_SNIFF_BYTES = 8192  # A NUL byte in this prefix marks a file as binary, as grep does
+MMAP_THRESHOLD = 1024 * 1024  # Larger files are mapped rather than read
+MAX_LINE_TEXT = 300  # Characters of context reported around a match
+MAX_MATCHES_PER_FILE = 50
+NEWLINE_COUNT_STEP = 1024 * 1024
+FIND_STEP = 4 * 1024 * 1024
+
+
+def compile_pattern(query, regex=False, case_sensitive=False):
+    """
+    Bytes pattern for a content search
+
+    Raises:
+        ValueError: for an empty query or an invalid regular expression
+    """
+    if not query:
+        raise ValueError('Search text is empty')
+    source = query if regex else re.escape(query)
+    try:
+        return re.compile(source.encode('utf-8'), 0 if case_sensitive else re.IGNORECASE)
+    except re.error as e:
+        raise ValueError(f'Invalid regular expression: {e}') from e
+
+
+def literal_needle(query, regex=False, case_sensitive=False):
+    """
+    Bytes to look for with find() for a plain-text query, or None for regexes
+
+    Finding the literal in a lower-cased copy is several times faster than
+    a case-insensitive regex, which cannot use its literal prefix scan.
+    """
+    if regex or not query:
+        return None
+    needle = query.encode('utf-8')
+    return needle if case_sensitive else needle.lower()
+
+
+def _find_literal(buffer, needle, fold):
+    """(start, end) of each occurrence of needle, lower-casing buffer slice by slice when fold"""
+    overlap = len(needle) - 1
+    position = 0
+    for offset in range(0, len(buffer), FIND_STEP):
+        piece = buffer[offset:offset + FIND_STEP + overlap]
+        if fold:
+            piece = piece.lower()
+        index = piece.find(needle, max(0, position - offset))
+        while 0 <= index < FIND_STEP:
+            start = offset + index
+            position = start + len(needle)
+            yield start, position
+            index = piece.find(needle, index + len(needle))
+
+
+def _count_newlines(buffer, start, end):
+    if isinstance(buffer, bytes):
+        return buffer.count(b'\n', start, end)
+    # mmap has no count(); count slice by slice to bound the copies
+    count = 0
+    for offset in range(start, end, NEWLINE_COUNT_STEP):
+        count += buffer[offset:min(end, offset + NEWLINE_COUNT_STEP)].count(b'\n')
+    return count
+
+
+def _context(buffer, start, end, binary):
+    """Text around a match: its line for text files, nearby bytes for binary ones"""
+    if binary:
+        low, high = max(0, start - 40), min(len(buffer), end + 40)
+        return ''.join(chr(b) if 32 <= b < 127 else '.' for b in buffer[low:high]), start - low
+
+    line_start = buffer.rfind(b'\n', 0, start) + 1
+    line_end = buffer.find(b'\n', end)
+    if line_end < 0:
+        line_end = len(buffer)
+    # Long lines (minified files, logs) are cut to a window around the match
+    if line_end - line_start > MAX_LINE_TEXT:
+        line_start = max(line_start, start - MAX_LINE_TEXT // 2)
+        line_end = min(line_end, line_start + MAX_LINE_TEXT)
+    text = buffer[line_start:line_end].decode('utf-8', errors='replace').rstrip('\r')
+    return text, len(buffer[line_start:start].decode('utf-8', errors='replace'))
+
+
+def grep_file(path, pattern, include_binary=False, max_file_size=None, max_matches=MAX_MATCHES_PER_FILE,
+              literal=None):
+    """
+    Matches of a compiled bytes pattern in one file
+
+    Small files are read whole; large ones are memory-mapped, so the regex
+    runs over the page cache without copying the file. Binary files (a
+    NUL byte near the start) are skipped unless include_binary, in which
+    case matches are reported by byte offset. With literal (see
+    literal_needle), matches are located with find() instead of the regex.
+
+    Returns:
+        dict with path, matches (line, column, offset, text), binary and
+        truncated; skipped is set instead of matches for files that were
+        not searched
+    """
+    result = {'path': path, 'matches': [], 'binary': False, 'truncated': False, 'size': 0}
+    try:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            result['size'] = size
+            if max_file_size and size > max_file_size:
+                result['skipped'] = 'too_large'
+                return result
+            if size == 0:
+                return result
+
+            binary = b'\0' in f.read(BINARY_SNIFF_BYTES)
+            result['binary'] = binary
+            if binary and not include_binary:
+                result['skipped'] = 'binary'
+                return result
+
+            f.seek(0)
+            if size >= MMAP_THRESHOLD:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                buffer = f.read()
+
+            try:
+                if literal is not None:
+                    spans = _find_literal(buffer, literal, fold=bool(pattern.flags & re.IGNORECASE))
+                else:
+                    spans = (match.span() for match in pattern.finditer(buffer))
+                line, position = 1, 0
+                for start, end in spans:
+                    if len(result['matches']) >= max_matches:
+                        result['truncated'] = True
+                        break
+                    if not binary:
+                        line += _count_newlines(buffer, position, start)
+                        position = start
+                    text, column = _context(buffer, start, end, binary)
+                    result['matches'].append({
+                        'line': None if binary else line,
+                        'column': column,
+                        'offset': start,
+                        'text': text,
+                    })
+            finally:
+                if isinstance(buffer, mmap.mmap):
+                    buffer.close()
+    except (OSError, ValueError) as e:
+        result['skipped'] = 'error'
+        result['error'] = str(e)
+    return result
+
+
+_worker_pattern = None
+_worker_pattern_key = None
+
+
+def _grep_chunk(paths, pattern_key, options):
+    """Pool task: grep a chunk of files, compiling the pattern once per worker"""
+    global _worker_pattern, _worker_pattern_key
+    if _worker_pattern_key != pattern_key:
+        _worker_pattern = compile_pattern(*pattern_key)
+        _worker_pattern_key = pattern_key
+    return [grep_file(path, _worker_pattern, **options) for path in paths]
+
+
+def _pool_context():
+    """Fork where available, so workers do not re-import the app"""
+    if 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing.get_context()
+
+
+class ContentSearchJob:
+    """
+    Search the contents of every file below a directory, on a background thread
+
+    Files are listed with scandir (symlinks are not followed, only regular
+    files are opened) and grepped in chunks by a process pool, so several
+    cores run the regex at once. Each file with matches becomes an event;
+    events() returns those after a sequence number, so clients can stream
+    results while the search runs.
+    """
+
+    CHUNK_FILES = 32
+    CHUNK_BYTES = 32 * 1024 * 1024
+
+    def __init__(self, base, query, regex=False, case_sensitive=False, include=None, show_hidden=False,
+                 include_binary=False, max_file_size=100 * 1024 * 1024, max_matches=1000,
+                 exclude=(), workers=None, user_id=None):
+        """
+        Args:
+            base: Directory to search
+            query: Text or regular expression to find
+            regex: Treat query as a regular expression
+            case_sensitive: Match case exactly
+            include: Only files whose name matches this glob (e.g. '*.env')
+            show_hidden: Descend into dot directories and search dot files
+            include_binary: Search binary files too, reporting byte offsets
+            max_file_size: Larger files are skipped
+            max_matches: Stop after this many matches in total
+            exclude: Directories not to descend into
+            workers: Worker processes (default: CPU count, 1 searches in-process)
+            user_id: Owner of the job
+
+        Raises:
+            ValueError: for an invalid pattern
+        """
+        self.pattern_key = (query, regex, case_sensitive)
+        self.pattern = compile_pattern(*self.pattern_key)
+        self.id = uuid.uuid4().hex
+        self.base = base
+        self.query = query
+        self.include = include
+        self.show_hidden = show_hidden
+        self.exclude = frozenset(exclude)
+        self.options = {'include_binary': include_binary, 'max_file_size': max_file_size,
+                        'literal': literal_needle(query, regex, case_sensitive)}
+        self.max_matches = max_matches
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.user_id = user_id
+
+        self.status = 'pending'
+        self.error = None
+        self.started = None
+        self.finished = None
+        self.files_listed = 0
+        self.files_searched = 0
+        self.bytes_searched = 0
+        self.files_skipped = {'binary': 0, 'too_large': 0, 'error': 0}
+        self.match_count = 0
+        self.files_matched = 0
+        self.limit_reached = False
+        self._events = []
+        self._cancel = threading.Event()
+        self._changed = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name=f'content-search-{self.id[:8]}', daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def done(self):
+        return self.status in ('completed', 'cancelled', 'error')
+
+    def run(self):
+        self.status = 'running'
+        self.started = time.monotonic()
+        try:
+            if self.workers == 1:
+                for path, _ in self._iter_files():
+                    if self._cancel.is_set():
+                        break
+                    self._record(grep_file(path, self.pattern, **self.options))
+            else:
+                self._run_pool()
+            self.status = 'cancelled' if self._cancel.is_set() and not self.limit_reached else 'completed'
+        except Exception as e:
+            # Any failure must end the job: streams poll until it is done
+            print(f"Content search {self.id} failed: {e}")
+            self.error = str(e) or type(e).__name__
+            self.status = 'error'
+        finally:
+            if not self.done:
+                self.error = self.error or 'Search stopped unexpectedly'
+                self.status = 'error'
+            self.finished = time.monotonic()
+            with self._changed:
+                self._changed.notify_all()
+
+    def _run_pool(self):
+        executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_pool_context())
+        in_flight = set()
+
+        def collect(block):
+            nonlocal in_flight
+            done, in_flight = wait(in_flight, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+            for future in done:
+                for result in future.result():
+                    self._record(result)
+
+        try:
+            for chunk in self._iter_chunks():
+                if self._cancel.is_set():
+                    break
+                in_flight.add(executor.submit(_grep_chunk, chunk, self.pattern_key, self.options))
+                # Keep a bounded number of chunks queued
+                if len(in_flight) >= self.workers * 2:
+                    collect(block=True)
+                elif in_flight:
+                    collect(block=False)
+            while in_flight and not self._cancel.is_set():
+                collect(block=True)
+        finally:
+            executor.shutdown(wait=not self._cancel.is_set(), cancel_futures=True)
+
+    def _iter_files(self):
+        """Regular files below base, depth first, symlinks not followed"""
+        stack = [self.base]
+        while stack and not self._cancel.is_set():
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    entries = list(entries)
+            except OSError:
+                self.files_skipped['error'] += 1
+                continue
+            for entry in entries:
+                if not self.show_hidden and entry.name.startswith('.'):
+                    continue
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                if stat.S_ISDIR(st.st_mode):
+                    if entry.path not in self.exclude:
+                        stack.append(entry.path)
+                elif stat.S_ISREG(st.st_mode):
+                    if self.include and not fnmatch.fnmatch(entry.name, self.include):
+                        continue
+                    self.files_listed += 1
+                    yield entry.path, st.st_size
+
+    def _iter_chunks(self):
+        chunk, chunk_bytes = [], 0
+        for path, size in self._iter_files():
+            chunk.append(path)
+            chunk_bytes += size
+            if len(chunk) >= self.CHUNK_FILES or chunk_bytes >= self.CHUNK_BYTES:
+                yield chunk
+                chunk, chunk_bytes = [], 0
+        if chunk:
+            yield chunk
+
+    def _record(self, result):
+        """Count a file's result and publish it as an event if it matched"""
+        skipped = result.get('skipped')
+        if skipped:
+            self.files_skipped[skipped] += 1
+            return
+        self.files_searched += 1
+        self.bytes_searched += result['size']
+        if not result['matches'] or self.limit_reached:
+            return
+
+        remaining = self.max_matches - self.match_count
+        if len(result['matches']) >= remaining:
+            result['matches'] = result['matches'][:remaining]
+            self.limit_reached = True
+            self.cancel()
+        self.match_count += len(result['matches'])
+        self.files_matched += 1
+        with self._changed:
+            self._events.append(dict(result, type='file', seq=len(self._events) + 1))
+            self._changed.notify_all()
+
+    def events(self, since=0, timeout=None):
+        """
+        File events after sequence number since
+
+        With a timeout, waits up to that long for new events while the job runs.
+        """
+        with self._changed:
+            if timeout and len(self._events) <= since and not self.done:
+                self._changed.wait(timeout)
+            return self._events[since:]
+
+    def snapshot(self):
+        """Progress and totals of the search"""
+        end = self.finished or time.monotonic()
+        return {
+            'job_id': self.id,
+            'path': self.base,
+            'query': self.query,
+            'status': self.status,
+            'error': self.error,
+            'files_listed': self.files_listed,
+            'files_searched': self.files_searched,
+            'bytes_searched': self.bytes_searched,
+            'files_skipped': dict(self.files_skipped),
+            'files_matched': self.files_matched,
+            'match_count': self.match_count,
+            'limit_reached': self.limit_reached,
+            'last_seq': len(self._events),
+            'elapsed': round(end - self.started, 3) if self.started else 0.0,
+        }
+
+
+class TooManySearches(Exception):
+    """A user already has as many content searches running as allowed"""
+
+
+class ContentSearchJobs:
+    """Running and recent content searches"""
+
+    def __init__(self, max_jobs=20, max_running_per_user=2):
+        self.max_jobs = max_jobs
+        self.max_running_per_user = max_running_per_user
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, *args, max_running=None, **kwargs):
+        """
+        Create and start a ContentSearchJob
+
+        Each search keeps a process pool busy, so a user may only have
+        max_running (default max_running_per_user) of them running at once.
+
+        Raises:
+            ValueError: for an invalid pattern
+            TooManySearches: when the job's user has max_running searches running
+        """
+        job = ContentSearchJob(*args, **kwargs)
+        max_running = max_running or self.max_running_per_user
+        with self._lock:
+            if job.user_id is not None:
+                running = sum(1 for old in self._jobs.values() if old.user_id == job.user_id and not old.done)
+                if running >= max_running:
+                    raise TooManySearches(f'{running} content searches are already running; '
+                                          f'wait for one to finish or cancel it')
+            self._jobs[job.id] = job
+            finished = [job_id for job_id, old in self._jobs.items() if old.done]
+            for job_id in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+                del self._jobs[job_id]
+        return job.start()
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
@@ -0,0 +1,267 @@
+import heapq
+import os
+import stat
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class DirectoryUsage:
+    """Totals of the entries directly inside one directory, as cached between jobs"""
+    __slots__ = ('size', 'blocks', 'files', 'linked', 'subdirs')
+
+    def __init__(self):
+        self.size = 0  # Apparent size of the files (st_size)
+        self.blocks = 0  # Allocated 512-byte blocks
+        self.files = 0
+        self.linked = []  # (dev, ino, size, blocks) of files with more than one link
+        self.subdirs = []  # (name, dev, mtime_ns) of subdirectories, symlinks not followed
+
+
+class DiskUsageCache:
+    """
+    Per-directory usage keyed by the directory's mtime
+
+    Adding, removing or renaming an entry changes the directory's mtime,
+    so an unchanged mtime means the same set of entries and the cached
+    totals can be reused without listing the directory again. Files that
+    grow in place do not change it; jobs started with refresh rescan.
+    """
+
+    def __init__(self, max_directories=200000):
+        self.max_directories = max_directories
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, mtime_ns):
+        with self._lock:
+            cached = self._entries.get(path)
+            if cached is None or cached[0] != mtime_ns:
+                return None
+            self._entries.move_to_end(path)
+            return cached[1]
+
+    def put(self, path, mtime_ns, usage):
+        with self._lock:
+            self._entries[path] = (mtime_ns, usage)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_directories:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def scan_directory_usage(path):
+    """
+    DirectoryUsage of the entries directly inside path, with one stat per entry
+
+    Symlinks are counted as files (their own size) and never followed.
+
+    Raises:
+        OSError: if the directory cannot be listed
+    """
+    usage = DirectoryUsage()
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue  # Vanished while listing
+            if stat.S_ISDIR(st.st_mode):
+                usage.subdirs.append((entry.name, st.st_dev, st.st_mtime_ns))
+            elif st.st_nlink > 1:
+                usage.linked.append((st.st_dev, st.st_ino, st.st_size, st.st_blocks))
+            else:
+                usage.files += 1
+                usage.size += st.st_size
+                usage.blocks += st.st_blocks
+    return usage
+
+
+class DiskUsageJob:
+    """
+    Recursive disk usage of one directory, computed on a background thread
+
+    Totals are updated after every directory, so snapshot() reports partial
+    results while the job runs. Files with several hard links are counted
+    once; with one_file_system, directories on other devices are skipped.
+    """
+
+    PROGRESS_CHILDREN = 10  # Largest subdirectories reported
+
+    def __init__(self, path, cache, one_file_system=False, refresh=False, user_id=None):
+        self.id = uuid.uuid4().hex
+        self.path = path
+        self.cache = cache
+        self.one_file_system = one_file_system
+        self.refresh = refresh
+        self.user_id = user_id
+        self.status = 'pending'
+        self.error = None
+        self.started = None
+        self.finished = None
+        self.current = None
+        self.size = 0
+        self.blocks = 0
+        self.files = 0
+        self.folders = 0
+        self.hardlinks_skipped = 0
+        self.mounts_skipped = 0
+        self.cached_directories = 0
+        self.unreadable_directories = 0
+        self.children = {}  # Top-level subdirectory -> [size, blocks]
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name=f'disk-usage-{self.id[:8]}', daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.done
+
+    @property
+    def done(self):
+        return self.status in ('completed', 'cancelled', 'error')
+
+    def run(self):
+        self.status = 'running'
+        self.started = time.monotonic()
+        try:
+            self._walk()
+            self.status = 'cancelled' if self._cancel.is_set() else 'completed'
+        except Exception as e:
+            # Any failure must end the job: streams poll until it is done
+            print(f"Disk usage {self.id} failed: {e}")
+            self.error = str(e) or type(e).__name__
+            self.status = 'error'
+        finally:
+            if not self.done:
+                self.error = self.error or 'Disk usage stopped unexpectedly'
+                self.status = 'error'
+            self.current = None
+            self.finished = time.monotonic()
+
+    def _walk(self):
+        root_stat = os.stat(self.path)
+        seen_links = set()
+        stack = [(self.path, None, root_stat.st_mtime_ns)]
+
+        while stack and not self._cancel.is_set():
+            path, top, mtime_ns = stack.pop()
+            self.current = path
+
+            usage = None if self.refresh else self.cache.get(path, mtime_ns)
+            if usage is not None:
+                cached = True
+            else:
+                cached = False
+                try:
+                    usage = scan_directory_usage(path)
+                except OSError:
+                    with self._lock:
+                        self.unreadable_directories += 1
+                    continue
+                self.cache.put(path, mtime_ns, usage)
+
+            size, blocks, files, skipped = usage.size, usage.blocks, usage.files, 0
+            for dev, ino, link_size, link_blocks in usage.linked:
+                if (dev, ino) in seen_links:
+                    skipped += 1
+                    continue
+                seen_links.add((dev, ino))
+                size += link_size
+                blocks += link_blocks
+                files += 1
+
+            for name, dev, sub_mtime_ns in usage.subdirs:
+                if self.one_file_system and dev != root_stat.st_dev:
+                    with self._lock:
+                        self.mounts_skipped += 1
+                    continue
+                sub_path = os.path.join(path, name)
+                if cached:
+                    # The listing is cached but the subdirectory's own mtime may have changed
+                    try:
+                        sub_mtime_ns = os.stat(sub_path, follow_symlinks=False).st_mtime_ns
+                    except OSError:
+                        continue
+                stack.append((sub_path, top or name, sub_mtime_ns))
+
+            with self._lock:
+                self.size += size
+                self.blocks += blocks
+                self.files += files
+                self.folders += len(usage.subdirs)
+                self.hardlinks_skipped += skipped
+                self.cached_directories += cached
+                if top is not None:
+                    totals = self.children.setdefault(top, [0, 0])
+                    totals[0] += size
+                    totals[1] += blocks
+
+    def snapshot(self):
+        """Current totals in bytes; partial while the job is running"""
+        with self._lock:
+            largest = heapq.nlargest(self.PROGRESS_CHILDREN, self.children.items(), key=lambda item: item[1][0])
+            disk_bytes = self.blocks * 512
+            end = self.finished or time.monotonic()
+            return {
+                'job_id': self.id,
+                'path': self.path,
+                'status': self.status,
+                'error': self.error,
+                'current': self.current,
+                'total_size_bytes': self.size,
+                'disk_usage_bytes': disk_bytes,
+                'file_count': self.files,
+                'folder_count': self.folders,
+                'hardlinks_skipped': self.hardlinks_skipped,
+                'mounts_skipped': self.mounts_skipped,
+                'cached_directories': self.cached_directories,
+                'unreadable_directories': self.unreadable_directories,
+                'children': [{'name': name, 'size_bytes': size} for name, (size, _) in largest],
+                'elapsed': round(end - self.started, 3) if self.started else 0.0,
+            }
+
+
+class DiskUsageJobs:
+    """Running and recent disk usage jobs, sharing one DiskUsageCache"""
+
+    def __init__(self, cache=None, max_jobs=50):
+        self.cache = cache or DiskUsageCache()
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, path, one_file_system=False, refresh=False, user_id=None):
+        """
+        Start a job for path, or return the running job with the same options
+
+        Returns:
+            DiskUsageJob
+        """
+        with self._lock:
+            for job in self._jobs.values():
+                if (not job.done and job.path == path and job.user_id == user_id
+                        and job.one_file_system == one_file_system and not refresh):
+                    return job
+
+            job = DiskUsageJob(path, self.cache, one_file_system, refresh, user_id)
+            self._jobs[job.id] = job
+            finished = [job_id for job_id, old in self._jobs.items() if old.done]
+            for job_id in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+                del self._jobs[job_id]
+        return job.start()
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
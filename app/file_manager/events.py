@@ -0,0 +1,158 @@
+import os
+import threading
+
+from app.file_manager.watcher import DirectoryWatcher, GONE
+
+
+class LiveDirectories:
+    """
+    Directories open in file manager pages, with their changes pushed over Socket.IO
+
+    Each client (Socket.IO sid) subscribes to the directory it shows and
+    joins that directory's room. Changes found by the DirectoryWatcher are
+    sent to the room once per batch, with the file info of created and
+    modified entries, so pages update their rows instead of listing the
+    whole directory again.
+    """
+
+    NAMESPACE = '/file_manager'
+    EVENT_NAME = 'changes'
+
+    def __init__(self, socketio=None, describe=None, invalidate=None):
+        """
+        Args:
+            socketio: SocketIO to emit with (None to only track subscriptions)
+            describe: Callable returning the file info of a path
+            invalidate: Callable taking a directory whose cached listing is stale
+        """
+        self.socketio = socketio
+        self.describe = describe
+        self.invalidate = invalidate
+        self.app = None
+        self.watcher = DirectoryWatcher(self._changed)
+        self.clients = {}  # sid -> set of directories
+        self.lock = threading.Lock()
+
+    def init_app(self, app):
+        """Use the app's watch settings, and its context for describing entries"""
+        self.app = app
+        self.watcher.poll_interval = app.config.get('FILE_MANAGER_WATCH_POLL_INTERVAL', 2.0)
+        self.watcher.use_inotify = app.config.get('FILE_MANAGER_WATCH_INOTIFY', True)
+
+    @staticmethod
+    def room(directory):
+        """Socket.IO room that receives a directory's changes"""
+        return f'file_manager_{directory}'
+
+    def subscribe(self, sid, directory):
+        """
+        Watch directory for a client
+
+        Returns:
+            'inotify' or 'polling'
+
+        Raises:
+            OSError: if the directory cannot be watched
+        """
+        with self.lock:
+            directories = self.clients.setdefault(sid, set())
+            if directory in directories:
+                return self.watcher.backend(directory)
+            backend = self.watcher.watch(directory)
+            directories.add(directory)
+            return backend
+
+    def unsubscribe(self, sid, directory):
+        with self.lock:
+            directories = self.clients.get(sid)
+            if not directories or directory not in directories:
+                return
+            directories.discard(directory)
+            if not directories:
+                del self.clients[sid]
+        self.watcher.unwatch(directory)
+
+    def disconnect(self, sid):
+        """Drop every subscription of a client"""
+        with self.lock:
+            directories = self.clients.pop(sid, set())
+        for directory in directories:
+            self.watcher.unwatch(directory)
+
+    def _changed(self, directory, changes):
+        if changes[0]['type'] == GONE:
+            # The watcher dropped the watch; a client opening the directory again starts a new one
+            with self.lock:
+                for directories in self.clients.values():
+                    directories.discard(directory)
+        if self.invalidate:
+            self.invalidate(directory)
+        if self.describe:
+            if self.app is not None:
+                with self.app.app_context():
+                    self._describe(directory, changes)
+            else:
+                self._describe(directory, changes)
+        self.emit(directory, changes)
+
+    def _describe(self, directory, changes):
+        for change in changes:
+            if change['type'] in ('created', 'modified'):
+                info = self.describe(os.path.join(directory, change['name']))
+                if info.get('error'):
+                    change['type'] = 'deleted'  # Gone again before it could be described
+                else:
+                    change['item'] = info
+
+    def emit(self, directory, changes):
+        if self.socketio is None or self.socketio.server is None:
+            return
+        try:
+            self.socketio.emit(self.EVENT_NAME, {'path': directory, 'changes': changes},
+                               to=self.room(directory), namespace=self.NAMESPACE)
+        except Exception as e:
+            print(f"Error emitting file manager changes for {directory}: {e}")
+
+
+def register_file_manager_handlers(socketio, live_directories):
+    """Socket.IO handlers for watching the directory shown by a file manager page"""
+
+    @socketio.on('watch', namespace=LiveDirectories.NAMESPACE)
+    def file_manager_watch(data):
+        """Join a directory's room; the reply says whether it is watched and how"""
+        from flask import request
+        from flask_login import current_user
+        from flask_socketio import join_room
+        from app.file_manager.routes import get_safe_path, reset_path_decisions
+
+        if not current_user.is_authenticated:
+            return {'success': False, 'error': 'Authentication required.'}
+
+        reset_path_decisions()  # Socket.IO events do not run before_request hooks
+        try:
+            directory = get_safe_path((data or {}).get('path'))
+            if not os.path.isdir(directory):
+                return {'success': False, 'error': 'Not a directory.'}
+            # Join first so that no change between watching and joining is lost
+            join_room(live_directories.room(directory))
+            backend = live_directories.subscribe(request.sid, directory)
+        except (PermissionError, OSError) as e:
+            return {'success': False, 'error': str(e)}
+        return {'success': True, 'path': directory, 'backend': backend}
+
+    @socketio.on('unwatch', namespace=LiveDirectories.NAMESPACE)
+    def file_manager_unwatch(data):
+        """Leave a directory's room"""
+        from flask import request
+        from flask_socketio import leave_room
+
+        directory = (data or {}).get('path')
+        if directory:
+            leave_room(live_directories.room(directory))
+            live_directories.unsubscribe(request.sid, directory)
+
+    @socketio.on('disconnect', namespace=LiveDirectories.NAMESPACE)
+    def file_manager_disconnect(*args):
+        from flask import request
+
+        live_directories.disconnect(request.sid)
@@ -0,0 +1,296 @@
+import os
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+
+from app.file_manager.content_search import BINARY_SNIFF_BYTES
+
+VIEW_MODES = ('lines', 'tail', 'bytes', 'follow')
+DEFAULT_PAGE_LINES = 500
+MAX_PAGE_LINES = 5000
+MAX_PAGE_BYTES = 1024 * 1024  # Upper bound on the content of one response
+INDEX_STEP = 64 * 1024  # Bytes between line index checkpoints
+READ_CHUNK = 64 * 1024  # Largest pread when scanning for newlines
+
+
+def decode_text(data):
+    """Decode as UTF-8, falling back to latin-1 like the previous viewer"""
+    try:
+        return data.decode('utf-8'), 'utf-8'
+    except UnicodeDecodeError:
+        return data.decode('latin-1'), 'latin-1'
+
+
+class FileReader:
+    """
+    Byte ranges and newline searches of an open file, through os.pread
+
+    The file is not mapped: a file truncated while it is read (a rotated
+    log that is being followed) only gives short reads, where touching a
+    mapped page past the new end kills the process with SIGBUS. size is
+    the size when the file was opened.
+    """
+
+    def __init__(self, fd, size):
+        self.fd = fd
+        self.size = size
+
+    def read(self, start, end):
+        """Bytes of [start, end); fewer when the file shrank since it was opened"""
+        end = min(end, self.size)
+        return os.pread(self.fd, end - start, start) if end > start else b''
+
+    def _chunks(self, start, end, first=READ_CHUNK):
+        """(offset, data) pieces of [start, end), growing from first bytes up to READ_CHUNK"""
+        size = first
+        while start < end:
+            data = self.read(start, min(end, start + size))
+            if not data:
+                return
+            yield start, data
+            start += len(data)
+            size = min(size * 2, READ_CHUNK)
+
+    def find_newline(self, start):
+        """Offset of the first newline at or after start, or -1"""
+        # Lines are usually short: start with a small read
+        for offset, data in self._chunks(start, self.size, first=4096):
+            newline = data.find(b'\n')
+            if newline >= 0:
+                return offset + newline
+        return -1
+
+    def skip_lines(self, start, count):
+        """Offset after the count-th newline from start, or -1 when the file ends first"""
+        if not count:
+            return start
+        for offset, data in self._chunks(start, self.size, first=4096):
+            position = 0
+            while count:
+                newline = data.find(b'\n', position)
+                if newline < 0:
+                    break
+                position = newline + 1
+                count -= 1
+            if not count:
+                return offset + position
+        return -1
+
+    def count_newlines(self, start, end):
+        return sum(data.count(b'\n') for _, data in self._chunks(start, end))
+
+
+class LineIndex:
+    """
+    Sparse line offsets of one file
+
+    Holds a (byte offset, line number) checkpoint at the first line start
+    after every INDEX_STEP bytes, so a line is found by bisecting the
+    checkpoints and scanning at most INDEX_STEP bytes. The index is built
+    lazily, only as far as the lines requested, and resumes from its last
+    checkpoint when the file grows.
+    """
+
+    def __init__(self, identity, size):
+        self.identity = identity  # (st_dev, st_ino, st_mtime_ns)
+        self.size = size
+        self.offsets = array('q', [0])
+        self.lines = array('q', [1])
+        self.total_lines = None  # Known once the whole file has been scanned
+        self.lock = threading.Lock()
+
+    def grown(self, identity, size):
+        """Keep the checkpoints of a file that was appended to; its end must be scanned again"""
+        self.identity = identity
+        self.size = size
+        self.total_lines = None
+
+    def extend(self, reader, line=None):
+        """Add checkpoints until line is covered, or to the end of the file"""
+        end = reader.size
+        while self.total_lines is None and (line is None or self.lines[-1] < line):
+            offset, number = self.offsets[-1], self.lines[-1]
+            step_end = offset + INDEX_STEP
+            # One read for the step and, usually, the rest of the line it ends in
+            data = reader.read(offset, step_end + 4096) if step_end < end else b''
+            newline = data.find(b'\n', INDEX_STEP)
+            if newline >= 0:
+                newline += offset
+            elif len(data) > INDEX_STEP:
+                newline = reader.find_newline(offset + len(data))
+            if newline < 0 or newline + 1 >= end:
+                # Last stretch: count what is left, a final line without newline included
+                count = reader.count_newlines(offset, end)
+                trailing = end > offset and reader.read(end - 1, end) != b'\n'
+                self.total_lines = number - 1 + count + trailing
+                break
+            # newline is the first one at or after step_end
+            self.lines.append(number + data.count(b'\n', 0, INDEX_STEP) + 1)
+            self.offsets.append(newline + 1)
+
+    def locate(self, reader, line):
+        """
+        Byte offset where line (1-based) starts
+
+        Returns:
+            int, or None when the file has fewer lines
+        """
+        with self.lock:
+            self.extend(reader, line)
+            i = bisect_right(self.lines, line) - 1
+            offset, number = self.offsets[i], self.lines[i]
+        offset = reader.skip_lines(offset, line - number)
+        if offset < 0:
+            return None
+        return offset if offset < reader.size or line == 1 else None
+
+    def count_lines(self, reader):
+        with self.lock:
+            self.extend(reader)
+            return self.total_lines
+
+
+class LineIndexCache:
+    """LineIndex per path, dropped when the file is replaced, truncated or rewritten"""
+
+    def __init__(self, max_files=32):
+        self.max_files = max_files
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, st):
+        identity = (st.st_dev, st.st_ino, st.st_mtime_ns)
+        with self._lock:
+            index = self._indexes.get(path)
+            if index is not None and index.identity != identity:
+                # Same inode and larger: appended (a growing log), so the checkpoints still hold
+                if index.identity[:2] == identity[:2] and st.st_size > index.size:
+                    index.grown(identity, st.st_size)
+                else:
+                    index = None
+            if index is None:
+                index = LineIndex(identity, st.st_size)
+                self._indexes[path] = index
+            self._indexes.move_to_end(path)
+            while len(self._indexes) > self.max_files:
+                self._indexes.popitem(last=False)
+            return index
+
+
+class TextFileView:
+    """
+    Ranges of a text file, read with os.pread
+
+    Only the requested range is read (at most MAX_PAGE_BYTES), so multi-GB
+    files are served without being read whole; line lookups go through the
+    cached LineIndex. Files being followed are often truncated or rotated
+    under the view, which only shortens reads. Use as a context manager.
+    """
+
+    def __init__(self, path, cache):
+        self.path = path
+        self.cache = cache
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, 'rb')
+        try:
+            st = os.fstat(self._file.fileno())
+            self.reader = FileReader(self._file.fileno(), st.st_size)
+            self.size = st.st_size
+            self.index = self.cache.get(self.path, st)
+        except BaseException:
+            self._file.close()
+            raise
+        return self
+
+    def __exit__(self, *exc):
+        self._file.close()
+
+    @property
+    def binary(self):
+        return b'\0' in self.reader.read(0, BINARY_SNIFF_BYTES)
+
+    def _page(self, start, data, first_line=None, line_count=None):
+        end = start + len(data)
+        content, encoding = decode_text(data)
+        return {
+            'content': content,
+            'encoding': encoding,
+            'binary': self.binary,
+            'size_bytes': self.size,
+            'offset': start,
+            'end_offset': end,
+            'start_line': first_line,
+            'line_count': line_count,
+            'total_lines': self.index.total_lines,
+            'eof': end >= self.size,
+        }
+
+    def _lines_from(self, start, count):
+        """Data and number of the count lines starting at start, bounded by MAX_PAGE_BYTES"""
+        limit = min(self.size, start + MAX_PAGE_BYTES)
+        data = self.reader.read(start, limit)
+        end, read = 0, 0
+        while read < count and end < len(data):
+            newline = data.find(b'\n', end)
+            if newline < 0:
+                if limit < self.size:
+                    break  # A line longer than the page limit; ranges continue it in bytes mode
+                end = len(data)
+                read += 1
+                break
+            end = newline + 1
+            read += 1
+        if read == 0 and start + end < self.size:
+            end = len(data)  # Never return an empty page in the middle of the file
+        return data[:end], read
+
+    def lines(self, start_line=1, count=DEFAULT_PAGE_LINES):
+        start = self.index.locate(self.reader, start_line)
+        if start is None:
+            raise ValueError(f"Line {start_line} is past the end of the file")
+        data, read = self._lines_from(start, count)
+        return self._page(start, data, start_line, read)
+
+    def tail(self, count=DEFAULT_PAGE_LINES):
+        """The last count lines, found by scanning backwards from the end"""
+        lower = max(0, self.size - MAX_PAGE_BYTES)
+        data = self.reader.read(lower, self.size)
+        position, read = len(data), 0
+        search_end = position - 1 if data.endswith(b'\n') else position  # Skip the final newline
+        while read < count and position > 0:
+            newline = data.rfind(b'\n', 0, search_end)
+            position = newline + 1 if newline >= 0 else 0
+            search_end = newline
+            read += 1
+        start = lower + position
+        if start == 0:
+            first_line = 1
+        elif self.index.total_lines is not None and self.reader.read(start - 1, start) == b'\n':
+            first_line = self.index.total_lines - read + 1
+        else:
+            first_line = None  # Unknown without indexing the whole file
+        return self._page(start, data[position:], first_line, read)
+
+    def byte_range(self, offset=0, length=MAX_PAGE_BYTES):
+        if offset > self.size:
+            raise ValueError(f"Offset {offset} is past the end of the file")
+        return self._page(offset, self.reader.read(offset, offset + min(length, MAX_PAGE_BYTES)))
+
+    def follow(self, since):
+        """
+        Complete lines appended after byte offset since
+
+        A file that shrank below since was truncated or replaced (log
+        rotation); its tail is returned with reset set.
+        """
+        if since > self.size:
+            return dict(self.tail(), reset=True)
+        limit = min(self.size, since + MAX_PAGE_BYTES)
+        data = self.reader.read(since, limit)
+        end = data.rfind(b'\n') + 1  # 0 when no line is complete yet
+        if end == 0 and limit - since >= MAX_PAGE_BYTES:
+            end = len(data)  # One line longer than a page
+        return dict(self._page(since, data[:end]), reset=False)
@@ -0,0 +1,198 @@
+import base64
+import binascii
+import json
+import os
+import threading
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from functools import total_ordering
+
+SORT_FIELDS = ('name', 'size', 'mtime')
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
+
+@total_ordering
+class _Descending:
+    """Wraps a sort key so that it orders in reverse"""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+
+def _primary(item, sort):
+    if sort == 'size':
+        return item['size_bytes']
+    if sort == 'mtime':
+        return item.get('mtime') or 0
+    return item['name'].lower()
+
+
+def sort_key(item, sort='name', descending=False):
+    """
+    Sort key of an entry: directories first, then by the sort field, ties broken by name
+
+    The same key is used for ordering a listing and for resuming it from
+    a cursor, so a page always starts right after the previous page's
+    last entry even if entries were added or removed in between.
+    """
+    return _make_key(_cursor_fields(item, sort), descending)
+
+
+def _cursor_fields(item, sort):
+    return [item['is_dir'], _primary(item, sort), item['name'].lower(), item['name']]
+
+
+def _make_key(fields, descending):
+    is_dir, primary, name_lower, name = fields
+    rest = (primary, name_lower, name)
+    return (not is_dir, _Descending(rest) if descending else rest)
+
+
+def encode_cursor(item, sort, descending):
+    """Opaque cursor pointing just after item"""
+    payload = {'s': sort, 'd': descending, 'k': _cursor_fields(item, sort)}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+
+def decode_cursor(cursor, sort, descending):
+    """
+    Sort key stored in a cursor
+
+    Raises:
+        ValueError: if the cursor is malformed or was issued for another sort order
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        fields = payload['k']
+        if payload['s'] != sort or payload['d'] != descending or len(fields) != 4:
+            raise ValueError('Cursor does not match the requested sort order')
+        return _make_key(fields, descending)
+    except (binascii.Error, UnicodeError, TypeError, KeyError, json.JSONDecodeError) as e:
+        raise ValueError(f'Invalid cursor: {e}') from e
+
+
+def matches_filter(item, text=None, kind=None):
+    """Whether an entry's name contains text (case-insensitive) and it is of kind 'dirs' or 'files'"""
+    if kind == 'dirs' and not item['is_dir']:
+        return False
+    if kind == 'files' and item['is_dir']:
+        return False
+    return not text or text.lower() in item['name'].lower()
+
+
+class _Snapshot:
+    def __init__(self, items, mtime_ns):
+        self.items = items
+        self.mtime_ns = mtime_ns
+        self.created = time.monotonic()
+        self.views = {}  # (sort, descending, text, kind) -> sorted, filtered items
+
+
+class DirectoryListingCache:
+    """
+    Recently scanned directories, for paging through a listing without rescanning it
+
+    A snapshot is reused while the directory's mtime is unchanged (entries
+    added, removed or renamed) and it is younger than ttl seconds (sizes and
+    times of existing entries). Sorted and filtered views of a snapshot are
+    kept with it, so each page is a bisect and a slice.
+    """
+
+    def __init__(self, max_directories=8, max_items=200000, ttl=30):
+        self.max_directories = max_directories
+        self.max_items = max_items
+        self.ttl = ttl
+        self._snapshots = OrderedDict()
+        self._lock = threading.Lock()
+
+    def snapshot(self, directory, show_hidden, scan):
+        """
+        Entries of directory, from the cache or by calling scan(directory, show_hidden)
+
+        Returns:
+            _Snapshot with the unsorted entries
+        """
+        key = (directory, show_hidden)
+        mtime_ns = os.stat(directory).st_mtime_ns
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if (snapshot is not None and snapshot.mtime_ns == mtime_ns
+                    and time.monotonic() - snapshot.created < self.ttl):
+                self._snapshots.move_to_end(key)
+                return snapshot
+
+        snapshot = _Snapshot(list(scan(directory, show_hidden)), mtime_ns)
+        with self._lock:
+            self._snapshots[key] = snapshot
+            self._snapshots.move_to_end(key)
+            while len(self._snapshots) > 1 and (
+                    len(self._snapshots) > self.max_directories
+                    or sum(len(s.items) for s in self._snapshots.values()) > self.max_items):
+                self._snapshots.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, directory):
+        """Drop the snapshots of a directory, e.g. when a watcher saw entries change"""
+        with self._lock:
+            for key in [key for key in self._snapshots if key[0] == directory]:
+                del self._snapshots[key]
+
+    def page(self, directory, show_hidden, scan, sort='name', descending=False,
+             text=None, kind=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+        """
+        One page of a sorted, filtered directory listing
+
+        Args:
+            directory: Absolute directory path
+            show_hidden: Include dot files
+            scan: Callable returning the entries of a directory
+            sort: One of SORT_FIELDS
+            descending: Reverse the sort field (directories stay first)
+            text: Only entries whose name contains text
+            kind: 'dirs' or 'files' to only list one kind
+            cursor: next_cursor of the previous page
+            limit: Maximum entries in the page
+
+        Returns:
+            dict with items, total (matching entries) and next_cursor (None on the last page)
+
+        Raises:
+            ValueError: for an unknown sort field or an invalid cursor
+        """
+        if sort not in SORT_FIELDS:
+            raise ValueError(f'Unknown sort field: {sort}')
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        start_key = decode_cursor(cursor, sort, descending) if cursor else None
+
+        snapshot = self.snapshot(directory, show_hidden, scan)
+        view_key = (sort, descending, (text or '').lower(), kind)
+        items = snapshot.views.get(view_key)
+        if items is None:
+            items = [item for item in snapshot.items if matches_filter(item, text, kind)]
+            # Plain tuples sort much faster than wrapped keys; reversing (is_dir, ...) keeps directories first
+            if descending:
+                items.sort(key=lambda item: (item['is_dir'], *_cursor_fields(item, sort)[1:]), reverse=True)
+            else:
+                items.sort(key=lambda item: (not item['is_dir'], *_cursor_fields(item, sort)[1:]))
+            snapshot.views[view_key] = items
+
+        start = 0
+        if start_key is not None:
+            start = bisect_right(items, start_key, key=lambda item: sort_key(item, sort, descending))
+        page = items[start:start + limit]
+        more = start + limit < len(items)
+        return {
+            'items': page,
+            'total': len(items),
+            'next_cursor': encode_cursor(page[-1], sort, descending) if page and more else None,
+        }
+
@@ -0,0 +1,176 @@
+import os
+
+_END = None  # Key marking the end of a prefix in a trie node
+
+
+def _components(path):
+    return [part for part in path.split('/') if part]
+
+
+class PathTrie:
+    """
+    Set of path prefixes matched component by component
+
+    A prefix covers itself and everything below it, so '/root' matches
+    '/root' and '/root/.ssh' but not '/rootfs'. Paths must be absolute and
+    normalized (os.path.abspath).
+    """
+
+    def __init__(self, prefixes=()):
+        self._root = {}
+        for prefix in prefixes:
+            self.add(prefix)
+
+    def add(self, prefix):
+        node = self._root
+        for part in _components(os.path.abspath(prefix)):
+            node = node.setdefault(part, {})
+        node[_END] = True
+
+    def lookup(self, path):
+        """
+        (matched, settled) for path
+
+        settled is True when every path below gets the same answer: a
+        prefix matched, or no prefix goes deeper than path.
+        """
+        node = self._root
+        if _END in node:
+            return True, True
+        for part in _components(path):
+            node = node.get(part)
+            if node is None:
+                return False, True
+            if _END in node:
+                return True, True
+        return False, False
+
+    def matches(self, path):
+        return self.lookup(path)[0]
+
+
+class PathResolver:
+    """
+    os.path.realpath with the resolved parent directories remembered
+
+    Search results and listings come in runs from the same directories,
+    so after the first path of a directory only the last component needs
+    an lstat. Meant to live for one request: a symlink changed later is
+    picked up by the next one.
+    """
+
+    def __init__(self):
+        self._directories = {}
+
+    def resolve(self, path):
+        """realpath of an absolute, normalized path"""
+        parent, _, name = path.rpartition('/')
+        if not name:
+            return path  # '/'
+        parent = parent or '/'
+        real_parent = self._directories.get(parent)
+        if real_parent is None:
+            real_parent = self._directories[parent] = os.path.realpath(parent)
+        real = path if real_parent == parent else os.path.join(real_parent, name)
+        if os.path.islink(real):
+            real = os.path.realpath(real)
+        return real
+
+
+class PathPolicy:
+    """
+    Which paths admins and other users may access, compiled once
+
+    Restricted prefixes are denied to everyone except admin_exempt ones,
+    which admins may access. Non-admins are further limited to the allowed
+    prefixes (except '/') and their home. Prefixes are added both as given
+    and resolved, and a path must pass both as given and with symlinks
+    resolved, so a link cannot lead out of the allowed trees.
+    """
+
+    def __init__(self, allowed, restricted, admin_exempt=('/root',), home=None):
+        home = home or os.path.expanduser('~')
+        user_allowed = [path for path in allowed if os.path.abspath(path) != '/'] + [home]
+        self._deny = {
+            True: self._compile(path for path in restricted if path not in admin_exempt),
+            False: self._compile(restricted),
+        }
+        self._allow = {True: None, False: self._compile(user_allowed)}
+
+    @staticmethod
+    def _compile(prefixes):
+        trie = PathTrie()
+        for prefix in prefixes:
+            trie.add(prefix)
+            trie.add(os.path.realpath(prefix))
+        return trie
+
+    def allows(self, path, admin=False):
+        """Answer for an absolute, normalized path taken as it is (symlinks not resolved)"""
+        if self._deny[admin].matches(path):
+            return False
+        allow = self._allow[admin]
+        return allow is None or allow.matches(path)
+
+    def subtree_answer(self, directory, admin=False):
+        """allows() for every path below directory when it is the same for all of them, else None"""
+        denied, settled = self._deny[admin].lookup(directory)
+        if denied:
+            return False
+        if not settled:
+            return None
+        allow = self._allow[admin]
+        if allow is None:
+            return True
+        allowed, settled = allow.lookup(directory)
+        return allowed if settled else None
+
+    def is_allowed(self, path, admin=False, resolver=None):
+        admin = bool(admin)
+        path = os.path.abspath(path)
+        if not self.allows(path, admin):
+            return False
+        real = resolver.resolve(path) if resolver else os.path.realpath(path)
+        return real == path or self.allows(real, admin)
+
+    def decisions(self, admin):
+        return PathDecisions(self, bool(admin))
+
+
+class PathDecisions:
+    """
+    Policy answers for one request, whose user (and so role) does not change
+
+    Besides remembering answers per path, the policy's answer for the
+    entries of a directory is kept when it is the same for all of them, so
+    a run of search hits from one directory costs a dictionary lookup and
+    the lstat of the symlink check each.
+    """
+
+    def __init__(self, policy, admin):
+        self.policy = policy
+        self.admin = admin
+        self.resolver = PathResolver()
+        self._answers = {}
+        self._subtrees = {}
+
+    def _allows(self, path):
+        directory = path.rpartition('/')[0] or '/'
+        try:
+            answer = self._subtrees[directory]
+        except KeyError:
+            answer = self._subtrees[directory] = self.policy.subtree_answer(directory, self.admin)
+        if answer is None:
+            answer = self.policy.allows(path, self.admin)
+        return answer
+
+    def is_allowed(self, path):
+        answer = self._answers.get(path)
+        if answer is None:
+            absolute = os.path.abspath(path)
+            answer = self._allows(absolute)
+            if answer:
+                real = self.resolver.resolve(absolute)
+                answer = real == absolute or self._allows(real)
+            self._answers[path] = answer
+        return answer
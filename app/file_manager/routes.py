@@ -7,11 +7,27 @@ import grp
 import stat
 import subprocess
 import re
+import json
+import sqlite3
 from datetime import datetime
-from flask import render_template, request, jsonify, current_app, send_file, abort
+from urllib.parse import quote
+from functools import lru_cache
+from flask import render_template, request, jsonify, current_app, send_file, abort, Response, stream_with_context, url_for, g
 from flask_login import login_required, current_user
 from app.file_manager import bp
+from app.file_manager.listing import DirectoryListingCache, DEFAULT_PAGE_SIZE, matches_filter
+from app.file_manager.disk_usage import DiskUsageJobs
+from app.file_manager.search_index import FilenameIndex, name_matcher
+from app.file_manager.content_search import ContentSearchJobs, TooManySearches
+from app.file_manager.archive import ARCHIVE_FORMATS, stream_tar, stream_zip
+from app.file_manager.uploads import UploadError, UploadStore
+from app.file_manager.path_policy import PathPolicy
+from app.file_manager.events import LiveDirectories
+from app import socketio
+from app.file_manager.file_viewer import (LineIndexCache, TextFileView, VIEW_MODES, DEFAULT_PAGE_LINES,
+                                          MAX_PAGE_LINES, MAX_PAGE_BYTES)
 import werkzeug.utils
+from werkzeug.exceptions import HTTPException
 
 # Configuration for system access
 ALLOWED_PATHS = [
@@ -34,37 +50,41 @@ RESTRICTED_PATHS = [
     '/root',  # Unless user is admin
 ]
 
+# Compiled PathPolicy by (allowed, restricted) paths
+_path_policies = {}
+
 def is_admin_user():
     """Check if current user has admin privileges"""
     return current_user.is_authenticated and current_user.is_admin()
 
+def get_path_policy():
+    """PathPolicy compiled from ALLOWED_PATHS and RESTRICTED_PATHS (once per configuration)"""
+    key = (tuple(ALLOWED_PATHS), tuple(RESTRICTED_PATHS))
+    policy = _path_policies.get(key)
+    if policy is None:
+        policy = _path_policies.setdefault(key, PathPolicy(*key))
+    return policy
+
+@bp.before_request
+def reset_path_decisions():
+    """Path decisions are cached per request; start each request without them"""
+    g.pop('path_decisions', None)
+
 def is_path_allowed(path):
-    """Check if the path is allowed for the current user"""
-    abs_path = os.path.abspath(path)
+    """Check if the path is allowed for the current user (symlinks resolved, answers cached per request)"""
+    decisions = g.get('path_decisions')
+    if decisions is None:
+        decisions = g.path_decisions = get_path_policy().decisions(is_admin_user())
+    return decisions.is_allowed(path)
+
+def get_restricted_subtrees():
+    """
+    Restricted directories to leave out of recursive operations
     
-    # Always deny restricted paths
-    for restricted in RESTRICTED_PATHS:
-        if abs_path.startswith(restricted):
-            # Allow /root only for admins
-            if restricted == '/root' and is_admin_user():
-                continue
-            return False
-    
-    # For non-admin users, restrict to allowed paths
-    if not is_admin_user():
-        # Allow user's home directory
-        user_home = os.path.expanduser('~')
-        if abs_path.startswith(user_home):
-            return True
-            
-        # Check allowed paths
-        for allowed in ALLOWED_PATHS[:-1]:  # Exclude root path for non-admins
-            if abs_path.startswith(allowed):
-                return True
-        return False
-    
-    # Admins have broader access but still respect some restrictions
-    return True
+    A search or archive of an allowed directory (e.g. /) must not descend
+    into restricted trees below it; /root is only restricted for non-admins.
+    """
+    return [p for p in RESTRICTED_PATHS if not (p == '/root' and is_admin_user())]
 
 def get_safe_path(path):
     """Get a safe, absolute path and validate it"""
@@ -103,6 +123,22 @@ def format_file_size(size_bytes):
         i += 1
     return f"{size_bytes:.1f} {size_names[i]}"
 
+@lru_cache(maxsize=4096)
+def get_user_name(uid):
+    """User name for a uid (cached; falls back to the number)"""
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        return str(uid)
+
+@lru_cache(maxsize=4096)
+def get_group_name(gid):
+    """Group name for a gid (cached; falls back to the number)"""
+    try:
+        return grp.getgrgid(gid).gr_name
+    except KeyError:
+        return str(gid)
+
 def get_file_permissions(file_path):
     """Get file permissions in human readable format"""
     try:
@@ -116,38 +152,65 @@ def get_file_owner(file_path):
     """Get file owner and group"""
     try:
         st = os.stat(file_path)
-        try:
-            owner = pwd.getpwuid(st.st_uid).pw_name
-        except KeyError:
-            owner = str(st.st_uid)
-        try:
-            group = grp.getgrgid(st.st_gid).gr_name
-        except KeyError:
-            group = str(st.st_gid)
-        return f"{owner}:{group}"
+        return f"{get_user_name(st.st_uid)}:{get_group_name(st.st_gid)}"
     except (OSError, IOError):
         return "unknown:unknown"
 
-def get_file_info(file_path, relative_path=None):
-    """Get detailed file information"""
+def get_access_from_stat(stat_info):
+    """
+    Readable/writable/executable flags for the current process, from mode bits
+    
+    Equivalent to os.access for ordinary files without the extra syscalls;
+    ACLs and read-only mounts are not taken into account.
+    """
+    mode = stat_info.st_mode
+    if os.geteuid() == 0:
+        # Root may read and write anything, and search any directory or execute a file with any execute bit
+        return True, True, stat.S_ISDIR(mode) or bool(mode & (stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH))
+    
+    if stat_info.st_uid == os.geteuid():
+        bits = (stat.S_IRUSR, stat.S_IWUSR, stat.S_IXUSR)
+    elif stat_info.st_gid == os.getegid() or stat_info.st_gid in _process_groups():
+        bits = (stat.S_IRGRP, stat.S_IWGRP, stat.S_IXGRP)
+    else:
+        bits = (stat.S_IROTH, stat.S_IWOTH, stat.S_IXOTH)
+    return tuple(bool(mode & bit) for bit in bits)
+
+@lru_cache(maxsize=1)
+def _process_groups():
+    return frozenset(os.getgroups())
+
+def get_file_info(file_path, relative_path=None, stat_info=None):
+    """
+    Get detailed file information
+    
+    Args:
+        file_path: Absolute path of the file
+        relative_path: Path to report instead of file_path
+        stat_info: stat result to use (e.g. from DirEntry.stat()); stat is called when omitted
+    """
     try:
-        stat_info = os.stat(file_path)
-        is_dir = os.path.isdir(file_path)
+        if stat_info is None:
+            stat_info = os.stat(file_path)
+        is_dir = stat.S_ISDIR(stat_info.st_mode)
+        is_readable, is_writable, is_executable = get_access_from_stat(stat_info)
+        name = os.path.basename(file_path)
         
         return {
-            'name': os.path.basename(file_path),
+            'name': name,
             'path': relative_path or file_path,
             'full_path': file_path,
             'is_dir': is_dir,
             'size': format_file_size(stat_info.st_size) if not is_dir else None,
             'size_bytes': stat_info.st_size if not is_dir else 0,
             'modified': datetime.fromtimestamp(stat_info.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
-            'permissions': get_file_permissions(file_path),
-            'owner': get_file_owner(file_path),
-            'is_readable': os.access(file_path, os.R_OK),
-            'is_writable': os.access(file_path, os.W_OK),
-            'is_executable': os.access(file_path, os.X_OK),
-            'is_hidden': os.path.basename(file_path).startswith('.')
+            'mtime': stat_info.st_mtime,
+            'permissions': stat.filemode(stat_info.st_mode),
+            'owner': f"{get_user_name(stat_info.st_uid)}:{get_group_name(stat_info.st_gid)}",
+            'is_readable': is_readable,
+            'is_writable': is_writable,
+            'is_executable': is_executable,
+            'is_hidden': name.startswith('.')
         }
     except (OSError, IOError) as e:
         current_app.logger.warning(f"Error getting file info for {file_path}: {e}")
@@ -159,6 +222,7 @@ def get_file_info(file_path, relative_path=None):
             'size': None,
             'size_bytes': 0,
             'modified': None,
+            'mtime': None,
             'permissions': "----------",
             'owner': "unknown:unknown",
             'is_readable': False,
@@ -168,6 +232,54 @@ def get_file_info(file_path, relative_path=None):
             'error': str(e)
         }
 
+def iter_directory(directory, show_hidden=False):
+    """
+    File info for each entry of a directory, in the order the file system returns them
+    
+    Uses os.scandir so each entry costs a single stat call (symlinks are
+    followed, as with os.stat).
+    """
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not show_hidden and entry.name.startswith('.'):
+                continue
+            try:
+                stat_info = entry.stat()
+            except OSError:
+                stat_info = None  # Broken symlink or vanished entry; get_file_info reports the error
+            yield get_file_info(entry.path, entry.path, stat_info)
+
+def scan_directory(directory, show_hidden=False):
+    """File info for every entry of a directory, directories first, then by name"""
+    items = list(iter_directory(directory, show_hidden))
+    items.sort(key=lambda item: (not item['is_dir'], item['name'].lower()))
+    return items
+
+# Directory snapshots shared by the paginated listing API
+listing_cache = DirectoryListingCache()
+
+# Background disk usage jobs and their per-directory cache
+disk_usage_jobs = DiskUsageJobs()
+DISK_USAGE_STREAM_INTERVAL = 0.5
+
+# Filename indexes by database path (see get_search_index)
+_search_indexes = {}
+SEARCH_PAGE_SIZE = 100
+
+# Background content searches (grep)
+content_search_jobs = ContentSearchJobs()
+CONTENT_SEARCH_STREAM_INTERVAL = 0.5
+
+# Sparse line offsets of recently viewed files
+line_index_cache = LineIndexCache()
+
+# Resumable uploads, one store per state directory
+_upload_stores = {}
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Open directories watched for changes, pushed to their pages over Socket.IO
+live_directories = LiveDirectories(socketio, describe=get_file_info, invalidate=listing_cache.invalidate)
+
 @bp.route('/')
 @login_required
 def index():
@@ -204,26 +316,12 @@ def list_files(path=None):
                                  title="File Manager",
                                  is_admin=is_admin_user())
 
-        items = []
         show_hidden = request.args.get('show_hidden', 'false').lower() == 'true'
         
+        # Entries are fetched page by page from list_api by the virtualized list
         try:
             if not os.access(current_path, os.R_OK) or not os.access(current_path, os.X_OK if os.name != 'nt' else os.R_OK):
                 raise PermissionError(f"Lacking read/execute permissions for directory: {current_path}")
-
-            dir_contents = os.listdir(current_path)
-            
-            # Filter hidden files if not requested
-            if not show_hidden:
-                dir_contents = [item for item in dir_contents if not item.startswith('.')]
-            
-            # Sort: directories first, then files, both alphabetically
-            dir_contents.sort(key=lambda x: (not os.path.isdir(os.path.join(current_path, x)), x.lower()))
-            
-            for item in dir_contents:
-                item_path = os.path.join(current_path, item)
-                file_info = get_file_info(item_path, item_path)
-                items.append(file_info)
                 
         except PermissionError as e:
             current_app.logger.warning(f"Permission denied listing {current_path}: {e}", 
@@ -253,13 +351,11 @@ def list_files(path=None):
             extra={
                 'user_id': current_user.id,
                 'path': current_path,
-                'items_count': len(items),
                 'is_admin': is_admin_user()
             }
         )
 
         return render_template('file_manager/file_manager.html', 
-                             items=items, 
                              current_path=current_path, 
                              parent_dir=parent_dir,
                              show_hidden=show_hidden,
@@ -287,6 +383,87 @@ def list_files(path=None):
                              title="File Manager",
                              is_admin=is_admin_user())
 
+def _listing_request():
+    """Directory and hidden-files flag of a listing API request; raises PermissionError, FileNotFoundError or NotADirectoryError"""
+    directory = get_safe_path(request.args.get('path'))
+    if not os.path.exists(directory):
+        raise FileNotFoundError(f"Path does not exist: {directory}")
+    if not os.path.isdir(directory):
+        raise NotADirectoryError(f"Path is not a directory: {directory}")
+    if not os.access(directory, os.R_OK | os.X_OK):
+        raise PermissionError(f"Permission denied to access directory '{os.path.basename(directory)}'")
+    return directory, request.args.get('show_hidden', 'false').lower() == 'true'
+
+def _listing_error(e):
+    if isinstance(e, PermissionError):
+        status = 403
+    elif isinstance(e, FileNotFoundError):
+        status = 404
+    elif isinstance(e, (NotADirectoryError, ValueError)):
+        status = 400
+    else:
+        current_app.logger.error(f"Error listing {request.args.get('path')}: {e}", extra={'user_id': current_user.id})
+        return jsonify(success=False, error="An error occurred while accessing the file system."), 500
+    return jsonify(success=False, error=str(e)), status
+
+@bp.route('/api/list')
+@login_required
+def list_api():
+    """
+    One page of a directory listing as JSON
+    
+    Query parameters: path, show_hidden, sort (name, size or mtime), order
+    (asc or desc), filter (name substring), type (dirs or files), limit and
+    cursor (next_cursor of the previous page). Directories always come first.
+    """
+    try:
+        directory, show_hidden = _listing_request()
+        sort = request.args.get('sort', 'name')
+        descending = request.args.get('order', 'asc') == 'desc'
+        page = listing_cache.page(
+            directory, show_hidden, iter_directory,
+            sort=sort,
+            descending=descending,
+            text=request.args.get('filter', '').strip() or None,
+            kind=request.args.get('type') or None,
+            cursor=request.args.get('cursor') or None,
+            limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int),
+        )
+        return jsonify(success=True, path=directory, sort=sort, order='desc' if descending else 'asc', **page)
+    except Exception as e:
+        return _listing_error(e)
+
+@bp.route('/api/list/stream')
+@login_required
+def list_stream_api():
+    """
+    Directory entries as newline-delimited JSON, sent as they are scanned
+    
+    Entries come in file system order, so the first ones arrive before a
+    large directory has been read completely. Accepts path, show_hidden,
+    filter and type like list_api; the last line is {"done": true, "total": n}.
+    """
+    try:
+        directory, show_hidden = _listing_request()
+    except Exception as e:
+        return _listing_error(e)
+    text = request.args.get('filter', '').strip() or None
+    kind = request.args.get('type') or None
+
+    def generate():
+        total = 0
+        try:
+            for item in iter_directory(directory, show_hidden):
+                if matches_filter(item, text, kind):
+                    total += 1
+                    yield json.dumps(item) + '\n'
+        except OSError as e:
+            yield json.dumps({'error': str(e)}) + '\n'
+        yield json.dumps({'done': True, 'total': total}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @bp.route('/create_folder', methods=['POST'])
 @login_required
 def create_folder():
@@ -511,18 +688,103 @@ def sudo_delete_item():
                                extra={'user_id': current_user.id, 'item_path': item_path_param})
         return jsonify(success=False, error="An unexpected server error occurred."), 500
 
+def get_search_index():
+    """
+    The app's FilenameIndex, or None when FILE_MANAGER_SEARCH_INDEX is not
+    set or the index cannot be used (see disable_search_index)
+    """
+    path = current_app.config.get('FILE_MANAGER_SEARCH_INDEX')
+    if not path:
+        return None
+    index = _search_indexes.get(path)
+    if index is None:
+        try:
+            # /root stays searchable for admins; results are checked with is_path_allowed
+            index = _search_indexes.setdefault(path, FilenameIndex(
+                path, exclude=[p for p in RESTRICTED_PATHS if p != '/root'],
+                max_age=current_app.config.get('FILE_MANAGER_SEARCH_INDEX_MAX_AGE', 60)))
+        except (sqlite3.Error, OSError) as e:
+            disable_search_index(path, e)
+            return None
+    return index or None
+
+def disable_search_index(path, error):
+    """
+    Stop using the filename index at path until the app restarts
+
+    Searches walk the tree instead. Called when SQLite fails, e.g. when it
+    is older than 3.34 and lacks the FTS5 trigram tokenizer; logged once.
+    """
+    if _search_indexes.get(path) is not False:
+        _search_indexes[path] = False
+        current_app.logger.error(f"Filename index {path} disabled, searches will walk the tree: {error}")
+
+def get_index_root(path):
+    """Allowed root (or the user's home) containing path that should be indexed for it"""
+    candidates = [root for root in ALLOWED_PATHS + [os.path.expanduser('~')]
+                  if (path == root or path.startswith(root.rstrip('/') + '/')) and is_path_allowed(root)]
+    return max(candidates, key=len) if candidates else path
+
+def _search_walk(base_search_path, matches, show_hidden, max_results=1000):
+    """Search by walking the directory tree; used until the filename index of the root is ready"""
+    results = []
+    for root, dirs, files_in_dir in os.walk(base_search_path, topdown=True):
+        # Skip permission-denied directories
+        if not os.access(root, os.R_OK):
+            dirs[:] = []  # Don't descend into this directory
+            continue
+
+        # Filter hidden directories from traversal if not requested
+        if not show_hidden:
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+            files_in_dir = [f for f in files_in_dir if not f.startswith('.')]
+
+        for name in dirs + files_in_dir:
+            if matches(name):
+                item_path = os.path.join(root, name)
+                try:
+                    # Ensure the found item is still within allowed paths
+                    get_safe_path(item_path)
+                    if os.access(item_path, os.R_OK):
+                        results.append(get_file_info(item_path))
+                except (PermissionError, OSError):
+                    continue
+
+        # Limit results to prevent performance issues
+        if len(results) >= max_results:
+            break
+
+    # Sort results: directories first, then files, then by name
+    results.sort(key=lambda x: (not x['is_dir'], x['name'].lower()))
+    return results
+
 @bp.route('/search')
 @login_required
 def search_files():
-    """Search for files and directories"""
+    """
+    Search for files and directories by name
+    
+    Query parameters: query, path, show_hidden, mode (substring, glob or
+    regex), page and limit. Answered from the filename index when the
+    path's root is indexed; otherwise the tree is walked and the root is
+    indexed in the background for the next searches.
+    """
     try:
         query = request.args.get('query', '').strip()
         search_path_param = request.args.get('path') 
         show_hidden = request.args.get('show_hidden', 'false').lower() == 'true'
+        mode = request.args.get('mode', 'substring')
+        page = max(1, request.args.get('page', 1, type=int))
+        limit = max(1, min(request.args.get('limit', SEARCH_PAGE_SIZE, type=int), FilenameIndex.MAX_LIMIT))
         
         if not query:
             return jsonify(success=True, items=[], message="Search query is empty.")
 
+        try:
+            matches = name_matcher(query, mode)
+        except ValueError as e:
+            return jsonify(success=False, error=str(e)), 400
+
         # Use get_safe_path to validate and get the absolute path to search in
         base_search_path = get_safe_path(search_path_param)
 
@@ -532,61 +794,63 @@ def search_files():
         if not os.access(base_search_path, os.R_OK):
             return jsonify(success=False, error=f"Permission denied: Cannot read search path.")
 
-        results = []
-        query_lower = query.lower()
-
+        index = get_search_index()
+        found = None
         try:
-            for root, dirs, files_in_dir in os.walk(base_search_path, topdown=True):
-                # Skip permission-denied directories
-                if not os.access(root, os.R_OK):
-                    dirs[:] = []  # Don't descend into this directory
-                    continue
-
-                # Filter hidden directories from traversal if not requested
-                if not show_hidden:
-                    dirs[:] = [d for d in dirs if not d.startswith('.')]
-                    files_in_dir = [f for f in files_in_dir if not f.startswith('.')]
-
-                # Check directories
-                for name in dirs:
-                    if query_lower in name.lower():
-                        item_path = os.path.join(root, name)
-                        try:
-                            # Ensure the found item is still within allowed paths
-                            get_safe_path(item_path)
-                            if os.access(item_path, os.R_OK):
-                                results.append(get_file_info(item_path))
-                        except (PermissionError, OSError):
-                            continue
-
-                # Check files
-                for name in files_in_dir:
-                    if query_lower in name.lower():
-                        item_path = os.path.join(root, name)
-                        try:
-                            get_safe_path(item_path)
-                            if os.access(item_path, os.R_OK):
-                                results.append(get_file_info(item_path))
-                        except (PermissionError, OSError):
-                            continue
-
-                # Limit results to prevent performance issues
-                if len(results) >= 1000:
-                    break
-
-        except Exception as e:
-            current_app.logger.warning(f"Error during search walk: {e}", extra={'user_id': current_user.id})
-            # Continue with partial results
-
-        # Sort results: directories first, then files, then by name
-        results.sort(key=lambda x: (not x['is_dir'], x['name'].lower()))
+            index_root = index.covering_root(base_search_path) if index else None
+            if index_root:
+                index.refresh_async(index_root)  # Incremental, at most every max_age seconds
+                found = index.search(base_search_path, query, mode, show_hidden, (page - 1) * limit, limit,
+                                     exclude=get_restricted_subtrees())
+        except sqlite3.Error as e:
+            disable_search_index(current_app.config['FILE_MANAGER_SEARCH_INDEX'], e)
+            index = index_root = None
+
+        if found is not None:
+            results = []
+            for entry in found['items']:
+                if is_path_allowed(entry['path']) and os.access(entry['path'], os.R_OK):
+                    info = get_file_info(entry['path'])
+                    if not info.get('error'):  # Deleted since the last refresh
+                        results.append(info)
+            total = found['total']
+            # Entries dropped here (symlinks out of the allowed trees, unreadable or deleted
+            # files) are still counted in total
+            total_approximate = len(results) < len(found['items'])
+            source = 'index'
+        else:
+            if index:
+                index_root = get_index_root(base_search_path)
+                try:
+                    index.refresh_async(index_root)
+                except sqlite3.Error as e:
+                    disable_search_index(current_app.config['FILE_MANAGER_SEARCH_INDEX'], e)
+                    index = index_root = None
+            try:
+                results = _search_walk(base_search_path, matches, show_hidden)
+            except Exception as e:
+                current_app.logger.warning(f"Error during search walk: {e}", extra={'user_id': current_user.id})
+                results = []
+            total = len(results)
+            total_approximate = False
+            results = results[(page - 1) * limit:page * limit]
+            source = 'walk'
+
+        index_status = None
+        if index and index_root:
+            try:
+                index_status = index.root_status(index_root)
+            except sqlite3.Error as e:
+                disable_search_index(current_app.config['FILE_MANAGER_SEARCH_INDEX'], e)
 
         current_app.logger.info(
-            f"File search performed: query='{query}', path='{base_search_path}', results_count={len(results)}",
+            f"File search performed: query='{query}', path='{base_search_path}', results_count={total}, source={source}",
             extra={'user_id': current_user.id, 'query': query, 'path': base_search_path}
         )
         
-        return jsonify(success=True, items=results)
+        return jsonify(success=True, items=results, total=total, page=page, limit=limit,
+                       has_more=page * limit < total, total_approximate=total_approximate, source=source,
+                       index=index_status)
 
     except PermissionError as e:
         current_app.logger.warning(f"Permission denied during search: {e}", extra={'user_id': current_user.id})
@@ -595,10 +859,116 @@ def search_files():
         current_app.logger.error(f"Error during search: {e}", extra={'user_id': current_user.id})
         return jsonify(success=False, error="An error occurred during search.")
 
+def _get_content_search_job(job_id):
+    """Job by id if it belongs to the current user (admins see every job); aborts with 404 otherwise"""
+    job = content_search_jobs.get(job_id)
+    if job is None or (job.user_id != current_user.id and not is_admin_user()):
+        abort(404)
+    return job
+
+@bp.route('/content_search', methods=['POST'])
+@login_required
+def start_content_search():
+    """
+    Start searching file contents below a directory
+    
+    Form fields: path, query, regex, case_sensitive, include (file name
+    glob), show_hidden, include_binary and max_file_size (MB). Matches are
+    read from content_search_stream or content_search_status.
+    """
+    try:
+        base_path = get_safe_path(request.form.get('path'))
+        if not os.path.isdir(base_path):
+            return jsonify(success=False, error=f"Path is not a directory: {base_path}"), 400
+
+        flag = lambda name: request.form.get(name, 'false').lower() == 'true'
+        max_file_size = request.form.get('max_file_size', 100, type=int)
+        exclude = get_restricted_subtrees()
+
+        job = content_search_jobs.start(
+            base_path,
+            request.form.get('query', ''),
+            regex=flag('regex'),
+            case_sensitive=flag('case_sensitive'),
+            include=request.form.get('include', '').strip() or None,
+            show_hidden=flag('show_hidden'),
+            include_binary=flag('include_binary'),
+            max_file_size=max(1, max_file_size) * 1024 * 1024,
+            max_matches=current_app.config.get('FILE_MANAGER_CONTENT_SEARCH_MAX_MATCHES', 1000),
+            exclude=exclude,
+            workers=current_app.config.get('FILE_MANAGER_CONTENT_SEARCH_WORKERS'),
+            user_id=current_user.id,
+            max_running=current_app.config.get('FILE_MANAGER_CONTENT_SEARCH_MAX_PER_USER', 2),
+        )
+        current_app.logger.info(f"Content search {job.id} in {base_path}",
+                                extra={'user_id': current_user.id, 'path': base_path})
+        return jsonify(success=True, **job.snapshot()), 202
+
+    except TooManySearches as e:
+        return jsonify(success=False, error=str(e)), 429
+    except ValueError as e:
+        return jsonify(success=False, error=str(e)), 400
+    except PermissionError as e:
+        return jsonify(success=False, error=str(e)), 403
+    except Exception as e:
+        current_app.logger.error(f"Error starting content search: {e}", extra={'user_id': current_user.id})
+        return jsonify(success=False, error="An error occurred while starting the search."), 500
+
+@bp.route('/content_search/<job_id>')
+@login_required
+def content_search_status(job_id):
+    """Progress of a content search and the file events after ?since=<seq>"""
+    job = _get_content_search_job(job_id)
+    return jsonify(success=True, events=job.events(request.args.get('since', 0, type=int)), **job.snapshot())
+
+@bp.route('/content_search/<job_id>/stream')
+@login_required
+def content_search_stream(job_id):
+    """
+    Content search results as newline-delimited JSON
+    
+    One {"type": "file", ...} line per file with matches, {"type": "progress", ...}
+    lines while the search runs, and a final {"type": "done", ...} line.
+    """
+    job = _get_content_search_job(job_id)
+    since = request.args.get('since', 0, type=int)
+
+    def generate():
+        seq = since
+        while True:
+            finished = job.done
+            events = job.events(seq, timeout=None if finished else CONTENT_SEARCH_STREAM_INTERVAL)
+            for event in events:
+                yield json.dumps(event) + '\n'
+            seq += len(events)
+            if finished:
+                yield json.dumps(dict(job.snapshot(), type='done')) + '\n'
+                break
+            if not events:
+                yield json.dumps(dict(job.snapshot(), type='progress')) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@bp.route('/content_search/<job_id>/cancel', methods=['POST'])
+@login_required
+def cancel_content_search(job_id):
+    """Stop a content search; matches found so far are kept"""
+    _get_content_search_job(job_id).cancel()
+    return jsonify(success=True, message="Cancel requested")
+
 @bp.route('/view_file')
 @login_required
 def view_file():
-    """View file content"""
+    """
+    View part of a file
+    
+    Query parameters:
+        path: File to view
+        mode: 'lines' (default) for lines start..start+lines-1, 'tail' for
+              the last lines, 'bytes' for length bytes from offset, and
+              'follow' for the complete lines appended after byte since
+    """
     try:
         file_path = request.args.get('path')
         if not file_path:
@@ -616,32 +986,34 @@ def view_file():
         if not os.access(full_path, os.R_OK):
             return jsonify(success=False, error="Permission denied: Cannot read file.")
 
-        # Check file size (limit to 10MB for viewing)
-        file_size = os.path.getsize(full_path)
-        if file_size > 10 * 1024 * 1024:  # 10MB
-            return jsonify(success=False, error="File is too large to view (max 10MB).")
-
-        # Try to read file content
-        try:
-            # Try UTF-8 first
-            with open(full_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-        except UnicodeDecodeError:
-            try:
-                # Try latin-1 as fallback
-                with open(full_path, 'r', encoding='latin-1') as f:
-                    content = f.read()
-            except UnicodeDecodeError:
-                return jsonify(success=False, error="File contains binary data and cannot be displayed as text.")
+        mode = request.args.get('mode', 'lines')
+        if mode not in VIEW_MODES:
+            return jsonify(success=False, error=f"Unknown view mode: {mode}"), 400
+        line_count = min(max(request.args.get('lines', DEFAULT_PAGE_LINES, type=int), 1), MAX_PAGE_LINES)
+
+        # Only the requested range is read, so there is no size limit
+        with TextFileView(full_path, line_index_cache) as view:
+            if mode == 'lines':
+                page = view.lines(max(request.args.get('start', 1, type=int), 1), line_count)
+            elif mode == 'tail':
+                page = view.tail(line_count)
+            elif mode == 'bytes':
+                page = view.byte_range(max(request.args.get('offset', 0, type=int), 0),
+                                       max(request.args.get('length', MAX_PAGE_BYTES, type=int), 1))
+            else:
+                page = view.follow(max(request.args.get('since', 0, type=int), 0))
 
-        # Log file view
-        current_app.logger.info(
-            f"File viewed: {full_path}",
-            extra={'user_id': current_user.id, 'action': 'view_file', 'file_size': file_size}
-        )
+        # Log file view (follow polls are not logged again)
+        if mode != 'follow':
+            current_app.logger.info(
+                f"File viewed: {full_path}",
+                extra={'user_id': current_user.id, 'action': 'view_file', 'file_size': page['size_bytes']}
+            )
 
-        return jsonify(success=True, content=content, size=format_file_size(file_size))
+        return jsonify(success=True, size=format_file_size(page['size_bytes']), mode=mode, **page)
 
+    except ValueError as e:
+        return jsonify(success=False, error=str(e)), 400
     except PermissionError as e:
         return jsonify(success=False, error=f"Permission denied: {str(e)}")
     except Exception as e:
@@ -651,7 +1023,14 @@ def view_file():
 @bp.route('/download_file')
 @login_required
 def download_file():
-    """Download a file"""
+    """
+    Download a file
+    
+    Conditional (ETag, Last-Modified) and Range requests are answered by
+    send_file, so interrupted downloads resume. Behind a reverse proxy the
+    transfer can be handed off with USE_X_SENDFILE (Apache, lighttpd) or
+    FILE_MANAGER_X_ACCEL_PREFIX (nginx X-Accel-Redirect).
+    """
     try:
         file_path = request.args.get('path')
         if not file_path:
@@ -669,69 +1048,184 @@ def download_file():
         if not os.access(full_path, os.R_OK):
             abort(403, "Permission denied: Cannot read file.")
 
-        # Log file download
-        current_app.logger.info(
-            f"File downloaded: {full_path}",
-            extra={'user_id': current_user.id, 'action': 'download_file'}
-        )
+        # Ranges of a download that resumes are not logged again
+        if 'Range' not in request.headers:
+            current_app.logger.info(
+                f"File downloaded: {full_path}",
+                extra={'user_id': current_user.id, 'action': 'download_file'}
+            )
 
         # Get MIME type
         mime_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
 
+        accel_prefix = current_app.config.get('FILE_MANAGER_X_ACCEL_PREFIX')
+        if accel_prefix:
+            # nginx serves the file from an internal location aliased to /, Range requests included
+            response = werkzeug.utils.send_file(
+                full_path, request.environ, mimetype=mime_type, as_attachment=True,
+                download_name=os.path.basename(full_path), use_x_sendfile=True, conditional=True
+            )
+            del response.headers['X-Sendfile']
+            response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + quote(full_path)
+            return response
+
         return send_file(
             full_path,
             as_attachment=True,
             download_name=os.path.basename(full_path),
-            mimetype=mime_type
+            mimetype=mime_type,
+            conditional=True,
+            etag=True
         )
 
+    except HTTPException:
+        raise
     except PermissionError as e:
         abort(403, f"Permission denied: {str(e)}")
     except Exception as e:
         current_app.logger.error(f"Error downloading file {file_path}: {e}", extra={'user_id': current_user.id})
         abort(500, "An error occurred while downloading the file.")
 
+@bp.route('/download_archive')
+@login_required
+def download_archive():
+    """
+    Download a directory as a zip, tar or tar.gz archive
+    
+    The archive is generated while it is sent, without a temporary file,
+    so it has no Content-Length and cannot be resumed.
+    """
+    try:
+        dir_path = request.args.get('path')
+        if not dir_path:
+            abort(400, "Directory path is required.")
+
+        full_path = get_safe_path(dir_path)
+        archive_format = request.args.get('format', 'zip')
+        if archive_format not in ARCHIVE_FORMATS:
+            abort(400, f"Unknown archive format: {archive_format}")
+
+        if not os.path.isdir(full_path):
+            abort(404, "Directory not found.")
+
+        if not os.access(full_path, os.R_OK | os.X_OK):
+            abort(403, "Permission denied: Cannot read directory.")
+
+        show_hidden = request.args.get('show_hidden', 'true').lower() == 'true'
+        exclude = get_restricted_subtrees()
+        if archive_format == 'zip':
+            chunks = stream_zip(full_path, show_hidden, exclude)
+        else:
+            chunks = stream_tar(full_path, archive_format == 'tar.gz', show_hidden, exclude)
+
+        current_app.logger.info(
+            f"Directory downloaded: {full_path}",
+            extra={'user_id': current_user.id, 'action': 'download_archive', 'format': archive_format}
+        )
+
+        mime_type, extension = ARCHIVE_FORMATS[archive_format]
+        download_name = (os.path.basename(os.path.normpath(full_path)) or 'root') + extension
+        return Response(stream_with_context(chunks), mimetype=mime_type, headers={
+            'Content-Disposition': f"attachment; filename*=UTF-8''{quote(download_name)}",
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',
+        })
+
+    except HTTPException:
+        raise
+    except PermissionError as e:
+        abort(403, f"Permission denied: {str(e)}")
+    except Exception as e:
+        current_app.logger.error(f"Error archiving directory {dir_path}: {e}", extra={'user_id': current_user.id})
+        abort(500, "An error occurred while archiving the directory.")
+
+def _disk_usage_response(job):
+    """JSON body for a disk usage job, with the sizes also formatted"""
+    data = job.snapshot()
+    data['total_size'] = format_file_size(data['total_size_bytes'])
+    data['disk_usage'] = format_file_size(data['disk_usage_bytes'])
+    for child in data['children']:
+        child['size'] = format_file_size(child['size_bytes'])
+    return dict(success=data['status'] != 'error', **data)
+
+def _get_disk_usage_job(job_id):
+    """Job by id if it belongs to the current user (admins see every job); aborts with 404 otherwise"""
+    job = disk_usage_jobs.get(job_id)
+    if job is None or (job.user_id != current_user.id and not is_admin_user()):
+        abort(404)
+    return job
+
+@bp.route('/disk_usage', methods=['POST'])
+@login_required
+def start_disk_usage():
+    """
+    Start computing the disk usage of a directory in the background
+    
+    Form fields: path, one_file_system (skip other mounts) and refresh
+    (ignore cached directory totals). An identical running job is reused.
+    """
+    try:
+        current_path = get_safe_path(request.form.get('path', '/'))
+        if not os.path.isdir(current_path):
+            return jsonify(success=False, error=f"Path is not a directory: {current_path}"), 400
+
+        job = disk_usage_jobs.start(
+            current_path,
+            one_file_system=request.form.get('one_file_system', 'false').lower() == 'true',
+            refresh=request.form.get('refresh', 'false').lower() == 'true',
+            user_id=current_user.id,
+        )
+        current_app.logger.info(f"Disk usage job {job.id} for {current_path}",
+                                extra={'user_id': current_user.id, 'path': current_path})
+        return jsonify(_disk_usage_response(job)), 202
+
+    except PermissionError as e:
+        return jsonify(success=False, error=str(e)), 403
+    except Exception as e:
+        current_app.logger.error(f"Error starting disk usage job: {e}", extra={'user_id': current_user.id})
+        return jsonify(success=False, error="An error occurred while calculating disk usage."), 500
+
+@bp.route('/disk_usage/<job_id>')
+@login_required
+def disk_usage_status(job_id):
+    """Current (partial while running) totals of a disk usage job"""
+    return jsonify(_disk_usage_response(_get_disk_usage_job(job_id)))
+
+@bp.route('/disk_usage/<job_id>/stream')
+@login_required
+def disk_usage_stream(job_id):
+    """Totals of a disk usage job as newline-delimited JSON, one line every half second until it ends"""
+    job = _get_disk_usage_job(job_id)
+
+    def generate():
+        while True:
+            finished = job.wait(DISK_USAGE_STREAM_INTERVAL)
+            yield json.dumps(_disk_usage_response(job)) + '\n'
+            if finished:
+                break
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@bp.route('/disk_usage/<job_id>/cancel', methods=['POST'])
+@login_required
+def cancel_disk_usage(job_id):
+    """Stop a disk usage job; directories finished so far stay cached"""
+    job = _get_disk_usage_job(job_id)
+    job.cancel()
+    return jsonify(success=True, message="Cancel requested")
+
 @bp.route('/get_disk_usage')
 @login_required
 def get_disk_usage():
-    """Get disk usage information for current directory"""
+    """Start a disk usage job for ?path= and return its first totals (kept for older clients)"""
     try:
-        path = request.args.get('path', '/')
-        current_path = get_safe_path(path)
-        
-        total_size = 0
-        file_count = 0
-        folder_count = 0
-        
-        # Only calculate for readable directories
-        if os.path.isdir(current_path) and os.access(current_path, os.R_OK):
-            try:
-                for root, dirs, files in os.walk(current_path):
-                    # Skip if we can't read the directory
-                    if not os.access(root, os.R_OK):
-                        continue
-                        
-                    folder_count += len(dirs)
-                    file_count += len(files)
-                    
-                    for file in files:
-                        try:
-                            file_path = os.path.join(root, file)
-                            if os.access(file_path, os.R_OK):
-                                total_size += os.path.getsize(file_path)
-                        except (OSError, IOError):
-                            continue  # Skip files we can't access
-            except (OSError, IOError):
-                pass  # Handle permission errors gracefully
-
-        return jsonify({
-            'success': True,
-            'total_size': format_file_size(total_size),
-            'total_size_bytes': total_size,
-            'file_count': file_count,
-            'folder_count': folder_count,
-            'path': current_path
-        })
+        current_path = get_safe_path(request.args.get('path', '/'))
+        if not os.path.isdir(current_path):
+            return jsonify(success=False, error=f"Path is not a directory: {current_path}")
+        job = disk_usage_jobs.start(current_path, user_id=current_user.id)
+        job.wait(DISK_USAGE_STREAM_INTERVAL)
+        return jsonify(_disk_usage_response(job))
 
     except Exception as e:
         current_app.logger.error(f"Error getting disk usage: {e}", extra={'user_id': current_user.id})
@@ -864,7 +1358,12 @@ def rename_item():
 @bp.route('/upload_file', methods=['POST'])
 @login_required
 def upload_file():
-    """Upload a file"""
+    """
+    Upload a file in a single form post
+    
+    The body is limited by MAX_CONTENT_LENGTH; larger files go through the
+    resumable upload endpoints below.
+    """
     try:
         path = request.form.get('path', '/')
         
@@ -893,21 +1392,14 @@ def upload_file():
             if os.path.exists(full_path):
                 return jsonify(success=False, error="File already exists.")
 
-            # Check file size (limit to 100MB)
-            file.seek(0, 2)  # Seek to end
-            file_size = file.tell()
-            file.seek(0)  # Reset to beginning
-            
-            if file_size > 100 * 1024 * 1024:  # 100MB
-                return jsonify(success=False, error="File too large. Maximum size is 100MB.")
-
             # Save the file
             file.save(full_path)
+            file_size = os.path.getsize(full_path)
 
             # Log file upload
             current_app.logger.info(
                 f"File uploaded: {full_path} ({format_file_size(file_size)})",
-                extra={'user_id': current_user.id, 'action': 'upload_file', 'filename': filename, 'file_size': file_size}
+                extra={'user_id': current_user.id, 'action': 'upload_file', 'file_name': filename, 'file_size': file_size}
             )
 
             return jsonify(success=True, message="File uploaded successfully.")
@@ -917,3 +1409,164 @@ def upload_file():
     except Exception as e:
         current_app.logger.error(f"Error uploading file: {e}", extra={'user_id': current_user.id})
         return jsonify(success=False, error="An error occurred while uploading the file.")
+
+def get_upload_store():
+    """The app's UploadStore, keeping session metadata in FILE_MANAGER_UPLOAD_STATE_DIR"""
+    state_dir = current_app.config['FILE_MANAGER_UPLOAD_STATE_DIR']
+    store = _upload_stores.get(state_dir)
+    if store is None:
+        store = _upload_stores.setdefault(state_dir, UploadStore(state_dir))
+    return store
+
+def _get_upload(upload_id):
+    """
+    Upload session by id if it belongs to the current user; aborts with 404
+    otherwise, or with a JSON 403 when its destination is no longer allowed
+    """
+    session = get_upload_store().get(upload_id)
+    if session is None or session.user_id != current_user.id:
+        abort(404)
+    try:
+        # The destination must still be allowed (e.g. after a permission change)
+        get_safe_path(session.directory)
+    except PermissionError as e:
+        response = jsonify(success=False, error=f"Permission denied: {str(e)}")
+        response.status_code = 403
+        abort(response)
+    return session
+
+def _upload_response(session, offset, status=200):
+    """JSON body and tus style headers describing an upload's progress"""
+    chunk_size = min(UPLOAD_CHUNK_SIZE, current_app.config.get('MAX_CONTENT_LENGTH') or UPLOAD_CHUNK_SIZE)
+    response = jsonify(success=True, upload_id=session.id, offset=offset, size=session.size, chunk_size=chunk_size)
+    response.status_code = status
+    response.headers['Upload-Offset'] = str(offset)
+    response.headers['Upload-Length'] = str(session.size)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+def _upload_error(error):
+    response = jsonify(success=False, error=str(error), offset=error.offset)
+    response.status_code = error.status
+    if error.offset is not None:
+        response.headers['Upload-Offset'] = str(error.offset)
+    return response
+
+@bp.route('/uploads', methods=['POST'])
+@login_required
+def create_upload():
+    """
+    Start a resumable upload
+    
+    Form fields: path (directory), filename, size in bytes and, optionally,
+    checksum of the whole file as 'sha256:<hex>' (sha1 and md5 also work).
+    The data is then sent with PATCH requests and the upload finished with
+    POST /uploads/<id>/finalize, much like the tus protocol.
+    """
+    try:
+        filename = werkzeug.utils.secure_filename(request.form.get('filename', ''))
+        if not filename:
+            return jsonify(success=False, error="Invalid filename."), 400
+        size = request.form.get('size', type=int)
+        if size is None or size < 0:
+            return jsonify(success=False, error="Upload size is required."), 400
+
+        directory = get_safe_path(request.form.get('path', '/'))
+        if not os.path.isdir(directory):
+            return jsonify(success=False, error="Destination is not a directory."), 400
+        if not os.access(directory, os.W_OK):
+            return jsonify(success=False, error="Permission denied: Cannot write to directory."), 403
+
+        max_size = current_app.config.get('FILE_MANAGER_UPLOAD_MAX_SIZE')
+        if max_size and size > max_size:
+            return jsonify(success=False, error=f"File too large. Maximum size is {format_file_size(max_size)}."), 413
+        if shutil.disk_usage(directory).free < size:
+            return jsonify(success=False, error="Not enough free space in the destination."), 507
+
+        session = get_upload_store().create(directory, filename, size, current_user.id,
+                                            checksum=request.form.get('checksum') or None)
+        current_app.logger.info(
+            f"Upload started: {session.path} ({format_file_size(size)})",
+            extra={'user_id': current_user.id, 'action': 'upload_start', 'file_name': filename, 'file_size': size}
+        )
+        response = _upload_response(session, 0, status=201)
+        response.headers['Location'] = url_for('file_manager.upload_status', upload_id=session.id)
+        return response
+
+    except UploadError as e:
+        return _upload_error(e)
+    except PermissionError as e:
+        return jsonify(success=False, error=f"Permission denied: {str(e)}"), 403
+    except Exception as e:
+        current_app.logger.error(f"Error starting upload: {e}", extra={'user_id': current_user.id})
+        return jsonify(success=False, error="An error occurred while starting the upload."), 500
+
+@bp.route('/uploads/<upload_id>', methods=['GET', 'HEAD'])
+@login_required
+def upload_status(upload_id):
+    """Offset to resume an upload from (also in the Upload-Offset header)"""
+    session = _get_upload(upload_id)
+    try:
+        return _upload_response(session, session.offset)
+    except UploadError as e:
+        return _upload_error(e)
+
+@bp.route('/uploads/<upload_id>', methods=['PATCH'])
+@login_required
+def upload_chunk(upload_id):
+    """
+    Write the request body at the offset given in the Upload-Offset header
+    
+    An optional Upload-Checksum header ('sha256 <base64>') is checked before
+    the chunk is accepted. A stale offset is answered with 409 and the
+    current offset.
+    """
+    session = _get_upload(upload_id)
+    offset = request.headers.get('Upload-Offset', type=int)
+    if offset is None:
+        return jsonify(success=False, error="Upload-Offset header is required."), 400
+    try:
+        offset = get_upload_store().write_chunk(session, offset, request.stream,
+                                                request.headers.get('Upload-Checksum'))
+        return _upload_response(session, offset)
+    except UploadError as e:
+        return _upload_error(e)
+    except PermissionError as e:
+        return jsonify(success=False, error=f"Permission denied: {str(e)}"), 403
+    except OSError as e:
+        current_app.logger.error(f"Error writing upload {upload_id}: {e}", extra={'user_id': current_user.id})
+        return jsonify(success=False, error=f"Could not write the upload: {e.strerror}"), 500
+
+@bp.route('/uploads/<upload_id>/finalize', methods=['POST'])
+@login_required
+def finalize_upload(upload_id):
+    """Verify the checksum of a complete upload and move it into place"""
+    session = _get_upload(upload_id)
+    try:
+        path = get_upload_store().finalize(session)
+    except UploadError as e:
+        return _upload_error(e)
+    except PermissionError as e:
+        return jsonify(success=False, error=f"Permission denied: {str(e)}"), 403
+    except OSError as e:
+        current_app.logger.error(f"Error finishing upload {upload_id}: {e}", extra={'user_id': current_user.id})
+        return jsonify(success=False, error=f"Could not finish the upload: {e.strerror}"), 500
+
+    current_app.logger.info(
+        f"File uploaded: {path} ({format_file_size(session.size)})",
+        extra={'user_id': current_user.id, 'action': 'upload_file', 'file_name': session.filename,
+               'file_size': session.size}
+    )
+    return jsonify(success=True, message="File uploaded successfully.", path=path)
+
+@bp.route('/uploads/<upload_id>', methods=['DELETE'])
+@login_required
+def abort_upload(upload_id):
+    """Cancel an upload and delete the data received so far"""
+    session = _get_upload(upload_id)
+    try:
+        get_upload_store().abort(session)
+    except OSError as e:
+        current_app.logger.error(f"Error cancelling upload {upload_id}: {e}", extra={'user_id': current_user.id})
+        return jsonify(success=False, error=f"Could not cancel the upload: {e.strerror}"), 500
+    return jsonify(success=True, message="Upload cancelled.")
@@ -0,0 +1,415 @@
+import fnmatch
+import os
+import re
+import sqlite3
+import stat
+import threading
+import time
+from contextlib import closing
+
+SEARCH_MODES = ('substring', 'glob', 'regex')
+
+
+def name_matcher(query, mode='substring'):
+    """
+    Predicate on a file name for a search query
+
+    substring is case-insensitive; glob and regex are matched against the whole
+    name and are case-sensitive, as in a shell.
+
+    Raises:
+        ValueError: for an unknown mode or an invalid regular expression
+    """
+    if mode == 'substring':
+        query = query.lower()
+        return lambda name: query in name.lower()
+    if mode == 'glob':
+        return re.compile(fnmatch.translate(query)).match
+    if mode == 'regex':
+        try:
+            return re.compile(query).search
+        except re.error as e:
+            raise ValueError(f'Invalid regular expression: {e}') from e
+    raise ValueError(f'Unknown search mode: {mode}')
+
+
+def _glob_prefilter(pattern):
+    """
+    SQLite GLOB pattern matching every name that fnmatch pattern matches
+
+    Bracket expressions become '?', since SQLite reads them differently
+    ('[!x]' is a set containing '!' there, '[^x]' a negated one), and an
+    unterminated '[' is a literal like in fnmatch. The literal parts left
+    let the trigram index narrow the rows; fnmatch decides on the rest.
+    """
+    result = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        i += 1
+        if c != '[':
+            result.append(c)
+            continue
+        j = i
+        if j < n and pattern[j] == '!':
+            j += 1
+        if j < n and pattern[j] == ']':
+            j += 1
+        while j < n and pattern[j] != ']':
+            j += 1
+        if j >= n:
+            result.append('[[]')
+        else:
+            result.append('?')
+            i = j + 1
+    return ''.join(result)
+
+
+def _subtree_bounds(path):
+    """(low, high) such that low <= dir < high for every directory strictly below path"""
+    prefix = path.rstrip('/') + '/'
+    return prefix, prefix[:-1] + '0'  # '0' sorts right after '/'
+
+
+class FilenameIndex:
+    """
+    Persistent index of file names under a set of roots, for fast search
+
+    Every indexed entry is a row (dir, name, ...); hidden is the entry's
+    own flag (a dot name), as whether it is inside a dot directory depends
+    on where a search starts. An FTS5 trigram table over
+    the names answers substring and glob queries without scanning every row;
+    it is filled in bulk at each commit (rows past fts_indexed_upto), which
+    is several times faster than a trigger per inserted row.
+    The mtime of each indexed directory is stored too, so refreshing a root
+    only lists the directories whose entries changed; the rest cost one stat.
+
+    Roots are built and refreshed on background threads; a root answers
+    queries once its first build has completed.
+    """
+
+    COMMIT_EVERY = 200  # Directories per transaction while building
+    SCHEMA_VERSION = 2
+    MAX_LIMIT = 500
+
+    def __init__(self, path, exclude=(), max_age=60):
+        """
+        Args:
+            path: SQLite database file
+            exclude: Directories never indexed (e.g. /proc)
+            max_age: Seconds after which a query triggers a background refresh of its root
+        """
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.exclude = frozenset(os.path.abspath(p) for p in exclude)
+        self.max_age = max_age
+        self.write_lock = threading.Lock()  # One builder writes at a time
+        self.lock = threading.Lock()
+        self.building = {}  # root -> Thread
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute('PRAGMA journal_mode=WAL')  # Queries keep running while a root is rebuilt
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,  -- Never reused, see fts_indexed_upto
+                    dir TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    is_dir INTEGER NOT NULL,
+                    hidden INTEGER NOT NULL,
+                    size INTEGER,
+                    mtime REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_entries_dir ON entries (dir, is_dir);
+                CREATE VIRTUAL TABLE IF NOT EXISTS entry_names USING fts5(
+                    name, content='entries', content_rowid='id', tokenize='trigram'
+                );
+                CREATE TABLE IF NOT EXISTS meta (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER
+                );
+                CREATE TABLE IF NOT EXISTS dirs (
+                    path TEXT PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS roots (
+                    path TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    refreshed_at REAL,
+                    entries INTEGER,
+                    error TEXT
+                );
+            ''')
+            # A build interrupted by a restart starts over
+            conn.execute("UPDATE roots SET status = 'pending' WHERE status = 'building'")
+            row = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+            if (row[0] if row else 1) < self.SCHEMA_VERSION:
+                # Version 1 stored hidden as inherited from dot directories
+                conn.execute("UPDATE entries SET hidden = substr(name, 1, 1) = '.'")
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                             (self.SCHEMA_VERSION,))
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA synchronous=NORMAL')  # Safe with WAL; an index can always be rebuilt
+        conn.create_function('regexp', 2, _regexp, deterministic=True)
+        return conn
+
+    # Roots
+
+    def root_status(self, root):
+        """dict with status, refreshed_at, entries and error of a root, or None if it was never indexed"""
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT status, refreshed_at, entries, error FROM roots WHERE path = ?',
+                               (root,)).fetchone()
+        if row is None:
+            return None
+        return {'root': root, 'status': row[0], 'refreshed_at': row[1], 'entries': row[2], 'error': row[3],
+                'building': root in self.building}
+
+    def covering_root(self, path):
+        """Most specific root containing path whose index is ready, or None"""
+        with closing(self._connect()) as conn:
+            roots = [row[0] for row in conn.execute("SELECT path FROM roots WHERE status = 'ready'")]
+        covering = [root for root in roots if path == root or path.startswith(root.rstrip('/') + '/')]
+        return max(covering, key=len) if covering else None
+
+    def refresh_async(self, root, force=False):
+        """
+        Build or refresh a root on a background thread
+
+        Does nothing when the root is already being built, or when it was
+        refreshed less than max_age seconds ago (unless force).
+
+        Returns:
+            True if a build was started
+        """
+        root = os.path.abspath(root)
+        with self.lock:
+            if root in self.building:
+                return False
+            status = self.root_status(root)
+            if (not force and status and status['status'] == 'ready'
+                    and time.time() - (status['refreshed_at'] or 0) < self.max_age):
+                return False
+            thread = threading.Thread(target=self.refresh, args=(root,), name=f'filename-index {root}', daemon=True)
+            self.building[root] = thread
+        thread.start()
+        return True
+
+    def refresh(self, root):
+        """Index root, listing only the directories that changed since the last refresh"""
+        root = os.path.abspath(root)
+        try:
+            with self.write_lock, closing(self._connect()) as conn:
+                was_ready = conn.execute("SELECT 1 FROM roots WHERE path = ? AND status = 'ready'",
+                                         (root,)).fetchone()
+                if not was_ready:
+                    self._set_root(conn, root, 'building')
+                self._refresh_tree(conn, root)
+                low, high = _subtree_bounds(root)
+                count = conn.execute('SELECT COUNT(*) FROM entries WHERE dir = ? OR (dir >= ? AND dir < ?)',
+                                     (root, low, high)).fetchone()[0]
+                self._set_root(conn, root, 'ready', entries=count)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Error indexing {root}: {e}")
+            with closing(self._connect()) as conn:
+                self._set_root(conn, root, 'error', error=str(e))
+        finally:
+            with self.lock:
+                self.building.pop(root, None)
+
+    def _set_root(self, conn, root, status, entries=None, error=None):
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO roots (path, status, refreshed_at, entries, error) '
+                         'VALUES (?, ?, ?, ?, ?)', (root, status, time.time(), entries, error))
+
+    # Building
+
+    def _refresh_tree(self, conn, root):
+        stack = [root]
+        pending = 0
+        row = conn.execute("SELECT value FROM meta WHERE key = 'fts_indexed_upto'").fetchone()
+        self._fts_upto = row[0] if row else 0
+
+        while stack:
+            path = stack.pop()
+            try:
+                st = os.stat(path, follow_symlinks=False)
+            except OSError:
+                st = None
+            if st is None or not stat.S_ISDIR(st.st_mode):
+                self._remove_tree(conn, path)
+                continue
+
+            known = conn.execute('SELECT mtime_ns FROM dirs WHERE path = ?', (path,)).fetchone()
+            if known and known[0] == st.st_mtime_ns:
+                subdirs = [row[0] for row in conn.execute(
+                    'SELECT name FROM entries WHERE dir = ? AND is_dir = 1', (path,))]
+            else:
+                subdirs = self._index_directory(conn, path, st.st_mtime_ns)
+                pending += 1
+
+            for name in subdirs:
+                child = os.path.join(path, name)
+                if child not in self.exclude:
+                    stack.append(child)
+
+            if pending >= self.COMMIT_EVERY:
+                self._commit(conn)  # Readers see the index fill up
+                pending = 0
+        self._commit(conn)
+
+    def _commit(self, conn):
+        """Add the rows inserted since the last commit to the name index, then commit"""
+        last_id = conn.execute('SELECT MAX(id) FROM entries').fetchone()[0] or 0
+        if last_id > self._fts_upto:
+            conn.execute('INSERT INTO entry_names (rowid, name) SELECT id, name FROM entries WHERE id > ?',
+                         (self._fts_upto,))
+            self._fts_upto = last_id
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('fts_indexed_upto', ?)", (last_id,))
+        conn.commit()
+
+    def _delete_entries(self, conn, condition, params):
+        """Delete entries matching condition, and those already in the name index from it"""
+        conn.execute(f"INSERT INTO entry_names (entry_names, rowid, name) "
+                     f"SELECT 'delete', id, name FROM entries WHERE ({condition}) AND id <= ?",
+                     (*params, self._fts_upto))
+        conn.execute(f'DELETE FROM entries WHERE {condition}', params)
+
+    def _index_directory(self, conn, path, mtime_ns):
+        """Replace the entries of one directory; returns the names of its subdirectories"""
+        old_subdirs = {row[0] for row in conn.execute(
+            'SELECT name FROM entries WHERE dir = ? AND is_dir = 1', (path,))}
+        rows = []
+        subdirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    is_dir = stat.S_ISDIR(st.st_mode)  # Symlinked directories are not descended into
+                    if is_dir:
+                        subdirs.append(entry.name)
+                    rows.append((path, entry.name, is_dir, entry.name.startswith('.'),
+                                 None if is_dir else st.st_size, st.st_mtime))
+        except OSError:
+            # Unreadable: keep nothing for it and retry on the next refresh
+            self._delete_entries(conn, 'dir = ?', (path,))
+            conn.execute('DELETE FROM dirs WHERE path = ?', (path,))
+            return []
+
+        for name in old_subdirs.difference(subdirs):
+            self._remove_tree(conn, os.path.join(path, name))
+        self._delete_entries(conn, 'dir = ?', (path,))
+        conn.executemany('INSERT INTO entries (dir, name, is_dir, hidden, size, mtime) VALUES (?, ?, ?, ?, ?, ?)',
+                         rows)
+        conn.execute('INSERT OR REPLACE INTO dirs (path, mtime_ns) VALUES (?, ?)', (path, mtime_ns))
+        return subdirs
+
+    def _remove_tree(self, conn, path):
+        low, high = _subtree_bounds(path)
+        self._delete_entries(conn, 'dir = ? OR (dir >= ? AND dir < ?)', (path, low, high))
+        conn.execute('DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)', (path, low, high))
+
+    # Queries
+
+    def search(self, base, query, mode='substring', show_hidden=False, offset=0, limit=100, exclude=()):
+        """
+        Entries below base whose name matches query, best matches first
+
+        Substring results are ranked exact name, then prefix, then anywhere
+        in the name; within a rank, directories, shorter names and shallower
+        paths come first.
+
+        Args:
+            base: Directory to search in (must be inside a ready root)
+            query: Search text, glob pattern or regular expression
+            mode: One of SEARCH_MODES
+            show_hidden: Include entries that are, or are inside, dot directories below base
+            offset: Results to skip
+            limit: Maximum results returned
+            exclude: Directories left out with everything below them (restricted trees)
+
+        Returns:
+            dict with items (path, name, dir, is_dir, size, mtime) and total
+
+        Raises:
+            ValueError: for an unknown mode or an invalid regular expression
+        """
+        name_matcher(query, mode)  # Validates the mode and the pattern
+        limit = max(1, min(int(limit), self.MAX_LIMIT))
+        base = os.path.abspath(base)
+
+        where = []
+        params = []
+        if mode == 'substring' and len(query) >= 3:
+            where.append('entries.id IN (SELECT rowid FROM entry_names WHERE entry_names MATCH ?)')
+            params.append('"' + query.replace('"', '""') + '"')
+        elif mode == 'substring':
+            where.append("name LIKE ? ESCAPE '\\'")  # Case-insensitive for ASCII, like the trigram index
+            params.append(f'%{_escape_like(query)}%')
+        elif mode == 'glob':
+            where.append('entries.id IN (SELECT rowid FROM entry_names WHERE entry_names.name GLOB ?)')
+            where.append('regexp(?, name)')
+            params.extend((_glob_prefilter(query), '^' + fnmatch.translate(query)))
+        else:
+            where.append('regexp(?, name)')
+            params.append(query)
+
+        low, high = _subtree_bounds(base)
+        where.append('(dir = ? OR (dir >= ? AND dir < ?))')
+        params.extend((base, low, high))
+        if not show_hidden:
+            # Dot directories above base do not hide what is searched inside them
+            where.append("hidden = 0 AND instr(substr(dir, ?), '/.') = 0")
+            params.append(len(base.rstrip('/')) + 1)
+        for path in exclude:
+            path = os.path.abspath(path)
+            if path.startswith(base.rstrip('/') + '/'):
+                low, high = _subtree_bounds(path)
+                parent, name = os.path.split(path)
+                where.append('NOT (dir = ? OR (dir >= ? AND dir < ?) OR (dir = ? AND name = ?))')
+                params.extend((path, low, high, parent, name))
+        condition = ' AND '.join(where)
+
+        order = 'is_dir DESC, length(name), length(dir), dir, name'
+        order_params = []
+        if mode == 'substring':
+            order = f"CASE WHEN name LIKE ? ESCAPE '\\' THEN 0 WHEN name LIKE ? ESCAPE '\\' THEN 1 ELSE 2 END, {order}"
+            order_params = [_escape_like(query), _escape_like(query) + '%']
+
+        with closing(self._connect()) as conn:
+            # One pass gives both the page and the number of matches
+            rows = conn.execute(f'''
+                SELECT dir, name, is_dir, size, mtime, COUNT(*) OVER () FROM entries
+                WHERE {condition}
+                ORDER BY {order}
+                LIMIT ? OFFSET ?
+            ''', params + order_params + [limit, max(0, int(offset))]).fetchall()
+            if rows:
+                total = rows[0][5]
+            else:
+                total = conn.execute(f'SELECT COUNT(*) FROM entries WHERE {condition}', params).fetchone()[0]
+
+        items = [{'path': os.path.join(directory, name), 'dir': directory, 'name': name,
+                  'is_dir': bool(is_dir), 'size': size, 'mtime': mtime}
+                 for directory, name, is_dir, size, mtime, _ in rows]
+        return {'items': items, 'total': total}
+
+
+def _escape_like(text):
+    return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+_regex_cache = {}
+
+
+def _regexp(pattern, value):
+    compiled = _regex_cache.get(pattern)
+    if compiled is None:
+        if len(_regex_cache) > 64:
+            _regex_cache.clear()
+        compiled = _regex_cache[pattern] = re.compile(pattern)
+    return value is not None and compiled.search(value) is not None
@@ -0,0 +1,289 @@
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+CHECKSUM_ALGORITHMS = ('sha256', 'sha1', 'md5')
+COPY_BUFFER = 1024 * 1024
+UPLOAD_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class UploadError(Exception):
+    """An upload request that cannot be honoured, with the HTTP status to answer"""
+
+    def __init__(self, message, status=400, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.offset = offset
+
+
+def parse_checksum(value, separator=':'):
+    """
+    (algorithm, digest bytes) from 'sha256:<hex>', or from tus style 'sha256 <base64>'
+
+    Raises:
+        UploadError: for an unknown algorithm or a malformed digest
+    """
+    algorithm, _, digest = value.strip().partition(separator)
+    algorithm = algorithm.lower()
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise UploadError(f"Unsupported checksum algorithm: {algorithm or value}")
+    try:
+        digest = bytes.fromhex(digest) if separator == ':' else base64.b64decode(digest, validate=True)
+    except ValueError:
+        raise UploadError("Malformed checksum")
+    if len(digest) != hashlib.new(algorithm).digest_size:
+        raise UploadError("Malformed checksum")
+    return algorithm, digest
+
+
+class UploadSession:
+    """
+    One resumable upload
+
+    Data goes straight into a hidden .part file next to the destination,
+    so finishing is a rename on the same file system. The size of that
+    file is the upload offset; only the metadata is kept in the store.
+    """
+
+    def __init__(self, upload_id, user_id, directory, filename, size, checksum=None, created=None):
+        self.id = upload_id
+        self.user_id = user_id
+        self.directory = directory
+        self.filename = filename
+        self.size = size
+        self.checksum = checksum  # 'algorithm:hex' of the whole file, if the client sent one
+        self.created = created or time.time()
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, self.filename)
+
+    @property
+    def part_path(self):
+        return os.path.join(self.directory, f'.{self.filename}.{self.id[:12]}.part')
+
+    @property
+    def offset(self):
+        try:
+            return os.path.getsize(self.part_path)
+        except FileNotFoundError:
+            raise UploadError("Upload data is gone; start the upload again.", 410)
+
+    def to_dict(self):
+        return {
+            'upload_id': self.id,
+            'user_id': self.user_id,
+            'directory': self.directory,
+            'filename': self.filename,
+            'size': self.size,
+            'checksum': self.checksum,
+            'created': self.created,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['upload_id'], data['user_id'], data['directory'], data['filename'],
+                   data['size'], data.get('checksum'), data.get('created'))
+
+
+class UploadStore:
+    """
+    Resumable uploads: create, write chunks at an offset, finalize
+
+    Session metadata is a small JSON file per upload in state_dir, so an
+    upload survives restarts and works across worker processes. Chunks
+    are copied from the request stream in COPY_BUFFER pieces, so memory
+    use does not depend on the file or chunk size. The whole-file hash is
+    updated as chunks arrive and only recomputed from disk if this process
+    did not see every chunk.
+    """
+
+    def __init__(self, state_dir, max_age=7 * 24 * 3600):
+        self.state_dir = state_dir
+        self.max_age = max_age
+        self._hashes = {}  # upload id -> (offset hashed up to, hash object)
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _state_path(self, upload_id):
+        return os.path.join(self.state_dir, f'{upload_id}.json')
+
+    def _upload_lock(self, upload_id):
+        with self._lock:
+            return self._locks.setdefault(upload_id, threading.Lock())
+
+    def _save(self, session):
+        os.makedirs(self.state_dir, mode=0o700, exist_ok=True)
+        temp_path = self._state_path(session.id) + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(session.to_dict(), f)
+        os.replace(temp_path, self._state_path(session.id))
+
+    def _forget(self, session):
+        for path in (session.part_path, self._state_path(session.id)):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._hashes.pop(session.id, None)
+            self._locks.pop(session.id, None)
+
+    def create(self, directory, filename, size, user_id, checksum=None):
+        """
+        Start an upload of size bytes to directory/filename
+
+        Raises:
+            UploadError: for a bad checksum or when the destination exists
+        """
+        if checksum:
+            algorithm, digest = parse_checksum(checksum)
+            checksum = f'{algorithm}:{digest.hex()}'
+        session = UploadSession(uuid.uuid4().hex, user_id, directory, filename, size, checksum)
+        if os.path.exists(session.path):
+            raise UploadError("File already exists.", 409)
+
+        self.remove_stale()
+        with open(session.part_path, 'xb'):
+            pass
+        try:
+            self._save(session)
+        except OSError:
+            os.remove(session.part_path)
+            raise
+        if checksum:
+            self._hashes[session.id] = (0, hashlib.new(checksum.split(':')[0]))
+        return session
+
+    def get(self, upload_id):
+        if not UPLOAD_ID.match(upload_id or ''):
+            return None
+        try:
+            with open(self._state_path(upload_id)) as f:
+                return UploadSession.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def write_chunk(self, session, offset, stream, chunk_checksum=None):
+        """
+        Append the request body at offset; returns the new offset
+
+        A body that would run past the declared size, or whose checksum
+        (tus 'Upload-Checksum' header) does not match, is discarded. If the
+        client disconnects mid-chunk, what arrived is kept and the client
+        resumes from the offset reported by a status request.
+
+        Raises:
+            UploadError: 409 with the current offset when offset is stale
+        """
+        verify = parse_checksum(chunk_checksum, separator=' ') if chunk_checksum else None
+        with self._upload_lock(session.id):
+            current = session.offset
+            if offset != current:
+                raise UploadError("Upload offset does not match.", 409, offset=current)
+
+            chunk_hash = hashlib.new(verify[0]) if verify else None
+            with self._lock:
+                hashed_upto, file_hash = self._hashes.pop(session.id, (None, None))
+            if hashed_upto != offset:
+                file_hash = None  # Chunks were written by another process; hash from disk at the end
+            written = 0
+            try:
+                with open(session.part_path, 'r+b') as f:
+                    f.seek(offset)
+                    while True:
+                        block = stream.read(COPY_BUFFER)
+                        if not block:
+                            break
+                        if offset + written + len(block) > session.size:
+                            raise UploadError("Chunk runs past the declared upload size.", 413, offset=offset)
+                        f.write(block)
+                        written += len(block)
+                        if chunk_hash:
+                            chunk_hash.update(block)
+                        if file_hash:
+                            file_hash.update(block)
+                if verify and chunk_hash.digest() != verify[1]:
+                    raise UploadError("Chunk checksum does not match.", 460, offset=offset)
+            except Exception as e:
+                # Discard the chunk unless the client only disconnected from an unverified one
+                if verify or isinstance(e, UploadError):
+                    self._truncate(session, offset)
+                    written, file_hash = 0, None
+                raise
+            finally:
+                if file_hash:
+                    with self._lock:
+                        self._hashes[session.id] = (offset + written, file_hash)
+            return offset + written
+
+    def _truncate(self, session, offset):
+        with open(session.part_path, 'r+b') as f:
+            f.truncate(offset)
+
+    def _file_digest(self, session, algorithm):
+        hashed_upto, file_hash = self._hashes.get(session.id, (None, None))
+        if hashed_upto == session.size and file_hash.name == algorithm:
+            return file_hash.digest()
+        file_hash = hashlib.new(algorithm)
+        with open(session.part_path, 'rb') as f:
+            while True:
+                block = f.read(COPY_BUFFER)
+                if not block:
+                    break
+                file_hash.update(block)
+        return file_hash.digest()
+
+    def finalize(self, session):
+        """
+        Verify a complete upload and move it into place; returns the final path
+
+        Raises:
+            UploadError: if data is missing, the checksum does not match (the
+                upload is discarded) or the destination appeared meanwhile
+        """
+        with self._upload_lock(session.id):
+            offset = session.offset
+            if offset != session.size:
+                raise UploadError(f"Upload is incomplete ({offset} of {session.size} bytes).", 409, offset=offset)
+            if session.checksum:
+                algorithm, expected = session.checksum.split(':')
+                if self._file_digest(session, algorithm).hex() != expected:
+                    self._forget(session)
+                    raise UploadError("File checksum does not match; the upload was discarded.", 460)
+
+            with open(session.part_path, 'rb+') as f:
+                os.fsync(f.fileno())
+            try:
+                # A hard link never replaces a file that appeared since the upload started
+                os.link(session.part_path, session.path)
+            except FileExistsError:
+                raise UploadError("File already exists.", 409)
+            except OSError:
+                if os.path.exists(session.path):
+                    raise UploadError("File already exists.", 409)
+                os.rename(session.part_path, session.path)  # File systems without hard links
+            self._forget(session)
+            return session.path
+
+    def abort(self, session):
+        with self._upload_lock(session.id):
+            self._forget(session)
+
+    def remove_stale(self):
+        """Discard uploads not finished within max_age"""
+        try:
+            names = os.listdir(self.state_dir)
+        except FileNotFoundError:
+            return
+        cutoff = time.time() - self.max_age
+        for name in names:
+            if name.endswith('.json'):
+                session = self.get(name[:-5])
+                if session is not None and session.created < cutoff:
+                    self._forget(session)
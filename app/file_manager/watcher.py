@@ -0,0 +1,350 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import threading
+import time
+
+# inotify(7) event bits
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+
+WATCH_MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_MODIFY | IN_CLOSE_WRITE
+              | IN_ATTRIB | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len; the name follows
+READ_SIZE = 64 * 1024
+
+# Besides 'created', 'deleted' and 'modified' entries, changes of the watched directory itself
+GONE = 'gone'  # The directory was deleted or moved away
+RESCAN = 'rescan'  # Too many changes, or events were lost: reload the listing
+
+# Previous pending change and new change -> pending change (None drops it)
+_MERGED = {
+    ('created', 'modified'): 'created',
+    ('created', 'deleted'): None,
+    ('deleted', 'created'): 'modified',
+    ('deleted', 'modified'): 'modified',
+    ('modified', 'created'): 'modified',
+}
+
+
+def merge_change(previous, change):
+    """Pending change of an entry after another change arrives for it within one batch"""
+    if previous is None:
+        return change
+    return _MERGED.get((previous, change), change)
+
+
+class Inotify:
+    """
+    Minimal inotify binding through ctypes
+
+    Raises:
+        OSError: when inotify is not available (not Linux, or out of instances)
+    """
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, 'inotify is not available')
+        self._libc = libc
+        self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            self._raise()
+
+    def _raise(self):
+        code = ctypes.get_errno()
+        raise OSError(code, os.strerror(code))
+
+    def fileno(self):
+        return self.fd
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        """Watch descriptor for path; ENOSPC when max_user_watches is reached"""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            self._raise()
+        return wd
+
+    def remove_watch(self, wd):
+        self._libc.inotify_rm_watch(self.fd, wd)  # Fails only for watches already removed
+
+    def read(self):
+        """Pending events as (wd, mask, name) tuples"""
+        try:
+            data = os.read(self.fd, READ_SIZE)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def _poll_state(directory):
+    """What polling compares between passes: name -> (inode, mtime, size, mode) of each entry"""
+    state = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            state[entry.name] = (st.st_ino, st.st_mtime_ns, st.st_size, st.st_mode)
+    return state
+
+
+class _Watch:
+    def __init__(self, directory):
+        self.directory = directory
+        self.subscribers = 0
+        self.wd = None  # inotify watch descriptor, or None when polled
+        self.state = None  # Last poll_state when polled
+        self.polled_at = 0
+        self.gone = False
+        self.pending = {}  # name -> change, for the next batch
+        self.pending_since = None
+        self.overflow = False
+
+    @property
+    def backend(self):
+        return 'polling' if self.wd is None else 'inotify'
+
+
+class DirectoryWatcher:
+    """
+    Reports entries created, deleted or modified in watched directories
+
+    Directories are watched with inotify where available; when it is not
+    (or max_user_watches is reached) they are polled every poll_interval
+    seconds, comparing inode, mtime, size and mode of every entry. Watches
+    are not recursive and are counted, so a directory open in several
+    browser tabs is watched once.
+
+    Changes are collected for batch_delay seconds and passed to
+    on_change(directory, changes) from a background thread, as a list of
+    {'type': ..., 'name': ...} dicts. An entry changed several times in a
+    batch is reported once (written files cause a stream of events). A
+    batch of more than max_batch changes, or lost inotify events, is
+    reported as a single RESCAN change; a directory that was removed as
+    GONE. The thread runs only while something is watched.
+    """
+
+    def __init__(self, on_change, poll_interval=2.0, batch_delay=0.2, max_batch=500, use_inotify=True):
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.batch_delay = batch_delay
+        self.max_batch = max_batch
+        self.use_inotify = use_inotify
+        self._inotify = None
+        self._watches = {}  # directory -> _Watch
+        self._by_wd = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _get_inotify(self):
+        if self._inotify is None and self.use_inotify:
+            try:
+                self._inotify = Inotify()
+            except OSError:
+                self.use_inotify = False
+        return self._inotify
+
+    def watch(self, directory):
+        """
+        Start (or count another subscriber of) a watch on directory
+
+        Returns:
+            'inotify' or 'polling'
+
+        Raises:
+            OSError: if the directory cannot be read
+        """
+        with self._lock:
+            watch = self._watches.get(directory)
+            if watch is None:
+                watch = _Watch(directory)
+                inotify = self._get_inotify()
+                if inotify is not None:
+                    try:
+                        watch.wd = inotify.add_watch(directory)
+                        self._by_wd[watch.wd] = watch
+                    except OSError as e:
+                        if e.errno not in (errno.ENOSPC, errno.ENOMEM):
+                            raise
+                if watch.wd is None:
+                    watch.state = _poll_state(directory)
+                    watch.polled_at = time.monotonic()
+                self._watches[directory] = watch
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='file-manager-watcher', daemon=True)
+                    self._thread.start()
+            watch.subscribers += 1
+            return watch.backend
+
+    def backend(self, directory):
+        """'inotify' or 'polling' for a watched directory, else None"""
+        with self._lock:
+            watch = self._watches.get(directory)
+            return watch.backend if watch else None
+
+    def unwatch(self, directory):
+        """Drop a subscriber; the watch ends with the last one"""
+        with self._lock:
+            watch = self._watches.get(directory)
+            if watch is None:
+                return
+            watch.subscribers -= 1
+            if watch.subscribers <= 0:
+                self._drop(watch)
+
+    def _drop(self, watch):
+        self._watches.pop(watch.directory, None)
+        if watch.wd is not None and self._by_wd.pop(watch.wd, None) is not None:
+            self._inotify.remove_watch(watch.wd)
+
+    def watched(self):
+        """Watched directories and their number of subscribers"""
+        with self._lock:
+            return {directory: watch.subscribers for directory, watch in self._watches.items()}
+
+    def _record(self, watch, name, change):
+        if watch.overflow or watch.gone:
+            return
+        merged = merge_change(watch.pending.get(name), change)
+        if merged is None:
+            watch.pending.pop(name, None)
+        else:
+            watch.pending[name] = merged
+        if watch.pending_since is None:
+            watch.pending_since = time.monotonic()
+        if len(watch.pending) > self.max_batch:
+            watch.pending.clear()
+            watch.overflow = True
+
+    def _handle_events(self, events):
+        for wd, mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                for watch in self._watches.values():
+                    watch.pending.clear()
+                    watch.overflow = True
+                    watch.pending_since = watch.pending_since or time.monotonic()
+                continue
+            watch = self._by_wd.get(wd)
+            if watch is None:
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                if not watch.gone:
+                    watch.gone = True
+                    watch.pending_since = watch.pending_since or time.monotonic()
+                if mask & IN_IGNORED:
+                    self._by_wd.pop(wd, None)  # The kernel removed the watch
+                continue
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self._record(watch, name, 'created')
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._record(watch, name, 'deleted')
+            elif name:
+                self._record(watch, name, 'modified')
+
+    def _poll(self, watch, now):
+        watch.polled_at = now
+        try:
+            state = _poll_state(watch.directory)
+        except OSError:
+            watch.gone = True
+            watch.pending_since = watch.pending_since or now
+            return
+        previous = watch.state
+        watch.state = state
+        for name in previous.keys() - state.keys():
+            self._record(watch, name, 'deleted')
+        for name, info in state.items():
+            old = previous.get(name)
+            if old is None:
+                self._record(watch, name, 'created')
+            elif old != info:
+                # A different inode under the same name is a replaced entry, reported as modified
+                self._record(watch, name, 'modified')
+
+    def _due_batches(self, now):
+        batches = []
+        for watch in list(self._watches.values()):
+            if watch.pending_since is None or now - watch.pending_since < self.batch_delay:
+                continue
+            if watch.gone:
+                changes = [{'type': GONE}]
+                self._drop(watch)
+            elif watch.overflow:
+                changes = [{'type': RESCAN}]
+            else:
+                changes = [{'type': change, 'name': name} for name, change in watch.pending.items()]
+            watch.pending = {}
+            watch.pending_since = None
+            watch.overflow = False
+            if changes:
+                batches.append((watch.directory, changes))
+        return batches
+
+    def _timeout(self, now):
+        deadlines = [watch.pending_since + self.batch_delay for watch in self._watches.values()
+                     if watch.pending_since is not None]
+        deadlines += [watch.polled_at + self.poll_interval for watch in self._watches.values()
+                      if watch.wd is None and not watch.gone]
+        return min(deadlines) - now if deadlines else self.poll_interval
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._watches:
+                    self._thread = None
+                    return
+                timeout = max(0, self._timeout(time.monotonic()))
+                inotify = self._inotify if self._by_wd else None
+
+            if inotify is not None:
+                try:
+                    readable, _, _ = select.select([inotify], [], [], timeout)
+                except (OSError, ValueError):
+                    readable = []
+                events = inotify.read() if readable else []
+            else:
+                time.sleep(timeout)
+                events = []
+
+            now = time.monotonic()
+            with self._lock:
+                self._handle_events(events)
+                for watch in list(self._watches.values()):
+                    if watch.wd is None and not watch.gone and now - watch.polled_at >= self.poll_interval:
+                        self._poll(watch, now)
+                batches = self._due_batches(time.monotonic())
+
+            for directory, changes in batches:
+                try:
+                    self.on_change(directory, changes)
+                except Exception as e:
+                    print(f"Error reporting changes in {directory}: {e}")
@@ -0,0 +1,84 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime
+
+
+class AnalysisCache:
+    """Persistent cache of MetadataAnalyzer results
+
+    Results are looked up in two ways:
+
+    * by path, when the file's size, mtime and inode are unchanged (no I/O
+      beyond a stat call), and
+    * by SHA-256, so the same content under another name or in a new batch
+      reuses the expensive parts of an earlier analysis.
+
+    Entries are tied to the analysis options and the analyzer's
+    ``analysis_version``; results from other versions are ignored.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(os.path.expanduser(path))
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute('PRAGMA journal_mode=WAL')  # Pool workers read and write concurrently
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    path TEXT NOT NULL,
+                    options TEXT NOT NULL,
+                    size INTEGER,
+                    mtime_ns INTEGER,
+                    inode INTEGER,
+                    sha256 TEXT,
+                    analysis_version TEXT,
+                    result TEXT NOT NULL,
+                    analyzed_at TEXT,
+                    PRIMARY KEY (path, options)
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_analysis_cache_sha256 ON analysis_cache (sha256, options)')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get_by_stat(self, path, stat, options, analysis_version):
+        """Cached result for path if the file has not changed since it was analyzed"""
+        with closing(self._connect()) as conn:
+            row = conn.execute('''
+                SELECT result FROM analysis_cache
+                WHERE path = ? AND options = ? AND size = ? AND mtime_ns = ? AND inode = ?
+                  AND analysis_version = ?
+            ''', (os.path.abspath(path), options, stat.st_size, stat.st_mtime_ns, stat.st_ino,
+                  analysis_version)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_by_content(self, sha256, options, analysis_version):
+        """Cached result for any file with this content"""
+        with closing(self._connect()) as conn:
+            row = conn.execute('''
+                SELECT result FROM analysis_cache
+                WHERE sha256 = ? AND options = ? AND analysis_version = ?
+                ORDER BY analyzed_at DESC LIMIT 1
+            ''', (sha256, options, analysis_version)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, path, stat, sha256, options, analysis_version, result):
+        """Store the result of analyzing path"""
+        try:
+            serialized = json.dumps(result, default=str)
+        except (TypeError, ValueError) as e:
+            print(f"Not caching analysis of {path}: {e}")
+            return
+
+        with self.lock, closing(self._connect()) as conn, conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO analysis_cache
+                    (path, options, size, mtime_ns, inode, sha256, analysis_version, result, analyzed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (os.path.abspath(path), options, stat.st_size, stat.st_mtime_ns, stat.st_ino, sha256,
+                  analysis_version, serialized, datetime.now().isoformat()))
@@ -0,0 +1,126 @@
+import math
+from collections import Counter
+
+from app.metaspidey.optional_imports import REGISTRY as OPTIONAL_MODULES
+
+np = OPTIONAL_MODULES['numpy']  # Imported on first use
+NUMPY_AVAILABLE = np.available
+
+PRINTABLE_RANGE = (32, 127)  # Printable ASCII, space to tilde
+MIN_WINDOW = 1024
+MAX_PROFILE_POINTS = 512
+
+
+def byte_histogram(data):
+    """Count of each byte value (0-255) in data, as a list of 256 ints"""
+    if NUMPY_AVAILABLE:
+        return np.bincount(np.frombuffer(data, dtype=np.uint8), minlength=256).tolist()
+    counts = Counter(bytes(data))
+    return [counts.get(value, 0) for value in range(256)]
+
+
+def entropy_from_histogram(histogram, total=None):
+    """Shannon entropy in bits per byte of a byte histogram"""
+    total = sum(histogram) if total is None else total
+    if not total:
+        return 0.0
+    entropy = 0.0
+    for count in histogram:
+        if count:
+            probability = count / total
+            entropy -= probability * math.log2(probability)
+    return round(entropy, 4)
+
+
+def entropy(data):
+    """Shannon entropy in bits per byte of data"""
+    if not data:
+        return 0.0
+    return entropy_from_histogram(byte_histogram(data), len(data))
+
+
+def printable_ratio(data):
+    """Fraction of printable ASCII bytes in data"""
+    if not data:
+        return 0.0
+    histogram = byte_histogram(data)
+    return sum(histogram[PRINTABLE_RANGE[0]:PRINTABLE_RANGE[1]]) / len(data)
+
+
+def profile_window(size):
+    """Window size that keeps an entropy profile of size bytes within MAX_PROFILE_POINTS"""
+    window = MIN_WINDOW
+    while window * MAX_PROFILE_POINTS < size:
+        window *= 2
+    return window
+
+
+def analyze_bytes(view, window=None):
+    """
+    Byte statistics for a whole file in one pass over a FileView
+
+    Args:
+        view: FileView of the file
+        window: Entropy profile window in bytes (default: sized from the file, power of two)
+
+    Returns:
+        dict with the byte histogram, whole-file entropy, printable, null
+        and high-byte ratios, and the entropy of each consecutive window
+    """
+    window = window or profile_window(view.size)
+    # Chunks hold a whole number of windows, so windows never span chunks
+    chunk_size = max(window, view.CHUNK_SIZE // window * window)
+
+    histogram = [0] * 256
+    profile = []
+    if NUMPY_AVAILABLE:
+        totals = np.zeros(256, dtype=np.int64)
+        for chunk in view.iter_chunks(chunk_size):
+            window_counts = _window_histograms(np.frombuffer(chunk, dtype=np.uint8), window)
+            totals += window_counts.sum(axis=0)
+            profile.extend(_window_entropies(window_counts).tolist())
+        histogram = totals.tolist()
+    else:
+        for chunk in view.iter_chunks(chunk_size):
+            for offset in range(0, len(chunk), window):
+                counts = byte_histogram(chunk[offset:offset + window])
+                profile.append(entropy_from_histogram(counts))
+                histogram = [a + b for a, b in zip(histogram, counts)]
+
+    size = view.size
+    most_frequent = max(range(256), key=histogram.__getitem__) if size else None
+    return {
+        'size': size,
+        'histogram': histogram,
+        'entropy': entropy_from_histogram(histogram, size),
+        'unique_bytes': sum(1 for count in histogram if count),
+        'most_frequent_byte': (most_frequent, histogram[most_frequent]) if size else None,
+        'null_ratio': histogram[0] / size if size else 0.0,
+        'printable_ratio': sum(histogram[PRINTABLE_RANGE[0]:PRINTABLE_RANGE[1]]) / size if size else 0.0,
+        'high_byte_ratio': sum(histogram[128:]) / size if size else 0.0,
+        'window_size': window,
+        'entropy_profile': [round(value, 4) for value in profile],
+    }
+
+
+def _window_histograms(data, window):
+    """256-bin histogram of each consecutive window of a uint8 array, shape (windows, 256)"""
+    full = len(data) // window
+    rows = []
+    if full:
+        # Offset each window's bytes into its own 256-bin range and count them all at once
+        offsets = (np.arange(full, dtype=np.int64) * 256)[:, None]
+        binned = data[:full * window].reshape(full, window) + offsets
+        rows.append(np.bincount(binned.ravel(), minlength=full * 256).reshape(full, 256))
+    if len(data) % window:
+        rows.append(np.bincount(data[full * window:], minlength=256)[None, :])
+    return np.concatenate(rows) if rows else np.zeros((0, 256), dtype=np.int64)
+
+
+def _window_entropies(window_counts):
+    """Shannon entropy of each row of a (windows, 256) histogram array"""
+    totals = window_counts.sum(axis=1, keepdims=True)
+    probabilities = window_counts / np.maximum(totals, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terms = np.where(probabilities > 0, probabilities * np.log2(probabilities), 0.0)
+    return np.maximum(-terms.sum(axis=1), 0.0)  # Avoid -0.0 for constant windows
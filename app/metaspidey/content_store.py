@@ -0,0 +1,160 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+from contextlib import closing
+from datetime import datetime
+
+
+class ContentStore:
+    """Content-addressed storage for downloaded files
+
+    Files are stored once under ``objects/<aa>/<sha256>`` and exposed under
+    their human readable names through hardlinks (falling back to symlinks
+    or copies). Objects are made read-only so that editing a linked name in
+    place does not silently change the stored content, and are re-hashed
+    before a lookup reuses them. A small SQLite index maps each URL to the hash, ETag and
+    Last-Modified value seen when it was fetched, so unchanged resources can
+    be skipped on later runs.
+    """
+
+    INDEX_FILENAME = 'index.db'
+
+    def __init__(self, root):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.index_path = os.path.join(root, self.INDEX_FILENAME)
+        self.lock = threading.Lock()
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS url_index (
+                    url TEXT PRIMARY KEY,
+                    sha256 TEXT NOT NULL,
+                    size INTEGER,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_type TEXT,
+                    fetched_at TEXT
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_url_index_sha256 ON url_index (sha256)')
+
+    def _connect(self):
+        return sqlite3.connect(self.index_path, timeout=30)
+
+    def object_path(self, sha256):
+        """Path of the stored object for a SHA-256 hex digest"""
+        return os.path.join(self.objects_dir, sha256[:2], sha256)
+
+    def has(self, sha256):
+        return os.path.exists(self.object_path(sha256))
+
+    def lookup(self, url):
+        """Return the index entry for a URL if its content is still stored intact"""
+        with closing(self._connect()) as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute('SELECT * FROM url_index WHERE url = ?', (url,)).fetchone()
+
+        if row and self.verify(row['sha256'], row['size']):
+            return dict(row)
+        return None
+
+    def verify(self, sha256, size=None):
+        """
+        Check that a stored object still has its size and hash
+
+        An object that was modified (e.g. through a hardlinked name, by a
+        user allowed to write read-only files) is removed from the store, so
+        the content is downloaded and stored again.
+        """
+        object_path = self.object_path(sha256)
+        try:
+            if size is None or os.path.getsize(object_path) == size:
+                digest = hashlib.sha256()
+                with open(object_path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                        digest.update(chunk)
+                if digest.hexdigest() == sha256:
+                    return True
+        except FileNotFoundError:
+            return False
+
+        print(f"Stored object {sha256} was modified; discarding it")
+        with self.lock:
+            try:
+                os.unlink(object_path)  # Names linked to it keep the modified content
+            except FileNotFoundError:
+                pass
+        return False
+
+    def record(self, url, sha256, size=None, etag=None, last_modified=None, content_type=None):
+        """Remember which content a URL resolved to"""
+        with self.lock, closing(self._connect()) as conn, conn:
+            conn.execute('''
+                INSERT OR REPLACE INTO url_index
+                    (url, sha256, size, etag, last_modified, content_type, fetched_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (url, sha256, size, etag, last_modified, content_type, datetime.now().isoformat()))
+
+    def ingest(self, file_path, sha256):
+        """
+        Move a fully downloaded file into the store
+
+        Returns:
+            Tuple of (object path, True if the content was already stored)
+        """
+        object_path = self.object_path(sha256)
+        with self.lock:
+            if os.path.exists(object_path):
+                os.unlink(file_path)
+                return object_path, True
+
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            os.chmod(file_path, 0o444)  # Before any name is linked to it
+            os.replace(file_path, object_path)
+            return object_path, False
+
+    def link(self, sha256, dest_path):
+        """
+        Expose a stored object at dest_path
+
+        If dest_path (or a numbered variant of it) already refers to the same
+        object it is reused instead of creating another copy.
+
+        Returns:
+            The path the object is available at
+        """
+        object_path = self.object_path(sha256)
+
+        with self.lock:
+            counter = 1
+            candidate = dest_path
+            while os.path.lexists(candidate):
+                try:
+                    if os.path.samefile(candidate, object_path):
+                        return candidate
+                except OSError:
+                    pass
+                name, ext = os.path.splitext(dest_path)
+                candidate = f"{name}_{counter}{ext}"
+                counter += 1
+
+            try:
+                if os.stat(object_path).st_mode & 0o222:
+                    os.chmod(object_path, 0o444)  # Stored before objects were made read-only
+            except OSError:
+                pass
+
+            try:
+                os.link(object_path, candidate)
+            except OSError:
+                # Hardlinks are unavailable (e.g. across filesystems)
+                try:
+                    os.symlink(object_path, candidate)
+                except OSError:
+                    shutil.copy2(object_path, candidate)
+
+            return candidate
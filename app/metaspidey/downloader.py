@@ -1,6 +1,12 @@
 import os
+import json
+import hashlib
+import posixpath
 import requests
-from urllib.parse import urlparse, urljoin
+import tempfile
+import urllib3
+from collections import deque
+from urllib.parse import urlparse, urljoin, urlunparse, parse_qsl, urlencode
 from pathlib import Path
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -10,35 +16,174 @@ from bs4 import BeautifulSoup
 import mimetypes
 from urllib.robotparser import RobotFileParser
 import re
+from app.metaspidey.content_store import ContentStore
+from app.metaspidey.prober import PatternProber
+
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url):
+    """
+    Canonicalize a URL for deduplication
+    
+    Lowercases scheme and host, drops default ports and fragments, resolves
+    dot segments, collapses duplicate slashes and sorts query parameters so
+    that equivalent URLs compare equal.
+    """
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    if parsed.port and parsed.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parsed.port}"
+    if parsed.username:
+        credentials = parsed.username + (f":{parsed.password}" if parsed.password else '')
+        host = f"{credentials}@{host}"
+    
+    path = re.sub(r'/{2,}', '/', parsed.path or '/')
+    trailing_slash = path.endswith('/')
+    path = posixpath.normpath(path)
+    if trailing_slash and path != '/':
+        path += '/'
+    
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return urlunparse((scheme, host, path, parsed.params, query, ''))
+
+
+class _DownloadCancelled(Exception):
+    """Raised inside a transfer when the downloader has been stopped"""
+
+
+class _DownloadTooLarge(Exception):
+    """Raised inside a transfer when the size limit is exceeded"""
+
+
+class _RangeNotSatisfied(Exception):
+    """Raised when a server answers a segment request without a partial response"""
+
+
+class _TransferStats:
+    """Thread-safe byte counter that reports throughput through a progress callback"""
+    
+    REPORT_INTERVAL = 0.5  # seconds between progress callbacks
+    
+    def __init__(self, progress_callback=None, **context):
+        self.progress_callback = progress_callback
+        self.context = context
+        self.total = None
+        self.downloaded = 0
+        self.transferred = 0  # bytes fetched in this run, excluding resumed data
+        self.file_bytes = {}
+        self.started = time.monotonic()
+        self.last_report = 0.0
+        self.lock = threading.Lock()
+    
+    def add(self, num_bytes, count_towards_rate=True):
+        with self.lock:
+            self.downloaded += num_bytes
+            if count_towards_rate:
+                self.transferred += num_bytes
+        self.emit('download_progress')
+    
+    def set_file_bytes(self, key, num_bytes):
+        """Track per-file byte counts when aggregating several transfers"""
+        with self.lock:
+            previous = self.file_bytes.get(key, 0)
+            self.file_bytes[key] = num_bytes
+            self.downloaded += num_bytes - previous
+            self.transferred += max(0, num_bytes - previous)
+    
+    def elapsed(self):
+        return time.monotonic() - self.started
+    
+    def throughput(self):
+        elapsed = self.elapsed()
+        return round(self.transferred / elapsed) if elapsed > 0 else 0
+    
+    def emit(self, event_type, force=False, **extra):
+        if not self.progress_callback:
+            return
+        now = time.monotonic()
+        if event_type == 'download_progress' and not force:
+            with self.lock:
+                if now - self.last_report < self.REPORT_INTERVAL:
+                    return
+                self.last_report = now
+        self.progress_callback({
+            'type': event_type,
+            **self.context,
+            'downloaded': self.downloaded,
+            'total': self.total,
+            'percent': round(self.downloaded / self.total * 100, 1) if self.total else None,
+            'throughput_bps': self.throughput(),
+            **extra
+        })
+
 
 class FileDownloader:
     """Enhanced File downloader with crawling capabilities for MetaSpidey"""
     
-    def __init__(self):
+    # Adaptive read size bounds for streamed downloads
+    MIN_CHUNK_SIZE = 64 * 1024
+    MAX_CHUNK_SIZE = 4 * 1024 * 1024
+    # Files at least this large are fetched in parallel segments when ranges are supported
+    SEGMENT_THRESHOLD = 8 * 1024 * 1024
+    # Seconds between saves of segment progress while a segmented download runs
+    PROGRESS_SAVE_INTERVAL = 2.0
+    # Directory (inside the download path) holding resumable partial downloads
+    PARTIAL_DIR = '.metaspidey_partial'
+    # Directory (inside the download path) holding the content-addressed store
+    STORE_DIR = '.metaspidey_store'
+    
+    def __init__(self, segments=4, use_store=True):
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'MetaSpidey/1.0 (Security Research Tool)'
         })
+        # Allow enough pooled connections for concurrent workers and segments
+        adapter = requests.adapters.HTTPAdapter(pool_connections=20, pool_maxsize=64)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.segments = segments
+        self.use_store = use_store
+        self.stores = {}
+        self.prober = PatternProber(self.session)
         self.downloaded_files = []
         self.failed_downloads = []
         self.discovered_files = []
-        self.visited_urls = set()
+        self.discovered_index = {}  # normalized URL -> discovered file info
+        self.visited_urls = set()  # normalized URLs of crawled pages
         self.lock = threading.Lock()
         self.robots_parser = RobotFileParser()
         self.should_stop = False
 
-    def download_file(self, url, download_path, max_size_mb=100):
+    def download_file(self, url, download_path, max_size_mb=100, progress_callback=None,
+                      timeout=30, segments=None):
         """
         Download a single file
         
+        Data is streamed into a partial file under ``.metaspidey_partial`` so an
+        interrupted download can be resumed with an HTTP Range request on the
+        next attempt. Large files on servers that accept ranges are fetched in
+        several parallel segments.
+        
+        When the content store is enabled the file is hashed while streaming,
+        stored once by SHA-256 and linked under its readable name. URLs whose
+        ETag/Last-Modified still match the stored copy are not fetched again.
+        
         Args:
             url: URL to download
             download_path: Directory to save the file
             max_size_mb: Maximum file size in MB
+            progress_callback: Function to call with progress/throughput updates
+            timeout: Request timeout in seconds
+            segments: Number of parallel segments for large files (default: self.segments)
         
         Returns:
             Dictionary with download result
         """
+        part_path = None
+        meta_path = None
         try:
             # Parse URL to get filename
             parsed_url = urlparse(url)
@@ -51,105 +196,112 @@ class FileDownloader:
             # Ensure download directory exists
             Path(download_path).mkdir(parents=True, exist_ok=True)
             
-            file_path = os.path.join(download_path, filename)
+            part_path, meta_path = self._partial_paths(url, download_path)
+            meta = self._load_partial_meta(meta_path, url)
+            max_bytes = max_size_mb * 1024 * 1024
+            segments = segments or self.segments
             
-            # Handle duplicate filenames
-            counter = 1
-            original_path = file_path
-            while os.path.exists(file_path):
-                name, ext = os.path.splitext(original_path)
-                file_path = f"{name}_{counter}{ext}"
-                counter += 1
+            stats = _TransferStats(progress_callback, url=url, filename=filename)
+            stats.emit('download_started')
             
-            # Start download with streaming
-            with self.session.get(url, stream=True, timeout=30) as response:
-                response.raise_for_status()
-                
-                # Check content length
-                content_length = response.headers.get('content-length')
-                if content_length:
-                    size_mb = int(content_length) / (1024 * 1024)
-                    if size_mb > max_size_mb:
-                        return {
-                            'url': url,
-                            'status': 'failed',
-                            'error': f'File too large ({size_mb:.1f}MB > {max_size_mb}MB)',
-                            'timestamp': datetime.now().isoformat()
-                        }
-                
-                # Download file
-                downloaded_size = 0
-                with open(file_path, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            f.write(chunk)
-                            downloaded_size += len(chunk)
-                            
-                            # Check size limit during download
-                            if downloaded_size > max_size_mb * 1024 * 1024:
-                                os.unlink(file_path)  # Delete partial file
-                                return {
-                                    'url': url,
-                                    'status': 'failed',
-                                    'error': f'File exceeded size limit during download',
-                                    'timestamp': datetime.now().isoformat()
-                                }
-                
-                # Get file info
-                file_size = os.path.getsize(file_path)
-                
-                result = {
-                    'url': url,
-                    'status': 'success',
-                    'filename': os.path.basename(file_path),
-                    'file_path': file_path,
-                    'file_size': file_size,
-                    'file_size_human': self._format_file_size(file_size),
-                    'content_type': response.headers.get('content-type', 'unknown'),
-                    'download_time': datetime.now().isoformat(),
-                    'server': response.headers.get('server', 'unknown')
-                }
-                
-                with self.lock:
-                    self.downloaded_files.append(result)
-                
+            # Probe the resource so we know its size and whether ranges are supported
+            info = self._probe_url(url, timeout)
+            total_size = info.get('total_size')
+            if total_size and total_size > max_bytes:
+                self._discard_partial(part_path, meta_path)
+                return self._record_failure(url, f'File too large ({total_size / (1024 * 1024):.1f}MB > {max_size_mb}MB)')
+            
+            if meta.get('total_size') and total_size and meta['total_size'] != total_size:
+                # The remote file changed since the partial download was started
+                self._discard_partial(part_path, meta_path)
+                meta = {'url': url}
+            
+            store = self._get_store(download_path) if self.use_store else None
+            cached = store.lookup(url) if store else None
+            if cached and self._is_unchanged(cached, info):
+                # Same content is already stored - just make sure it is linked
+                self._discard_partial(part_path, meta_path)
+                file_path = store.link(cached['sha256'], os.path.join(download_path, filename))
+                result = self._success_result(url, file_path, {'content-type': cached.get('content_type')},
+                                              stats, sha256=cached['sha256'], cached=True,
+                                              deduplicated=True)
+                stats.emit('download_completed', file_size=result['file_size'], cached=True)
                 return result
-                
-        except requests.exceptions.RequestException as e:
-            result = {
-                'url': url,
-                'status': 'failed',
-                'error': f'Request error: {str(e)}',
-                'timestamp': datetime.now().isoformat()
-            }
             
-            with self.lock:
-                self.failed_downloads.append(result)
+            stats.total = total_size
+            use_segments = (segments > 1 and info.get('accepts_ranges') and
+                            total_size and total_size >= self.SEGMENT_THRESHOLD)
             
-            return result
+            headers = {}
+            sha256 = None
+            if use_segments:
+                try:
+                    resumed_from, headers = self._segmented_download(
+                        url, part_path, meta_path, meta, info, segments, timeout, stats)
+                except _RangeNotSatisfied:
+                    self._discard_partial(part_path, meta_path)
+                    meta = {'url': url}
+                    use_segments = False
             
-        except Exception as e:
-            result = {
-                'url': url,
-                'status': 'failed',
-                'error': f'Unexpected error: {str(e)}',
-                'timestamp': datetime.now().isoformat()
-            }
+            if not use_segments:
+                resumed_from, headers, sha256 = self._stream_download(
+                    url, part_path, meta_path, meta, max_bytes, timeout, stats)
             
-            with self.lock:
-                self.failed_downloads.append(result)
+            deduplicated = False
+            if store:
+                # Segmented downloads arrive out of order, so hash those once complete
+                sha256 = sha256 or self._hash_file(part_path).hexdigest()
+                object_path, deduplicated = store.ingest(part_path, sha256)
+                file_path = store.link(sha256, os.path.join(download_path, filename))
+                store.record(url, sha256,
+                             size=os.path.getsize(object_path),
+                             etag=headers.get('etag') or info.get('etag'),
+                             last_modified=headers.get('last-modified') or info.get('last_modified'),
+                             content_type=headers.get('content-type'))
+            else:
+                # Move the completed partial file to its final, human readable name
+                with self.lock:
+                    file_path = self._unique_path(os.path.join(download_path, filename))
+                    os.replace(part_path, file_path)
+            if os.path.exists(meta_path):
+                os.unlink(meta_path)
             
+            result = self._success_result(url, file_path, headers, stats,
+                                          resumed_from=resumed_from,
+                                          segments=segments if use_segments else 1,
+                                          sha256=sha256,
+                                          cached=False,
+                                          deduplicated=deduplicated)
+            stats.emit('download_completed', file_size=result['file_size'])
             return result
+            
+        except _DownloadTooLarge:
+            self._discard_partial(part_path, meta_path)
+            return self._record_failure(url, 'File exceeded size limit during download')
+            
+        except _DownloadCancelled:
+            return self._record_failure(url, 'Download cancelled (partial data kept for resume)', resumable=True)
+            
+        except requests.exceptions.RequestException as e:
+            # Keep the partial file so the next attempt can resume where this one stopped
+            return self._record_failure(url, f'Request error: {str(e)}',
+                                        resumable=bool(part_path and os.path.exists(part_path)))
+            
+        except Exception as e:
+            return self._record_failure(url, f'Unexpected error: {str(e)}')
 
-    def download_files(self, urls, download_path, max_size_mb=100, threads=3):
+    def download_files(self, urls, download_path, max_size_mb=100, threads=3,
+                       progress_callback=None, timeout=30):
         """
-        Download multiple files - simplified for better reliability
+        Download multiple files using a pool of worker threads
         
         Args:
             urls: List of URLs to download
             download_path: Directory to save files
             max_size_mb: Maximum file size in MB
-            threads: Number of concurrent downloads (unused in simplified version)
+            threads: Number of concurrent downloads
+            progress_callback: Function to call with per-file and aggregate progress
+            timeout: Request timeout in seconds
         
         Returns:
             Dictionary with download results
@@ -158,43 +310,69 @@ class FileDownloader:
             self.downloaded_files = []
             self.failed_downloads = []
             
-            print(f"Starting download of {len(urls)} files to {download_path}")
+            print(f"Starting download of {len(urls)} files to {download_path} ({threads} workers)")
             
             start_time = datetime.now()
-            results = []
+            results = [None] * len(urls)
+            aggregate = _TransferStats(progress_callback)
+            completed = 0
             
-            # Process downloads sequentially for better reliability
-            for i, url in enumerate(urls):
-                try:
-                    print(f"Downloading {i+1}/{len(urls)}: {url}")
-                    result = self.download_file(url, download_path, max_size_mb)
-                    results.append(result)
+            def file_callback(update):
+                # Per-file updates are forwarded and folded into the aggregate throughput
+                if update['type'] == 'download_progress':
+                    aggregate.set_file_bytes(update['url'], update['downloaded'])
+                if progress_callback:
+                    progress_callback(update)
+            
+            with ThreadPoolExecutor(max_workers=max(1, threads)) as executor:
+                future_to_index = {
+                    executor.submit(self.download_file, url, download_path, max_size_mb,
+                                    file_callback, timeout): i
+                    for i, url in enumerate(urls)
+                }
+                
+                for future in as_completed(future_to_index):
+                    i = future_to_index[future]
+                    url = urls[i]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        result = {
+                            'url': url,
+                            'status': 'failed',
+                            'error': f'Download error: {str(e)}',
+                            'timestamp': datetime.now().isoformat()
+                        }
+                        with self.lock:
+                            self.failed_downloads.append(result)
+                    results[i] = result
+                    completed += 1
                     
                     if result['status'] == 'success':
-                        print(f"✓ Downloaded: {result['filename']}")
+                        aggregate.set_file_bytes(url, result['file_size'])
+                        print(f"✓ Downloaded [{completed}/{len(urls)}]: {result['filename']} "
+                              f"({result['throughput_human']})")
                     else:
-                        print(f"✗ Failed: {result.get('error', 'Unknown error')}")
-                        
-                except Exception as e:
-                    error_result = {
-                        'url': url,
-                        'status': 'failed',
-                        'error': f'Download error: {str(e)}',
-                        'timestamp': datetime.now().isoformat()
-                    }
-                    results.append(error_result)
-                    self.failed_downloads.append(error_result)
-                    print(f"✗ Error downloading {url}: {str(e)}")
-                
-                # Small delay between downloads
-                time.sleep(0.1)
+                        print(f"✗ Failed [{completed}/{len(urls)}]: {url}: {result.get('error', 'Unknown error')}")
+                    
+                    aggregate.emit('download_stats', force=True,
+                                   completed=completed,
+                                   total_files=len(urls),
+                                   successful=len(self.downloaded_files),
+                                   failed=len(self.failed_downloads))
+                    
+                    if self.should_stop:
+                        for pending in future_to_index:
+                            pending.cancel()
             
             end_time = datetime.now()
+            results = [r for r in results if r is not None]
             
             # Compile summary
             successful = len(self.downloaded_files)
             failed = len(self.failed_downloads)
             total_size = sum(f.get('file_size', 0) for f in self.downloaded_files)
+            duration = (end_time - start_time).total_seconds()
             
             summary = {
                 'total_urls': len(urls),
@@ -207,6 +385,8 @@ class FileDownloader:
                 'start_time': start_time.isoformat(),
                 'end_time': end_time.isoformat(),
                 'duration': str(end_time - start_time),
+                'throughput_bps': round(total_size / duration) if duration > 0 else 0,
+                'throughput_human': f"{self._format_file_size(total_size / duration if duration > 0 else 0)}/s",
                 'results': results
             }
             
@@ -227,6 +407,288 @@ class FileDownloader:
                 'results': []
             }
 
+    def _probe_url(self, url, timeout):
+        """HEAD the URL to learn its size, validators and range support"""
+        try:
+            response = self.session.head(url, timeout=timeout, allow_redirects=True,
+                                         headers={'Accept-Encoding': 'identity'})
+            if response.status_code >= 400:
+                return {}
+            content_length = response.headers.get('content-length')
+            return {
+                'total_size': int(content_length) if content_length and content_length.isdigit() else None,
+                'accepts_ranges': response.headers.get('accept-ranges', '').lower() == 'bytes',
+                'etag': response.headers.get('etag'),
+                'last_modified': response.headers.get('last-modified')
+            }
+        except requests.exceptions.RequestException:
+            # Some servers reject HEAD; the GET request will still tell us what we need
+            return {}
+
+    def _stream_download(self, url, part_path, meta_path, meta, max_bytes, timeout, stats):
+        """Stream a file into part_path, resuming from existing partial data if possible"""
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) and not meta.get('segments') else 0
+        headers = {'Accept-Encoding': 'identity'}
+        if offset:
+            headers['Range'] = f'bytes={offset}-'
+            validator = meta.get('etag') or meta.get('last_modified')
+            if validator:
+                headers['If-Range'] = validator
+        
+        with self.session.get(url, stream=True, timeout=timeout, headers=headers) as response:
+            if offset and response.status_code == 416:
+                # Partial file already holds the whole resource
+                return offset, response.headers, self._hash_file(part_path).hexdigest()
+            response.raise_for_status()
+            
+            if offset and response.status_code != 206:
+                # Server ignored the range (or the file changed) - start over
+                offset = 0
+            
+            meta.update({
+                'url': url,
+                'etag': response.headers.get('etag'),
+                'last_modified': response.headers.get('last-modified'),
+                'segments': None
+            })
+            content_length = response.headers.get('content-length')
+            if content_length and content_length.isdigit():
+                meta['total_size'] = offset + int(content_length)
+                stats.total = meta['total_size']
+                if meta['total_size'] > max_bytes:
+                    raise _DownloadTooLarge()
+            self._save_partial_meta(meta_path, meta)
+            
+            # Hash while streaming; resumed data already on disk is hashed first
+            digest = self._hash_file(part_path) if offset else hashlib.sha256()
+            downloaded = offset
+            stats.add(offset, count_towards_rate=False)
+            with open(part_path, 'ab' if offset else 'wb') as f:
+                for chunk in self._iter_adaptive_chunks(response):
+                    if self.should_stop:
+                        raise _DownloadCancelled()
+                    f.write(chunk)
+                    digest.update(chunk)
+                    downloaded += len(chunk)
+                    stats.add(len(chunk))
+                    
+                    # Check size limit during download
+                    if downloaded > max_bytes:
+                        raise _DownloadTooLarge()
+            
+            return offset, response.headers, digest.hexdigest()
+
+    def _segmented_download(self, url, part_path, meta_path, meta, info, segments, timeout, stats):
+        """Fetch a large file as parallel byte ranges written into a preallocated partial file"""
+        total_size = info['total_size']
+        validator = info.get('etag') or info.get('last_modified')
+        
+        ranges = meta.get('segments')
+        if not ranges or meta.get('total_size') != total_size or not os.path.exists(part_path):
+            segment_size = -(-total_size // segments)
+            ranges = [[start, min(start + segment_size, total_size) - 1, 0]
+                      for start in range(0, total_size, segment_size)]
+            with open(part_path, 'wb') as f:
+                f.truncate(total_size)
+        
+        meta.update({
+            'url': url,
+            'total_size': total_size,
+            'etag': info.get('etag'),
+            'last_modified': info.get('last_modified'),
+            'segments': ranges
+        })
+        self._save_partial_meta(meta_path, meta)
+        
+        resumed_from = sum(done for _, _, done in ranges)
+        stats.add(resumed_from, count_towards_rate=False)
+        response_headers = requests.structures.CaseInsensitiveDict()
+        progress_lock = threading.Lock()
+        saved_at = time.monotonic()
+        
+        def save_progress(force=False):
+            """Persist per-segment progress, at most every PROGRESS_SAVE_INTERVAL seconds"""
+            nonlocal saved_at
+            with progress_lock:
+                if force or time.monotonic() - saved_at >= self.PROGRESS_SAVE_INTERVAL:
+                    self._save_partial_meta(meta_path, meta)
+                    saved_at = time.monotonic()
+        
+        def fetch_segment(segment):
+            start, end, done = segment
+            if start + done > end:
+                return
+            headers = {'Range': f'bytes={start + done}-{end}', 'Accept-Encoding': 'identity'}
+            if validator:
+                headers['If-Range'] = validator
+            with self.session.get(url, stream=True, timeout=timeout, headers=headers) as response:
+                response.raise_for_status()
+                if response.status_code != 206:
+                    raise _RangeNotSatisfied()
+                response_headers.update(response.headers)
+                # Unbuffered, so bytes counted in the saved progress are already in the file
+                with open(part_path, 'r+b', buffering=0) as f:
+                    f.seek(start + segment[2])
+                    for chunk in self._iter_adaptive_chunks(response):
+                        if self.should_stop:
+                            raise _DownloadCancelled()
+                        chunk = memoryview(chunk)[:end + 1 - start - segment[2]]
+                        while chunk:
+                            written = f.write(chunk)
+                            chunk = chunk[written:]
+                            segment[2] += written
+                            stats.add(written)
+                        save_progress()
+        
+        try:
+            with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+                futures = [executor.submit(fetch_segment, segment) for segment in ranges]
+                for future in as_completed(futures):
+                    future.result()
+        finally:
+            # Persist per-segment progress so an interrupted download resumes each range;
+            # it is also saved while running, for a process that is killed
+            save_progress(force=True)
+        
+        return resumed_from, response_headers
+
+    def _iter_adaptive_chunks(self, response):
+        """
+        Read the response body, growing the chunk size while reads stay fast
+        
+        Raises:
+            requests.exceptions.ConnectionError: when the connection fails mid-body (reads
+                from response.raw raise urllib3's errors, which requests does not wrap)
+        """
+        chunk_size = self.MIN_CHUNK_SIZE
+        while True:
+            started = time.monotonic()
+            try:
+                chunk = response.raw.read(chunk_size, decode_content=True)
+            except urllib3.exceptions.HTTPError as e:
+                raise requests.exceptions.ConnectionError(e, request=response.request) from e
+            if not chunk:
+                break
+            yield chunk
+            elapsed = time.monotonic() - started
+            if elapsed < 0.05 and chunk_size < self.MAX_CHUNK_SIZE:
+                chunk_size *= 2
+            elif elapsed > 0.5 and chunk_size > self.MIN_CHUNK_SIZE:
+                chunk_size //= 2
+
+    def _success_result(self, url, file_path, headers, stats, **extra):
+        """Build and remember a successful download result"""
+        file_size = os.path.getsize(file_path)
+        result = {
+            'url': url,
+            'status': 'success',
+            'filename': os.path.basename(file_path),
+            'file_path': file_path,
+            'file_size': file_size,
+            'file_size_human': self._format_file_size(file_size),
+            'content_type': headers.get('content-type') or 'unknown',
+            'download_time': datetime.now().isoformat(),
+            'server': headers.get('server') or 'unknown',
+            'duration_seconds': round(stats.elapsed(), 3),
+            'throughput_bps': stats.throughput(),
+            'throughput_human': f"{self._format_file_size(stats.throughput())}/s",
+            **extra
+        }
+        
+        with self.lock:
+            self.downloaded_files.append(result)
+        
+        return result
+
+    def _get_store(self, download_path):
+        """Content store shared by all downloads into download_path"""
+        with self.lock:
+            store = self.stores.get(download_path)
+            if store is None:
+                store = ContentStore(os.path.join(download_path, self.STORE_DIR))
+                self.stores[download_path] = store
+            return store
+
+    def _is_unchanged(self, cached, info):
+        """Whether probe info shows the stored copy of a URL is still current"""
+        if info.get('etag') and cached.get('etag'):
+            return info['etag'] == cached['etag']
+        if info.get('last_modified') and cached.get('last_modified'):
+            return (info['last_modified'] == cached['last_modified'] and
+                    info.get('total_size') in (None, cached.get('size')))
+        return False
+
+    def _hash_file(self, file_path, digest=None):
+        """Feed a file's contents into a SHA-256 digest"""
+        digest = digest or hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest
+
+    def _partial_paths(self, url, download_path):
+        """Stable partial file and metadata paths for a URL"""
+        partial_dir = os.path.join(download_path, self.PARTIAL_DIR)
+        os.makedirs(partial_dir, exist_ok=True)
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(partial_dir, f"{key}.part"), os.path.join(partial_dir, f"{key}.json")
+
+    def _load_partial_meta(self, meta_path, url):
+        """Load resume metadata for a URL, ignoring stale or foreign entries"""
+        try:
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            if meta.get('url') == url:
+                return meta
+        except (OSError, ValueError):
+            pass
+        return {'url': url}
+
+    def _save_partial_meta(self, meta_path, meta):
+        """Persist resume metadata next to the partial file, atomically"""
+        fd, temp_path = tempfile.mkstemp(prefix='.meta_', dir=os.path.dirname(meta_path))
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(meta, f)
+            os.replace(temp_path, meta_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def _discard_partial(self, part_path, meta_path):
+        """Remove partial download state"""
+        for path in (part_path, meta_path):
+            if path and os.path.exists(path):
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+
+    def _unique_path(self, file_path):
+        """Return file_path or a variant with a numeric suffix that does not exist yet"""
+        counter = 1
+        original_path = file_path
+        while os.path.exists(file_path):
+            name, ext = os.path.splitext(original_path)
+            file_path = f"{name}_{counter}{ext}"
+            counter += 1
+        return file_path
+
+    def _record_failure(self, url, error, **extra):
+        """Build and remember a failed download result"""
+        result = {
+            'url': url,
+            'status': 'failed',
+            'error': error,
+            'timestamp': datetime.now().isoformat(),
+            **extra
+        }
+        
+        with self.lock:
+            self.failed_downloads.append(result)
+        
+        return result
+
     def _format_file_size(self, size_bytes):
         """Format file size in human readable format"""
         for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
@@ -349,18 +811,11 @@ class FileDownloader:
                             self.is_allowed(full_url)):
                             files.add(full_url)
             
-            # Fuzzing patterns for common file locations
+            # Fuzzing patterns for common file locations (probed once per directory)
             if fuzzing_patterns:
-                for pattern in fuzzing_patterns:
-                    fuzzed_url = urljoin(url, pattern)
-                    if self.is_valid_file_extension(fuzzed_url, allowed_extensions):
-                        # Test if file exists
-                        try:
-                            head_response = self.session.head(fuzzed_url, timeout=5)
-                            if head_response.status_code == 200:
-                                files.add(fuzzed_url)
-                        except:
-                            continue
+                for probe_result in self.prober.probe(url, fuzzing_patterns, allowed_extensions,
+                                                      self.is_valid_file_extension):
+                    files.add(probe_result['url'])
             
             return list(files)
             
@@ -390,8 +845,10 @@ class FileDownloader:
         try:
             # Reset state
             self.discovered_files = []
+            self.discovered_index = {}
             self.visited_urls = set()
             self.should_stop = False
+            self.prober = PatternProber(self.session, threads=threads)
             
             # Validate input URL
             if not start_url.startswith(('http://', 'https://')):
@@ -403,21 +860,24 @@ class FileDownloader:
             max_pages = min(200, max_depth * 50)  # Scale with depth
             links_per_page = min(20, max_depth * 4)  # More links for deeper crawls
             
-            # Initialize with starting URL
-            urls_queue = [(start_url, 0)]
+            # Initialize the frontier with the starting URL; queued tracks normalized
+            # URLs already waiting so each page is enqueued at most once
+            urls_queue = deque([(start_url, 0)])
+            queued = {normalize_url(start_url)}
             processed_count = 0
             files_found = 0
             
             while (urls_queue and not self.should_stop and 
                    processed_count < max_pages and files_found < max_files):
                 
-                current_url, current_depth = urls_queue.pop(0)
+                current_url, current_depth = urls_queue.popleft()
+                current_key = normalize_url(current_url)
                 
                 # Skip if already visited
-                if current_url in self.visited_urls:
+                if current_key in self.visited_urls:
                     continue
                     
-                self.visited_urls.add(current_url)
+                self.visited_urls.add(current_key)
                 processed_count += 1
                 
                 try:
@@ -432,13 +892,9 @@ class FileDownloader:
                     
                     # Add discovered files
                     for file_info in page_files:
-                        if file_info['url'] not in [f['url'] for f in self.discovered_files]:
-                            file_info.update({
-                                'discovered_from': current_url,
-                                'depth': current_depth,
-                                'discovery_time': datetime.now().isoformat()
-                            })
-                            self.discovered_files.append(file_info)
+                        if files_found >= max_files:
+                            break
+                        if self._register_discovered_file(file_info, current_url, current_depth):
                             files_found += 1
                             
                             print(f"✓ Discovered file [{files_found}]: {file_info['filename']} ({file_info['extension']})")
@@ -457,9 +913,11 @@ class FileDownloader:
                         new_links = self._extract_page_links_improved(current_url, current_depth)
                         added_links = 0
                         for link in new_links:
-                            if (link not in self.visited_urls and 
-                                added_links < links_per_page and
-                                len(urls_queue) < max_pages * 2):  # Queue size limit
+                            if added_links >= links_per_page or len(urls_queue) >= max_pages * 2:  # Queue size limit
+                                break
+                            link_key = normalize_url(link)
+                            if link_key not in self.visited_urls and link_key not in queued:
+                                queued.add(link_key)
                                 urls_queue.append((link, current_depth + 1))
                                 added_links += 1
                         
@@ -518,6 +976,27 @@ class FileDownloader:
                 'error': str(e)
             }
 
+    def _register_discovered_file(self, file_info, discovered_from, depth):
+        """
+        Record a discovered file unless an equivalent URL was already seen
+        
+        Returns:
+            True if the file is new
+        """
+        key = normalize_url(file_info['url'])
+        if key in self.discovered_index:
+            return False
+        
+        file_info.update({
+            'normalized_url': key,
+            'discovered_from': discovered_from,
+            'depth': depth,
+            'discovery_time': datetime.now().isoformat()
+        })
+        self.discovered_index[key] = file_info
+        self.discovered_files.append(file_info)
+        return True
+
     def _analyze_page_for_files(self, url, depth, allowed_extensions=None, fuzzing_patterns=None):
         """Analyze a page for downloadable files - Enhanced version"""
         try:
@@ -603,7 +1082,7 @@ class FileDownloader:
                         if (parsed.netloc == base_domain and 
                             parsed.scheme in ['http', 'https'] and
                             self._is_crawlable_page(full_url) and
-                            full_url not in self.visited_urls):
+                            normalize_url(full_url) not in self.visited_urls):
                             
                             links.add(full_url)
                             
@@ -665,7 +1144,7 @@ class FileDownloader:
                                   ['.pdf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx', 
                                    '.zip', '.rar', '.tar', '.gz', '.jpg', '.jpeg', '.png', 
                                    '.gif', '.mp3', '.mp4', '.avi', '.mov']) and
-                            full_url not in self.visited_urls):
+                            normalize_url(full_url) not in self.visited_urls):
                             
                             links.add(full_url)
                             
@@ -732,7 +1211,7 @@ class FileDownloader:
             print(f"Downloading {len(file_urls)} discovered files...")
             
             download_results = self.download_files(
-                file_urls, download_path, max_size_mb, threads
+                file_urls, download_path, max_size_mb, threads, progress_callback
             )
             
             # Combine results
@@ -805,4 +1284,5 @@ class FileDownloader:
 
     def stop(self):
         """Stop the crawler"""
-        self.should_stop = True
\ No newline at end of file
+        self.should_stop = True
+        self.prober.stop()
\ No newline at end of file
@@ -0,0 +1,155 @@
+import threading
+from collections import deque
+from datetime import datetime
+
+
+class OperationEventLog:
+    """
+    Sequence-numbered progress events per MetaSpidey operation
+
+    Every published event gets a ``seq`` (1, 2, 3, ... per operation) and is
+    pushed to the operation's Socket.IO room. Clients that missed events, or
+    that poll over HTTP, ask for everything after the last ``seq`` they saw,
+    so each update only transfers the delta.
+
+    Only the last max_events events of an operation are kept. A client
+    asking for events older than that first gets a ``resync`` event
+    carrying the operation's current state (from snapshot) instead of the
+    events it missed.
+    """
+
+    EVENT_NAME = 'metaspidey_events'
+
+    def __init__(self, socketio=None, max_operations=100, max_events=1000, snapshot=None):
+        """
+        Args:
+            socketio: flask_socketio.SocketIO to push events with (None to only record them)
+            max_operations: Operations whose logs are kept
+            max_events: Events kept per operation
+            snapshot: Function returning an operation's current state for resync events
+        """
+        self.socketio = socketio
+        self.max_operations = max_operations
+        self.max_events = max_events
+        self.snapshot = snapshot
+        self.logs = {}  # operation_id -> deque of the most recent events
+        self.seqs = {}  # operation_id -> last seq assigned
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def room(operation_id):
+        """Socket.IO room that receives an operation's events"""
+        return f'metaspidey_{operation_id}'
+
+    def open(self, operation_id):
+        """Start an empty log for an operation, dropping the oldest logs if needed"""
+        with self.lock:
+            self.logs[operation_id] = deque(maxlen=self.max_events)
+            self.seqs[operation_id] = 0
+            while len(self.logs) > self.max_operations:
+                dropped = next(iter(self.logs))
+                self.logs.pop(dropped)
+                self.seqs.pop(dropped, None)
+
+    def publish(self, operation_id, event):
+        """
+        Append an event to an operation's log and push it to subscribers
+
+        Args:
+            operation_id: Operation the event belongs to
+            event: Dictionary describing the event
+
+        Returns:
+            Sequence number assigned to the event
+        """
+        with self.lock:
+            log = self.logs.setdefault(operation_id, deque(maxlen=self.max_events))
+            seq = self.seqs[operation_id] = self.seqs.get(operation_id, 0) + 1
+            event = {'seq': seq, 'timestamp': datetime.now().isoformat(), **event}
+            log.append(event)
+
+        self.emit(operation_id, [event])
+        return event['seq']
+
+    def emit(self, operation_id, events, to=None):
+        """Push events to the operation's room, or to a single client sid"""
+        if self.socketio is None or self.socketio.server is None:
+            return
+        try:
+            self.socketio.emit(self.EVENT_NAME, {'operation_id': operation_id, 'events': events},
+                               to=to or self.room(operation_id))
+        except Exception as e:
+            print(f"Error emitting MetaSpidey events for {operation_id}: {e}")
+
+    def since(self, operation_id, seq=0):
+        """
+        Events with a sequence number greater than seq, or None for unknown operations
+
+        When some of those events are no longer kept, the list starts with a
+        resync event numbered just before the oldest kept event.
+        """
+        with self.lock:
+            log = self.logs.get(operation_id)
+            if log is None:
+                return None
+            first_seq = self.seqs[operation_id] - len(log) + 1
+            events = list(log)[max(0, seq - first_seq + 1):]
+        if seq < first_seq - 1:
+            events.insert(0, self._resync_event(operation_id, first_seq - 1, first_seq - 1 - max(0, seq)))
+        return events
+
+    def _resync_event(self, operation_id, seq, missed):
+        event = {'seq': seq, 'timestamp': datetime.now().isoformat(), 'type': 'resync', 'missed': missed}
+        if self.snapshot is not None:
+            try:
+                event['operation'] = self.snapshot(operation_id)
+            except Exception as e:
+                print(f"Error taking a snapshot of MetaSpidey operation {operation_id}: {e}")
+        return event
+
+    def last_seq(self, operation_id):
+        with self.lock:
+            return self.seqs.get(operation_id, 0)
+
+    def __contains__(self, operation_id):
+        return operation_id in self.logs
+
+
+def register_metaspidey_handlers(socketio, event_log):
+    """Socket.IO handlers for subscribing to MetaSpidey operation events"""
+
+    @socketio.on('metaspidey_subscribe')
+    def metaspidey_subscribe(data):
+        """Join an operation's room and replay the events after ``since``"""
+        from flask import request
+        from flask_login import current_user
+        from flask_socketio import join_room
+
+        if not current_user.is_authenticated:
+            return
+
+        operation_id = (data or {}).get('operation_id')
+        if not operation_id:
+            return
+
+        # Join before replaying so nothing published in between is lost;
+        # clients ignore events whose seq they have already seen
+        join_room(event_log.room(operation_id))
+
+        try:
+            since = int(data.get('since', 0))
+        except (TypeError, ValueError):
+            since = 0
+
+        events = event_log.since(operation_id, since)
+        if events:
+            event_log.emit(operation_id, events, to=request.sid)
+
+    @socketio.on('metaspidey_unsubscribe')
+    def metaspidey_unsubscribe(data):
+        """Leave an operation's room"""
+        from flask_socketio import leave_room
+
+        operation_id = (data or {}).get('operation_id')
+        if operation_id:
+            leave_room(event_log.room(operation_id))
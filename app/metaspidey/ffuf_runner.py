@@ -1,15 +1,23 @@
+import base64
+import binascii
 import subprocess
 import threading
 import json
 import os
-import time
+import signal
+from collections import deque
 from urllib.parse import urlparse
+from app.metaspidey.fuzzer import NativeFuzzer
+from app.metaspidey.wordlists import WordlistCatalog
 
 class FFUFRunner:
     """FFUF (Fuzz Faster U Fool) runner for web directory/file discovery"""
     
+    STDERR_TAIL_LINES = 200
+    
     def __init__(self):
         self.process = None
+        self.native_fuzzer = None
         self.should_stop = False
         self.results = []
         self.lock = threading.Lock()
@@ -33,42 +41,57 @@ class FFUFRunner:
             Dictionary with results
         """
         try:
-            # Check if ffuf is available
+            # Fall back to the built-in fuzzer if ffuf is not installed
             if not self.check_ffuf_available():
-                return self.simulate_ffuf(options, progress_callback)
+                return self.run_native(options, progress_callback)
             
             # Build FFUF command
             cmd = self.build_ffuf_command(options)
+            self.results = []
             
-            # Create temporary output file
-            temp_output = f"/tmp/ffuf_output_{int(time.time())}.json"
-            cmd.extend(["-o", temp_output, "-of", "json"])
-            
-            # Run FFUF process
+            # Run FFUF process; results are streamed as JSON lines on stdout
             self.process = subprocess.Popen(
                 cmd,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
+                stdin=subprocess.DEVNULL,
                 text=True,
                 bufsize=1,
-                universal_newlines=True
+                start_new_session=True  # Own process group so stop() can signal all of it
             )
             
-            # Wait for completion or stop signal
-            stdout, stderr = self.process.communicate()
+            # Drain stderr in the background so a chatty ffuf cannot block on a full pipe
+            stderr_tail = deque(maxlen=self.STDERR_TAIL_LINES)
+            stderr_thread = threading.Thread(target=stderr_tail.extend, args=(self.process.stderr,), daemon=True)
+            stderr_thread.start()
+            
+            for line in self.process.stdout:
+                result = self.parse_ffuf_line(line)
+                if result is None:
+                    continue
+                
+                with self.lock:
+                    self.results.append(result)
+                
+                if progress_callback:
+                    progress_callback(result)
             
-            # Parse results
-            results = self.parse_ffuf_output(temp_output)
+            returncode = self.process.wait()
+            stderr_thread.join(timeout=5)
+            stderr = ''.join(stderr_tail)
             
-            # Cleanup
-            if os.path.exists(temp_output):
-                os.unlink(temp_output)
+            if returncode != 0 and not self.should_stop and not self.results:
+                return {
+                    'success': False,
+                    'error': f"FFUF exited with code {returncode}: {stderr.strip()}",
+                    'results': []
+                }
             
             return {
                 'success': True,
-                'results': results,
-                'total_found': len(results),
-                'stdout': stdout,
+                'results': self.results,
+                'total_found': len(self.results),
+                'stopped': self.should_stop,
                 'stderr': stderr
             }
             
@@ -76,7 +99,7 @@ class FFUFRunner:
             return {
                 'success': False,
                 'error': str(e),
-                'results': []
+                'results': self.results
             }
     
     def build_ffuf_command(self, options):
@@ -103,40 +126,44 @@ class FFUFRunner:
         if options.get('timeout'):
             cmd.extend(["-timeout", str(options['timeout'])])
         
-        # Additional options for better results
-        cmd.extend(["-c"])  # Colorize output
-        cmd.extend(["-v"])  # Verbose output
+        # Newline-delimited JSON records on stdout, one per result
+        cmd.extend(["-json"])
+        cmd.extend(["-noninteractive"])
         
         return cmd
     
-    def parse_ffuf_output(self, output_file):
-        """Parse FFUF JSON output"""
+    def parse_ffuf_line(self, line):
+        """Parse one JSON-lines record from ffuf stdout; returns None for other output"""
+        line = line.strip()
+        if not line.startswith('{'):
+            return None
+        
         try:
-            if not os.path.exists(output_file):
-                return []
-            
-            with open(output_file, 'r') as f:
-                data = json.load(f)
-            
-            results = []
-            if 'results' in data:
-                for result in data['results']:
-                    results.append({
-                        'url': result.get('url', ''),
-                        'status': result.get('status', 0),
-                        'length': result.get('length', 0),
-                        'words': result.get('words', 0),
-                        'lines': result.get('lines', 0),
-                        'content_type': result.get('content-type', ''),
-                        'redirectlocation': result.get('redirectlocation', ''),
-                        'input': result.get('input', {})
-                    })
-            
-            return results
-            
-        except Exception as e:
-            print(f"Error parsing FFUF output: {e}")
-            return []
+            result = json.loads(line)
+        except json.JSONDecodeError:
+            print(f"Error parsing FFUF output line: {line[:200]}")
+            return None
+        
+        if 'url' not in result:
+            return None
+        
+        return {
+            'url': result.get('url', ''),
+            'status': result.get('status', 0),
+            'length': result.get('length', 0),
+            'words': result.get('words', 0),
+            'lines': result.get('lines', 0),
+            'content_type': result.get('content-type', ''),
+            'redirectlocation': result.get('redirectlocation', ''),
+            'input': {key: self._decode_input(value) for key, value in result.get('input', {}).items()}
+        }
+    
+    def _decode_input(self, value):
+        """ffuf -json encodes input values as base64; plain strings are passed through"""
+        try:
+            return base64.b64decode(value, validate=True).decode('utf-8')
+        except (binascii.Error, ValueError, TypeError):
+            return value
     
     def check_ffuf_available(self):
         """Check if FFUF is available in the system"""
@@ -146,101 +173,33 @@ class FFUFRunner:
         except (subprocess.CalledProcessError, FileNotFoundError):
             return False
     
-    def simulate_ffuf(self, options, progress_callback=None):
-        """Simulate FFUF results when the tool is not available"""
-        # This is a fallback simulation for demonstration
-        import random
-        
-        try:
-            # Read some words from the wordlist for simulation
-            with open(options['wordlist'], 'r') as f:
-                words = [line.strip() for line in f.readlines()[:100]]  # First 100 words
-            
-            results = []
-            base_url = options['fuzz_template'].replace('FUZZ', '')
-            total_words = len(words)
-            
-            print(f"Starting fuzzing simulation with {total_words} words")
-            
-            # Simulate findings with various status codes
-            for i, word in enumerate(words):
-                if self.should_stop:
-                    break
-                
-                url = options['fuzz_template'].replace('FUZZ', word)
-                
-                # Simulate different status codes with realistic probabilities
-                rand = random.random()
-                if rand < 0.05:  # 5% chance of 200
-                    status = 200
-                elif rand < 0.08:  # 3% chance of 301/302
-                    status = random.choice([301, 302])
-                elif rand < 0.12:  # 4% chance of 403
-                    status = 403
-                elif rand < 0.15:  # 3% chance of 401
-                    status = 401
-                else:
-                    status = 404  # Most will be 404
-                
-                # Only include results that match the status code filter
-                if status in options.get('status_codes', [200, 301, 302, 403]):
-                    result = {
-                        'url': url,
-                        'status': status,
-                        'length': random.randint(100, 5000),
-                        'words': random.randint(10, 500),
-                        'lines': random.randint(5, 100),
-                        'content_type': 'text/html',
-                        'redirectlocation': '',
-                        'input': {'FUZZ': word}
-                    }
-                    results.append(result)
-                    
-                    # Call progress callback for real-time updates
-                    if progress_callback:
-                        progress_callback(result)
-                    
-                    print(f"Found: [{status}] {url}")
-                
-                # Update progress
-                progress = (i + 1) / total_words * 100
-                if i % 10 == 0:  # Update every 10 items
-                    print(f"Progress: {progress:.1f}% ({i+1}/{total_words})")
-                
-                # Small delay to simulate real fuzzing
-                time.sleep(0.05)
-            
-            print(f"Fuzzing simulation completed. Found {len(results)} results")
-            
-            return {
-                'success': True,
-                'results': results,
-                'total_found': len(results),
-                'total_tested': len(words),
-                'simulated': True,
-                'note': 'FFUF not available - showing simulated results'
-            }
-            
-        except Exception as e:
-            return {
-                'success': False,
-                'error': f"Simulation failed: {str(e)}",
-                'results': []
-            }
+    def run_native(self, options, progress_callback=None):
+        """Run the built-in Python fuzzer with the same options as run_ffuf"""
+        self.native_fuzzer = NativeFuzzer()
+        if self.should_stop:
+            self.native_fuzzer.stop()
+        results = self.native_fuzzer.run(options, progress_callback)
+        results['note'] = 'FFUF not available - results from the built-in fuzzer'
+        return results
     
     def stop(self):
         """Stop the FFUF process"""
         self.should_stop = True
         
+        if self.native_fuzzer:
+            self.native_fuzzer.stop()
+        
         if self.process and self.process.poll() is None:
             try:
-                self.process.terminate()
+                os.killpg(self.process.pid, signal.SIGTERM)
                 # Give it a moment to terminate gracefully
-                time.sleep(1)
-                
-                if self.process.poll() is None:
-                    self.process.kill()
+                try:
+                    self.process.wait(timeout=3)
+                except subprocess.TimeoutExpired:
+                    os.killpg(self.process.pid, signal.SIGKILL)
                     
+            except ProcessLookupError:
+                pass  # Already exited
             except Exception as e:
                 print(f"Error stopping FFUF process: {e}")
 
@@ -315,6 +274,11 @@ class WordlistDownloader:
             # Clean up zip file
             os.unlink(output_file)
             
+            # Index the extracted lists so later lookups do not walk the tree
+            if self.progress_callback:
+                self.progress_callback("Indexing wordlists...")
+            WordlistCatalog(extract_path).refresh(self.progress_callback)
+            
             # Find common wordlists
             wordlists = self.find_common_wordlists(extract_path)
             
@@ -332,8 +296,9 @@ class WordlistDownloader:
             }
     
     def find_common_wordlists(self, base_path):
-        """Find common wordlists in the downloaded collection"""
+        """Find common wordlists in the downloaded collection, using the wordlist catalog"""
         common_lists = []
+        catalog = WordlistCatalog(base_path)
         
         # Common wordlist paths in SecLists
         common_paths = [
@@ -347,13 +312,15 @@ class WordlistDownloader:
         ]
         
         for path in common_paths:
-            full_path = os.path.join(base_path, path)
-            if os.path.exists(full_path):
+            entry = catalog.find(os.path.join(base_path, path))
+            if entry:
                 common_lists.append({
-                    'name': os.path.basename(path),
-                    'path': full_path,
+                    'name': entry['name'],
+                    'path': entry['path'],
                     'category': path.split('/')[1] if '/' in path else 'Other',
-                    'size': os.path.getsize(full_path)
+                    'size': entry['size'],
+                    'lines': entry['lines'],
+                    'sha256': entry['sha256']
                 })
         
         return common_lists
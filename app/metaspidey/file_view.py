@@ -0,0 +1,75 @@
+import mmap
+import os
+
+
+class FileView:
+    """
+    Read-only view of a file shared by all stages of one analysis
+
+    The file is opened once and memory-mapped, so headers, footers and
+    samples are sliced from the same mapping and hashing streams over it
+    without copying. Files that cannot be mapped (empty files, pipes,
+    some virtual filesystems) are read into memory once instead.
+
+    Usage:
+        with FileView(path) as view:
+            header = view.head(32)
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = None
+        try:
+            self.stat = os.fstat(self._file.fileno())
+            if self.stat.st_size > 0:
+                try:
+                    self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+                    self._data = self._mmap
+                except (ValueError, OSError):
+                    self._data = self._file.read()
+            else:
+                self._data = self._file.read()
+        except BaseException:
+            self.close()
+            raise
+        self.size = len(self._data)
+
+    def head(self, length):
+        """First length bytes"""
+        return self._data[:length]
+
+    def tail(self, length):
+        """Last length bytes"""
+        return self._data[max(0, self.size - length):]
+
+    def read(self, offset, length):
+        """length bytes starting at offset"""
+        return self._data[offset:offset + length]
+
+    def iter_chunks(self, chunk_size=None):
+        """Yield zero-copy memoryview chunks covering the whole file"""
+        chunk_size = chunk_size or self.CHUNK_SIZE
+        view = memoryview(self._data)
+        try:
+            for offset in range(0, self.size, chunk_size):
+                yield view[offset:offset + chunk_size]
+        finally:
+            view.release()
+
+    def close(self):
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass  # A chunk is still referenced; the mapping is freed with it
+            self._mmap = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
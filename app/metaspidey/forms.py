@@ -1,3 +1,4 @@
+import os
 from flask_wtf import FlaskForm
 from wtforms import StringField, SelectField, IntegerField, TextAreaField, BooleanField, FileField, SelectMultipleField, ValidationError
 from wtforms.validators import DataRequired, URL, NumberRange, Optional
@@ -40,6 +41,10 @@ class BruteForceForm(FlaskForm):
     wordlist_path = StringField('Wordlist Path', validators=[Optional()],
                                render_kw={"placeholder": "Or enter path to wordlist file"})
     
+    # Choices are filled from the wordlist catalog; several selections are merged and deduplicated
+    catalog_wordlists = SelectMultipleField('Catalog Wordlists', choices=[], validators=[Optional()],
+                                           validate_choice=False)
+    
     threads = IntegerField('Threads', validators=[NumberRange(min=1, max=200)], default=40,
                           render_kw={"min": "1", "max": "200"})
     
@@ -82,6 +87,14 @@ class MetadataForm(FlaskForm):
     
     deep_analysis = BooleanField('Deep File Analysis', default=False)
     
+    workers = IntegerField('Worker Processes', validators=[NumberRange(min=1, max=32)],
+                          default=min(os.cpu_count() or 1, 8), render_kw={"min": "1", "max": "32"})
+    
+    file_timeout = IntegerField('Per-file Timeout (seconds)', validators=[NumberRange(min=1, max=600)], default=60,
+                               render_kw={"min": "1", "max": "600"})
+    
+    use_cache = BooleanField('Reuse Cached Results for Unchanged Files', default=True)
+    
     # File type filters
     analyze_images = BooleanField('Analyze Images', default=True)
     
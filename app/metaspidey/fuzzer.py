@@ -0,0 +1,201 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urljoin, urlparse
+
+import requests
+import urllib3
+
+from app.metaspidey.wordlists import iter_wordlist
+
+
+class NativeFuzzer:
+    """
+    Built-in content discovery fuzzer used when ffuf is not installed
+
+    Accepts the same options as FFUFRunner.run_ffuf and produces results in
+    the same format. The wordlist is streamed lazily and only a bounded
+    number of requests is in flight at any time, so memory use does not
+    depend on the wordlist size.
+    """
+
+    MAX_BODY_SIZE = 5 * 1024 * 1024  # bytes read per response for size/word/line counts
+
+    def __init__(self):
+        self.session = requests.Session()
+        self.session.headers.update({
+            'User-Agent': 'MetaSpidey/1.0 (Security Research Tool)'
+        })
+        self.should_stop = False
+        self.results = []
+        self.total_tested = 0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def run(self, options, progress_callback=None):
+        """
+        Fuzz the target described by options
+
+        Args:
+            options: Dictionary containing:
+                - fuzz_template: URL template with FUZZ keyword
+                - wordlist: Path to wordlist file
+                - threads: Number of concurrent requests
+                - status_codes: List of status codes to match
+                - filter_status/filter_sizes/filter_words/filter_lines: Values to drop
+                - recursion: Enable recursion into discovered directories
+                - recursion_depth: Recursion depth
+                - timeout: Request timeout
+            progress_callback: Function called with each result as it is found
+
+        Returns:
+            Dictionary with results
+        """
+        try:
+            template = options['fuzz_template']
+            if 'FUZZ' not in template:
+                return {'success': False, 'error': 'Fuzz template must contain the FUZZ keyword', 'results': []}
+
+            threads = max(1, int(options.get('threads') or 40))
+            adapter = requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=threads)
+            self.session.mount('http://', adapter)
+            self.session.mount('https://', adapter)
+
+            self.results = []
+            self.total_tested = 0
+            self.errors = 0
+            # Like ffuf, recursion only applies when FUZZ is the last path component
+            recursive = options.get('recursion') and template.endswith('FUZZ')
+            max_depth = int(options.get('recursion_depth') or 1) if recursive else 0
+            jobs = deque([(template, 0)])
+            scanned_templates = set()
+
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                while jobs and not self.should_stop:
+                    job_template, depth = jobs.popleft()
+                    if job_template in scanned_templates:
+                        continue
+                    scanned_templates.add(job_template)
+                    print(f"Native fuzzer: scanning {job_template} (depth {depth})")
+
+                    in_flight = set()
+                    for word in iter_wordlist(options['wordlist']):
+                        if self.should_stop:
+                            break
+                        in_flight.add(executor.submit(self._request, job_template, word, options))
+
+                        # Keep a bounded window of pending requests
+                        if len(in_flight) >= threads * 2:
+                            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                            self._collect(done, depth, max_depth, jobs, progress_callback)
+
+                    self._collect(in_flight, depth, max_depth, jobs, progress_callback)
+
+            print(f"Native fuzzer completed. Found {len(self.results)} results in {self.total_tested} requests")
+
+            return {
+                'success': True,
+                'results': self.results,
+                'total_found': len(self.results),
+                'total_tested': self.total_tested,
+                'errors': self.errors,
+                'engine': 'native',
+                'stopped': self.should_stop
+            }
+
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f"Native fuzzer failed: {str(e)}",
+                'results': self.results
+            }
+
+    def _collect(self, futures, depth, max_depth, jobs, progress_callback):
+        """Handle finished requests: record hits and queue recursion jobs"""
+        for future in futures:
+            with self.lock:
+                self.total_tested += 1
+            try:
+                result = future.result()
+            except Exception as e:
+                # One failing candidate must not end the run
+                print(f"Native fuzzer: request failed: {e}")
+                self._count_error()
+                continue
+            if result is None:
+                continue
+
+            result['depth'] = depth
+            self.results.append(result)
+            if progress_callback:
+                progress_callback(result)
+
+            if depth < max_depth:
+                recursion_template = self._recursion_template(result)
+                if recursion_template:
+                    jobs.append((recursion_template, depth + 1))
+
+    def _request(self, template, word, options):
+        """Request one candidate; returns a result dict if it passes the matchers/filters"""
+        if self.should_stop:
+            return None
+
+        url = template.replace('FUZZ', word)
+        try:
+            with self.session.get(url, timeout=options.get('timeout') or 10,
+                                  allow_redirects=False, stream=True) as response:
+                body = response.raw.read(self.MAX_BODY_SIZE, decode_content=True) or b''
+        except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError):
+            # Reading the raw body raises urllib3's errors (read timeouts, truncated bodies) unwrapped
+            self._count_error()
+            return None
+
+        result = {
+            'url': url,
+            'status': response.status_code,
+            'length': len(body),
+            'words': len(body.split()),
+            'lines': body.count(b'\n') + 1 if body else 0,
+            'content_type': response.headers.get('content-type', ''),
+            'redirectlocation': response.headers.get('location', ''),
+            'input': {'FUZZ': word}
+        }
+        return result if self._matches(result, options) else None
+
+    def _count_error(self):
+        with self.lock:
+            self.errors += 1
+
+    def _matches(self, result, options):
+        """Apply ffuf-style matchers (-mc) and filters (-fc/-fs/-fw/-fl)"""
+        status_codes = options.get('status_codes')
+        if status_codes and result['status'] not in status_codes:
+            return False
+        if result['status'] in (options.get('filter_status') or ()):
+            return False
+        if result['length'] in (options.get('filter_sizes') or ()):
+            return False
+        if result['words'] in (options.get('filter_words') or ()):
+            return False
+        if result['lines'] in (options.get('filter_lines') or ()):
+            return False
+        return True
+
+    def _recursion_template(self, result):
+        """Template for fuzzing inside a discovered directory, like ffuf -recursion"""
+        url = result['url']
+        location = result['redirectlocation']
+        if location and urljoin(url, location).rstrip('/') == url.rstrip('/') and location.endswith('/'):
+            directory = urljoin(url, location)
+        elif url.endswith('/'):
+            directory = url
+        else:
+            return None
+
+        if urlparse(directory).query:
+            return None
+        return directory + 'FUZZ'
+
+    def stop(self):
+        """Stop fuzzing; results found so far are kept"""
+        self.should_stop = True
@@ -1,57 +1,76 @@
 import os
 import json
 import mimetypes
+import multiprocessing
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 import hashlib
-import math
 import struct
 import zipfile
 from pathlib import Path
 from collections import Counter
+from app.metaspidey import byte_stats
+from app.metaspidey import patterns as patterns_module
+from app.metaspidey.analysis_cache import AnalysisCache
+from app.metaspidey.file_view import FileView
+from app.metaspidey.optional_imports import REGISTRY as OPTIONAL_MODULES
+from app.metaspidey.threat_scanner import ThreatScanner, load_rules
 
-# Import libraries with graceful fallbacks
-try:
-    from PIL import Image
-    from PIL.ExifTags import TAGS as EXIF_TAGS, GPSTAGS
-    PIL_AVAILABLE = True
-except ImportError:
-    PIL_AVAILABLE = False
+# Optional libraries, imported on first use so app startup and pool workers
+# only pay for the extractors that actually run
+Image = OPTIONAL_MODULES['pil']
+ExifTags = OPTIONAL_MODULES['pil_exif_tags']
+PyPDF2 = OPTIONAL_MODULES['pypdf2']
+docx = OPTIONAL_MODULES['docx']
+openpyxl = OPTIONAL_MODULES['openpyxl']
+mutagen = OPTIONAL_MODULES['mutagen']
+exifread = OPTIONAL_MODULES['exifread']
 
-try:
-    import PyPDF2
-    PYPDF2_AVAILABLE = True
-except ImportError:
-    PYPDF2_AVAILABLE = False
+PIL_AVAILABLE = Image.available
+PYPDF2_AVAILABLE = PyPDF2.available
+DOCX_AVAILABLE = docx.available
+OPENPYXL_AVAILABLE = openpyxl.available
+MUTAGEN_AVAILABLE = mutagen.available
+EXIFREAD_AVAILABLE = exifread.available
 
-try:
-    from docx import Document
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
 
-try:
-    from openpyxl import load_workbook
-    OPENPYXL_AVAILABLE = True
-except ImportError:
-    OPENPYXL_AVAILABLE = False
+class _AnalysisTimeout(BaseException):
+    """
+    Raised by SIGALRM when a file exceeds its time budget
 
-try:
-    from mutagen import File as MutagenFile
-    MUTAGEN_AVAILABLE = True
-except ImportError:
-    MUTAGEN_AVAILABLE = False
+    Derives from BaseException so the extractors' ``except Exception``
+    handlers cannot swallow it and carry on with the same file.
+    """
 
-try:
-    import exifread
-    EXIFREAD_AVAILABLE = True
-except ImportError:
-    EXIFREAD_AVAILABLE = False
+
+def _alarm_available():
+    """Whether SIGALRM can interrupt work on this thread (only the main thread gets signals)"""
+    return hasattr(signal, 'SIGALRM') and threading.current_thread() is threading.main_thread()
 
 
 class MetadataAnalyzer:
     """Advanced Metadata Analyzer for comprehensive file analysis"""
     
-    def __init__(self):
+    MAX_CHUNK_FILES = 16  # Upper bound on files sent to a pool worker per task
+    ANALYSIS_VERSION = '2.3'
+    PATTERN_SCAN_BYTES = 1024 * 1024  # Pattern analysis scope with NumPy
+    PATTERN_SCAN_BYTES_FALLBACK = 64 * 1024  # Pattern analysis scope without NumPy
+    
+    # Result sections that depend only on file content and can be reused from the cache
+    CONTENT_SECTIONS = ('hashes', 'security_analysis', 'deep_analysis')
+    TYPE_SECTIONS = ('image_metadata', 'document_metadata', 'media_metadata', 'archive_metadata')
+    
+    def __init__(self, cache=None, rules_path=None):
+        """
+        Args:
+            cache: Optional AnalysisCache used to skip files that were already analyzed
+            rules_path: Optional YARA-like rule file, or directory of rule files, for the security scan
+        """
+        self.cache = cache
+        self.rules_path = rules_path
         self.file_signatures = {
             b'%PDF': 'application/pdf',
             b'\x89PNG': 'image/png',
@@ -77,44 +96,90 @@ class MetadataAnalyzer:
             b'cmd.exe',
             b'powershell',
         ]
+        
+        # One scanner for the built-in indicators and any user rules
+        rules = load_rules(rules_path)
+        self.threat_scanner = ThreatScanner(self.threat_indicators, rules)
+        self.rules_fingerprint = hashlib.sha256(
+            repr([(rule.name, rule.condition_text, rule.strings) for rule in rules]).encode()
+        ).hexdigest()[:16] if rules else None
 
     def analyze_file(self, filepath, extract_exif=True, calculate_hashes=True, deep_analysis=False):
         """
         Comprehensive file analysis with specialized extractors
+        
+        With a cache configured, an unchanged file (same size, mtime and
+        inode) is answered from the cache without being read, and a file
+        whose content was analyzed before under any name only has its
+        name-dependent sections recomputed.
         """
         try:
             if not os.path.exists(filepath):
                 return {'error': f'File not found: {filepath}'}
             
-            print(f"Starting comprehensive analysis of: {filepath}")
+            options_key = f'exif={int(bool(extract_exif))},hashes={int(bool(calculate_hashes))},deep={int(bool(deep_analysis))}'
+            if self.rules_fingerprint:
+                options_key += f',rules={self.rules_fingerprint}'
+            if self.cache:
+                stat = os.stat(filepath)
+                cached = self.cache.get_by_stat(filepath, stat, options_key, self.ANALYSIS_VERSION)
+                if cached:
+                    cached['cache_hit'] = 'unchanged'
+                    return cached
             
             # Initialize result structure
             result = {
                 'analysis_timestamp': datetime.now().isoformat(),
                 'filename': os.path.basename(filepath),
                 'file_path': filepath,
-                'analysis_version': '2.0'
+                'analysis_version': self.ANALYSIS_VERSION
             }
             
-            # Basic metadata (always performed)
-            result['basic_info'] = self._extract_basic_info(filepath)
-            
-            # File signature analysis
-            result['signature_analysis'] = self._analyze_file_signature(filepath)
-            
-            # Hash calculation
-            if calculate_hashes:
-                result['hashes'] = self._calculate_hashes(filepath)
-            
-            # Security analysis
-            result['security_analysis'] = self._perform_security_analysis(filepath)
+            # Open the file once; the byte-level stages below share this view
+            with FileView(filepath) as view:
+                # Basic metadata (always performed)
+                result['basic_info'] = self._extract_basic_info(view)
+                
+                # File signature analysis
+                result['signature_analysis'] = self._analyze_file_signature(view)
+                
+                # Hash calculation
+                sha256 = None
+                if calculate_hashes:
+                    result['hashes'] = self._calculate_hashes(view)
+                    sha256 = result['hashes'].get('SHA256')
+                elif self.cache:
+                    sha256 = self._sha256(view)
+                
+                # Same content analyzed before (possibly under another name)
+                cached = None
+                if self.cache and sha256:
+                    cached = self.cache.get_by_content(sha256, options_key, self.ANALYSIS_VERSION)
+                
+                if cached:
+                    self._reuse_cached_sections(result, cached)
+                else:
+                    # Security analysis
+                    result['security_analysis'] = self._perform_security_analysis(view)
+                    
+                    # Deep analysis (entropy, file structure, etc.)
+                    if deep_analysis:
+                        result['deep_analysis'] = self._perform_deep_analysis(view)
             
             # Type-specific analysis
             mime_type = result['basic_info'].get('mime_type', '')
             file_ext = result['basic_info'].get('extension', '').lower()
             
+            cached_info = cached.get('basic_info', {}) if cached else {}
+            if cached and cached_info.get('extension', '').lower() == file_ext and \
+                    cached_info.get('mime_type', '') == mime_type:
+                # Type-specific metadata is reused when the file type is the same
+                for section in self.TYPE_SECTIONS:
+                    if section in cached:
+                        result[section] = cached[section]
+            
             # Image analysis
-            if self._is_image_file(mime_type, file_ext):
+            elif self._is_image_file(mime_type, file_ext):
                 result['image_metadata'] = self._extract_image_metadata(filepath, extract_exif)
             
             # Document analysis
@@ -129,14 +194,14 @@ class MetadataAnalyzer:
             elif self._is_archive_file(mime_type, file_ext):
                 result['archive_metadata'] = self._extract_archive_metadata(filepath)
             
-            # Deep analysis (entropy, file structure, etc.)
-            if deep_analysis:
-                result['deep_analysis'] = self._perform_deep_analysis(filepath)
-            
             # File categorization
             result['categorization'] = self._categorize_file(result)
             
-            print(f"Analysis completed for: {filepath}")
+            if self.cache:
+                self.cache.put(filepath, view.stat, sha256, options_key, self.ANALYSIS_VERSION, result)
+                if cached:
+                    result['cache_hit'] = 'content'
+            
             return result
             
         except Exception as e:
@@ -144,25 +209,25 @@ class MetadataAnalyzer:
                 'error': f'Analysis failed: {str(e)}',
                 'filename': os.path.basename(filepath) if filepath else 'unknown',
                 'analysis_timestamp': datetime.now().isoformat(),
-                'analysis_version': '2.0'
+                'analysis_version': self.ANALYSIS_VERSION
             }
 
-    def _extract_basic_info(self, filepath):
+    def _extract_basic_info(self, view):
         """Extract comprehensive basic file information"""
         try:
-            stat = os.stat(filepath)
+            filepath = view.path
+            stat = view.stat
             file_path = Path(filepath)
             
             # MIME type detection
             mime_type, encoding = mimetypes.guess_type(filepath)
             if not mime_type:
                 # Fallback to signature detection
-                with open(filepath, 'rb') as f:
-                    header = f.read(16)
-                    for sig, detected_mime in self.file_signatures.items():
-                        if header.startswith(sig):
-                            mime_type = detected_mime
-                            break
+                header = view.head(16)
+                for sig, detected_mime in self.file_signatures.items():
+                    if header.startswith(sig):
+                        mime_type = detected_mime
+                        break
                     
                 if not mime_type:
                     mime_type = 'application/octet-stream'
@@ -190,18 +255,17 @@ class MetadataAnalyzer:
         except Exception as e:
             return {'error': f'Failed to extract basic info: {str(e)}'}
 
-    def _analyze_file_signature(self, filepath):
+    def _analyze_file_signature(self, view):
         """Analyze file signature and detect potential mismatches"""
         try:
-            with open(filepath, 'rb') as f:
-                header = f.read(32)  # Read more bytes for better detection
+            header = view.head(32)  # Read more bytes for better detection
                 
             detected_types = []
             for sig, mime_type in self.file_signatures.items():
                 if header.startswith(sig):
                     detected_types.append(mime_type)
             
-            extension_mime, _ = mimetypes.guess_type(filepath)
+            extension_mime, _ = mimetypes.guess_type(view.path)
             
             return {
                 'file_header': header.hex()[:64],  # First 32 bytes as hex
@@ -233,8 +297,20 @@ class MetadataAnalyzer:
             
         return analysis
 
-    def _calculate_hashes(self, filepath):
-        """Calculate comprehensive file hashes"""
+    def _reuse_cached_sections(self, result, cached):
+        """Copy the content-derived sections of a cached result"""
+        for section in self.CONTENT_SECTIONS:
+            if section in cached:
+                result[section] = cached[section]
+
+    def _sha256(self, view):
+        digest = hashlib.sha256()
+        for chunk in view.iter_chunks():
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def _calculate_hashes(self, view):
+        """Calculate comprehensive file hashes in a single pass over the file view"""
         hashes = {}
         hash_functions = {
             'MD5': hashlib.md5(),
@@ -244,13 +320,9 @@ class MetadataAnalyzer:
         }
         
         try:
-            with open(filepath, 'rb') as f:
-                while True:
-                    chunk = f.read(65536)  # 64KB chunks for better performance
-                    if not chunk:
-                        break
-                    for hash_func in hash_functions.values():
-                        hash_func.update(chunk)
+            for chunk in view.iter_chunks():
+                for hash_func in hash_functions.values():
+                    hash_func.update(chunk)
             
             for name, hash_func in hash_functions.items():
                 hashes[name] = hash_func.hexdigest()
@@ -263,25 +335,25 @@ class MetadataAnalyzer:
             
         return hashes
 
-    def _perform_security_analysis(self, filepath):
+    def _perform_security_analysis(self, view):
         """Perform security analysis to detect potential threats"""
         try:
             analysis = {
                 'threat_indicators_found': [],
+                'threat_matches': {},
+                'rule_matches': [],
                 'suspicious_patterns': [],
                 'risk_level': 'low',
                 'security_notes': []
             }
             
-            # Read file content for analysis
             try:
-                with open(filepath, 'rb') as f:
-                    content = f.read(min(1024 * 1024, os.path.getsize(filepath)))  # Max 1MB
-                    
-                # Check for threat indicators
-                for indicator in self.threat_indicators:
-                    if indicator in content:
-                        analysis['threat_indicators_found'].append(indicator.decode('utf-8', errors='ignore'))
+                # Scan the whole file for threat indicators and rule strings
+                scan = self.threat_scanner.scan(view.iter_chunks(self.threat_scanner.CHUNK_SIZE))
+                analysis['threat_indicators_found'] = list(scan['indicators'])
+                analysis['threat_matches'] = scan['indicators']
+                analysis['rule_matches'] = scan['rules']
+                analysis['bytes_scanned'] = scan['bytes_scanned']
                 
                 # Analyze for suspicious patterns
                 if len(analysis['threat_indicators_found']) > 2:
@@ -291,9 +363,16 @@ class MetadataAnalyzer:
                     analysis['risk_level'] = 'medium'
                     analysis['security_notes'].append('Potential threat indicators found')
                 
+                for rule_match in scan['rules']:
+                    analysis['security_notes'].append(f"Matched rule {rule_match['rule']}")
+                    if rule_match['severity'] in ('high', 'critical'):
+                        analysis['risk_level'] = 'high'
+                    elif analysis['risk_level'] == 'low' and rule_match['severity'] != 'low':
+                        analysis['risk_level'] = 'medium'
+                
                 # Check for obfuscation
-                printable_ratio = sum(1 for b in content[:1024] if 32 <= b <= 126) / min(1024, len(content))
-                if printable_ratio < 0.1 and os.path.getsize(filepath) > 1024:
+                printable_ratio = byte_stats.printable_ratio(view.head(1024))
+                if printable_ratio < 0.1 and view.size > 1024:
                     analysis['suspicious_patterns'].append('Highly obfuscated content')
                     analysis['risk_level'] = 'medium' if analysis['risk_level'] == 'low' else analysis['risk_level']
                 
@@ -348,14 +427,14 @@ class MetadataAnalyzer:
                     if hasattr(img, 'getexif'):
                         exif = img.getexif()
                         for tag_id, value in exif.items():
-                            tag = EXIF_TAGS.get(tag_id, f'Tag{tag_id}')
+                            tag = ExifTags.TAGS.get(tag_id, f'Tag{tag_id}')
                             exif_data[tag] = self._clean_exif_value(value)
                         
                         # GPS data extraction
                         if 'GPSInfo' in exif_data:
                             gps_info = {}
                             for gps_tag_id, gps_value in exif.get_ifd(0x8825).items():
-                                gps_tag = GPSTAGS.get(gps_tag_id, f'GPS{gps_tag_id}')
+                                gps_tag = ExifTags.GPSTAGS.get(gps_tag_id, f'GPS{gps_tag_id}')
                                 gps_info[gps_tag] = self._clean_exif_value(gps_value)
                             exif_data['GPS_Info'] = gps_info
                     
@@ -442,7 +521,7 @@ class MetadataAnalyzer:
     def _extract_docx_metadata(self, filepath):
         """Extract Word document metadata"""
         try:
-            doc = Document(filepath)
+            doc = docx.Document(filepath)
             
             metadata = {
                 'document_type': 'Word Document',
@@ -480,7 +559,7 @@ class MetadataAnalyzer:
     def _extract_xlsx_metadata(self, filepath):
         """Extract Excel document metadata"""
         try:
-            workbook = load_workbook(filepath, read_only=True, data_only=True)
+            workbook = openpyxl.load_workbook(filepath, read_only=True, data_only=True)
             
             metadata = {
                 'document_type': 'Excel Spreadsheet',
@@ -528,7 +607,7 @@ class MetadataAnalyzer:
             return {'error': 'Mutagen not available for media analysis'}
         
         try:
-            audio_file = MutagenFile(filepath)
+            audio_file = mutagen.File(filepath)
             if audio_file is None:
                 return {'error': 'File not recognized as media file'}
             
@@ -638,36 +717,35 @@ class MetadataAnalyzer:
         except Exception as e:
             return {'archive_type': 'ZIP', 'error': f'ZIP analysis failed: {str(e)}'}
 
-    def _perform_deep_analysis(self, filepath):
+    def _perform_deep_analysis(self, view):
         """Perform comprehensive deep analysis"""
         try:
             analysis = {}
-            file_size = os.path.getsize(filepath)
             
-            # Entropy analysis
-            with open(filepath, 'rb') as f:
-                chunk = f.read(min(65536, file_size))  # Analyze first 64KB
-                analysis['entropy'] = self._calculate_entropy(chunk)
-                analysis['entropy_analysis'] = self._interpret_entropy(analysis['entropy'])
+            # Entropy and byte distribution over the whole file in one pass
+            stats = byte_stats.analyze_bytes(view)
+            analysis['entropy'] = stats['entropy']
+            analysis['entropy_analysis'] = self._interpret_entropy(analysis['entropy'])
+            
+            analysis['byte_distribution'] = {
+                'unique_bytes': stats['unique_bytes'],
+                'most_frequent_byte': stats['most_frequent_byte'],
+                'null_byte_percentage': round(stats['null_ratio'] * 100, 2),
+                'printable_percentage': round(stats['printable_ratio'] * 100, 2),
+                'high_byte_percentage': round(stats['high_byte_ratio'] * 100, 2)
+            }
             
-            # Byte distribution analysis
-            with open(filepath, 'rb') as f:
-                sample = f.read(min(8192, file_size))
-                byte_counts = Counter(sample)
-                
-                analysis['byte_distribution'] = {
-                    'unique_bytes': len(byte_counts),
-                    'most_frequent_byte': byte_counts.most_common(1)[0] if byte_counts else None,
-                    'null_byte_percentage': round((byte_counts.get(0, 0) / len(sample)) * 100, 2) if sample else 0,
-                    'printable_percentage': round(sum(count for byte, count in byte_counts.items() 
-                                                    if 32 <= byte <= 126) / len(sample) * 100, 2) if sample else 0
-                }
+            # Entropy map: one value per window across the file
+            analysis['entropy_profile'] = {
+                'window_size': stats['window_size'],
+                'values': stats['entropy_profile']
+            }
             
             # File structure analysis
-            analysis['structure_analysis'] = self._analyze_file_structure(filepath)
+            analysis['structure_analysis'] = self._analyze_file_structure(view, stats['entropy_profile'])
             
             # Pattern analysis
-            analysis['pattern_analysis'] = self._analyze_patterns(filepath)
+            analysis['pattern_analysis'] = self._analyze_patterns(view)
             
             return analysis
             
@@ -679,16 +757,7 @@ class MetadataAnalyzer:
         if not data:
             return 0.0
             
-        byte_counts = Counter(data)
-        data_len = len(data)
-        entropy = 0.0
-        
-        for count in byte_counts.values():
-            if count > 0:
-                probability = count / data_len
-                entropy -= probability * math.log2(probability)
-        
-        return round(entropy, 4)
+        return byte_stats.entropy(data)
 
     def _interpret_entropy(self, entropy):
         """Interpret entropy value"""
@@ -703,23 +772,28 @@ class MetadataAnalyzer:
         else:
             return 'Very high (likely encrypted/random)'
 
-    def _analyze_file_structure(self, filepath):
-        """Analyze internal file structure"""
+    def _analyze_file_structure(self, view, entropies=None):
+        """
+        Analyze internal file structure
+        
+        Args:
+            view: FileView of the file
+            entropies: Windowed entropy profile of the whole file; sampled when not given
+        """
         try:
             structure = {}
-            file_size = os.path.getsize(filepath)
-            
-            # Sample different parts of the file
-            sample_points = min(10, file_size // 1024)  # Sample every KB up to 10 points
-            if sample_points < 2:
-                sample_points = 1
+            file_size = view.size
             
-            entropies = []
-            with open(filepath, 'rb') as f:
+            if entropies is None:
+                # Sample different parts of the file
+                sample_points = min(10, file_size // 1024)  # Sample every KB up to 10 points
+                if sample_points < 2:
+                    sample_points = 1
+                
+                entropies = []
                 for i in range(sample_points):
                     position = (file_size * i) // sample_points
-                    f.seek(position)
-                    chunk = f.read(1024)
+                    chunk = view.read(position, 1024)
                     if chunk:
                         entropies.append(self._calculate_entropy(chunk))
             
@@ -731,10 +805,8 @@ class MetadataAnalyzer:
             }
             
             # Check for common structures
-            with open(filepath, 'rb') as f:
-                header = f.read(512)
-                f.seek(-min(512, file_size), 2)  # Seek to near end
-                footer = f.read(512)
+            header = view.head(512)
+            footer = view.tail(512)
             
             structure['has_structured_header'] = self._entropy_category(self._calculate_entropy(header)) == 'low'
             structure['has_structured_footer'] = self._entropy_category(self._calculate_entropy(footer)) == 'low'
@@ -753,7 +825,7 @@ class MetadataAnalyzer:
         else:
             return 'high'
 
-    def _analyze_patterns(self, filepath):
+    def _analyze_patterns(self, view):
         """Analyze file for interesting patterns"""
         try:
             patterns = {
@@ -763,52 +835,17 @@ class MetadataAnalyzer:
                 'file_paths': []
             }
             
-            with open(filepath, 'rb') as f:
-                content = f.read(min(32768, os.path.getsize(filepath)))  # First 32KB
+            content = view.head(self.PATTERN_SCAN_BYTES if patterns_module.NUMPY_AVAILABLE
+                                else self.PATTERN_SCAN_BYTES_FALLBACK)
             
             # Look for repeated byte sequences
-            for seq_len in [4, 8, 16]:
-                sequences = {}
-                for i in range(len(content) - seq_len):
-                    seq = content[i:i+seq_len]
-                    if seq in sequences:
-                        sequences[seq] += 1
-                    else:
-                        sequences[seq] = 1
-                
-                # Find most repeated sequences
-                for seq, count in sorted(sequences.items(), key=lambda x: x[1], reverse=True)[:3]:
-                    if count > 2:  # Only sequences that repeat more than twice
-                        patterns['repeated_sequences'].append({
-                            'sequence': seq.hex(),
-                            'length': seq_len,
-                            'count': count
-                        })
+            patterns['repeated_sequences'] = patterns_module.top_repeated_sequences(content, lengths=(4, 8, 16))
             
-            # Look for strings (printable sequences)
-            try:
-                text_content = content.decode('utf-8', errors='ignore')
-                
-                # URLs
-                import re
-                urls = re.findall(r'https?://[^\s<>"]+', text_content)
-                patterns['url_patterns'] = urls[:10]  # First 10 URLs
-                
-                # File paths
-                paths = re.findall(r'[A-Za-z]:\\[^<>"|?*\s]+|/[^<>"|?*\s]+', text_content)
-                patterns['file_paths'] = paths[:10]  # First 10 paths
-                
-                # Interesting strings (emails, IPs, etc.)
-                emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text_content)
-                if emails:
-                    patterns['interesting_strings'].extend(emails[:5])
-                
-                ips = re.findall(r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b', text_content)
-                if ips:
-                    patterns['interesting_strings'].extend(ips[:5])
-                    
-            except Exception:
-                pass  # Skip string analysis if decoding fails
+            # URLs, file paths, emails and IPs in a single scan
+            strings = patterns_module.extract_strings(content)
+            patterns['url_patterns'] = strings['url']
+            patterns['file_paths'] = strings['path']
+            patterns['interesting_strings'] = strings['email'] + strings['ip']
             
             return patterns
             
@@ -980,8 +1017,19 @@ class MetadataAnalyzer:
             return {'error': f'Generic document analysis failed: {str(e)}'}
 
     # Directory and batch analysis methods
-    def analyze_directory(self, directory_path, **kwargs):
-        """Analyze all files in a directory with improved handling"""
+    def analyze_directory(self, directory_path, workers=None, ordered=True, timeout=None,
+                          result_callback=None, **kwargs):
+        """
+        Analyze all files in a directory with improved handling
+        
+        Args:
+            directory_path: Directory to analyze recursively
+            workers: Worker processes (default: CPU count, 1 analyzes in-process)
+            ordered: Report results to result_callback in file order rather than as completed
+            timeout: Per-file time budget in seconds
+            result_callback: Function called with each result as it becomes available
+            **kwargs: max_files and analyze_file options
+        """
         try:
             if not os.path.exists(directory_path):
                 return {'error': f'Directory not found: {directory_path}'}
@@ -989,37 +1037,48 @@ class MetadataAnalyzer:
             if not os.path.isdir(directory_path):
                 return {'error': f'Path is not a directory: {directory_path}'}
             
-            results = []
-            file_count = 0
-            max_files = kwargs.get('max_files', 100)  # Allow configurable limit
+            file_paths = []
+            max_files = kwargs.pop('max_files', 100)  # Allow configurable limit
+            seen_inodes = set()
             
             print(f"Starting directory analysis: {directory_path}")
             
             # Walk through directory
             for root, dirs, files in os.walk(directory_path):
+                # Skip MetaSpidey's internal download state (partial files, content store)
+                dirs[:] = [d for d in dirs if not d.startswith('.metaspidey_')]
+                
                 for filename in files:
-                    if file_count >= max_files:
+                    if len(file_paths) >= max_files:
                         break
                     
                     filepath = os.path.join(root, filename)
+                    
+                    # Hardlinked copies of the same content are analyzed only once
                     try:
-                        print(f"Analyzing file {file_count + 1}/{max_files}: {filename}")
-                        result = self.analyze_file(filepath, **kwargs)
-                        result['relative_path'] = os.path.relpath(filepath, directory_path)
-                        results.append(result)
-                        file_count += 1
-                    except Exception as e:
-                        results.append({
-                            'error': str(e),
-                            'filename': filename,
-                            'file_path': filepath,
-                            'relative_path': os.path.relpath(filepath, directory_path)
-                        })
-                        file_count += 1
+                        stat = os.stat(filepath)
+                        inode_key = (stat.st_dev, stat.st_ino)
+                        if inode_key in seen_inodes:
+                            continue
+                        seen_inodes.add(inode_key)
+                    except OSError:
+                        pass
+                    
+                    file_paths.append(filepath)
                 
-                if file_count >= max_files:
+                if len(file_paths) >= max_files:
                     break
             
+            print(f"Analyzing {len(file_paths)} files from {directory_path}")
+            
+            results = [None] * len(file_paths)
+            for index, result in self.iter_analyze(file_paths, workers=workers, ordered=ordered,
+                                                   timeout=timeout, **kwargs):
+                result['relative_path'] = os.path.relpath(file_paths[index], directory_path)
+                results[index] = result
+                if result_callback:
+                    result_callback(result)
+            
             # Generate summary statistics
             summary = self._generate_analysis_summary(results)
             
@@ -1031,7 +1090,7 @@ class MetadataAnalyzer:
                 'results': results,
                 'summary': summary,
                 'timestamp': datetime.now().isoformat(),
-                'analysis_version': '2.0'
+                'analysis_version': self.ANALYSIS_VERSION
             }
             
         except Exception as e:
@@ -1041,6 +1100,131 @@ class MetadataAnalyzer:
                 'timestamp': datetime.now().isoformat()
             }
 
+    def iter_analyze(self, file_paths, workers=None, chunk_size=None, ordered=True, timeout=None, **kwargs):
+        """
+        Analyze files in a process pool, yielding results as they finish
+        
+        Files are sent to the workers in chunks, and only a bounded number
+        of chunks is queued at a time. Each file gets its own time budget,
+        so one malformed file cannot stall the rest of the batch. The budget
+        is enforced with SIGALRM, which only reaches the main thread: called
+        from any other thread (a request or background job) with a timeout,
+        files are analyzed in a worker process even when workers is 1.
+        
+        Args:
+            file_paths: Files to analyze
+            workers: Worker processes (default: CPU count, 1 analyzes in-process)
+            chunk_size: Files per pool task (default: sized from the batch and worker count)
+            ordered: Yield in file order rather than as completed
+            timeout: Per-file time budget in seconds
+            **kwargs: analyze_file options
+        
+        Yields:
+            (index, result) tuples, index being the position in file_paths
+        """
+        file_paths = list(file_paths)
+        workers = max(1, workers or os.cpu_count() or 1)
+        
+        in_process = workers == 1 or len(file_paths) < 2
+        if in_process and timeout and hasattr(signal, 'SIGALRM') and not _alarm_available():
+            in_process = False
+            workers = 1
+        
+        if in_process:
+            for index, filepath in enumerate(file_paths):
+                yield index, self._analyze_with_timeout(filepath, kwargs, timeout)
+            return
+        
+        if not chunk_size:
+            chunk_size = max(1, min(self.MAX_CHUNK_FILES, len(file_paths) // (workers * 4)))
+        indexed = list(enumerate(file_paths))
+        chunks = [indexed[i:i + chunk_size] for i in range(0, len(indexed), chunk_size)]
+        
+        in_flight = {}
+        buffered = {}
+        next_index = 0
+        
+        def release(finished):
+            """Pass results through, or hold them back until all earlier ones are in"""
+            nonlocal next_index
+            if not ordered:
+                return finished
+            buffered.update(finished)
+            ready = []
+            while next_index in buffered:
+                ready.append((next_index, buffered.pop(next_index)))
+                next_index += 1
+            return ready
+        
+        def collect(done):
+            finished = []
+            for future in done:
+                chunk = in_flight.pop(future)
+                try:
+                    finished.extend(future.result())
+                except BrokenProcessPool as e:
+                    finished.extend(self._chunk_errors(chunk, f'Worker process failed: {e}'))
+            return release(finished)
+        
+        settings = (self.cache.path if self.cache else None, self.rules_path)
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as executor:
+            for chunk in chunks:
+                try:
+                    in_flight[executor.submit(_analyze_chunk, chunk, kwargs, timeout, settings)] = chunk
+                except BrokenProcessPool as e:
+                    yield from release(self._chunk_errors(chunk, f'Worker pool unavailable: {e}'))
+                    continue
+                
+                # Keep a bounded number of chunks queued
+                if len(in_flight) >= workers * 2:
+                    done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                    yield from collect(done)
+            
+            while in_flight:
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                yield from collect(done)
+
+    def _analyze_with_timeout(self, filepath, options, timeout=None):
+        """
+        Analyze one file, giving up after timeout seconds
+        
+        The timeout needs SIGALRM on the main thread; elsewhere the file is
+        analyzed without one and the result says so with timeout_applied.
+        """
+        if not timeout:
+            return self.analyze_file(filepath, **options)
+        if not _alarm_available():
+            result = self.analyze_file(filepath, **options)
+            result['timeout_applied'] = False
+            return result
+        
+        def on_alarm(signum, frame):
+            raise _AnalysisTimeout()
+        
+        previous_handler = signal.signal(signal.SIGALRM, on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            return self.analyze_file(filepath, **options)
+        except _AnalysisTimeout:
+            result = self._batch_error(filepath, f'Analysis timed out after {timeout} seconds')
+            result['timed_out'] = True
+            return result
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous_handler)
+
+    def _chunk_errors(self, chunk, error):
+        return [(index, self._batch_error(filepath, error)) for index, filepath in chunk]
+
+    def _batch_error(self, filepath, error):
+        return {
+            'error': error,
+            'filename': os.path.basename(filepath),
+            'file_path': filepath,
+            'analysis_timestamp': datetime.now().isoformat(),
+            'analysis_version': self.ANALYSIS_VERSION
+        }
+
     def _generate_analysis_summary(self, results):
         """Generate summary statistics from analysis results"""
         try:
@@ -1080,25 +1264,31 @@ class MetadataAnalyzer:
         except Exception as e:
             return {'error': f'Summary generation failed: {str(e)}'}
 
-    def batch_analyze(self, file_paths, **kwargs):
-        """Analyze multiple files with progress tracking"""
-        results = []
+    def batch_analyze(self, file_paths, workers=None, ordered=True, timeout=None,
+                      result_callback=None, chunk_size=None, **kwargs):
+        """
+        Analyze multiple files in parallel with progress tracking
+        
+        Args:
+            file_paths: Files to analyze
+            workers: Worker processes (default: CPU count, 1 analyzes in-process)
+            ordered: Report results to result_callback in file order rather than as completed
+            timeout: Per-file time budget in seconds
+            result_callback: Function called with each result as it becomes available
+            chunk_size: Files per pool task
+            **kwargs: analyze_file options
+        """
+        file_paths = list(file_paths)
+        results = [None] * len(file_paths)
         
         print(f"Starting batch analysis of {len(file_paths)} files")
         
-        for i, filepath in enumerate(file_paths):
-            try:
-                print(f"Analyzing file {i + 1}/{len(file_paths)}: {os.path.basename(filepath)}")
-                result = self.analyze_file(filepath, **kwargs)
-                result['batch_index'] = i
-                results.append(result)
-            except Exception as e:
-                results.append({
-                    'error': str(e),
-                    'filename': os.path.basename(filepath),
-                    'file_path': filepath,
-                    'batch_index': i
-                })
+        for index, result in self.iter_analyze(file_paths, workers=workers, chunk_size=chunk_size,
+                                               ordered=ordered, timeout=timeout, **kwargs):
+            result['batch_index'] = index
+            results[index] = result
+            if result_callback:
+                result_callback(result)
         
         summary = self._generate_analysis_summary(results)
         
@@ -1107,6 +1297,44 @@ class MetadataAnalyzer:
             'total_files': len(file_paths),
             'results': results,
             'summary': summary,
+            'cache_hits': sum(1 for r in results if r.get('cache_hit')),
             'timestamp': datetime.now().isoformat(),
-            'analysis_version': '2.0'
-        }
\ No newline at end of file
+            'analysis_version': self.ANALYSIS_VERSION
+        }
+
+
+def _pool_context():
+    """
+    Forkserver where available, spawn otherwise
+
+    Pools are started from request and job threads of the server; a plain
+    fork there can copy a lock (stdout, logging) held by another thread and
+    hang the worker. Forkserver workers are forked from a clean,
+    single-threaded process that has already imported this module.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])  # Only applies before the server first starts
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+_worker_analyzer = None
+_worker_settings = None
+
+
+def _analyze_chunk(chunk, options, timeout, settings=(None, None)):
+    """
+    Pool task: analyze a chunk of (index, filepath) pairs with a per-file timeout
+    
+    settings is the submitting analyzer's (cache path, rules path); each worker
+    builds its analyzer, and so its threat scanner, once per distinct settings.
+    """
+    global _worker_analyzer, _worker_settings
+    if _worker_analyzer is None or _worker_settings != settings:
+        cache_path, rules_path = settings
+        _worker_analyzer = MetadataAnalyzer(cache=AnalysisCache(cache_path) if cache_path else None,
+                                            rules_path=rules_path)
+        _worker_settings = settings
+    return [(index, _worker_analyzer._analyze_with_timeout(filepath, options, timeout))
+            for index, filepath in chunk]
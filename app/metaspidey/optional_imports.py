@@ -0,0 +1,88 @@
+import importlib
+import importlib.util
+import threading
+
+
+class OptionalModule:
+    """
+    Lazily imported optional dependency
+
+    Availability is probed with importlib.util.find_spec on the top-level
+    package, which locates the package without executing it. The module
+    itself is imported the first time one of its attributes is used, so
+    app startup and pool workers only pay for the libraries they need.
+
+    Usage:
+        Image = OptionalModule('PIL.Image')
+        if Image.available:
+            with Image.open(path) as img:
+                ...
+    """
+
+    def __init__(self, name, package=None):
+        """
+        Args:
+            name: Module to import, e.g. 'PIL.Image'
+            package: Distribution name shown when the module is missing (default: top-level package)
+        """
+        self._name = name
+        self._package = package or name.split('.')[0]
+        self._module = None
+        self._available = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        """Whether the module can be imported, without importing it"""
+        if self._available is None:
+            try:
+                self._available = importlib.util.find_spec(self._name.split('.')[0]) is not None
+            except (ImportError, ValueError):
+                self._available = False
+        return self._available
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def load(self):
+        """Import the module on first use; raises ImportError if it is missing or broken"""
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    if not self.available:
+                        raise ImportError(f'{self._package} is not installed')
+                    try:
+                        self._module = importlib.import_module(self._name)
+                    except ImportError:
+                        self._available = False
+                        raise
+        return self._module
+
+    def __getattr__(self, attribute):
+        # Only called for attributes not found on the proxy itself
+        if attribute.startswith('_'):
+            raise AttributeError(attribute)
+        return getattr(self.load(), attribute)
+
+    def __repr__(self):
+        state = 'loaded' if self.loaded else ('available' if self.available else 'missing')
+        return f'<OptionalModule {self._name} ({state})>'
+
+
+# Optional libraries used by the metadata extractors, by the feature they enable
+REGISTRY = {
+    'numpy': OptionalModule('numpy'),
+    'pil': OptionalModule('PIL.Image', 'pillow'),
+    'pil_exif_tags': OptionalModule('PIL.ExifTags', 'pillow'),
+    'pypdf2': OptionalModule('PyPDF2'),
+    'docx': OptionalModule('docx', 'python-docx'),
+    'openpyxl': OptionalModule('openpyxl'),
+    'mutagen': OptionalModule('mutagen'),
+    'exifread': OptionalModule('exifread'),
+}
+
+
+def availability():
+    """{feature: available} for every registered module, without importing any of them"""
+    return {feature: module.available for feature, module in REGISTRY.items()}
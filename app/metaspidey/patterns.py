@@ -0,0 +1,123 @@
+import heapq
+import re
+from collections import Counter
+from operator import itemgetter
+
+from app.metaspidey.optional_imports import REGISTRY as OPTIONAL_MODULES
+
+np = OPTIONAL_MODULES['numpy']  # Imported on first use
+NUMPY_AVAILABLE = np.available
+
+# One scan finds every kind of string; at each position the first alternative wins,
+# so a URL is reported as a URL rather than also as a path
+STRING_PATTERN = re.compile(
+    rb'(?P<url>https?://[^\s<>"]+)'
+    rb'|(?P<email>\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b)'
+    rb'|(?P<ip>\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b)'
+    rb'|(?P<path>[A-Za-z]:\\[^<>"|?*\s]+|/[^<>"|?*\s]+)'
+)
+
+STRING_LIMITS = {'url': 10, 'path': 10, 'email': 5, 'ip': 5}
+
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15  # Mixes the two halves of 16-byte keys
+
+
+def extract_strings(data, limits=None):
+    """
+    URLs, file paths, emails and IPv4 addresses in data, in one regex scan
+
+    Args:
+        data: bytes-like content
+        limits: Maximum matches kept per kind (default: STRING_LIMITS)
+
+    Returns:
+        dict mapping 'url', 'path', 'email' and 'ip' to lists of strings
+    """
+    limits = limits or STRING_LIMITS
+    found = {kind: [] for kind in limits}
+    remaining = sum(limits.values())
+
+    for match in STRING_PATTERN.finditer(data):
+        kind = match.lastgroup
+        if kind in found and len(found[kind]) < limits[kind]:
+            found[kind].append(match.group().decode('utf-8', errors='ignore'))
+            remaining -= 1
+            if not remaining:
+                break  # Every kind is full
+
+    return found
+
+
+def top_repeated_sequences(data, lengths=(4, 8, 16), top=3, min_count=3):
+    """
+    Most repeated byte sequences of each length, counting overlapping occurrences
+
+    With NumPy, each k-byte window is packed into a 64-bit key (16-byte
+    windows are hashed from two keys and verified exactly), and the keys
+    are counted with a sort instead of a dict of slices.
+
+    Args:
+        data: bytes-like content
+        lengths: Sequence lengths to look for (at most 16 bytes)
+        top: Sequences reported per length
+        min_count: Minimum occurrences for a sequence to be reported
+
+    Returns:
+        List of dicts with sequence (hex), length and count
+    """
+    results = []
+    for length in lengths:
+        if NUMPY_AVAILABLE:
+            counts = _top_kgrams_numpy(np.frombuffer(data, dtype=np.uint8), length, top)
+        else:
+            counts = _top_kgrams_python(bytes(data), length, top)
+        results.extend({'sequence': sequence.hex(), 'length': length, 'count': count}
+                       for sequence, count in counts if count >= min_count)
+    return results
+
+
+def _top_kgrams_python(data, length, top):
+    counts = Counter(data[i:i + length] for i in range(len(data) - length + 1))
+    return heapq.nlargest(top, counts.items(), key=itemgetter(1))
+
+
+def _pack_keys(arr, length):
+    """Little-endian uint64 key of every window of up to 8 bytes"""
+    count = len(arr) - length + 1
+    keys = np.zeros(count, dtype=np.uint64)
+    for j in range(length):
+        keys |= arr[j:j + count].astype(np.uint64) << np.uint64(8 * j)
+    return keys
+
+
+def _top_kgrams_numpy(arr, length, top):
+    count = len(arr) - length + 1
+    if count <= 0:
+        return []
+
+    if length <= 8:
+        keys = _pack_keys(arr, length)
+        unique, counts = np.unique(keys, return_counts=True)
+        best = _largest(counts, top)
+        return heapq.nlargest(top, ((int(unique[i]).to_bytes(8, 'little')[:length], int(counts[i]))
+                                    for i in best), key=itemgetter(1))
+
+    # Longer windows: hash two 8-byte halves, then count the best candidates exactly
+    low = _pack_keys(arr[:count + 7], 8)
+    high = _pack_keys(arr[8:], length - 8)
+    hashes = low * np.uint64(_HASH_MULTIPLIER) ^ high
+    unique, counts = np.unique(hashes, return_counts=True)
+
+    candidates = []
+    for i in _largest(counts, top * 4):
+        position = int(np.argmax(hashes == unique[i]))
+        exact = int(np.count_nonzero((low == low[position]) & (high == high[position])))
+        candidates.append((bytes(arr[position:position + length]), exact))
+    return heapq.nlargest(top, candidates, key=itemgetter(1))
+
+
+def _largest(counts, k):
+    """Indices of the k largest counts, unordered"""
+    if len(counts) <= k:
+        return range(len(counts))
+    return np.argpartition(counts, -k)[-k:]
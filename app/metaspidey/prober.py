@@ -0,0 +1,143 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+
+class HostRateLimiter:
+    """Spaces out requests to each host to at most ``rate`` per second"""
+
+    def __init__(self, rate=20):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, host):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class PatternProber:
+    """
+    Concurrent existence checks for fuzzing patterns
+
+    Each pattern is requested once per directory, no matter how many pages
+    of that directory are crawled. A HEAD request is tried first; hosts that
+    reject HEAD are probed with a ``Range: bytes=0-0`` GET instead so no body
+    is transferred.
+    """
+
+    FOUND_STATUSES = (200, 206)
+    HEAD_UNSUPPORTED_STATUSES = (405, 501)
+
+    def __init__(self, session=None, threads=10, rate_limit=20, timeout=5):
+        self.session = session or requests.Session()
+        self.threads = max(1, threads)
+        self.timeout = timeout
+        self.rate_limiter = HostRateLimiter(rate_limit)
+        self.probed_directories = set()
+        self.head_unsupported_hosts = set()
+        self.lock = threading.Lock()
+        self.should_stop = False
+
+    def directory_of(self, url):
+        """Directory URL a page belongs to (fragment and query dropped)"""
+        parsed = urlparse(urljoin(url, './'))
+        return f"{parsed.scheme}://{parsed.netloc.lower()}{parsed.path}"
+
+    def claim_directory(self, url):
+        """Mark a page's directory as probed; returns the directory if it was new"""
+        directory = self.directory_of(url)
+        with self.lock:
+            if directory in self.probed_directories:
+                return None
+            self.probed_directories.add(directory)
+        return directory
+
+    def probe(self, page_url, patterns, allowed_extensions=None, is_valid_extension=None):
+        """
+        Probe all patterns in the directory of page_url, once per directory
+
+        Args:
+            page_url: URL of a crawled page
+            patterns: Fuzzing patterns (file names or relative paths)
+            allowed_extensions: Optional extension filter
+            is_valid_extension: Callable(url, allowed_extensions) used to filter candidates
+
+        Returns:
+            List of dictionaries describing the files that exist
+        """
+        directory = self.claim_directory(page_url)
+        if not directory or not patterns:
+            return []
+
+        candidates = []
+        seen = set()
+        for pattern in patterns:
+            candidate = urljoin(directory, pattern)
+            if candidate in seen:
+                continue
+            seen.add(candidate)
+            if is_valid_extension and not is_valid_extension(candidate, allowed_extensions):
+                continue
+            candidates.append(candidate)
+
+        with ThreadPoolExecutor(max_workers=min(self.threads, len(candidates) or 1)) as executor:
+            results = list(executor.map(self.probe_url, candidates))
+
+        return [result for result in results if result]
+
+    def probe_url(self, url):
+        """Check whether a single URL exists; returns its details or None"""
+        if self.should_stop:
+            return None
+
+        host = urlparse(url).netloc
+        try:
+            response = None
+            method = 'HEAD'
+            if host not in self.head_unsupported_hosts:
+                self.rate_limiter.acquire(host)
+                response = self.session.head(url, timeout=self.timeout, allow_redirects=False)
+                if response.status_code in self.HEAD_UNSUPPORTED_STATUSES:
+                    with self.lock:
+                        self.head_unsupported_hosts.add(host)
+                    response = None
+
+            if response is None:
+                method = 'GET'
+                self.rate_limiter.acquire(host)
+                with self.session.get(url, timeout=self.timeout, stream=True, allow_redirects=False,
+                                      headers={'Range': 'bytes=0-0'}) as response:
+                    pass
+
+            if response.status_code not in self.FOUND_STATUSES:
+                return None
+
+            content_length = response.headers.get('content-length')
+            content_range = response.headers.get('content-range', '')
+            if response.status_code == 206 and '/' in content_range:
+                # Full size of a ranged response is in "bytes 0-0/<size>"
+                content_length = content_range.rsplit('/', 1)[-1]
+
+            return {
+                'url': url,
+                'status': response.status_code,
+                'method': method,
+                'content_length': int(content_length) if content_length and content_length.isdigit() else None,
+                'content_type': response.headers.get('content-type', '')
+            }
+
+        except requests.exceptions.RequestException:
+            return None
+
+    def stop(self):
+        self.should_stop = True
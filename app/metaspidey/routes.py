@@ -9,15 +9,32 @@ from flask_login import login_required, current_user
 from app.metaspidey import metaspidey_bp
 from app.metaspidey.forms import CrawlerForm, BruteForceForm, MetadataForm, DownloadForm, WordlistDownloadForm
 from app.metaspidey.crawler import WebCrawler
+from app.metaspidey.analysis_cache import AnalysisCache
 from app.metaspidey.metadata_analyzer import MetadataAnalyzer
 from app.metaspidey.downloader import FileDownloader
 from app.metaspidey.ffuf_runner import FFUFRunner
+from app.metaspidey.events import OperationEventLog
+from app.metaspidey.wordlists import WordlistCatalog
+from app import socketio
 from werkzeug.utils import secure_filename
 
 # Global variables to store active operations
 active_operations = {}
 operation_results = {}
-realtime_results = {}
+operation_runners = {}  # Stoppable runners by operation id
+
+def operation_snapshot(operation_id):
+    """Current state of a running operation (as in /status), sent to clients that missed events"""
+    operation = active_operations.get(operation_id)
+    return dict(operation) if operation is not None else None
+
+operation_events = OperationEventLog(socketio, snapshot=operation_snapshot)  # Live progress, pushed over Socket.IO
+
+def finish_operation(operation_id):
+    """Mark an operation as finished and notify its subscribers"""
+    active_operations.pop(operation_id, None)
+    status = operation_results.get(operation_id, {}).get('status', 'error')
+    operation_events.publish(operation_id, {'type': 'operation_finished', 'status': status})
 
 @metaspidey_bp.route('/')
 @login_required
@@ -29,12 +46,21 @@ def index():
     download_form = DownloadForm()
     wordlist_form = WordlistDownloadForm()
     
+    # Cached catalog index; a missing one is built in the background (hashing every
+    # list can take minutes) and the page offers the catalog once it is ready
+    catalog = WordlistCatalog(current_app.config['WORDLISTS_DIR'])
+    bruteforce_form.catalog_wordlists.choices = [
+        (entry['path'], f"{entry['category']}/{entry['name']} ({entry['lines']:,} lines)")
+        for entry in catalog.entries(background=True)
+    ]
+    
     return render_template('metaspidey/index.html',
                          crawler_form=crawler_form,
                          bruteforce_form=bruteforce_form,
                          metadata_form=metadata_form,
                          download_form=download_form,
-                         wordlist_form=wordlist_form)
+                         wordlist_form=wordlist_form,
+                         catalog_building=catalog.building)
 
 @metaspidey_bp.route('/crawl', methods=['POST'])
 @login_required
@@ -82,10 +108,10 @@ def start_crawl():
                         'timestamp': datetime.now().isoformat()
                     }
                 finally:
-                    if operation_id in active_operations:
-                        del active_operations[operation_id]
+                    finish_operation(operation_id)
             
             # Store operation info
+            operation_events.open(operation_id)
             active_operations[operation_id] = {
                 'type': 'crawl',
                 'status': 'running',
@@ -125,11 +151,23 @@ def start_bruteforce():
         try:
             # Determine wordlist source
             wordlist_path = None
+            catalog_selection = None
             if form.wordlist_file.data and form.wordlist_file.data.filename:
                 # Save uploaded wordlist
                 filename = secure_filename(form.wordlist_file.data.filename)
                 wordlist_path = os.path.join(tempfile.gettempdir(), filename)
                 form.wordlist_file.data.save(wordlist_path)
+            elif form.catalog_wordlists.data:
+                # Checked against the index here; merging can take a while, so the job does it
+                catalog = WordlistCatalog(current_app.config['WORDLISTS_DIR'])
+                catalogued = {entry['path'] for entry in catalog.entries(background=True)}
+                unknown = [path for path in form.catalog_wordlists.data if os.path.abspath(path) not in catalogued]
+                if unknown:
+                    return jsonify({
+                        'success': False,
+                        'error': f'Not a catalogued wordlist: {unknown[0]}'
+                    }), 400
+                catalog_selection = list(form.catalog_wordlists.data)
             elif form.wordlist_path.data:
                 wordlist_path = form.wordlist_path.data
             else:
@@ -138,28 +176,30 @@ def start_bruteforce():
                     'error': 'No wordlist provided. Upload a file or specify a path.'
                 }), 400
             
-            if not os.path.exists(wordlist_path):
+            if not catalog_selection and not os.path.exists(wordlist_path):
                 return jsonify({
                     'success': False,
                     'error': f'Wordlist file not found: {wordlist_path}'
                 }), 400
                 
             operation_id = f"bruteforce_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            ffuf_runner = FFUFRunner()
+            operation_runners[operation_id] = ffuf_runner
             
             def bruteforce_worker():
                 try:
-                    ffuf_runner = FFUFRunner()
-                    
-                    # Store real-time results for this operation
-                    realtime_results[operation_id] = []
-                    
                     def progress_callback(result):
-                        """Store real-time results for live updates"""
-                        realtime_results[operation_id].append(result)
+                        """Publish each hit for live updates"""
+                        operation_events.publish(operation_id, result)
+                    
+                    wordlist = wordlist_path
+                    if catalog_selection:
+                        # A single catalog list is used as is; several are merged into one deduplicated list
+                        wordlist = catalog.merge(catalog_selection)['path']
                     
                     options = {
                         'fuzz_template': form.fuzz_url.data,
-                        'wordlist': wordlist_path,
+                        'wordlist': wordlist,
                         'threads': form.threads.data,
                         'status_codes': [int(code) for code in form.status_codes.data],
                         'recursion': form.recursion.data,
@@ -187,15 +227,17 @@ def start_bruteforce():
                     if form.wordlist_file.data and os.path.exists(wordlist_path):
                         os.unlink(wordlist_path)
                     
-                    if operation_id in active_operations:
-                        del active_operations[operation_id]
+                    operation_runners.pop(operation_id, None)
+                    finish_operation(operation_id)
             
             # Store operation info
+            operation_events.open(operation_id)
             active_operations[operation_id] = {
                 'type': 'bruteforce',
                 'status': 'running',
                 'fuzz_url': form.fuzz_url.data,
-                'wordlist': os.path.basename(wordlist_path),
+                'wordlist': (', '.join(os.path.basename(path) for path in catalog_selection)
+                             if catalog_selection else os.path.basename(wordlist_path)),
                 'started': datetime.now().isoformat()
             }
             
@@ -268,10 +310,13 @@ def analyze_metadata():
                 }), 400
             
             operation_id = f"metadata_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            cache_path = current_app.config['METASPIDEY_ANALYSIS_CACHE'] if form.use_cache.data else None
+            rules_path = current_app.config['METASPIDEY_THREAT_RULES']
             
             def analyze_worker():
                 try:
-                    analyzer = MetadataAnalyzer()
+                    analyzer = MetadataAnalyzer(cache=AnalysisCache(cache_path) if cache_path else None,
+                                                rules_path=rules_path)
                     results = []
                     
                     analysis_options = {
@@ -280,67 +325,71 @@ def analyze_metadata():
                         'deep_analysis': form.deep_analysis.data
                     }
                     
+                    def result_callback(result):
+                        """Publish each analyzed file as soon as it is done"""
+                        operation_events.publish(operation_id, {
+                            'type': 'file_analyzed',
+                            'filename': result.get('original_filename') or result.get('filename'),
+                            'error': result.get('error'),
+                            'risk_level': result.get('categorization', {}).get('risk_level')
+                        })
+                    
+                    batch_options = {
+                        'workers': form.workers.data,
+                        'timeout': form.file_timeout.data,
+                        'ordered': False,
+                        **analysis_options
+                    }
+                    
                     # Process uploaded files
                     if file_data_list:
-                        for file_data in file_data_list:
-                            temp_path = None
-                            try:
+                        temp_paths = []
+                        try:
+                            for file_data in file_data_list:
                                 # Save uploaded file temporarily with unique name
                                 filename = file_data['filename']
-                                file_content = file_data['content']
                                 timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
                                 temp_path = os.path.join(tempfile.gettempdir(), f"metaspidey_{timestamp}_{filename}")
                                 
-                                print(f"Saving uploaded file: {filename} -> {temp_path}")
-                                
-                                # Write to temporary file
                                 with open(temp_path, 'wb') as temp_file:
-                                    temp_file.write(file_content)
-                                
-                                # Verify file was written correctly
-                                if not os.path.exists(temp_path):
-                                    raise Exception(f"Failed to create temporary file: {temp_path}")
-                                
-                                file_size = os.path.getsize(temp_path)
-                                if file_size == 0:
-                                    raise Exception(f"Temporary file is empty: {temp_path}")
-                                
-                                print(f"Temporary file created successfully: {temp_path} ({file_size} bytes)")
-                                
-                                # Analyze file
-                                print(f"Starting analysis of: {temp_path}")
-                                metadata = analyzer.analyze_file(temp_path, **analysis_options)
-                                
+                                    temp_file.write(file_data['content'])
+                                temp_paths.append(temp_path)
+                            
+                            print(f"Saved {len(temp_paths)} uploaded files for analysis")
+                            
+                            def upload_callback(metadata):
                                 # Add source information
+                                file_data = file_data_list[metadata['batch_index']]
                                 metadata['source'] = 'uploaded'
-                                metadata['original_filename'] = filename
-                                metadata['temp_file_size'] = file_size
-                                
-                                results.append(metadata)
-                                print(f"Successfully analyzed: {filename}")
-                                
-                            except Exception as e:
-                                error_msg = f'Failed to process {filename}: {str(e)}'
-                                print(f"Error: {error_msg}")
-                                print(f"Traceback: {traceback.format_exc()}")
-                                results.append({
-                                    'error': error_msg,
-                                    'filename': uploaded_file.filename,
-                                    'source': 'uploaded'
-                                })
-                            finally:
-                                # Clean up temp file
-                                if temp_path and os.path.exists(temp_path):
-                                    try:
-                                        os.unlink(temp_path)
-                                        print(f"Cleaned up temp file: {temp_path}")
-                                    except Exception as cleanup_error:
-                                        print(f"Failed to cleanup {temp_path}: {cleanup_error}")
+                                metadata['original_filename'] = file_data['filename']
+                                metadata['temp_file_size'] = len(file_data['content'])
+                                result_callback(metadata)
+                            
+                            batch_result = analyzer.batch_analyze(temp_paths, result_callback=upload_callback,
+                                                                  **batch_options)
+                            results.extend(batch_result['results'])
+                            
+                        except Exception as e:
+                            error_msg = f'Failed to process uploaded files: {str(e)}'
+                            print(f"Error: {error_msg}")
+                            print(f"Traceback: {traceback.format_exc()}")
+                            results.append({
+                                'error': error_msg,
+                                'source': 'uploaded'
+                            })
+                        finally:
+                            # Clean up temp files
+                            for temp_path in temp_paths:
+                                try:
+                                    os.unlink(temp_path)
+                                except OSError as cleanup_error:
+                                    print(f"Failed to cleanup {temp_path}: {cleanup_error}")
                     
                     # Process directory
                     if input_directory:
                         print(f"Processing directory: {input_directory}")
-                        directory_result = analyzer.analyze_directory(input_directory, **analysis_options)
+                        directory_result = analyzer.analyze_directory(input_directory, result_callback=result_callback,
+                                                                      **batch_options)
                         
                         if 'error' in directory_result:
                             results.append(directory_result)
@@ -389,11 +438,11 @@ def analyze_metadata():
                         'timestamp': datetime.now().isoformat()
                     }
                 finally:
-                    if operation_id in active_operations:
-                        del active_operations[operation_id]
+                    finish_operation(operation_id)
             
             # Store operation info
             files_count = len(uploaded_files) if uploaded_files else 0
+            operation_events.open(operation_id)
             active_operations[operation_id] = {
                 'type': 'metadata',
                 'status': 'running',
@@ -483,11 +532,18 @@ def start_download():
                 def download_worker():
                     try:
                         downloader = FileDownloader()
+
+                        def progress_callback(update):
+                            """Publish progress/throughput updates for live UI feedback"""
+                            operation_events.publish(operation_id, update)
+
                         results = downloader.download_files(
                             urls=urls,
                             download_path=download_path,
                             max_size_mb=form.max_size.data,
-                            threads=form.threads.data
+                            threads=form.threads.data,
+                            progress_callback=progress_callback,
+                            timeout=form.timeout.data
                         )
                         
                         operation_results[operation_id] = {
@@ -505,10 +561,10 @@ def start_download():
                             'timestamp': datetime.now().isoformat()
                         }
                     finally:
-                        if operation_id in active_operations:
-                            del active_operations[operation_id]
+                        finish_operation(operation_id)
                 
                 # Store operation info
+                operation_events.open(operation_id)
                 active_operations[operation_id] = {
                     'type': 'download',
                     'mode': 'manual',
@@ -550,14 +606,10 @@ def start_download():
                     try:
                         downloader = FileDownloader()
                         
-                        # Store real-time results for this operation
-                        realtime_results[operation_id] = []
-                        
                         def progress_callback(update):
-                            """Store real-time updates for live UI feedback"""
-                            realtime_results[operation_id].append({
+                            """Publish real-time updates for live UI feedback"""
+                            operation_events.publish(operation_id, {
                                 'type': update.get('type', 'unknown'),
-                                'timestamp': datetime.now().isoformat(),
                                 **update
                             })
                         
@@ -589,10 +641,10 @@ def start_download():
                             'timestamp': datetime.now().isoformat()
                         }
                     finally:
-                        if operation_id in active_operations:
-                            del active_operations[operation_id]
+                        finish_operation(operation_id)
                 
                 # Store operation info
+                operation_events.open(operation_id)
                 active_operations[operation_id] = {
                     'type': 'download',
                     'mode': 'crawler',
@@ -663,23 +715,50 @@ def operation_status(operation_id):
         'error': 'Operation not found'
     }), 404
 
+@metaspidey_bp.route('/stop/<operation_id>', methods=['POST'])
+@login_required
+def stop_operation(operation_id):
+    """Stop a running operation; results found so far are kept"""
+    
+    runner = operation_runners.get(operation_id)
+    if runner is None:
+        return jsonify({
+            'success': False,
+            'error': 'Operation not found or cannot be stopped'
+        }), 404
+    
+    if operation_id in active_operations:
+        active_operations[operation_id]['status'] = 'stopping'
+    
+    # Stopping may wait for the process to exit, so keep it off the request thread
+    threading.Thread(target=runner.stop, daemon=True).start()
+    
+    return jsonify({
+        'success': True,
+        'message': 'Stop requested'
+    })
+
 @metaspidey_bp.route('/realtime/<operation_id>')
 @login_required
 def get_realtime_results(operation_id):
-    """Get real-time results for fuzzing operations"""
+    """Get real-time events for an operation, optionally only those after ?since=<seq>"""
+    
+    since = request.args.get('since', 0, type=int)
+    results = operation_events.since(operation_id, since)
     
-    if operation_id in realtime_results:
-        results = realtime_results[operation_id]
+    if results is not None:
         return jsonify({
             'success': True,
             'results': results,
-            'count': len(results)
+            'count': len(results),
+            'last_seq': operation_events.last_seq(operation_id)
         })
     
     return jsonify({
         'success': False,
         'results': [],
-        'count': 0
+        'count': 0,
+        'last_seq': 0
     })
 
 @metaspidey_bp.route('/results/<operation_id>')
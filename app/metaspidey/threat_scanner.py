@@ -0,0 +1,458 @@
+import glob
+import os
+import re
+
+RULE_FILE_PATTERNS = ('*.yar', '*.yara', '*.rules')
+
+# Rules may span lines or sit on one line; bodies are found by matching braces
+_RULE_HEADER_RE = re.compile(r'\s*(?:(?:private|global)\s+)*rule\s+(\w+)\s*(?::\s*([\w ]+?))?\s*\{')
+_QUOTED = r'"(?:[^"\\]|\\.)*"'
+_QUOTED_RE = re.compile(_QUOTED)
+_BODY_TOKEN_RE = re.compile(_QUOTED + r'|=\s*/(?:[^/\\\n]|\\.)+/[is]*|[{}]')
+_SECTION_RE = re.compile(_QUOTED + r'|\b(meta|strings|condition)\s*:')
+_META_RE = re.compile(r'(\w+)\s*=\s*(?:"((?:[^"\\]|\\.)*)"|([^\s"]+))')
+_STRING_RE = re.compile(r'(\$\w*)\s*=\s*(?:"((?:[^"\\]|\\.)*)"|\{([^}]*)\}|/((?:[^/\\]|\\.)+)/([is]*))'
+                        r'((?:[ \t]+(?:nocase|ascii|wide|fullword|private))*)')
+_STRING_DEFINITION_RE = re.compile(r'\$\w*\s*=')
+_TOKEN_RE = re.compile(r'\s*(\$\w*\*?|#\w+|\d+|>=|<=|==|!=|>|<|\(|\)|,|[A-Za-z_]\w*)')
+
+
+class ThreatRule:
+    """
+    A YARA-like rule: named strings and a condition over them
+
+    Supported subset: text strings (with nocase/ascii/wide modifiers), hex
+    strings with ?? wildcards and [n-m] jumps, /regex/ strings with i and s
+    flags, and conditions built from $id, #id comparisons, "any/all/N of
+    them", "of ($a, $b*)", and/or/not and parentheses.
+    """
+
+    def __init__(self, name, strings, condition, tags=None, meta=None):
+        self.name = name
+        self.strings = strings  # {'$a': [(kind, pattern, nocase), ...]}
+        self.tags = tags or []
+        self.meta = meta or {}
+        self.condition_text = condition
+        self._condition = _ConditionParser(condition, list(strings), name).parse()
+
+    @property
+    def severity(self):
+        return self.meta.get('severity', 'medium').lower()
+
+    def matches(self, counts):
+        """Evaluate the condition against {string id: match count}"""
+        return bool(_evaluate(self._condition, counts))
+
+
+class ThreatScanner:
+    """
+    Multi-pattern scanner for threat indicators and rule strings
+
+    Built once per analyzer. Literal patterns are combined into a single
+    compiled alternation per case mode (which keeps the regex engine's
+    literal prefix search); case-insensitive literals are matched against a
+    lowercased copy of the data, which is much faster than an IGNORECASE
+    alternation. Literal matching overlaps: after a match the search
+    resumes one byte after its start, and the longest literal found at a
+    position also counts every shorter literal that is a prefix of it, so a
+    literal inside or overlapping another (or a rule string sharing text
+    with an indicator) is still counted. Rule regexes are compiled
+    separately. Files are streamed in chunks that carry enough bytes of the
+    previous chunk to find matches that straddle the boundary.
+    """
+
+    CHUNK_SIZE = 8 * 1024 * 1024
+    REGEX_OVERLAP = 4096  # Longest rule regex match found across a chunk boundary
+    MAX_OFFSETS = 20  # Offsets kept per pattern
+
+    def __init__(self, indicators=(), rules=()):
+        self.rules = list(rules)
+        self._labels = []
+        literals = {False: {}, True: {}}
+        self._regexes = []
+
+        for indicator in indicators:
+            literals[False].setdefault(indicator, []).append(self._add_label(indicator.decode('utf-8', errors='ignore')))
+        self.indicator_count = len(self._labels)
+
+        for rule in self.rules:
+            for string_id, variants in rule.strings.items():
+                key = self._add_label((rule.name, string_id))
+                for kind, pattern, nocase in variants:
+                    if kind == 'literal':
+                        literals[nocase].setdefault(pattern.lower() if nocase else pattern, []).append(key)
+                    else:
+                        self._regexes.append((pattern, [key]))
+
+        self._literal_patterns = []
+        for nocase, table in literals.items():
+            if table:
+                # Longest first, so the longest literal starting at a position is the one found
+                alternation = b'|'.join(re.escape(literal) for literal in sorted(table, key=len, reverse=True))
+                compiled = re.compile(alternation)
+                self._literal_patterns.append((compiled, self._prefix_table(table), nocase, max(map(len, table)) - 1))
+
+    @staticmethod
+    def _prefix_table(table):
+        """literal -> (key, length) of it and of every shorter literal that is a prefix of it"""
+        return {literal: [(key, length) for length in range(1, len(literal) + 1)
+                          if literal[:length] in table for key in table[literal[:length]]]
+                for literal in table}
+
+    def _add_label(self, label):
+        self._labels.append(label)
+        return len(self._labels) - 1
+
+    def scan(self, chunks):
+        """
+        Scan a stream of byte chunks
+
+        Args:
+            chunks: Iterable of bytes-like chunks in file order (e.g. FileView.iter_chunks())
+
+        Returns:
+            dict with 'indicators' ({indicator: {'count', 'offsets'}} for the
+            indicators that matched), 'rules' (matched rules) and 'bytes_scanned'
+        """
+        counts = [0] * len(self._labels)
+        offsets = [[] for _ in self._labels]
+
+        def record(key, position):
+            counts[key] += 1
+            if len(offsets[key]) < self.MAX_OFFSETS:
+                offsets[key].append(position)
+
+        regexes = self._regexes
+        overlaps = [literal_overlap for _, _, _, literal_overlap in self._literal_patterns]
+        if regexes:
+            overlaps.append(self.REGEX_OVERLAP)
+        overlap = max(overlaps, default=0)
+        resume = [0] * len(regexes)  # Absolute offset where each regex's last match ended
+
+        tail = b''
+        base = 0  # Absolute offset of the start of the buffer
+        for chunk in chunks:
+            buffer = tail + bytes(chunk) if tail else bytes(chunk)
+            lowered = None
+            # A match ending inside the carried tail was already seen in the previous buffer
+            for compiled, table, nocase, _ in self._literal_patterns:
+                if nocase and lowered is None:
+                    lowered = buffer.lower()
+                data = lowered if nocase else buffer
+                search = compiled.search
+                match = search(data)
+                while match is not None:
+                    start = match.start()
+                    for key, length in table[match.group()]:
+                        if start + length > len(tail):
+                            record(key, base + start)
+                    match = search(data, start + 1)
+            for index, (compiled, keys) in enumerate(regexes):
+                for match in compiled.finditer(buffer, max(0, resume[index] - base)):
+                    if match.end() <= len(tail):
+                        continue
+                    resume[index] = base + match.end()
+                    for key in keys:
+                        record(key, base + match.start())
+            keep = min(overlap, len(buffer))
+            tail = buffer[len(buffer) - keep:] if keep else b''
+            base += len(buffer) - keep
+
+        indicators = {self._labels[key]: {'count': counts[key], 'offsets': offsets[key]}
+                      for key in range(self.indicator_count) if counts[key]}
+
+        string_counts = {}
+        for key in range(self.indicator_count, len(self._labels)):
+            rule_name, string_id = self._labels[key]
+            string_counts.setdefault(rule_name, {})[string_id] = (counts[key], offsets[key])
+
+        rules = []
+        for rule in self.rules:
+            matched = string_counts.get(rule.name, {})
+            if rule.matches({string_id: count for string_id, (count, _) in matched.items()}):
+                rules.append({
+                    'rule': rule.name,
+                    'tags': rule.tags,
+                    'severity': rule.severity,
+                    'description': rule.meta.get('description', ''),
+                    'strings': {string_id: {'count': count, 'offsets': string_offsets}
+                                for string_id, (count, string_offsets) in matched.items() if count}
+                })
+
+        return {'indicators': indicators, 'rules': rules, 'bytes_scanned': base + len(tail)}
+
+def load_rules(path):
+    """
+    Load rules from a rule file or every rule file in a directory
+
+    Files that fail to parse are reported and skipped.
+
+    Returns:
+        List of ThreatRule
+    """
+    if not path or not os.path.exists(path):
+        return []
+
+    if os.path.isdir(path):
+        files = sorted(f for pattern in RULE_FILE_PATTERNS for f in glob.glob(os.path.join(path, pattern)))
+    else:
+        files = [path]
+
+    rules = []
+    for rule_file in files:
+        try:
+            with open(rule_file, 'r', encoding='utf-8') as f:
+                rules.extend(parse_rules(f.read()))
+        except (OSError, ValueError, re.error) as e:
+            print(f"Skipping threat rule file {rule_file}: {e}")
+    return rules
+
+
+def parse_rules(text):
+    """
+    Parse YARA-like rule source into ThreatRule objects
+
+    Raises:
+        ValueError: for text that is not a rule, an unterminated rule, or a
+            rule whose strings or condition cannot be parsed
+    """
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.DOTALL)
+    text = re.sub(r'^\s*//.*$', '', text, flags=re.MULTILINE)
+    text = re.sub(r'^\s*import\s+"[^"]*"\s*$', '', text, flags=re.MULTILINE)
+
+    rules = []
+    position = 0
+    while text[position:].strip():
+        header = _RULE_HEADER_RE.match(text, position)
+        if header is None:
+            snippet = ' '.join(text[position:].split())[:40]
+            raise ValueError(f'Could not parse rule text near {snippet!r}')
+        end = _rule_body_end(text, header.end(), header.group(1))
+        rules.append(_parse_rule(header.group(1), (header.group(2) or '').split(), text[header.end():end]))
+        position = end + 1
+    return rules
+
+
+def _rule_body_end(text, start, name):
+    """Offset of the brace closing a rule body, skipping quoted strings, regexes and hex strings"""
+    depth = 1
+    for token in _BODY_TOKEN_RE.finditer(text, start):
+        if token.group() == '{':
+            depth += 1
+        elif token.group() == '}':
+            depth -= 1
+            if depth == 0:
+                return token.start()
+    raise ValueError(f'Rule {name} is not terminated by "}}"')
+
+
+def _parse_rule(name, tags, body):
+    sections = {}
+    current = None
+    last = 0
+    for match in _SECTION_RE.finditer(body):
+        if match.group(1) is None:
+            continue  # A quoted string
+        if current is not None:
+            sections[current] = body[last:match.start()]
+        elif body[:match.start()].strip():
+            raise ValueError(f'Unexpected text before the sections of rule {name}')
+        current, last = match.group(1), match.end()
+    if current is not None:
+        sections[current] = body[last:]
+
+    if 'condition' not in sections:
+        raise ValueError(f'Rule {name} has no condition')
+
+    meta = {}
+    for key, quoted, bare in _META_RE.findall(sections.get('meta', '')):
+        meta[key] = _unescape(quoted).decode('utf-8', errors='replace') if quoted or not bare else bare
+
+    strings = {}
+    anonymous = 0
+    string_source = sections.get('strings', '')
+    definitions = _STRING_RE.findall(string_source)
+    if len(definitions) != len(_STRING_DEFINITION_RE.findall(_QUOTED_RE.sub('""', string_source))):
+        raise ValueError(f'Unsupported string definition in rule {name}')
+    for string_id, text_value, hex_value, regex_value, regex_flags, modifiers in definitions:
+        if string_id == '$':
+            anonymous += 1
+            string_id = f'$_{anonymous}'
+        modifiers = modifiers.split()
+        if hex_value:
+            strings[string_id] = [_hex_pattern(hex_value, name)]
+        elif regex_value:
+            flags = (re.IGNORECASE if 'i' in regex_flags else 0) | (re.DOTALL if 's' in regex_flags else 0)
+            strings[string_id] = [('regex', re.compile(regex_value.encode('utf-8'), flags), False)]
+        else:
+            strings[string_id] = _text_patterns(_unescape(text_value), modifiers)
+
+    return ThreatRule(name, strings, ' '.join(sections['condition'].split()), tags, meta)
+
+
+_ESCAPES = {'n': b'\n', 't': b'\t', 'r': b'\r', '"': b'"', '\\': b'\\'}
+
+
+def _unescape(value):
+    """Bytes of a quoted rule string, resolving \\n, \\t, \\r, \\", \\\\ and \\xHH escapes"""
+    return re.sub(rb'\\(x[0-9A-Fa-f]{2}|.)',
+                  lambda m: bytes.fromhex(m.group(1)[1:].decode()) if m.group(1).startswith(b'x')
+                  else _ESCAPES.get(m.group(1).decode('latin-1'), m.group(0)),
+                  value.encode('utf-8'))
+
+
+def _text_patterns(value, modifiers):
+    nocase = 'nocase' in modifiers
+    encodings = []
+    if 'ascii' in modifiers or 'wide' not in modifiers:
+        encodings.append(value)
+    if 'wide' in modifiers:
+        encodings.append(b''.join(bytes([byte, 0]) for byte in value))
+    return [('literal', encoded, nocase) for encoded in encodings]
+
+
+def _hex_pattern(value, rule_name):
+    tokens = re.findall(r'\?\?|[0-9A-Fa-f]{2}|\[\s*\d*\s*-?\s*\d*\s*\]|\S', value)
+    if all(re.fullmatch(r'[0-9A-Fa-f]{2}', token) for token in tokens):
+        return ('literal', bytes.fromhex(''.join(tokens)), False)
+
+    parts = []
+    for token in tokens:
+        if token == '??':
+            parts.append(b'.')
+        elif re.fullmatch(r'[0-9A-Fa-f]{2}', token):
+            parts.append(re.escape(bytes.fromhex(token)))
+        elif token.startswith('['):
+            low, _, high = token.strip('[] ').partition('-')
+            if '-' in token:
+                parts.append(b'.{%d,%s}' % (int(low or 0), high.strip().encode()))
+            else:
+                parts.append(b'.{%d}' % int(low))
+        else:
+            raise ValueError(f'Unsupported hex string token {token!r} in rule {rule_name}')
+    return ('regex', re.compile(b''.join(parts), re.DOTALL), False)
+
+
+class _ConditionParser:
+    """Recursive-descent parser for the supported condition subset"""
+
+    def __init__(self, text, string_ids, rule_name):
+        self.tokens = _TOKEN_RE.findall(text)
+        if ''.join(self.tokens) != text.replace(' ', ''):
+            raise ValueError(f'Unsupported condition in rule {rule_name}: {text}')
+        self.position = 0
+        self.string_ids = string_ids
+        self.rule_name = rule_name
+
+    def parse(self):
+        node = self._or()
+        if self.position != len(self.tokens):
+            raise ValueError(f'Unexpected {self.tokens[self.position]!r} in condition of rule {self.rule_name}')
+        return node
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _next(self, expected=None):
+        token = self._peek()
+        if token is None or (expected and token != expected):
+            raise ValueError(f'Expected {expected or "more"} in condition of rule {self.rule_name}')
+        self.position += 1
+        return token
+
+    def _or(self):
+        node = self._and()
+        while self._peek() == 'or':
+            self._next()
+            node = ('or', node, self._and())
+        return node
+
+    def _and(self):
+        node = self._not()
+        while self._peek() == 'and':
+            self._next()
+            node = ('and', node, self._not())
+        return node
+
+    def _not(self):
+        if self._peek() == 'not':
+            self._next()
+            return ('not', self._not())
+        return self._primary()
+
+    def _primary(self):
+        token = self._next()
+        if token == '(':
+            node = self._or()
+            self._next(')')
+            return node
+        if token in ('true', 'false'):
+            return ('const', token == 'true')
+        if token in ('any', 'all') or token.isdigit():
+            if self._peek() != 'of':
+                if token.isdigit():
+                    return ('const', int(token))
+                raise ValueError(f'Expected "of" after {token!r} in rule {self.rule_name}')
+            self._next('of')
+            return ('of', token, self._string_set())
+        if token.startswith('#'):
+            operator = self._next()
+            if operator not in ('>', '<', '>=', '<=', '==', '!='):
+                raise ValueError(f'Expected comparison after {token} in rule {self.rule_name}')
+            return ('count', '$' + token[1:], operator, int(self._next()))
+        if token.startswith('$'):
+            self._check_id(token)
+            return ('string', token)
+        raise ValueError(f'Unsupported condition term {token!r} in rule {self.rule_name}')
+
+    def _string_set(self):
+        if self._peek() == 'them':
+            self._next()
+            return list(self.string_ids)
+        self._next('(')
+        ids = []
+        while True:
+            token = self._next()
+            if token.endswith('*'):
+                ids.extend(string_id for string_id in self.string_ids if string_id.startswith(token[:-1]))
+            else:
+                self._check_id(token)
+                ids.append(token)
+            if self._peek() != ',':
+                break
+            self._next(',')
+        self._next(')')
+        return ids
+
+    def _check_id(self, string_id):
+        if string_id not in self.string_ids:
+            raise ValueError(f'Undefined string {string_id} in rule {self.rule_name}')
+
+
+_COMPARISONS = {
+    '>': lambda a, b: a > b, '<': lambda a, b: a < b, '>=': lambda a, b: a >= b,
+    '<=': lambda a, b: a <= b, '==': lambda a, b: a == b, '!=': lambda a, b: a != b,
+}
+
+
+def _evaluate(node, counts):
+    kind = node[0]
+    if kind == 'or':
+        return _evaluate(node[1], counts) or _evaluate(node[2], counts)
+    if kind == 'and':
+        return _evaluate(node[1], counts) and _evaluate(node[2], counts)
+    if kind == 'not':
+        return not _evaluate(node[1], counts)
+    if kind == 'const':
+        return node[1]
+    if kind == 'string':
+        return counts.get(node[1], 0) > 0
+    if kind == 'count':
+        return _COMPARISONS[node[2]](counts.get(node[1], 0), node[3])
+    # 'of': quantifier over a set of strings
+    matched = sum(1 for string_id in node[2] if counts.get(string_id, 0) > 0)
+    if node[1] == 'any':
+        return matched >= 1
+    if node[1] == 'all':
+        return matched == len(node[2])
+    return matched >= int(node[1])
@@ -0,0 +1,325 @@
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import tempfile
+import threading
+
+
+def iter_wordlist(path, skip_comments=True):
+    """
+    Lazily yield the entries of a wordlist
+
+    The file is memory-mapped and split on newlines as it is consumed, so
+    even multi-gigabyte lists are streamed without being loaded into memory.
+
+    Args:
+        path: Path to a newline separated wordlist
+        skip_comments: Skip lines starting with '#'
+
+    Yields:
+        Stripped, non-empty entries decoded as UTF-8
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 0
+            while start < size:
+                end = mm.find(b'\n', start)
+                if end == -1:
+                    end = size
+                line = mm[start:end].strip()
+                start = end + 1
+
+                if not line or (skip_comments and line.startswith(b'#')):
+                    continue
+                yield line.decode('utf-8', errors='ignore')
+
+
+class WordlistCatalog:
+    """
+    Persisted index of the wordlists below a directory
+
+    Each entry records the path, size, mtime, line count and SHA-256 of a
+    wordlist. The index is stored next to the wordlists and only files whose
+    size or mtime changed are re-read on refresh, so loading the catalog for
+    a form is a single JSON read.
+    """
+
+    INDEX_FILE = '.wordlist_catalog.json'
+    MERGED_DIR = '.merged'
+    WORDLIST_EXTENSIONS = ('.txt', '.lst', '.list', '.dic')
+    MERGE_RUN_ENTRIES = 500000  # entries sorted in memory per run when merging
+
+    # Loaded indexes by root, reused while the index file is unchanged
+    _cache = {}
+    _cache_lock = threading.Lock()
+    _building = set()  # Roots being indexed by refresh_async
+    _write_lock = threading.RLock()  # Serializes read-modify-write updates of an index
+
+    def __init__(self, root):
+        self.root = os.path.abspath(os.path.expanduser(root))
+        self.index_path = os.path.join(self.root, self.INDEX_FILE)
+
+    def entries(self, background=False):
+        """
+        List the catalogued wordlists, building the index on first use
+
+        Args:
+            background: Build a missing index on a background thread and return no
+                entries meanwhile, for callers that must not wait for every list to be read
+
+        Returns:
+            List of dictionaries with name, path, category, size, mtime, lines and sha256
+        """
+        try:
+            index_mtime = os.stat(self.index_path).st_mtime_ns
+        except FileNotFoundError:
+            if not os.path.isdir(self.root):
+                return []
+            if background:
+                self.refresh_async()
+                return []
+            return self.refresh()
+
+        with self._cache_lock:
+            cached = self._cache.get(self.root)
+            if cached and cached[0] == index_mtime:
+                return cached[1]
+
+        try:
+            with open(self.index_path, 'r') as f:
+                entries = json.load(f).get('wordlists', [])
+        except (OSError, ValueError) as e:
+            print(f"Error reading wordlist catalog {self.index_path}: {e}")
+            if background:
+                self.refresh_async()
+                return []
+            return self.refresh()
+
+        with self._cache_lock:
+            self._cache[self.root] = (index_mtime, entries)
+        return entries
+
+    def refresh(self, progress_callback=None):
+        """
+        Rescan the directory and persist the index
+
+        Files whose size and mtime match the existing index are not re-read.
+
+        Args:
+            progress_callback: Function called with a status message per indexed file
+
+        Returns:
+            List of catalog entries
+        """
+        previous = {}
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r') as f:
+                    previous = {entry['path']: entry for entry in json.load(f).get('wordlists', [])}
+            except (OSError, ValueError):
+                previous = {}
+
+        entries = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith('.') or d == self.MERGED_DIR)
+            for filename in sorted(filenames):
+                if not filename.lower().endswith(self.WORDLIST_EXTENSIONS):
+                    continue
+
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+
+                entry = previous.get(path)
+                if not entry or entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime:
+                    if progress_callback:
+                        progress_callback(f"Indexing {filename}...")
+                    lines, sha256 = self._scan(path)
+                    relative = os.path.relpath(path, self.root)
+                    entry = {
+                        'name': filename,
+                        'path': path,
+                        'category': relative.split(os.sep)[-2] if os.sep in relative else 'Other',
+                        'size': stat.st_size,
+                        'mtime': stat.st_mtime,
+                        'lines': lines,
+                        'sha256': sha256
+                    }
+                entries.append(entry)
+
+        with self._write_lock:
+            self._save(entries)
+        return entries
+
+    def refresh_async(self):
+        """
+        Refresh on a background thread
+
+        Returns:
+            True if started, False when this root is already being refreshed
+        """
+        with self._cache_lock:
+            if self.root in self._building:
+                return False
+            self._building.add(self.root)
+
+        def run():
+            try:
+                self.refresh()
+            except OSError as e:
+                print(f"Error indexing wordlists in {self.root}: {e}")
+            finally:
+                with self._cache_lock:
+                    self._building.discard(self.root)
+
+        threading.Thread(target=run, name=f'wordlist-catalog {self.root}', daemon=True).start()
+        return True
+
+    @property
+    def building(self):
+        """Whether refresh_async is indexing this root"""
+        with self._cache_lock:
+            return self.root in self._building
+
+    def find(self, path):
+        """Catalog entry for a path, or None if it is not a catalogued wordlist"""
+        path = os.path.abspath(path)
+        for entry in self.entries():
+            if entry['path'] == path:
+                return entry
+        return None
+
+    def merge(self, paths):
+        """
+        Merge several wordlists into one sorted file without duplicates
+
+        Merged lists are content-addressed by their sources' hashes, so
+        merging the same selection again reuses the existing file. Sorting
+        is done in bounded runs that are then k-way merged, so memory use
+        does not depend on the size of the inputs.
+
+        Args:
+            paths: Paths of catalogued wordlists
+
+        Returns:
+            Catalog entry of the merged wordlist
+        """
+        sources = []
+        for path in paths:
+            entry = self.find(path)
+            if entry is None:
+                raise ValueError(f"Not a catalogued wordlist: {path}")
+            sources.append(entry)
+
+        if len(sources) == 1:
+            return sources[0]
+
+        key = hashlib.sha256(''.join(sorted(s['sha256'] for s in sources)).encode()).hexdigest()[:16]
+        merged_dir = os.path.join(self.root, self.MERGED_DIR)
+        output_path = os.path.join(merged_dir, f"merged_{key}.txt")
+
+        if not os.path.exists(output_path):
+            os.makedirs(merged_dir, exist_ok=True)
+            self._external_sort_unique([s['path'] for s in sources], output_path)
+
+        return self.refresh_entry(output_path)
+
+    def refresh_entry(self, path):
+        """Index a single file and add or update its catalog entry"""
+        stat = os.stat(path)
+        lines, sha256 = self._scan(path)
+        relative = os.path.relpath(path, self.root)
+        entry = {
+            'name': os.path.basename(path),
+            'path': path,
+            'category': relative.split(os.sep)[-2] if os.sep in relative else 'Other',
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'lines': lines,
+            'sha256': sha256
+        }
+        with self._write_lock:
+            # Read under the lock so concurrent merges do not drop each other's entries
+            entries = [existing for existing in self.entries() if existing['path'] != path]
+            entries.append(entry)
+            self._save(entries)
+        return entry
+
+    def _external_sort_unique(self, paths, output_path):
+        """Sort and deduplicate the entries of several wordlists into output_path"""
+        run_files = []
+        try:
+            chunk = set()
+            for path in paths:
+                for word in iter_wordlist(path):
+                    chunk.add(word)
+                    if len(chunk) >= self.MERGE_RUN_ENTRIES:
+                        run_files.append(self._write_run(chunk, output_path))
+                        chunk = set()
+            if chunk or not run_files:
+                run_files.append(self._write_run(chunk, output_path))
+
+            handles = [open(run, 'r', encoding='utf-8') for run in run_files]
+            try:
+                # A name of its own: the same selection may be merged by two jobs at once
+                fd, temp_output = tempfile.mkstemp(prefix='.merge_', dir=os.path.dirname(output_path))
+                run_files.append(temp_output)  # Removed below unless it replaced the output
+                with os.fdopen(fd, 'w', encoding='utf-8') as out:
+                    previous = None
+                    for line in heapq.merge(*handles):
+                        if line != previous:
+                            out.write(line)
+                            previous = line
+                os.replace(temp_output, output_path)
+            finally:
+                for handle in handles:
+                    handle.close()
+        finally:
+            for run in run_files:
+                if os.path.exists(run):
+                    os.unlink(run)
+
+    def _write_run(self, words, output_path):
+        """Write one sorted run next to the output file"""
+        fd, run_path = tempfile.mkstemp(prefix='.run_', dir=os.path.dirname(output_path))
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            # Sort whole lines so runs are ordered exactly as heapq.merge compares them
+            f.writelines(sorted(word + '\n' for word in words))
+        return run_path
+
+    def _scan(self, path):
+        """Line count and SHA-256 of a file in one pass"""
+        digest = hashlib.sha256()
+        lines = 0
+        last = b''
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+                lines += chunk.count(b'\n')
+                last = chunk
+        if last and not last.endswith(b'\n'):
+            lines += 1
+        return lines, digest.hexdigest()
+
+    def _save(self, entries):
+        """Write the index atomically and refresh the in-process cache"""
+        os.makedirs(self.root, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=self.INDEX_FILE + '.', dir=self.root)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'root': self.root, 'wordlists': entries}, f)
+            os.replace(temp_path, self.index_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+        with self._cache_lock:
+            self._cache[self.root] = (os.stat(self.index_path).st_mtime_ns, entries)
@@ -31,6 +31,12 @@ document.addEventListener('DOMContentLoaded', function() {
     // Initialize upload functionality
     initializeUpload();
     
+    // Load the directory listing into the virtualized table
+    initializeFileList();
+
+    // Apply changes of the open directory as they happen
+    initializeLiveUpdates();
+    
     // Add fade-in animations to table rows
     addTableAnimations();
     
@@ -81,7 +87,7 @@ function initializeSudoModal() {
                 if (data.success) {
                     sudoPasswordModal.hide();
                     showAlert(`${currentItemIsDirForSudo ? 'Folder' : 'File'} '${currentItemNameForSudo}' deleted successfully!`, 'success');
-                    setTimeout(() => location.reload(), 1000);
+                    refreshAfterChange();
                 } else {
                     showSudoError(data.error || 'Unknown error occurred');
                     sudoPasswordInput.value = '';
@@ -153,6 +159,16 @@ function initializeSearch() {
             }
         });
     }
+
+    const searchModeSelect = document.getElementById('search_mode');
+    if (searchModeSelect && searchQueryInput) {
+        searchModeSelect.addEventListener('change', function() {
+            const query = searchQueryInput.value.trim();
+            if (query) {
+                performSearch(query);
+            }
+        });
+    }
 }
 
 function initializePathNavigation() {
@@ -304,7 +320,7 @@ function getCurrentPath() {
     return '/';
 }
 
-async function performSearch(query) {
+async function performSearch(query, page = 1) {
     const searchInput = document.getElementById('search_query');
     const originalPlaceholder = searchInput ? searchInput.placeholder : '';
     
@@ -322,12 +338,20 @@ async function performSearch(query) {
     try {
         const currentPath = getCurrentPath();
         const showHidden = document.getElementById('showHidden') ? document.getElementById('showHidden').checked : false;
+        const modeSelect = document.getElementById('search_mode');
+        const params = new URLSearchParams({
+            query: query,
+            path: currentPath,
+            show_hidden: showHidden,
+            mode: modeSelect ? modeSelect.value : 'substring',
+            page: page
+        });
         
-        const response = await fetch(`/file_manager/search?query=${encodeURIComponent(query)}&path=${encodeURIComponent(currentPath)}&show_hidden=${showHidden}`);
+        const response = await fetch(`/file_manager/search?${params}`);
         const data = await response.json();
         
         if (data.success) {
-            displaySearchResults(data.items, query);
+            displaySearchResults(data.items, query, data);
             currentSearchQuery = query;
         } else {
             showAlert(`Search error: ${data.error}`, 'danger');
@@ -344,10 +368,11 @@ async function performSearch(query) {
     }
 }
 
-function displaySearchResults(items, query) {
+function displaySearchResults(items, query, data = {}) {
     const searchResultsContainer = document.getElementById('searchResults');
     const searchResultsBody = document.getElementById('searchResultsBody');
     const searchQuerySpan = document.getElementById('searchQuery');
+    const searchFooter = document.getElementById('searchResultsFooter');
     
     if (!searchResultsContainer || !searchResultsBody || !searchQuerySpan) {
         console.error('Search results elements not found');
@@ -355,14 +380,18 @@ function displaySearchResults(items, query) {
     }
     
     const fileListContainer = searchResultsContainer.nextElementSibling;
+    const page = data.page || 1;
+    const total = data.total !== undefined ? data.total : items.length;
     
     // Update query display
     searchQuerySpan.textContent = `"${query}"`;
     
-    // Clear previous results
-    searchResultsBody.innerHTML = '';
+    // Clear previous results, unless this is the next page of the same search
+    if (page === 1) {
+        searchResultsBody.innerHTML = '';
+    }
     
-    if (items.length === 0) {
+    if (items.length === 0 && page === 1) {
         searchResultsBody.innerHTML = `
             <tr>
                 <td colspan="8" class="empty-state">
@@ -371,7 +400,7 @@ function displaySearchResults(items, query) {
                     </div>
                     <div class="empty-state-title">No results found</div>
                     <div class="empty-state-description">
-                        No files or folders found matching "${query}"
+                        No files or folders found matching "${escapeHtml(query)}"
                     </div>
                 </td>
             </tr>
@@ -380,19 +409,37 @@ function displaySearchResults(items, query) {
         // Populate results
         items.forEach((item, index) => {
             const row = createFileRow(item, true);
-            row.style.animationDelay = `${index * 50}ms`;
+            row.style.animationDelay = `${Math.min(index, 20) * 50}ms`;
             row.classList.add('fade-in');
             searchResultsBody.appendChild(row);
         });
     }
     
+    if (searchFooter) {
+        const source = data.source === 'index'
+            ? '<i class="bi bi-lightning-charge me-1"></i>From the filename index'
+            : (data.index && data.index.building ? '<i class="bi bi-hourglass-split me-1"></i>Indexing this folder for faster searches' : '');
+        searchFooter.innerHTML = `
+            <small class="text-muted">${source}</small>
+            ${data.has_more ? `<button type="button" class="btn btn-sm btn-outline-primary" id="searchLoadMore">
+                Load more (${data.total_approximate ? 'up to ' : ''}${(total - page * data.limit).toLocaleString()} left)
+            </button>` : ''}
+        `;
+        const loadMore = document.getElementById('searchLoadMore');
+        if (loadMore) {
+            loadMore.addEventListener('click', () => performSearch(query, page + 1));
+        }
+    }
+    
     // Show search results and hide file list
     searchResultsContainer.style.display = 'block';
     if (fileListContainer) {
         fileListContainer.style.display = 'none';
     }
     
-    showAlert(`Found ${items.length} item(s) matching "${query}"`, 'info');
+    if (page === 1) {
+        showAlert(`Found ${data.total_approximate ? 'up to ' : ''}${total} item(s) matching "${query}"`, 'info');
+    }
 }
 
 function createFileRow(item, isSearchResult = false) {
@@ -465,6 +512,11 @@ function createFileRow(item, isSearchResult = false) {
                         <i class="bi bi-download"></i>
                     </button>` : ''
                 }
+                ${item.is_readable && item.is_dir ? 
+                    `<button type="button" class="file-action-btn btn-outline-secondary" onclick="downloadArchive('${escapedPath}', event.shiftKey ? 'tar.gz' : 'zip')" title="Download as .zip (Shift: .tar.gz)">
+                        <i class="bi bi-file-earmark-zip"></i>
+                    </button>` : ''
+                }
                 <button type="button" class="file-action-btn btn-outline-warning" onclick="showRenameModal('${escapedName}', '${escapedPath}')" title="Rename">
                     <i class="bi bi-pencil"></i>
                 </button>
@@ -478,6 +530,379 @@ function createFileRow(item, isSearchResult = false) {
     return row;
 }
 
+// Virtualized directory listing: pages come from /file_manager/api/list as the user
+// scrolls, and only the rows in view (plus a margin) exist in the DOM
+const LIST_PAGE_SIZE = 200;
+const LIST_ROW_BUFFER = 20;
+let fileList = null;
+
+class VirtualFileList {
+    constructor(container, tbody, status) {
+        this.container = container;
+        this.tbody = tbody;
+        this.status = status;
+        this.path = container.dataset.path;
+        this.showHidden = container.dataset.showHidden === 'true';
+        this.rowHeight = 45;  // Replaced by the measured height of the first row
+        this.renderQueued = false;
+        this.container.addEventListener('scroll', () => this.scheduleRender());
+        window.addEventListener('resize', () => this.scheduleRender());
+    }
+
+    load(sort = 'name', order = 'asc', filter = '') {
+        if (this.abort) {
+            this.abort.abort();
+        }
+        this.abort = new AbortController();
+        this.sort = sort;
+        this.order = order;
+        this.filter = filter;
+        this.items = [];
+        this.total = null;
+        this.cursor = null;
+        this.done = false;
+        this.loading = false;
+        this.error = null;
+        this.container.scrollTop = 0;
+
+        if (sort === 'scan') {
+            this.stream();
+        } else {
+            this.fetchPage();
+        }
+    }
+
+    listParams() {
+        const params = new URLSearchParams({ path: this.path, show_hidden: this.showHidden });
+        if (this.filter) {
+            params.set('filter', this.filter);
+        }
+        return params;
+    }
+
+    async fetchPage() {
+        if (this.loading || this.done) return;
+        this.loading = true;
+        const params = this.listParams();
+        params.set('sort', this.sort);
+        params.set('order', this.order);
+        params.set('limit', LIST_PAGE_SIZE);
+        if (this.cursor) {
+            params.set('cursor', this.cursor);
+        }
+
+        const signal = this.abort.signal;
+        try {
+            const response = await fetch(`/file_manager/api/list?${params}`, { signal });
+            const data = await response.json();
+            if (!data.success) {
+                throw new Error(data.error || 'Failed to list directory');
+            }
+            this.items.push(...data.items);
+            this.total = data.total;
+            this.cursor = data.next_cursor;
+            this.done = !data.next_cursor;
+        } catch (error) {
+            if (error.name === 'AbortError') return;
+            this.error = error.message;
+            this.done = true;
+        } finally {
+            if (!signal.aborted) {
+                this.loading = false;
+                this.render();
+            }
+        }
+    }
+
+    async stream() {
+        // Disk order: rows are shown as the server scans the directory
+        this.loading = true;
+        const signal = this.abort.signal;
+        try {
+            const response = await fetch(`/file_manager/api/list/stream?${this.listParams()}`, { signal });
+            if (!response.ok) {
+                const data = await response.json();
+                throw new Error(data.error || 'Failed to list directory');
+            }
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+                for (const line of lines) {
+                    if (!line) continue;
+                    const entry = JSON.parse(line);
+                    if (entry.done) {
+                        this.total = entry.total;
+                    } else if (entry.error) {
+                        this.error = entry.error;
+                    } else {
+                        this.items.push(entry);
+                    }
+                }
+                this.scheduleRender();
+            }
+        } catch (error) {
+            if (error.name === 'AbortError') return;
+            this.error = error.message;
+        }
+        this.done = true;
+        this.loading = false;
+        this.total = this.items.length;
+        this.render();
+    }
+
+    scheduleRender() {
+        if (this.renderQueued) return;
+        this.renderQueued = true;
+        requestAnimationFrame(() => {
+            this.renderQueued = false;
+            this.render();
+        });
+    }
+
+    render() {
+        const count = this.total !== null ? this.total : this.items.length;
+        this.updateStatus(count);
+
+        if (this.done && count === 0) {
+            this.tbody.innerHTML = '';
+            this.tbody.appendChild(this.createEmptyRow());
+            return;
+        }
+
+        // Visible range, from the scroll offset relative to the top of the list body
+        const bodyTop = this.tbody.getBoundingClientRect().top - this.container.getBoundingClientRect().top + this.container.scrollTop;
+        const viewTop = Math.max(0, this.container.scrollTop - bodyTop);
+        const visibleRows = Math.ceil(this.container.clientHeight / this.rowHeight);
+        const first = Math.max(0, Math.floor(viewTop / this.rowHeight) - LIST_ROW_BUFFER);
+        const last = Math.min(count, first + visibleRows + 2 * LIST_ROW_BUFFER);
+
+        const fragment = document.createDocumentFragment();
+        fragment.appendChild(this.createSpacer(first * this.rowHeight));
+        for (let i = first; i < last; i++) {
+            fragment.appendChild(i < this.items.length ? createFileRow(this.items[i]) : this.createPlaceholderRow());
+        }
+        fragment.appendChild(this.createSpacer((count - last) * this.rowHeight));
+        this.tbody.replaceChildren(fragment);
+
+        const sample = this.tbody.children[1];
+        if (sample && last > first && sample.offsetHeight && Math.abs(sample.offsetHeight - this.rowHeight) > 1) {
+            this.rowHeight = sample.offsetHeight;
+            this.scheduleRender();
+        }
+
+        // Fetch the next page before the user reaches the end of the loaded rows
+        if (!this.done && this.sort !== 'scan' && last + LIST_ROW_BUFFER >= this.items.length) {
+            this.fetchPage();
+        }
+    }
+
+    createSpacer(height) {
+        const row = document.createElement('tr');
+        row.className = 'virtual-spacer';
+        row.style.height = `${height}px`;
+        return row;
+    }
+
+    createPlaceholderRow() {
+        const row = document.createElement('tr');
+        row.className = 'virtual-placeholder';
+        row.innerHTML = '<td colspan="8" class="text-muted"><span class="spinner-border spinner-border-sm me-2"></span>Loading...</td>';
+        return row;
+    }
+
+    createEmptyRow() {
+        const row = document.createElement('tr');
+        const hint = this.filter ? `No names contain "${escapeHtml(this.filter)}".` : 'This directory appears to be empty.';
+        row.innerHTML = `
+            <td colspan="8" class="empty-state">
+                <div class="empty-state-icon"><i class="bi bi-folder-x"></i></div>
+                <div class="empty-state-title">No items found</div>
+                <div class="empty-state-description">
+                    ${this.error ? escapeHtml(this.error) : hint}
+                    ${!this.showHidden && !this.error ? `<br><small class="text-muted">
+                        <i class="bi bi-info-circle me-1"></i>
+                        Hidden files are not shown. Toggle "Hidden Files" to display them.
+                    </small>` : ''}
+                </div>
+            </td>
+        `;
+        return row;
+    }
+
+    updateStatus(count) {
+        if (!this.status) return;
+        if (this.error) {
+            this.status.innerHTML = `<span class="text-danger"><i class="bi bi-exclamation-circle me-1"></i>${escapeHtml(this.error)}</span>`;
+        } else if (!this.done) {
+            this.status.textContent = `Loading... ${this.items.length.toLocaleString()} of ${this.total !== null ? count.toLocaleString() : '?'} items`;
+        } else {
+            this.status.textContent = `${count.toLocaleString()} items`;
+        }
+        if (this.live && !this.error) {
+            const title = this.live === 'polling' ? 'Changes are checked every few seconds' : 'Changes appear as they happen';
+            this.status.insertAdjacentHTML('beforeend', ` <span class="badge bg-success ms-1" title="${title}"><i class="bi bi-broadcast me-1"></i>Live</span>`);
+        }
+    }
+
+    // Same order as the server's sort keys: directories first, then the sort field, then the name
+    compareItems(a, b) {
+        if (a.is_dir !== b.is_dir) return a.is_dir ? -1 : 1;
+        const fields = (item) => [
+            this.sort === 'size' ? item.size_bytes : this.sort === 'mtime' ? (item.mtime || 0) : item.name.toLowerCase(),
+            item.name.toLowerCase(),
+            item.name
+        ];
+        const left = fields(a);
+        const right = fields(b);
+        for (let i = 0; i < left.length; i++) {
+            if (left[i] !== right[i]) {
+                const order = left[i] < right[i] ? -1 : 1;
+                return this.order === 'desc' ? -order : order;
+            }
+        }
+        return 0;
+    }
+
+    insertPosition(item) {
+        if (this.sort === 'scan') return this.items.length;
+        let low = 0;
+        let high = this.items.length;
+        while (low < high) {
+            const middle = (low + high) >> 1;
+            if (this.compareItems(this.items[middle], item) <= 0) {
+                low = middle + 1;
+            } else {
+                high = middle;
+            }
+        }
+        return low;
+    }
+
+    isListed(item) {
+        if (!this.showHidden && item.name.startsWith('.')) return false;
+        return !this.filter || item.name.toLowerCase().includes(this.filter.toLowerCase());
+    }
+
+    // Apply the changes pushed for this directory to the loaded rows. Entries that sort past the
+    // last loaded page only change the total; the server returns them with the next page.
+    applyChanges(changes) {
+        for (const change of changes) {
+            if (change.type === 'rescan') {
+                this.load(this.sort, this.order, this.filter);
+                return;
+            }
+            if (change.type === 'gone') {
+                this.items = [];
+                this.total = 0;
+                this.done = true;
+                this.live = null;
+                this.error = 'This directory was deleted or moved.';
+                break;
+            }
+
+            const index = this.items.findIndex(item => item.name === change.name);
+            const listed = change.item && this.isListed(change.item);
+            if (index >= 0) {
+                this.items.splice(index, 1);
+                if (!listed && this.total !== null) this.total--;
+            } else if (change.type === 'deleted' && this.total !== null && !this.done && this.isListed({ name: change.name })) {
+                this.total--;  // It was on a page not loaded yet
+            }
+            if (listed) {
+                const position = this.insertPosition(change.item);
+                if (position < this.items.length || this.done) {
+                    this.items.splice(position, 0, change.item);
+                }
+                if (index < 0 && change.type === 'created' && this.total !== null) this.total++;
+            }
+        }
+        this.scheduleRender();
+    }
+}
+
+function initializeFileList() {
+    const container = document.getElementById('fileListContainer');
+    const tbody = document.getElementById('fileListBody');
+    if (!container || !tbody || !container.dataset.path) return;
+
+    fileList = new VirtualFileList(container, tbody, document.getElementById('fileListStatus'));
+
+    const sortSelect = document.getElementById('listSort');
+    const orderButton = document.getElementById('listOrder');
+    const filterInput = document.getElementById('listFilter');
+    const reload = () => fileList.load(
+        sortSelect ? sortSelect.value : 'name',
+        orderButton ? orderButton.dataset.order : 'asc',
+        filterInput ? filterInput.value.trim() : ''
+    );
+
+    if (sortSelect) {
+        sortSelect.addEventListener('change', reload);
+    }
+    if (orderButton) {
+        orderButton.addEventListener('click', function() {
+            this.dataset.order = this.dataset.order === 'asc' ? 'desc' : 'asc';
+            this.querySelector('i').className = this.dataset.order === 'asc' ? 'bi bi-sort-down-alt' : 'bi bi-sort-up';
+            reload();
+        });
+    }
+    if (filterInput) {
+        let filterTimeout;
+        filterInput.addEventListener('input', function() {
+            clearTimeout(filterTimeout);
+            filterTimeout = setTimeout(reload, 300);
+        });
+    }
+
+    reload();
+}
+
+// Live updates: the server watches the open directory (inotify, or polling where that is not
+// available) and pushes created, deleted and modified entries over Socket.IO
+let liveSocket = null;
+
+function initializeLiveUpdates() {
+    if (!fileList || typeof io === 'undefined') return;
+
+    let connectedBefore = false;
+    liveSocket = io('/file_manager');
+    liveSocket.on('connect', () => {
+        liveSocket.emit('watch', { path: fileList.path }, (reply) => {
+            if (!reply || !reply.success) return;
+            fileList.livePath = reply.path;
+            fileList.live = reply.backend;
+            if (connectedBefore) {
+                // Changes made while disconnected were not pushed
+                fileList.load(fileList.sort, fileList.order, fileList.filter);
+            } else {
+                fileList.scheduleRender();
+            }
+            connectedBefore = true;
+        });
+    });
+    liveSocket.on('disconnect', () => {
+        fileList.live = null;
+        fileList.scheduleRender();
+    });
+    liveSocket.on('changes', (payload) => {
+        if (payload.path === fileList.livePath) {
+            fileList.applyChanges(payload.changes);
+        }
+    });
+}
+
+// After creating, renaming, deleting or uploading: live listings receive the change, others reload
+function refreshAfterChange() {
+    if (fileList && fileList.live) return;
+    setTimeout(() => location.reload(), 1000);
+}
+
 function escapeHtml(text) {
     const map = {
         '&': '&amp;',
@@ -676,7 +1101,7 @@ async function createFile() {
         
         if (data.success) {
             showAlert('File created successfully!', 'success');
-            setTimeout(() => location.reload(), 1000);
+            refreshAfterChange();
         } else {
             showAlert('Error: ' + data.error, 'danger');
         }
@@ -714,7 +1139,7 @@ async function createFolder() {
         
         if (data.success) {
             showAlert('Folder created successfully!', 'success');
-            setTimeout(() => location.reload(), 1000);
+            refreshAfterChange();
         } else {
             showAlert('Error: ' + data.error, 'danger');
         }
@@ -753,7 +1178,7 @@ async function deleteItem(itemName, isDir, fullPath) {
 
         if (response.ok && data.success) {
             showAlert(`${itemType.charAt(0).toUpperCase() + itemType.slice(1)} deleted successfully!`, 'success');
-            setTimeout(() => location.reload(), 1000);
+            refreshAfterChange();
         } else if (response.status === 403 && data.requires_sudo) {
             // Show sudo modal
             currentItemPathForSudo = fullPath;
@@ -778,37 +1203,149 @@ async function deleteItem(itemName, isDir, fullPath) {
     }
 }
 
-async function viewFile(fileName, filePath) {
+// The viewer loads one page of lines at a time; follow polls for lines
+// appended to the file, like tail -f
+const VIEWER_PAGE_LINES = 500;
+const VIEWER_FOLLOW_INTERVAL = 2000;
+const VIEWER_MAX_FOLLOW_CHARS = 2 * 1024 * 1024;
+let viewerPath = null;
+let viewerPage = null;
+let viewerFollowTimer = null;
+
+async function viewFile(fileName, filePath, line = null) {
     const viewerFileNameElement = document.getElementById('viewerFileName');
-    const fileContentElement = document.getElementById('fileContent');
+    const modalElement = document.getElementById('fileViewerModal');
     
     if (viewerFileNameElement) {
         viewerFileNameElement.textContent = fileName;
     }
-    if (fileContentElement) {
-        fileContentElement.textContent = 'Loading file content...';
+    if (!modalElement.dataset.stopOnHide) {
+        modalElement.dataset.stopOnHide = 'true';
+        modalElement.addEventListener('hidden.bs.modal', () => toggleViewerFollow(false));
     }
+    toggleViewerFollow(false);
+    viewerPath = filePath;
+    viewerPage = null;
     
-    const modal = new bootstrap.Modal(document.getElementById('fileViewerModal'));
-    modal.show();
+    bootstrap.Modal.getOrCreateInstance(modalElement).show();
+    
+    // Open a little above the requested line so it has some context
+    await loadViewerPage({ mode: 'lines', start: line ? Math.max(1, line - 20) : 1 });
+}
+
+async function fetchViewerPage(params) {
+    const query = new URLSearchParams({ path: viewerPath, lines: VIEWER_PAGE_LINES, ...params });
+    const response = await fetch(`/file_manager/view_file?${query}`);
+    const data = await response.json();
+    if (!data.success) {
+        throw new Error(data.error);
+    }
+    return data;
+}
+
+async function loadViewerPage(params) {
+    const fileContentElement = document.getElementById('fileContent');
+    if (!fileContentElement || !viewerPath) return;
+    fileContentElement.textContent = 'Loading file content...';
     
     try {
-        const response = await fetch(`/file_manager/view_file?path=${encodeURIComponent(filePath)}`);
-        const data = await response.json();
-        
-        if (data.success && fileContentElement) {
-            fileContentElement.textContent = data.content;
-        } else if (fileContentElement) {
-            fileContentElement.textContent = `Error loading file: ${data.error}`;
-        }
+        viewerPage = await fetchViewerPage(params);
+        fileContentElement.textContent = viewerPage.content;
+        fileContentElement.scrollTop = params.mode === 'tail' ? fileContentElement.scrollHeight : 0;
+        updateViewerControls();
     } catch (error) {
         console.error('Error viewing file:', error);
-        if (fileContentElement) {
-            fileContentElement.textContent = 'Error loading file content.';
-        }
+        fileContentElement.textContent = `Error loading file: ${error.message || 'unknown error'}`;
+    }
+}
+
+function updateViewerControls() {
+    const page = viewerPage;
+    const status = document.getElementById('viewerStatus');
+    if (!page || !status) return;
+
+    const following = viewerFollowTimer !== null;
+    let position;
+    if (page.start_line !== null && page.line_count) {
+        const total = page.total_lines !== null ? ` of ${page.total_lines.toLocaleString()}` : '';
+        position = `Lines ${page.start_line.toLocaleString()}-${(page.start_line + page.line_count - 1).toLocaleString()}${total}`;
+    } else {
+        position = `Bytes ${page.offset.toLocaleString()}-${page.end_offset.toLocaleString()}`;
+    }
+    const notes = [page.size];
+    if (page.encoding !== 'utf-8') notes.push(page.encoding);
+    if (page.binary) notes.push('binary');
+    status.textContent = following ? `Following (${page.size})` : `${position} (${notes.join(', ')})`;
+
+    document.getElementById('viewerTop').disabled = following || page.offset === 0;
+    document.getElementById('viewerPrev').disabled = following || page.offset === 0 || !page.start_line;
+    document.getElementById('viewerNext').disabled = following || page.eof;
+    document.getElementById('viewerTail').disabled = following;
+}
+
+function viewerGoToLine(line) {
+    if (!line || line < 1) return;
+    loadViewerPage({ mode: 'lines', start: line });
+}
+
+function viewerPreviousPage() {
+    if (!viewerPage || !viewerPage.start_line) return;
+    viewerGoToLine(Math.max(1, viewerPage.start_line - VIEWER_PAGE_LINES));
+}
+
+function viewerNextPage() {
+    if (!viewerPage) return;
+    if (viewerPage.start_line !== null && viewerPage.line_count) {
+        viewerGoToLine(viewerPage.start_line + viewerPage.line_count);
+    } else {
+        // Inside a line longer than a page, or at a tail with unknown line numbers
+        loadViewerPage({ mode: 'bytes', offset: viewerPage.end_offset });
     }
 }
 
+async function toggleViewerFollow(enabled) {
+    const checkbox = document.getElementById('viewerFollow');
+    if (checkbox) checkbox.checked = enabled;
+    if (viewerFollowTimer !== null) {
+        clearTimeout(viewerFollowTimer);
+        viewerFollowTimer = null;
+    }
+    if (!enabled) {
+        updateViewerControls();
+        return;
+    }
+
+    await loadViewerPage({ mode: 'tail' });
+    const fileContentElement = document.getElementById('fileContent');
+
+    const poll = async () => {
+        try {
+            const page = await fetchViewerPage({ mode: 'follow', since: viewerPage.end_offset });
+            if (viewerFollowTimer === null) return;
+            if (page.reset) {
+                fileContentElement.textContent = page.content;
+            } else if (page.content) {
+                const atBottom = fileContentElement.scrollTop + fileContentElement.clientHeight >= fileContentElement.scrollHeight - 20;
+                let text = fileContentElement.textContent + page.content;
+                if (text.length > VIEWER_MAX_FOLLOW_CHARS) {
+                    text = text.slice(text.indexOf('\n', text.length - VIEWER_MAX_FOLLOW_CHARS) + 1);
+                }
+                fileContentElement.textContent = text;
+                if (atBottom) fileContentElement.scrollTop = fileContentElement.scrollHeight;
+            }
+            viewerPage = page;
+            updateViewerControls();
+        } catch (error) {
+            console.error('Error following file:', error);
+        }
+        if (viewerFollowTimer !== null) {
+            viewerFollowTimer = setTimeout(poll, VIEWER_FOLLOW_INTERVAL);
+        }
+    };
+    viewerFollowTimer = setTimeout(poll, VIEWER_FOLLOW_INTERVAL);
+    updateViewerControls();
+}
+
 function downloadFile(filePath) {
     const link = document.createElement('a');
     link.href = `/file_manager/download_file?path=${encodeURIComponent(filePath)}`;
@@ -818,65 +1355,319 @@ function downloadFile(filePath) {
     document.body.removeChild(link);
 }
 
-async function showDiskUsage() {
-    const modal = new bootstrap.Modal(document.getElementById('diskUsageModal'));
-    modal.show();
-    
+// Archives are generated while they download, so the browser shows no total size
+function downloadArchive(dirPath, format = 'zip') {
+    const showHidden = document.getElementById('showHidden') ? document.getElementById('showHidden').checked : false;
+    const link = document.createElement('a');
+    link.href = `/file_manager/download_archive?path=${encodeURIComponent(dirPath)}&format=${encodeURIComponent(format)}&show_hidden=${showHidden}`;
+    link.download = '';
+    document.body.appendChild(link);
+    link.click();
+    document.body.removeChild(link);
+}
+
+// Disk usage runs as a background job on the server; its totals are streamed
+// while it runs and it is cancelled when the modal is closed
+let diskUsageJob = null;
+let diskUsageStream = null;
+
+async function showDiskUsage(refresh = false) {
+    const modalElement = document.getElementById('diskUsageModal');
+    const content = document.getElementById('diskUsageContent');
+    if (!modalElement || !content) return;
+    bootstrap.Modal.getOrCreateInstance(modalElement).show();
+
+    if (!modalElement.dataset.cancelOnHide) {
+        modalElement.dataset.cancelOnHide = 'true';
+        modalElement.addEventListener('hidden.bs.modal', cancelDiskUsage);
+    }
+    await cancelDiskUsage();
+
+    content.innerHTML = `
+        <div class="text-center py-5">
+            <div class="loading-spinner"></div>
+            <p class="mt-2 text-muted">Calculating disk usage...</p>
+        </div>
+    `;
+
     try {
-        const currentPath = getCurrentPath();
-        const response = await fetch(`/file_manager/get_disk_usage?path=${encodeURIComponent(currentPath)}`);
-        const data = await response.json();
-        
-        const diskUsageContentElement = document.getElementById('diskUsageContent');
-        if (!diskUsageContentElement) return;
-        
-        if (data.success) {
-            diskUsageContentElement.innerHTML = `
-                <div class="mb-3">
-                    <h6>Directory: <code>${escapeHtml(data.path)}</code></h6>
-                </div>
-                <div class="row text-center">
-                    <div class="col-md-4">
-                        <h3 class="text-primary">${escapeHtml(data.total_size)}</h3>
-                        <p class="text-muted">Total Size</p>
-                    </div>
-                    <div class="col-md-4">
-                        <h3 class="text-success">${data.file_count}</h3>
-                        <p class="text-muted">Files</p>
-                    </div>
-                    <div class="col-md-4">
-                        <h3 class="text-warning">${data.folder_count}</h3>
-                        <p class="text-muted">Folders</p>
-                    </div>
-                </div>
-                <hr>
-                <div class="text-center">
-                    <small class="text-muted">
-                        <i class="bi bi-info-circle me-1"></i>
-                        Calculation includes all accessible subdirectories
-                    </small>
-                </div>
-            `;
-        } else {
-            diskUsageContentElement.innerHTML = `
-                <div class="alert alert-danger">
-                    <i class="bi bi-exclamation-circle me-2"></i>
-                    Error: ${escapeHtml(data.error)}
-                </div>
-            `;
+        const oneFs = document.getElementById('diskUsageOneFs');
+        const data = await postData('/file_manager/disk_usage', {
+            path: getCurrentPath(),
+            one_file_system: oneFs ? oneFs.checked : false,
+            refresh: refresh
+        });
+        if (!data.success) {
+            throw new Error(data.error);
+        }
+        diskUsageJob = data.job_id;
+        renderDiskUsage(data);
+
+        diskUsageStream = new AbortController();
+        const response = await fetch(`/file_manager/disk_usage/${data.job_id}/stream`, { signal: diskUsageStream.signal });
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            lines.filter(line => line).forEach(line => renderDiskUsage(JSON.parse(line)));
         }
     } catch (error) {
+        if (error.name === 'AbortError') return;
         console.error('Error getting disk usage:', error);
-        const diskUsageContentElement = document.getElementById('diskUsageContent');
-        if (diskUsageContentElement) {
-            diskUsageContentElement.innerHTML = `
-                <div class="alert alert-danger">
-                    <i class="bi bi-exclamation-circle me-2"></i>
-                    Error loading disk usage information.
+        content.innerHTML = `
+            <div class="alert alert-danger">
+                <i class="bi bi-exclamation-circle me-2"></i>
+                Error loading disk usage information${error.message ? `: ${escapeHtml(error.message)}` : '.'}
+            </div>
+        `;
+        setDiskUsageRunning(false);
+    }
+}
+
+async function cancelDiskUsage() {
+    const jobId = diskUsageJob;
+    diskUsageJob = null;
+    if (diskUsageStream) {
+        diskUsageStream.abort();
+        diskUsageStream = null;
+    }
+    if (jobId) {
+        try {
+            await postData(`/file_manager/disk_usage/${jobId}/cancel`);
+        } catch (error) {
+            console.error('Error cancelling disk usage:', error);
+        }
+    }
+}
+
+function setDiskUsageRunning(running) {
+    const stopButton = document.getElementById('diskUsageStop');
+    const rescanButton = document.getElementById('diskUsageRescan');
+    if (stopButton) stopButton.style.display = running ? '' : 'none';
+    if (rescanButton) rescanButton.style.display = running ? 'none' : '';
+}
+
+function renderDiskUsage(data) {
+    const content = document.getElementById('diskUsageContent');
+    if (!content || data.job_id !== diskUsageJob) return;
+
+    const running = data.status === 'running' || data.status === 'pending';
+    setDiskUsageRunning(running);
+    if (!running) {
+        diskUsageJob = null;
+    }
+
+    let statusLine;
+    if (running) {
+        statusLine = `<span class="spinner-border spinner-border-sm me-1"></span>
+            Scanning <code>${escapeHtml(data.current || data.path)}</code> (${data.elapsed}s)`;
+    } else if (data.status === 'cancelled') {
+        statusLine = `<i class="bi bi-stop-circle me-1 text-warning"></i>Stopped after ${data.elapsed}s; totals are partial`;
+    } else if (data.status === 'error') {
+        statusLine = `<i class="bi bi-exclamation-circle me-1 text-danger"></i>${escapeHtml(data.error || 'Disk usage failed')}`;
+    } else {
+        const notes = [`${data.cached_directories} directories from cache`];
+        if (data.hardlinks_skipped) notes.push(`${data.hardlinks_skipped} hard links counted once`);
+        if (data.mounts_skipped) notes.push(`${data.mounts_skipped} mounts skipped`);
+        if (data.unreadable_directories) notes.push(`${data.unreadable_directories} unreadable directories`);
+        statusLine = `<i class="bi bi-info-circle me-1"></i>Completed in ${data.elapsed}s; ${notes.join(', ')}`;
+    }
+
+    const children = data.children.map(child => {
+        const percent = data.total_size_bytes ? (100 * child.size_bytes / data.total_size_bytes).toFixed(1) : 0;
+        return `
+            <div class="mb-2">
+                <div class="d-flex justify-content-between small">
+                    <span><i class="bi bi-folder-fill text-warning me-1"></i>${escapeHtml(child.name)}</span>
+                    <span class="text-muted">${escapeHtml(child.size)}</span>
+                </div>
+                <div class="progress" style="height: 4px;">
+                    <div class="progress-bar" style="width: ${percent}%"></div>
                 </div>
-            `;
+            </div>
+        `;
+    }).join('');
+
+    content.innerHTML = `
+        <div class="mb-3">
+            <h6>Directory: <code>${escapeHtml(data.path)}</code></h6>
+        </div>
+        <div class="row text-center">
+            <div class="col-md-4">
+                <h3 class="text-primary">${escapeHtml(data.total_size)}</h3>
+                <p class="text-muted">Total Size<br><small>${escapeHtml(data.disk_usage)} on disk</small></p>
+            </div>
+            <div class="col-md-4">
+                <h3 class="text-success">${data.file_count.toLocaleString()}</h3>
+                <p class="text-muted">Files</p>
+            </div>
+            <div class="col-md-4">
+                <h3 class="text-warning">${data.folder_count.toLocaleString()}</h3>
+                <p class="text-muted">Folders</p>
+            </div>
+        </div>
+        ${children ? `<hr><h6 class="mb-2">Largest folders</h6>${children}` : ''}
+        <hr>
+        <div class="text-center">
+            <small class="text-muted">${statusLine}</small>
+        </div>
+    `;
+}
+
+// Content search (grep) also runs as a server job; each file with matches
+// arrives as one line of the result stream
+let contentSearchJob = null;
+let contentSearchStream = null;
+
+function showContentSearch() {
+    const modalElement = document.getElementById('contentSearchModal');
+    if (!modalElement) return;
+
+    if (!modalElement.dataset.initialized) {
+        modalElement.dataset.initialized = 'true';
+        modalElement.addEventListener('hidden.bs.modal', cancelContentSearch);
+        modalElement.addEventListener('shown.bs.modal', () => document.getElementById('contentSearchQuery').focus());
+        document.getElementById('contentSearchForm').addEventListener('submit', event => {
+            event.preventDefault();
+            startContentSearch();
+        });
+    }
+    bootstrap.Modal.getOrCreateInstance(modalElement).show();
+}
+
+async function startContentSearch() {
+    const results = document.getElementById('contentSearchResults');
+    await cancelContentSearch();
+    results.innerHTML = '';
+    setContentSearchStatus('<span class="spinner-border spinner-border-sm me-1"></span>Starting search...');
+
+    try {
+        const data = await postData('/file_manager/content_search', {
+            path: getCurrentPath(),
+            query: document.getElementById('contentSearchQuery').value,
+            include: document.getElementById('contentSearchInclude').value,
+            regex: document.getElementById('contentSearchRegex').checked,
+            case_sensitive: document.getElementById('contentSearchCase').checked,
+            include_binary: document.getElementById('contentSearchBinary').checked,
+            show_hidden: document.getElementById('showHidden') ? document.getElementById('showHidden').checked : false
+        });
+        if (!data.success) {
+            throw new Error(data.error);
+        }
+        contentSearchJob = data.job_id;
+        setContentSearchRunning(true);
+
+        contentSearchStream = new AbortController();
+        const response = await fetch(`/file_manager/content_search/${data.job_id}/stream`, { signal: contentSearchStream.signal });
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            lines.filter(line => line).forEach(line => handleContentSearchEvent(JSON.parse(line)));
         }
+    } catch (error) {
+        if (error.name === 'AbortError') return;
+        console.error('Error searching file contents:', error);
+        setContentSearchStatus(`<i class="bi bi-exclamation-circle me-1 text-danger"></i>${escapeHtml(error.message || 'Search failed')}`);
+        setContentSearchRunning(false);
+    }
+}
+
+async function cancelContentSearch() {
+    const jobId = contentSearchJob;
+    contentSearchJob = null;
+    if (contentSearchStream) {
+        contentSearchStream.abort();
+        contentSearchStream = null;
+    }
+    setContentSearchRunning(false);
+    if (jobId) {
+        try {
+            await postData(`/file_manager/content_search/${jobId}/cancel`);
+        } catch (error) {
+            console.error('Error cancelling content search:', error);
+        }
+    }
+}
+
+function setContentSearchRunning(running) {
+    const stopButton = document.getElementById('contentSearchStop');
+    if (stopButton) stopButton.style.display = running ? '' : 'none';
+}
+
+function setContentSearchStatus(html) {
+    const status = document.getElementById('contentSearchStatus');
+    if (status) status.innerHTML = html;
+}
+
+function handleContentSearchEvent(event) {
+    if (event.type === 'file') {
+        appendContentSearchFile(event);
+        return;
+    }
+
+    const counts = `${event.match_count.toLocaleString()} matches in ${event.files_matched.toLocaleString()} files; ` +
+        `${event.files_searched.toLocaleString()} files searched in ${event.elapsed}s`;
+    if (event.type === 'progress') {
+        setContentSearchStatus(`<span class="spinner-border spinner-border-sm me-1"></span>${counts}`);
+        return;
+    }
+
+    // Final line of the stream
+    contentSearchJob = null;
+    contentSearchStream = null;
+    setContentSearchRunning(false);
+    const skipped = event.files_skipped;
+    const notes = [];
+    if (skipped.binary) notes.push(`${skipped.binary} binary`);
+    if (skipped.too_large) notes.push(`${skipped.too_large} too large`);
+    if (skipped.error) notes.push(`${skipped.error} unreadable`);
+    let summary = counts + (notes.length ? `; skipped ${notes.join(', ')}` : '');
+    if (event.status === 'error') {
+        summary = `<i class="bi bi-exclamation-circle me-1 text-danger"></i>${escapeHtml(event.error || 'Search failed')}`;
+    } else if (event.limit_reached) {
+        summary += ` &mdash; stopped at the ${event.match_count.toLocaleString()} match limit`;
+    } else if (event.status === 'cancelled') {
+        summary += ' &mdash; stopped';
     }
+    setContentSearchStatus(summary);
+}
+
+function appendContentSearchFile(result) {
+    const results = document.getElementById('contentSearchResults');
+    if (!results) return;
+
+    const fileName = result.path.split('/').pop();
+    const group = document.createElement('div');
+    group.className = 'content-search-file';
+    group.innerHTML = `
+        <div class="content-search-path">
+            <i class="bi ${result.binary ? 'bi-file-binary' : 'bi-file-earmark-text'} me-1"></i>
+            <a href="#" class="content-search-open">${escapeHtml(result.path)}</a>
+            <span class="text-muted ms-1">(${result.matches.length}${result.truncated ? '+' : ''})</span>
+        </div>
+        ${result.matches.map(match => `
+            <div class="content-search-match">
+                <span class="content-search-line">${match.line === null ? `@${match.offset}` : match.line}</span>
+                <code>${escapeHtml(match.text)}</code>
+            </div>
+        `).join('')}
+    `;
+    group.querySelector('.content-search-open').addEventListener('click', event => {
+        event.preventDefault();
+        viewFile(fileName, result.path, result.matches.length && result.matches[0].line);
+    });
+    results.appendChild(group);
 }
 
 function showRenameModal(itemName, itemPath) {
@@ -919,7 +1710,7 @@ async function renameItem() {
         
         if (data.success) {
             showAlert('Item renamed successfully!', 'success');
-            setTimeout(() => location.reload(), 1000);
+            refreshAfterChange();
         } else {
             showAlert('Error: ' + data.error, 'danger');
         }
@@ -940,6 +1731,67 @@ function selectFiles() {
     }
 }
 
+// Files are sent in chunks to the resumable upload endpoints: each chunk is
+// written at its offset on the server, so a failed chunk is retried from the
+// offset the server reports rather than restarting the whole file
+const UPLOAD_CHUNK_RETRIES = 3;
+
+async function uploadRequest(url, options = {}) {
+    const csrfMeta = document.querySelector('meta[name="csrf-token"]');
+    const headers = { 'X-CSRFToken': csrfMeta ? csrfMeta.getAttribute('content') : '', ...(options.headers || {}) };
+    const response = await fetch(url, { ...options, headers });
+    const data = await response.json().catch(() => ({ success: false, error: `HTTP error! status: ${response.status}` }));
+    if (!response.ok || !data.success) {
+        const error = new Error(data.error || `HTTP error! status: ${response.status}`);
+        error.status = response.status;
+        error.offset = data.offset;
+        throw error;
+    }
+    return data;
+}
+
+async function chunkChecksum(blob) {
+    // crypto.subtle only exists in secure contexts (https or localhost)
+    if (!window.crypto || !window.crypto.subtle) return null;
+    const digest = await window.crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+    return 'sha256 ' + btoa(String.fromCharCode(...new Uint8Array(digest)));
+}
+
+async function uploadFileInChunks(file, directory, onProgress) {
+    const upload = await uploadRequest('/file_manager/uploads', {
+        method: 'POST',
+        body: new URLSearchParams({ path: directory, filename: file.name, size: file.size })
+    });
+    const url = `/file_manager/uploads/${upload.upload_id}`;
+    let offset = 0;
+    let failures = 0;
+
+    try {
+        while (offset < file.size) {
+            const chunk = file.slice(offset, offset + upload.chunk_size);
+            try {
+                const headers = { 'Content-Type': 'application/offset+octet-stream', 'Upload-Offset': String(offset) };
+                const checksum = await chunkChecksum(chunk);
+                if (checksum) headers['Upload-Checksum'] = checksum;
+                const data = await uploadRequest(url, { method: 'PATCH', headers, body: chunk });
+                offset = data.offset;
+                failures = 0;
+            } catch (error) {
+                if (++failures > UPLOAD_CHUNK_RETRIES || (error.status && error.status < 500 && error.status !== 409 && error.status !== 460)) {
+                    throw error;
+                }
+                // Resume from what the server actually has
+                offset = (await uploadRequest(url)).offset;
+            }
+            onProgress(offset);
+        }
+        return await uploadRequest(`${url}/finalize`, { method: 'POST' });
+    } catch (error) {
+        uploadRequest(url, { method: 'DELETE' }).catch(() => {});
+        throw error;
+    }
+}
+
 async function uploadFiles(files) {
     const currentPath = getCurrentPath();
     const progressDiv = document.getElementById('uploadProgress');
@@ -959,39 +1811,22 @@ async function uploadFiles(files) {
     progressDiv.style.display = 'block';
     
     let completed = 0;
-    const total = files.length;
+    let uploadedBytes = 0;
+    const totalBytes = Array.from(files).reduce((sum, file) => sum + file.size, 0) || 1;
     
     for (let file of files) {
         try {
-            const formData = new FormData();
-            formData.append('file', file);
-            formData.append('path', currentPath);
-            
-            const csrfMeta = document.querySelector('meta[name="csrf-token"]');
-            const csrfToken = csrfMeta ? csrfMeta.getAttribute('content') : '';
-            
-            const response = await fetch('/file_manager/upload_file', {
-                method: 'POST',
-                headers: {
-                    'X-CSRFToken': csrfToken
-                },
-                body: formData
+            await uploadFileInChunks(file, currentPath, offset => {
+                progressBar.style.width = ((uploadedBytes + offset) / totalBytes) * 100 + '%';
             });
-            
-            const data = await response.json();
-            
-            if (!data.success) {
-                showAlert(`Error uploading ${file.name}: ${data.error}`, 'danger');
-            }
-            
+            completed++;
         } catch (error) {
             console.error(`Error uploading ${file.name}:`, error);
-            showAlert(`Error uploading ${file.name}`, 'danger');
+            showAlert(`Error uploading ${file.name}: ${error.message}`, 'danger');
         }
         
-        completed++;
-        const percent = (completed / total) * 100;
-        progressBar.style.width = percent + '%';
+        uploadedBytes += file.size;
+        progressBar.style.width = (uploadedBytes / totalBytes) * 100 + '%';
     }
     
     // Hide modal and refresh page
@@ -999,7 +1834,7 @@ async function uploadFiles(files) {
         const uploadModal = bootstrap.Modal.getInstance(document.getElementById('uploadFileModal'));
         if (uploadModal) uploadModal.hide();
         showAlert(`${completed} file(s) uploaded successfully!`, 'success');
-        setTimeout(() => location.reload(), 1000);
+        refreshAfterChange();
     }, 500);
     
     // Reset
@@ -7,6 +7,7 @@ class MetaSpidey {
     constructor() {
         this.activeOperations = new Map();
         this.pollInterval = 2000; // 2 seconds
+        this.socket = null; // Socket.IO connection for pushed operation events
         this.csrf_token = document.querySelector('meta[name=csrf-token]').getAttribute('content');
     }
 
@@ -38,6 +39,10 @@ class MetaSpidey {
             this.startBruteForce();
         });
 
+        document.getElementById('bruteforce-stop-btn').addEventListener('click', () => {
+            this.stopOperations('bruteforce');
+        });
+
         // Removed SecLists download functionality
 
         // Depth description update
@@ -221,8 +226,10 @@ class MetaSpidey {
         // Check if wordlist is provided
         const wordlistFile = form.querySelector('[name="wordlist_file"]').files[0];
         const wordlistPath = form.querySelector('[name="wordlist_path"]').value.trim();
+        const catalogSelect = form.querySelector('[name="catalog_wordlists"]');
+        const catalogSelected = catalogSelect && catalogSelect.selectedOptions.length > 0;
         
-        if (!wordlistFile && !wordlistPath) {
+        if (!wordlistFile && !wordlistPath && !catalogSelected) {
             this.showNotification('Please provide a wordlist file or path', 'warning');
             return;
         }
@@ -257,6 +264,31 @@ class MetaSpidey {
         }
     }
 
+    async stopOperations(type) {
+        // Stop every running operation of this type; partial results are kept
+        for (const [operationId, operation] of this.activeOperations) {
+            if (operation.type !== type) continue;
+
+            try {
+                const response = await fetch(`/metaspidey/stop/${operationId}`, {
+                    method: 'POST',
+                    headers: {
+                        'X-CSRFToken': this.csrf_token
+                    }
+                });
+                const result = await response.json();
+
+                if (result.success) {
+                    this.showOperationStatus(type, 'Stopping... partial results will be kept');
+                } else {
+                    this.showNotification('Failed to stop operation: ' + (result.error || 'Unknown error'), 'error');
+                }
+            } catch (error) {
+                this.showNotification('Error stopping operation: ' + error.message, 'error');
+            }
+        }
+    }
+
     // SecLists download functionality has been removed for simplicity
 
     showFoundUrlsSection() {
@@ -299,37 +331,67 @@ class MetaSpidey {
         return 'status-badge-error';
     }
 
+    getSocket() {
+        // Socket.IO is loaded by base.html; without it operations fall back to polling
+        if (!this.socket && typeof io !== 'undefined') {
+            this.socket = io();
+            this.socket.on('metaspidey_events', (payload) => {
+                this.handleOperationEvents(payload.operation_id, payload.events);
+            });
+            this.socket.on('connect', () => {
+                // (Re)subscribe after every connect, resuming from the last event seen
+                this.activeOperations.forEach((operation, operationId) => this.subscribeOperation(operationId));
+            });
+        }
+        return this.socket;
+    }
+
+    subscribeOperation(operationId) {
+        const operation = this.activeOperations.get(operationId);
+        if (operation && this.socket && this.socket.connected) {
+            this.socket.emit('metaspidey_subscribe', { operation_id: operationId, since: operation.lastSeq });
+        }
+    }
+
     async monitorOperation(operationId, type) {
-        this.activeOperations.set(operationId, { type, startTime: Date.now() });
+        this.activeOperations.set(operationId, {
+            type,
+            startTime: Date.now(),
+            lastSeq: 0,
+            filesDiscovered: 0,
+            pagesCrawled: 0,
+            lastStats: null
+        });
 
+        const socket = this.getSocket();
+        this.subscribeOperation(operationId);
+
+        // Status polling is only a safety net while the socket is connected
         const pollOperation = async () => {
+            if (!this.activeOperations.has(operationId)) return;
+
             try {
+                const pushed = socket && socket.connected;
+                if (!pushed) {
+                    await this.fetchOperationEvents(operationId);
+                }
+
                 const response = await fetch(`/metaspidey/status/${operationId}`);
                 const result = await response.json();
 
+                if (!this.activeOperations.has(operationId)) return;
+
                 if (result.status === 'running') {
-                    // Update progress if available
-                    this.updateOperationProgress(type, result.operation);
-                    
-                    // For brute force and crawler download operations, get real-time results
-                    if (type === 'bruteforce' || (type === 'download' && result.operation.mode === 'crawler')) {
-                        await this.updateRealtimeResults(operationId);
+                    // Pushed events carry more detailed progress once they start arriving
+                    const operation = this.activeOperations.get(operationId);
+                    if (!pushed || operation.lastSeq === 0 || result.operation.status === 'stopping') {
+                        this.updateOperationProgress(type, result.operation);
                     }
-                    
-                    // Continue polling
-                    setTimeout(pollOperation, this.pollInterval);
+                    setTimeout(pollOperation, pushed ? this.pollInterval * 5 : this.pollInterval);
                 } else if (result.status === 'completed') {
-                    // Operation finished, get results
-                    this.activeOperations.delete(operationId);
-                    this.hideOperationStatus(type);
-                    
-                    // Get final real-time results for brute force and crawler download
-                    if (type === 'bruteforce' || (type === 'download' && result.operation?.mode === 'crawler')) {
-                        await this.updateRealtimeResults(operationId);
-                    }
-                    
-                    await this.loadOperationResults(operationId, type);
-                    this.loadOperations(); // Refresh operations list
+                    // Catch up on any events that were not pushed before finishing
+                    await this.fetchOperationEvents(operationId);
+                    await this.completeOperation(operationId);
                 } else {
                     // Operation not found or error
                     this.activeOperations.delete(operationId);
@@ -345,61 +407,97 @@ class MetaSpidey {
         setTimeout(pollOperation, this.pollInterval);
     }
 
-    async updateRealtimeResults(operationId) {
+    async fetchOperationEvents(operationId) {
+        const operation = this.activeOperations.get(operationId);
+        if (!operation) return;
+
         try {
-            const response = await fetch(`/metaspidey/realtime/${operationId}`);
+            const response = await fetch(`/metaspidey/realtime/${operationId}?since=${operation.lastSeq}`);
             const result = await response.json();
-            
-            if (result.success && result.results.length > 0) {
-                // Determine if this is bruteforce or crawler download results
-                const isCrawlerDownload = result.results.some(r => r.type === 'file_discovered' || r.type === 'page_crawled');
-                
-                if (isCrawlerDownload) {
-                    // Handle crawler download real-time updates
-                    this.updateCrawlerDownloadProgress(result.results);
-                } else {
-                    // Handle brute force results (existing functionality)
-                    const terminal = document.getElementById('found-urls-terminal');
-                    const counter = document.getElementById('found-urls-count');
-                    
-                    if (terminal && counter) {
-                        // Clear and rebuild with all results
-                        terminal.innerHTML = '';
-                        
-                        result.results.forEach(urlResult => {
-                            const statusClass = this.getStatusClass(urlResult.status);
-                            const urlLine = document.createElement('div');
-                            urlLine.className = 'url-found mb-1';
-                            urlLine.innerHTML = `
-                                <span class="badge ${statusClass} me-2">${urlResult.status}</span>
-                                <span class="text-muted me-2">[${urlResult.length}]</span>
-                                <span class="text-break">${urlResult.url}</span>
-                            `;
-                            terminal.appendChild(urlLine);
-                        });
-                        
-                        counter.textContent = result.count;
-                        terminal.scrollTop = terminal.scrollHeight; // Auto-scroll to bottom
-                    }
-                }
+
+            if (result.success) {
+                this.handleOperationEvents(operationId, result.results);
             }
         } catch (error) {
-            console.error('Error updating real-time results:', error);
+            console.error('Error fetching real-time results:', error);
+        }
+    }
+
+    handleOperationEvents(operationId, events) {
+        const operation = this.activeOperations.get(operationId);
+        if (!operation || !events) return;
+
+        // Events can arrive both pushed and fetched; only handle each seq once
+        const fresh = events.filter(event => event.seq > operation.lastSeq);
+        if (fresh.length === 0) return;
+        operation.lastSeq = fresh[fresh.length - 1].seq;
+
+        // Older events were no longer kept by the server; show its current state instead
+        const resync = fresh.find(event => event.type === 'resync');
+        if (resync && resync.operation) {
+            this.updateOperationProgress(operation.type, resync.operation);
+        }
+
+        const updates = fresh.filter(event => event.type !== 'operation_finished' && event.type !== 'resync');
+        if (updates.length > 0) {
+            if (operation.type === 'bruteforce') {
+                updates.forEach(urlResult => this.addFoundUrl(urlResult.url, urlResult.status, urlResult.length));
+            } else if (operation.type === 'download') {
+                this.updateCrawlerDownloadProgress(operation, updates);
+            } else if (operation.type === 'metadata') {
+                operation.filesAnalyzed = (operation.filesAnalyzed || 0) + updates.filter(u => u.type === 'file_analyzed').length;
+                this.showOperationStatus('metadata', `Analyzed ${operation.filesAnalyzed} file(s)...`);
+            }
+        }
+
+        if (fresh.some(event => event.type === 'operation_finished')) {
+            this.completeOperation(operationId);
+        }
+    }
+
+    async completeOperation(operationId) {
+        const operation = this.activeOperations.get(operationId);
+        if (!operation) return;
+
+        this.activeOperations.delete(operationId);
+        if (this.socket && this.socket.connected) {
+            this.socket.emit('metaspidey_unsubscribe', { operation_id: operationId });
         }
+
+        this.hideOperationStatus(operation.type);
+        await this.loadOperationResults(operationId, operation.type);
+        this.loadOperations(); // Refresh operations list
     }
 
-    updateCrawlerDownloadProgress(results) {
+    updateCrawlerDownloadProgress(operation, updates) {
         // Update download status text with crawling progress
         const statusText = document.getElementById('download-status-text');
-        
+        const newFiles = updates.filter(r => r.type === 'file_discovered');
+
+        operation.filesDiscovered += newFiles.length;
+        updates.forEach(update => {
+            if (update.pages_crawled) operation.pagesCrawled = update.pages_crawled;
+            if (update.type === 'download_stats') operation.lastStats = update;
+        });
+
         // Get latest progress info
-        const latestUpdate = results[results.length - 1];
-        const filesDiscovered = results.filter(r => r.type === 'file_discovered').length;
-        const pagesProcessed = latestUpdate.pages_crawled || 0;
+        const latestUpdate = updates[updates.length - 1];
+        const filesDiscovered = operation.filesDiscovered;
+        const pagesProcessed = operation.pagesCrawled;
         
         if (statusText) {
             let message = '';
-            if (latestUpdate.type === 'crawl_completed') {
+            const stats = operation.lastStats;
+            if (['download_started', 'download_progress', 'download_completed', 'download_stats'].includes(latestUpdate.type)) {
+                const speed = this.formatBytes(latestUpdate.throughput_bps || 0) + '/s';
+                if (stats) {
+                    message = `Downloading... ${stats.completed}/${stats.total_files} files done (${speed})`;
+                } else if (latestUpdate.percent !== null && latestUpdate.percent !== undefined) {
+                    message = `Downloading ${latestUpdate.filename || ''}... ${latestUpdate.percent}% (${speed})`;
+                } else {
+                    message = `Downloading ${latestUpdate.filename || ''}... ${this.formatBytes(latestUpdate.downloaded || 0)} (${speed})`;
+                }
+            } else if (latestUpdate.type === 'crawl_completed') {
                 message = `Crawling completed. Found ${latestUpdate.total_files} files. Starting downloads...`;
             } else if (latestUpdate.type === 'file_discovered') {
                 message = `Discovering files... Found ${filesDiscovered} files from ${pagesProcessed} pages`;
@@ -416,21 +514,19 @@ class MetaSpidey {
         const terminal = document.getElementById('found-urls-terminal');
         const counter = document.getElementById('found-urls-count');
         
-        if (terminal && counter) {
-            // Show the terminal section for crawler downloads
+        if (terminal && counter && newFiles.length > 0) {
+            // Show the terminal section for crawler downloads, starting from an empty list
             const section = document.getElementById('found-urls-section');
+            if (filesDiscovered === newFiles.length) {
+                terminal.innerHTML = '';
+            }
             if (section) section.style.display = 'block';
             
             // Update counter
             counter.textContent = filesDiscovered;
             
-            // Show discovered files
-            const discoveredFiles = results.filter(r => r.type === 'file_discovered');
-            
-            // Clear and rebuild
-            terminal.innerHTML = '';
-            
-            discoveredFiles.forEach((update, index) => {
+            // Append only the newly discovered files
+            newFiles.forEach(update => {
                 const file = update.file;
                 const fileRow = document.createElement('div');
                 fileRow.className = 'url-found mb-1';
@@ -741,7 +837,22 @@ class MetaSpidey {
                     <div class="alert alert-warning">
                         <strong>Threat Indicators Found:</strong>
                         <ul class="mb-0 mt-2">
-                            ${security.threat_indicators_found.map(indicator => `<li><code>${indicator}</code></li>`).join('')}
+                            ${security.threat_indicators_found.map(indicator => {
+                                const match = security.threat_matches?.[indicator];
+                                return `<li><code>${indicator}</code>${match ? ` &times;${match.count}
+                                    <small class="text-muted">at ${match.offsets.slice(0, 5).join(', ')}${match.count > 5 ? ', ...' : ''}</small>` : ''}</li>`;
+                            }).join('')}
+                        </ul>
+                    </div>
+                ` : ''}
+                ${security.rule_matches?.length > 0 ? `
+                    <div class="alert alert-danger">
+                        <strong>Rules Matched:</strong>
+                        <ul class="mb-0 mt-2">
+                            ${security.rule_matches.map(rule => `
+                                <li><code>${rule.rule}</code> <span class="badge bg-secondary">${rule.severity}</span>
+                                    ${rule.description ? `<small>${rule.description}</small>` : ''}</li>
+                            `).join('')}
                         </ul>
                     </div>
                 ` : ''}
@@ -807,6 +918,23 @@ class MetaSpidey {
         return html;
     }
 
+    renderEntropyMap(profile) {
+        const values = profile.values;
+        const width = 300;
+        const height = 60;
+        const step = width / (values.length - 1);
+        const points = values.map((value, i) =>
+            `${(i * step).toFixed(1)},${(height - (Math.min(value, 8) / 8) * height).toFixed(1)}`).join(' ');
+        
+        return `
+            <svg class="w-100 border rounded" viewBox="0 0 ${width} ${height}" preserveAspectRatio="none" style="height: 60px;">
+                <line x1="0" y1="${height * (1 - 7.5 / 8)}" x2="${width}" y2="${height * (1 - 7.5 / 8)}"
+                      stroke="#dc3545" stroke-dasharray="4 3" stroke-width="0.5"/>
+                <polyline points="${points}" fill="none" stroke="#0d6efd" stroke-width="1"/>
+            </svg>
+        `;
+    }
+
     renderTechnicalTab(file) {
         const deep = file.deep_analysis || {};
         const signature = file.signature_analysis || {};
@@ -831,6 +959,11 @@ class MetaSpidey {
                             <tr><td><strong>Printable:</strong></td><td>${deep.byte_distribution.printable_percentage}%</td></tr>
                         </table>
                     ` : ''}
+                    ${deep.entropy_profile?.values?.length > 1 ? `
+                        <h6 class="mt-3">Entropy Map</h6>
+                        ${this.renderEntropyMap(deep.entropy_profile)}
+                        <small class="text-muted">${deep.entropy_profile.values.length} windows of ${deep.entropy_profile.window_size} bytes, 0-8 bits/byte</small>
+                    ` : ''}
                 </div>
             `;
         }
@@ -1408,7 +1541,7 @@ class MetaSpidey {
                 <div class="alert alert-danger">
                     <i class="bi bi-exclamation-triangle me-2"></i>
                     <strong>Fuzzing Failed:</strong> ${results.error}
-                    ${results.simulated ? '<br><small>Note: FFUF not available on system - showing simulated results</small>' : ''}
+                    ${results.engine === 'native' ? '<br><small>Note: FFUF not available on system - the built-in fuzzer was used</small>' : ''}
                 </div>
             `;
         }
@@ -1429,7 +1562,8 @@ class MetaSpidey {
                 <h5><i class="bi bi-lightning me-2"></i>Fuzzing Results</h5>
                 <div class="text-muted">
                     Found ${results.total_found} URLs
-                    ${results.simulated ? '<span class="badge bg-warning ms-2">Simulated</span>' : ''}
+                    ${results.engine === 'native' ? '<span class="badge bg-info ms-2">Built-in fuzzer</span>' : ''}
+                    ${results.stopped ? '<span class="badge bg-secondary ms-2">Stopped</span>' : ''}
                 </div>
             </div>
 
@@ -1671,7 +1805,9 @@ class MetaSpidey {
         if (textEl) {
             let message = `${this.capitalizeFirst(type)} in progress...`;
             
-            if (operation.urls_count) {
+            if (operation.status === 'stopping') {
+                message = 'Stopping... partial results will be kept';
+            } else if (operation.urls_count) {
                 message = `Processing ${operation.urls_count} URL(s)...`;
             } else if (operation.files_count) {
                 message = `Analyzing ${operation.files_count} file(s)...`;
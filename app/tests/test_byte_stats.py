@@ -0,0 +1,58 @@
+import math
+import os
+import tempfile
+import unittest
+from collections import Counter
+from unittest import mock
+
+from app.metaspidey import byte_stats
+from app.metaspidey.file_view import FileView
+
+
+def reference_entropy(data):
+    counts = Counter(data)
+    return round(-sum(c / len(data) * math.log2(c / len(data)) for c in counts.values()), 4) if data else 0.0
+
+
+class ByteStatsTestCase(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        # Structured text, then zeros, then random bytes, with a partial final window
+        self.data = b'GET /index.html HTTP/1.1\r\n' * 4000 + b'\0' * 65536 + os.urandom(200000 + 123)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.data)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_whole_file_statistics(self):
+        with FileView(self.path) as view:
+            stats = byte_stats.analyze_bytes(view, window=4096)
+
+        self.assertEqual(sum(stats['histogram']), len(self.data))
+        self.assertEqual(stats['entropy'], reference_entropy(self.data))
+        self.assertAlmostEqual(stats['null_ratio'], self.data.count(0) / len(self.data))
+        self.assertEqual(len(stats['entropy_profile']), math.ceil(len(self.data) / 4096))
+
+        profile = stats['entropy_profile']
+        self.assertEqual(profile[0], reference_entropy(self.data[:4096]))
+        self.assertEqual(profile[-1], reference_entropy(self.data[-(len(self.data) % 4096):]))
+        self.assertIn(0.0, profile)
+        self.assertGreater(max(profile), 7.5)
+
+    def test_fallback_matches_numpy(self):
+        with FileView(self.path) as view:
+            vectorized = byte_stats.analyze_bytes(view, window=8192)
+            with mock.patch.object(byte_stats, 'NUMPY_AVAILABLE', False):
+                fallback = byte_stats.analyze_bytes(view, window=8192)
+
+        self.assertEqual(fallback, vectorized)
+
+    def test_profile_window_bounds_points(self):
+        self.assertEqual(byte_stats.profile_window(10), byte_stats.MIN_WINDOW)
+        size = 3 * 1024 ** 3
+        self.assertLessEqual(math.ceil(size / byte_stats.profile_window(size)), byte_stats.MAX_PROFILE_POINTS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,211 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from app import create_app, db
+from app.auth.models import User
+from app.config import TestingConfig
+from app.file_manager import content_search
+from app.file_manager.content_search import (ContentSearchJob, ContentSearchJobs, MAX_LINE_TEXT, MMAP_THRESHOLD,
+                                             TooManySearches, compile_pattern, grep_file)
+
+
+class GrepFileTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir='/tmp')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write(self, relative_path, content):
+        path = os.path.join(self.directory, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def test_lines_and_columns(self):
+        path = self.write('a.conf', b'listen 80\n# Password=x\nuser password=secret\n')
+
+        matches = grep_file(path, compile_pattern('password'))['matches']
+        self.assertEqual([(m['line'], m['column']) for m in matches], [(2, 2), (3, 5)])
+        self.assertEqual(matches[1]['text'], 'user password=secret')
+
+        matches = grep_file(path, compile_pattern('password', case_sensitive=True))['matches']
+        self.assertEqual([m['line'] for m in matches], [3])
+        self.assertEqual(len(grep_file(path, compile_pattern(r'pass\w+=\w+', regex=True))['matches']), 2)
+
+    def test_invalid_pattern(self):
+        with self.assertRaises(ValueError):
+            compile_pattern('(', regex=True)
+        with self.assertRaises(ValueError):
+            compile_pattern('')
+
+    def test_binary_files(self):
+        path = self.write('data.bin', b'\0\x01token\x02')
+
+        self.assertEqual(grep_file(path, compile_pattern('token'))['skipped'], 'binary')
+        match = grep_file(path, compile_pattern('token'), include_binary=True)['matches'][0]
+        self.assertIsNone(match['line'])
+        self.assertEqual(match['offset'], 2)
+        self.assertIn('token', match['text'])
+
+    def test_large_files_are_mapped(self):
+        path = self.write('big.log', b'x' * MMAP_THRESHOLD + b'\nfirst needle\n' + b'y\n' * 10 + b'needle')
+
+        result = grep_file(path, compile_pattern('needle'))
+        self.assertEqual([m['line'] for m in result['matches']], [2, 13])
+        self.assertEqual(grep_file(path, compile_pattern('needle'), max_file_size=1024)['skipped'], 'too_large')
+
+    def test_long_lines_are_cut(self):
+        path = self.write('min.js', b'a' * 10000 + b'needle' + b'b' * 10000)
+
+        match = grep_file(path, compile_pattern('needle'))['matches'][0]
+        self.assertEqual(len(match['text']), MAX_LINE_TEXT)
+        self.assertEqual(match['text'][match['column']:match['column'] + 6], 'needle')
+
+
+class ContentSearchJobTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir='/tmp')
+        for i in range(40):
+            self.write(f'dir{i % 4}/file{i}.txt', f'line one\nneedle {i}\n')
+        self.write('dir0/notes.md', 'needle in markdown\n')
+        self.write('.hidden/secret.txt', 'needle\n')
+        self.write('skip/also.txt', 'needle\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write(self, relative_path, content):
+        path = os.path.join(self.directory, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(content)
+
+    def run_job(self, **options):
+        job = ContentSearchJob(self.directory, 'needle', **options)
+        job.run()
+        return job
+
+    def test_inline_and_pool_agree(self):
+        exclude = [os.path.join(self.directory, 'skip')]
+        inline = self.run_job(workers=1, exclude=exclude)
+        pooled = self.run_job(workers=2, exclude=exclude)
+
+        self.assertEqual(inline.snapshot()['status'], 'completed')
+        self.assertEqual(inline.snapshot()['match_count'], 41)
+        self.assertEqual(sorted(e['path'] for e in inline.events()), sorted(e['path'] for e in pooled.events()))
+        self.assertEqual([e['seq'] for e in pooled.events(since=40)], [41])
+
+    def test_filters(self):
+        self.assertEqual(self.run_job(workers=1, include='*.md').snapshot()['files_matched'], 1)
+        self.assertEqual(self.run_job(workers=1, show_hidden=True).snapshot()['files_matched'], 43)
+
+    def test_match_limit_stops_the_search(self):
+        snapshot = self.run_job(workers=1, max_matches=5).snapshot()
+
+        self.assertEqual(snapshot['status'], 'completed')
+        self.assertTrue(snapshot['limit_reached'])
+        self.assertEqual(snapshot['match_count'], 5)
+        self.assertLess(snapshot['files_searched'], 42)
+
+    def test_cancel(self):
+        job = ContentSearchJob(self.directory, 'needle', workers=1)
+        job.cancel()
+        job.run()
+
+        self.assertEqual(job.snapshot()['status'], 'cancelled')
+        self.assertEqual(job.events(), [])
+
+    def test_unexpected_errors_end_the_job(self):
+        job = ContentSearchJob(self.directory, 'needle', workers=1)
+        with mock.patch.object(content_search, 'grep_file', side_effect=KeyError('size')):
+            job.run()
+
+        self.assertTrue(job.done)
+        self.assertEqual(job.snapshot()['status'], 'error')
+        self.assertEqual(job.snapshot()['error'], "'size'")
+        self.assertEqual(job.events(timeout=5), [])  # Returns at once for a finished job
+
+    def test_running_searches_per_user(self):
+        jobs = ContentSearchJobs(max_running_per_user=1)
+        with mock.patch.object(ContentSearchJob, 'start', lambda job: job):  # Stays pending, i.e. running
+            first = jobs.start(self.directory, 'needle', user_id=1)
+            with self.assertRaises(TooManySearches):
+                jobs.start(self.directory, 'needle', user_id=1)
+            jobs.start(self.directory, 'needle', user_id=2)
+            jobs.start(self.directory, 'needle', user_id=1, max_running=2)
+
+            first.status = 'completed'
+            jobs.start(self.directory, 'needle', user_id=1, max_running=2)
+            with self.assertRaises(TooManySearches):
+                jobs.start(self.directory, 'needle', user_id=1, max_running=2)
+
+
+class ContentSearchRouteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.app.config['FILE_MANAGER_CONTENT_SEARCH_WORKERS'] = 1
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.user = User(username='grepuser', email='grep@example.com')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = self.user.id
+            sess['_fresh'] = True
+
+        self.directory = tempfile.mkdtemp(dir='/tmp')
+        with open(os.path.join(self.directory, 'app.env'), 'w') as f:
+            f.write('DEBUG=1\nAPI_TOKEN=abc\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_start_and_stream(self):
+        response = self.client.post('/file_manager/content_search',
+                                    data={'path': self.directory, 'query': 'api_token'})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.get_json()['job_id']
+
+        stream = self.client.get(f'/file_manager/content_search/{job_id}/stream')
+        events = [json.loads(line) for line in stream.get_data(as_text=True).splitlines()]
+        self.assertEqual(events[0]['type'], 'file')
+        self.assertEqual(events[0]['matches'][0]['line'], 2)
+        self.assertEqual(events[-1]['type'], 'done')
+        self.assertEqual(events[-1]['match_count'], 1)
+
+        data = self.client.get(f'/file_manager/content_search/{job_id}', query_string={'since': 1}).get_json()
+        self.assertEqual(data['events'], [])
+        self.assertEqual(self.client.get('/file_manager/content_search/unknown').status_code, 404)
+
+    def test_concurrent_search_limit(self):
+        self.app.config['FILE_MANAGER_CONTENT_SEARCH_MAX_PER_USER'] = 1
+        with mock.patch.object(ContentSearchJob, 'start', lambda job: job):
+            first = self.client.post('/file_manager/content_search', data={'path': self.directory, 'query': 'x'})
+            second = self.client.post('/file_manager/content_search', data={'path': self.directory, 'query': 'x'})
+        self.assertEqual(first.status_code, 202)
+        from app.file_manager.routes import content_search_jobs
+        self.addCleanup(setattr, content_search_jobs.get(first.get_json()['job_id']), 'status', 'cancelled')
+        self.assertEqual(second.status_code, 429)
+        self.assertFalse(second.get_json()['success'])
+
+    def test_invalid_regex(self):
+        response = self.client.post('/file_manager/content_search',
+                                    data={'path': self.directory, 'query': '(', 'regex': 'true'})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from app import create_app, db
+from app.auth.models import User
+from app.config import TestingConfig
+from app.file_manager.disk_usage import DiskUsageCache, DiskUsageJob, DiskUsageJobs
+
+
+class DiskUsageJobTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir='/tmp')
+        self.write('a.txt', 100)
+        self.write('sub/b.bin', 1000)
+        self.write('sub/deeper/c.bin', 10)
+        os.link(os.path.join(self.directory, 'sub', 'b.bin'), os.path.join(self.directory, 'b-link.bin'))
+        os.symlink('/', os.path.join(self.directory, 'root-link'))  # Must not be followed
+        self.cache = DiskUsageCache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write(self, relative_path, size):
+        path = os.path.join(self.directory, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+
+    def run_job(self, **options):
+        job = DiskUsageJob(self.directory, self.cache, **options)
+        job.run()
+        return job.snapshot()
+
+    def test_totals_count_hard_links_once(self):
+        result = self.run_job()
+
+        self.assertEqual(result['status'], 'completed')
+        symlink_size = os.lstat(os.path.join(self.directory, 'root-link')).st_size
+        self.assertEqual(result['total_size_bytes'], 100 + 1000 + 10 + symlink_size)
+        self.assertEqual(result['file_count'], 4)
+        self.assertEqual(result['folder_count'], 2)
+        self.assertEqual(result['hardlinks_skipped'], 1)
+        # The root is walked first, so the shared inode is counted there, as du does
+        self.assertEqual(result['children'], [{'name': 'sub', 'size_bytes': 10}])
+
+    def test_unchanged_directories_come_from_cache(self):
+        self.run_job()
+        self.write('sub/deeper/new.bin', 5)
+
+        result = self.run_job()
+
+        # Only sub/deeper changed; the root and sub are reused without listing them again
+        self.assertEqual(result['cached_directories'], 2)
+        self.assertEqual(result['children'][0]['size_bytes'], 15)
+
+        result = self.run_job(refresh=True)
+        self.assertEqual(result['cached_directories'], 0)
+
+    def test_cancelled_job_stops(self):
+        job = DiskUsageJob(self.directory, self.cache)
+        job.cancel()
+        job.run()
+
+        self.assertEqual(job.snapshot()['status'], 'cancelled')
+        self.assertEqual(job.snapshot()['file_count'], 0)
+
+    def test_unexpected_error_ends_the_job(self):
+        job = DiskUsageJob(self.directory, self.cache)
+        with mock.patch('app.file_manager.disk_usage.scan_directory_usage', side_effect=ValueError('bad entry')):
+            job.run()
+
+        self.assertTrue(job.done)
+        self.assertEqual(job.snapshot()['status'], 'error')
+        self.assertEqual(job.snapshot()['error'], 'bad entry')
+
+    def test_jobs_run_in_background(self):
+        jobs = DiskUsageJobs(self.cache)
+        job = jobs.start(self.directory, user_id=1)
+        job.wait(5)
+
+        self.assertEqual(job.snapshot()['status'], 'completed')
+        self.assertIsNot(jobs.start(self.directory, user_id=1), job)  # Finished jobs are not reused
+
+
+class DiskUsageRouteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.user = User(username='usageuser', email='usage@example.com')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = self.user.id
+            sess['_fresh'] = True
+
+        self.directory = tempfile.mkdtemp(dir='/tmp')
+        with open(os.path.join(self.directory, 'file.txt'), 'w') as f:
+            f.write('hello')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_start_and_stream(self):
+        response = self.client.post('/file_manager/disk_usage', data={'path': self.directory})
+        self.assertEqual(response.status_code, 202)
+        job_id = response.get_json()['job_id']
+
+        stream = self.client.get(f'/file_manager/disk_usage/{job_id}/stream')
+        last = stream.get_data(as_text=True).strip().splitlines()[-1]
+        self.assertIn('"status": "completed"', last)
+
+        data = self.client.get(f'/file_manager/disk_usage/{job_id}').get_json()
+        self.assertEqual(data['total_size_bytes'], 5)
+        self.assertEqual(data['total_size'], '5.0 B')
+        self.assertEqual(self.client.get('/file_manager/disk_usage/unknown').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,297 @@
+import os
+import re
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app.metaspidey.downloader import FileDownloader, normalize_url
+from app.metaspidey.prober import PatternProber
+
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+    """Minimal static file handler with HEAD and single byte-range support"""
+
+    files = {}
+    range_requests = []
+    request_log = []
+    head_allowed = True
+    truncate_after = None  # Bytes of a GET body sent before the connection is dropped
+
+    def log_message(self, format, *args):
+        pass  # Keep test output quiet
+
+    def _send_headers(self):
+        self.request_log.append((self.command, self.path))
+        if self.command == 'HEAD' and not self.head_allowed:
+            self.send_response(405)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return None
+
+        body = self.files.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return None
+
+        start, end = 0, len(body) - 1
+        range_header = self.headers.get('Range')
+        match = re.match(r'bytes=(\d+)-(\d*)', range_header or '')
+        if match:
+            self.range_requests.append(range_header)
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else end
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(body)}')
+                self.end_headers()
+                return None
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(body)}')
+        else:
+            self.send_response(200)
+
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(end - start + 1))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('ETag', '"test-etag"')
+        self.end_headers()
+        return body[start:end + 1]
+
+    def do_HEAD(self):
+        self._send_headers()
+
+    def do_GET(self):
+        payload = self._send_headers()
+        if payload is not None:
+            if self.truncate_after is not None:
+                payload = payload[:self.truncate_after]
+                self.close_connection = True
+            self.wfile.write(payload)
+
+
+class FileDownloaderTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), RangeRequestHandler)
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_port}'
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.server_thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.download_dir = tempfile.mkdtemp()
+        RangeRequestHandler.files = {
+            '/small.txt': b'hello metaspidey\n' * 100,
+            '/large.bin': os.urandom(256 * 1024),
+        }
+        RangeRequestHandler.range_requests = []
+        RangeRequestHandler.request_log = []
+        RangeRequestHandler.head_allowed = True
+        RangeRequestHandler.truncate_after = None
+
+    def tearDown(self):
+        shutil.rmtree(self.download_dir, ignore_errors=True)
+
+    def test_download_file(self):
+        downloader = FileDownloader()
+        result = downloader.download_file(f'{self.base_url}/small.txt', self.download_dir)
+
+        self.assertEqual(result['status'], 'success')
+        with open(result['file_path'], 'rb') as f:
+            self.assertEqual(f.read(), RangeRequestHandler.files['/small.txt'])
+        self.assertIn('throughput_bps', result)
+
+    def test_resume_partial_download(self):
+        url = f'{self.base_url}/small.txt'
+        body = RangeRequestHandler.files['/small.txt']
+        downloader = FileDownloader()
+
+        # Simulate an interrupted earlier attempt
+        part_path, meta_path = downloader._partial_paths(url, self.download_dir)
+        with open(part_path, 'wb') as f:
+            f.write(body[:500])
+
+        result = downloader.download_file(url, self.download_dir)
+
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['resumed_from'], 500)
+        self.assertIn('bytes=500-', RangeRequestHandler.range_requests)
+        with open(result['file_path'], 'rb') as f:
+            self.assertEqual(f.read(), body)
+        self.assertFalse(os.path.exists(part_path))
+
+    def test_dropped_connection_is_resumable(self):
+        url = f'{self.base_url}/small.txt'
+        RangeRequestHandler.truncate_after = 600
+        downloader = FileDownloader()
+        downloader.MIN_CHUNK_SIZE = 256  # Chunks read before the drop are kept
+
+        result = downloader.download_file(url, self.download_dir)
+
+        self.assertEqual(result['status'], 'failed')
+        self.assertTrue(result['error'].startswith('Request error'))
+        self.assertTrue(result['resumable'])
+        kept = os.path.getsize(downloader._partial_paths(url, self.download_dir)[0])
+        self.assertGreater(kept, 0)
+
+        RangeRequestHandler.truncate_after = None
+        result = downloader.download_file(url, self.download_dir)
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['resumed_from'], kept)
+        with open(result['file_path'], 'rb') as f:
+            self.assertEqual(f.read(), RangeRequestHandler.files['/small.txt'])
+
+    def test_segment_progress_is_saved_while_downloading(self):
+        downloader = FileDownloader(segments=4)
+        downloader.SEGMENT_THRESHOLD = 64 * 1024
+        downloader.MIN_CHUNK_SIZE = 8 * 1024  # Several chunks per 64 KB segment
+        downloader.PROGRESS_SAVE_INTERVAL = 0
+        saved = []
+        save = downloader._save_partial_meta
+
+        def record(meta_path, meta):
+            saved.append([done for _, _, done in meta['segments']])
+            save(meta_path, meta)
+
+        downloader._save_partial_meta = record
+        result = downloader.download_file(f'{self.base_url}/large.bin', self.download_dir)
+
+        self.assertEqual(result['status'], 'success')
+        segment_size = 64 * 1024
+        self.assertTrue(any(0 < done < segment_size for progress in saved for done in progress))
+        self.assertEqual(os.listdir(os.path.join(self.download_dir, FileDownloader.PARTIAL_DIR)), [])
+
+    def test_segmented_download(self):
+        downloader = FileDownloader(segments=4)
+        downloader.SEGMENT_THRESHOLD = 64 * 1024
+        updates = []
+
+        result = downloader.download_file(f'{self.base_url}/large.bin', self.download_dir,
+                                          progress_callback=updates.append)
+
+        self.assertEqual(result['status'], 'success')
+        self.assertEqual(result['segments'], 4)
+        self.assertEqual(len(RangeRequestHandler.range_requests), 4)
+        with open(result['file_path'], 'rb') as f:
+            self.assertEqual(f.read(), RangeRequestHandler.files['/large.bin'])
+        self.assertEqual(updates[-1]['type'], 'download_completed')
+
+    def test_download_files_worker_pool(self):
+        urls = [f'{self.base_url}/small.txt', f'{self.base_url}/large.bin', f'{self.base_url}/missing.txt']
+        updates = []
+
+        summary = FileDownloader().download_files(urls, self.download_dir, threads=3,
+                                                  progress_callback=updates.append)
+
+        self.assertEqual(summary['successful_downloads'], 2)
+        self.assertEqual(summary['failed_downloads'], 1)
+        self.assertEqual([r['url'] for r in summary['results']], urls)
+        stats = [u for u in updates if u['type'] == 'download_stats']
+        self.assertEqual(stats[-1]['completed'], 3)
+
+    def test_identical_content_is_stored_once(self):
+        RangeRequestHandler.files['/copy.txt'] = RangeRequestHandler.files['/small.txt']
+        downloader = FileDownloader()
+
+        first = downloader.download_file(f'{self.base_url}/small.txt', self.download_dir)
+        second = downloader.download_file(f'{self.base_url}/copy.txt', self.download_dir)
+
+        self.assertEqual(first['sha256'], second['sha256'])
+        self.assertFalse(first['deduplicated'])
+        self.assertTrue(second['deduplicated'])
+        self.assertTrue(os.path.samefile(first['file_path'], second['file_path']))
+        objects_dir = os.path.join(self.download_dir, FileDownloader.STORE_DIR, 'objects')
+        self.assertEqual(sum(len(files) for _, _, files in os.walk(objects_dir)), 1)
+
+    def test_unchanged_url_is_not_downloaded_again(self):
+        url = f'{self.base_url}/small.txt'
+        FileDownloader().download_file(url, self.download_dir)
+
+        result = FileDownloader().download_file(url, self.download_dir)
+
+        self.assertTrue(result['cached'])
+        self.assertEqual(result['filename'], 'small.txt')
+        self.assertEqual(sorted(f for f in os.listdir(self.download_dir) if not f.startswith('.')),
+                         ['small.txt'])
+
+    def test_modified_object_is_not_reused(self):
+        url = f'{self.base_url}/small.txt'
+        first = FileDownloader().download_file(url, self.download_dir)
+        self.assertEqual(os.stat(first['file_path']).st_mode & 0o777, 0o444)
+
+        # In place, through the hardlinked name (root, or a user who restored write access)
+        os.chmod(first['file_path'], 0o644)
+        with open(first['file_path'], 'r+b') as f:
+            f.write(b'HELLO')
+
+        result = FileDownloader().download_file(url, self.download_dir)
+
+        self.assertFalse(result['cached'])
+        with open(result['file_path'], 'rb') as f:
+            self.assertEqual(f.read(), RangeRequestHandler.files['/small.txt'])
+        self.assertFalse(os.path.samefile(first['file_path'], result['file_path']))
+
+    def test_discovered_files_are_deduplicated_canonically(self):
+        downloader = FileDownloader()
+        pages = {
+            'https://example.com/': ['https://example.com/a.pdf?x=1&y=2', 'https://EXAMPLE.com:443/a.pdf?y=2&x=1#top'],
+            'https://example.com/docs/': ['https://example.com//docs/../a.pdf?x=1&y=2', 'https://example.com/b.pdf'],
+        }
+        downloader._analyze_page_for_files = lambda url, depth, *args: {
+            'files': [{'url': u, 'filename': u.rsplit('/', 1)[-1], 'extension': '.pdf'} for u in pages.get(url, [])]
+        }
+        downloader._extract_page_links_improved = lambda url, depth: ['https://example.com/docs/', 'https://example.com/docs/#x']
+
+        result = downloader.crawl_and_discover_files('https://example.com/', max_depth=2, delay=0)
+
+        self.assertEqual([f['normalized_url'] for f in result['discovered_files']],
+                         ['https://example.com/a.pdf?x=1&y=2', 'https://example.com/b.pdf'])
+        self.assertEqual(result['pages_crawled'], 2)
+
+    def test_normalize_url(self):
+        self.assertEqual(normalize_url('HTTP://Example.com:80/a//b/../c?z=1&a=2#frag'), 'http://example.com/a/c?a=2&z=1')
+        self.assertEqual(normalize_url('https://example.com:8443/dir/'), 'https://example.com:8443/dir/')
+
+    def test_prober_probes_each_directory_once(self):
+        RangeRequestHandler.files['/docs/backup.zip'] = b'PK\x03\x04'
+        prober = PatternProber(threads=4, rate_limit=0)
+        patterns = ['backup.zip', 'missing.sql', '.env']
+
+        found = prober.probe(f'{self.base_url}/docs/index.html', patterns)
+        again = prober.probe(f'{self.base_url}/docs/other.html?page=2', patterns)
+
+        self.assertEqual([f['url'] for f in found], [f'{self.base_url}/docs/backup.zip'])
+        self.assertEqual(again, [])
+        self.assertEqual(len(RangeRequestHandler.request_log), len(patterns))
+        self.assertTrue(all(method == 'HEAD' for method, _ in RangeRequestHandler.request_log))
+
+    def test_prober_falls_back_to_ranged_get(self):
+        RangeRequestHandler.head_allowed = False
+        RangeRequestHandler.files['/docs/backup.zip'] = b'PK\x03\x04 archive'
+        prober = PatternProber(threads=1, rate_limit=0)
+
+        found = prober.probe(f'{self.base_url}/docs/', ['backup.zip', 'dump.sql'])
+
+        self.assertEqual(len(found), 1)
+        self.assertEqual(found[0]['method'], 'GET')
+        self.assertEqual(found[0]['status'], 206)
+        self.assertEqual(found[0]['content_length'], len(RangeRequestHandler.files['/docs/backup.zip']))
+        # Only the first request per host is a HEAD; the rest go straight to ranged GETs
+        self.assertEqual([m for m, _ in RangeRequestHandler.request_log], ['HEAD', 'GET', 'GET'])
+
+    def test_size_limit(self):
+        RangeRequestHandler.files['/huge.bin'] = b'\0' * (2 * 1024 * 1024)
+        result = FileDownloader().download_file(f'{self.base_url}/huge.bin', self.download_dir, max_size_mb=1)
+
+        self.assertEqual(result['status'], 'failed')
+        self.assertIn('too large', result['error'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+from app import create_app, db
+from app.auth.models import User
+from app.config import TestingConfig
+from app.file_manager.archive import stream_tar, stream_zip
+
+
+class ArchiveStreamTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir='/tmp')
+        self.root = os.path.join(self.directory, 'loot')
+        os.makedirs(os.path.join(self.root, 'keys', 'empty'))
+        os.makedirs(os.path.join(self.root, 'skip'))
+        self.write('notes.txt', b'hello')
+        self.write('keys/id_rsa', os.urandom(200000))
+        self.write('.hidden', b'h')
+        self.write('skip/secret', b's')
+        os.symlink('/etc/passwd', os.path.join(self.root, 'passwd'))
+        os.mkfifo(os.path.join(self.root, 'pipe'))  # Must be skipped, not read
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write(self, relative_path, content):
+        with open(os.path.join(self.root, relative_path), 'wb') as f:
+            f.write(content)
+
+    def options(self):
+        return {'show_hidden': False, 'exclude': [os.path.join(self.root, 'skip')]}
+
+    def test_tar(self):
+        for compress in (False, True):
+            data = b''.join(stream_tar(self.root, compress, **self.options()))
+            with tarfile.open(fileobj=io.BytesIO(data)) as archive:
+                members = {member.name: member for member in archive.getmembers()}
+                self.assertEqual(sorted(members), ['loot', 'loot/keys', 'loot/keys/empty', 'loot/keys/id_rsa',
+                                                   'loot/notes.txt', 'loot/passwd'])
+                self.assertEqual(archive.extractfile('loot/notes.txt').read(), b'hello')
+                self.assertEqual(members['loot/passwd'].linkname, '/etc/passwd')
+                self.assertEqual(members['loot/keys/id_rsa'].size, 200000)
+
+    def test_zip(self):
+        data = b''.join(stream_zip(self.root, **self.options()))
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(sorted(archive.namelist()), ['loot/', 'loot/keys/', 'loot/keys/empty/',
+                                                          'loot/keys/id_rsa', 'loot/notes.txt', 'loot/passwd'])
+            with open(os.path.join(self.root, 'keys', 'id_rsa'), 'rb') as f:
+                self.assertEqual(archive.read('loot/keys/id_rsa'), f.read())
+
+
+class DownloadRouteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.user = User(username='downloaduser', email='download@example.com')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = self.user.id
+            sess['_fresh'] = True
+
+        self.directory = tempfile.mkdtemp(dir='/tmp')
+        self.path = os.path.join(self.directory, 'dump.bin')
+        with open(self.path, 'wb') as f:
+            f.write(bytes(range(256)) * 40)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def download(self, **headers):
+        return self.client.get('/file_manager/download_file', query_string={'path': self.path}, headers=headers)
+
+    def test_range_and_conditional_requests(self):
+        response = self.download(Range='bytes=256-511')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.data, bytes(range(256)))
+        self.assertEqual(response.headers['Content-Range'], 'bytes 256-511/10240')
+
+        etag = self.download().headers['ETag']
+        self.assertEqual(self.download(**{'If-None-Match': etag}).status_code, 304)
+
+    def test_missing_file_is_not_found(self):
+        response = self.client.get('/file_manager/download_file', query_string={'path': self.path + '.gone'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_x_accel_redirect(self):
+        self.app.config['FILE_MANAGER_X_ACCEL_PREFIX'] = '/_protected/'
+
+        response = self.download()
+        self.assertEqual(response.headers['X-Accel-Redirect'], '/_protected' + self.path)
+        self.assertNotIn('X-Sendfile', response.headers)
+        self.assertEqual(response.data, b'')
+
+    def test_archive(self):
+        response = self.client.get('/file_manager/download_archive',
+                                   query_string={'path': self.directory, 'format': 'tar.gz'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("filename*=UTF-8''", response.headers['Content-Disposition'])
+        with tarfile.open(fileobj=io.BytesIO(response.data)) as archive:
+            self.assertEqual(len(archive.extractfile(f'{os.path.basename(self.directory)}/dump.bin').read()), 10240)
+
+        response = self.client.get('/file_manager/download_archive',
+                                   query_string={'path': self.directory, 'format': 'rar'})
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+from app.metaspidey.events import OperationEventLog
+
+
+class RecordingSocketIO:
+    """Stand-in for flask_socketio.SocketIO that records emitted events"""
+
+    server = object()
+
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, event, data, to=None):
+        self.emitted.append((event, data, to))
+
+
+class OperationEventLogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.socketio = RecordingSocketIO()
+        self.events = OperationEventLog(self.socketio, max_operations=2)
+
+    def test_events_are_numbered_per_operation(self):
+        self.events.open('op1')
+        self.events.open('op2')
+
+        self.assertEqual(self.events.publish('op1', {'type': 'a'}), 1)
+        self.assertEqual(self.events.publish('op1', {'type': 'b'}), 2)
+        self.assertEqual(self.events.publish('op2', {'type': 'c'}), 1)
+        self.assertEqual(self.events.last_seq('op1'), 2)
+
+    def test_since_returns_only_newer_events(self):
+        self.events.open('op1')
+        for i in range(5):
+            self.events.publish('op1', {'index': i})
+
+        self.assertEqual([e['index'] for e in self.events.since('op1', 3)], [3, 4])
+        self.assertEqual(self.events.since('op1', 5), [])
+        self.assertEqual(len(self.events.since('op1')), 5)
+        self.assertIsNone(self.events.since('unknown', 0))
+
+    def test_publish_pushes_to_operation_room(self):
+        self.events.open('op1')
+        self.events.publish('op1', {'type': 'file_discovered'})
+
+        event, data, room = self.socketio.emitted[-1]
+        self.assertEqual(event, OperationEventLog.EVENT_NAME)
+        self.assertEqual(room, OperationEventLog.room('op1'))
+        self.assertEqual(data['operation_id'], 'op1')
+        self.assertEqual([e['seq'] for e in data['events']], [1])
+
+    def test_oldest_operations_are_dropped(self):
+        for operation_id in ('op1', 'op2', 'op3'):
+            self.events.open(operation_id)
+
+        self.assertNotIn('op1', self.events)
+        self.assertIn('op3', self.events)
+
+    def test_old_events_are_dropped_with_a_resync(self):
+        events = OperationEventLog(max_events=3, snapshot=lambda operation_id: {'files_count': 7})
+        events.open('op1')
+        for i in range(5):
+            events.publish('op1', {'index': i})
+
+        self.assertEqual(events.last_seq('op1'), 5)
+        self.assertEqual([e['seq'] for e in events.since('op1', 3)], [4, 5])
+        self.assertEqual([e['seq'] for e in events.since('op1', 2)], [3, 4, 5])
+
+        replay = events.since('op1', 1)
+        self.assertEqual([e['seq'] for e in replay], [2, 3, 4, 5])
+        self.assertEqual(replay[0]['type'], 'resync')
+        self.assertEqual(replay[0]['missed'], 1)
+        self.assertEqual(replay[0]['operation'], {'files_count': 7})
+        self.assertEqual(events.since('op1')[0]['missed'], 2)
+
+    def test_publish_without_socketio(self):
+        events = OperationEventLog()
+        events.open('op1')
+
+        self.assertEqual(events.publish('op1', {'type': 'a'}), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
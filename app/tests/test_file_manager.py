@@ -0,0 +1,132 @@
+import json
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from app import create_app, db
+from app.auth.models import User
+from app.config import TestingConfig
+from app.file_manager.routes import get_file_info, scan_directory
+
+
+class FileManagerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.user = User(username='fileuser', email='files@example.com')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        db.session.commit()
+
+        self.directory = tempfile.mkdtemp(dir='/tmp')
+        os.makedirs(os.path.join(self.directory, 'Zeta'))
+        os.makedirs(os.path.join(self.directory, 'alpha'))
+        for name, mode in (('b.txt', 0o644), ('A.sh', 0o755), ('.hidden', 0o600), ('locked', 0o000)):
+            path = os.path.join(self.directory, name)
+            with open(path, 'w') as f:
+                f.write(name)
+            os.chmod(path, mode)
+        os.symlink(os.path.join(self.directory, 'missing'), os.path.join(self.directory, 'broken'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def login(self):
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = self.user.id
+            sess['_fresh'] = True
+
+    def test_scan_directory_order_and_hidden(self):
+        names = [item['name'] for item in scan_directory(self.directory)]
+        self.assertEqual(names, ['alpha', 'Zeta', 'A.sh', 'b.txt', 'broken', 'locked'])
+
+        hidden = [item['name'] for item in scan_directory(self.directory, show_hidden=True)]
+        self.assertIn('.hidden', hidden)
+
+    def test_matches_per_path_syscalls(self):
+        for item in scan_directory(self.directory):
+            path = item['full_path']
+            if item.get('error'):
+                self.assertEqual(item['name'], 'broken')
+                continue
+            st = os.stat(path)
+            self.assertEqual(item['permissions'], stat.filemode(st.st_mode))
+            self.assertEqual(item['is_dir'], os.path.isdir(path))
+            self.assertEqual((item['is_readable'], item['is_writable'], item['is_executable']),
+                             (os.access(path, os.R_OK), os.access(path, os.W_OK), os.access(path, os.X_OK)),
+                             item['name'])
+            self.assertEqual(item, get_file_info(path, path))
+
+    def test_list_route(self):
+        self.login()
+        response = self.client.get('/file_manager/list', query_string={'path': self.directory})
+
+        self.assertEqual(response.status_code, 200)
+        page = response.get_data(as_text=True)
+        self.assertIn('id="fileListContainer"', page)
+        self.assertIn(f'data-path="{self.directory}"', page)
+
+    def list_pages(self, **params):
+        names, cursor = [], None
+        while True:
+            query = dict(params, path=self.directory, limit=2)
+            if cursor:
+                query['cursor'] = cursor
+            data = self.client.get('/file_manager/api/list', query_string=query).get_json()
+            self.assertTrue(data['success'], data)
+            names.extend(item['name'] for item in data['items'])
+            cursor = data['next_cursor']
+            if not cursor:
+                return names, data['total']
+
+    def test_list_api_pages_follow_cursor(self):
+        self.login()
+        names, total = self.list_pages()
+        self.assertEqual(names, ['alpha', 'Zeta', 'A.sh', 'b.txt', 'broken', 'locked'])
+        self.assertEqual(total, 6)
+
+        # Entries added between pages do not shift the next page
+        data = self.client.get('/file_manager/api/list', query_string={'path': self.directory, 'limit': 3}).get_json()
+        open(os.path.join(self.directory, '0first'), 'w').close()
+        rest = self.client.get('/file_manager/api/list', query_string={
+            'path': self.directory, 'limit': 3, 'cursor': data['next_cursor']}).get_json()
+        self.assertEqual([item['name'] for item in rest['items']], ['b.txt', 'broken', 'locked'])
+
+    def test_list_api_sort_and_filter(self):
+        self.login()
+        with open(os.path.join(self.directory, 'b.txt'), 'a') as f:
+            f.write('x' * 100)
+
+        names, _ = self.list_pages(sort='size', order='desc')
+        self.assertEqual(names[:3], ['Zeta', 'alpha', 'b.txt'])  # Directories first, then by size
+
+        names, total = self.list_pages(filter='T', type='files', show_hidden='true')
+        self.assertEqual(names, ['b.txt'])
+        self.assertEqual(total, 1)
+
+        response = self.client.get('/file_manager/api/list', query_string={
+            'path': self.directory, 'sort': 'name', 'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_stream_api(self):
+        self.login()
+        response = self.client.get('/file_manager/api/list/stream', query_string={'path': self.directory})
+
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual(lines[-1], {'done': True, 'total': 6})
+        self.assertEqual(sorted(line['name'] for line in lines[:-1]),
+                         sorted(['alpha', 'Zeta', 'A.sh', 'b.txt', 'broken', 'locked']))
+
+
+if __name__ == '__main__':
+    unittest.main()
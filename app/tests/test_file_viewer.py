@@ -0,0 +1,154 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from app import create_app, db
+from app.auth.models import User
+from app.config import TestingConfig
+from app.file_manager import file_viewer
+from app.file_manager.file_viewer import LineIndexCache, TextFileView
+
+
+class TextFileViewTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir='/tmp')
+        self.path = os.path.join(self.directory, 'app.log')
+        self.write(''.join(f'line {i}\n' for i in range(1, 1001)))
+        self.cache = LineIndexCache()
+        # Small checkpoint steps so the tests cross many of them
+        patcher = mock.patch.object(file_viewer, 'INDEX_STEP', 100)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write(self, content, mode='w'):
+        with open(self.path, mode) as f:
+            f.write(content)
+
+    def view(self):
+        return TextFileView(self.path, self.cache)
+
+    def test_line_pages(self):
+        with self.view() as view:
+            page = view.lines(500, 3)
+            self.assertEqual(page['content'], 'line 500\nline 501\nline 502\n')
+            self.assertEqual(page['line_count'], 3)
+            self.assertIsNone(page['total_lines'])  # Only indexed as far as line 500
+            self.assertFalse(page['eof'])
+
+            self.assertEqual(view.lines(1000, 10)['content'], 'line 1000\n')
+            self.assertTrue(view.lines(1000)['eof'])
+            with self.assertRaises(ValueError):
+                view.lines(1001)
+
+    def test_tail_and_line_numbers(self):
+        with self.view() as view:
+            page = view.tail(2)
+            self.assertEqual(page['content'], 'line 999\nline 1000\n')
+            self.assertIsNone(page['start_line'])
+
+            self.assertEqual(view.index.count_lines(view.reader), 1000)
+            self.assertEqual(view.tail(2)['start_line'], 999)
+
+    def test_follow_appended_lines(self):
+        with self.view() as view:
+            view.index.count_lines(view.reader)
+            end = view.tail()['end_offset']
+        index = self.cache.get(self.path, os.stat(self.path))
+
+        self.write('line 1001\npartial', mode='a')
+        with self.view() as view:
+            page = view.follow(end)
+            self.assertEqual(page['content'], 'line 1001\n')  # The unfinished line waits for its newline
+            self.assertFalse(page['reset'])
+            self.assertIs(view.index, index)  # Appending keeps the index
+            self.assertEqual(view.lines(1002)['content'], 'partial')
+            self.assertEqual(view.index.total_lines, 1002)
+
+        self.write('rotated\n')
+        with self.view() as view:
+            page = view.follow(end)
+            self.assertTrue(page['reset'])
+            self.assertEqual(page['content'], 'rotated\n')
+
+    def test_file_truncated_under_the_view(self):
+        with self.view() as view:
+            view.lines(200)
+            with open(self.path, 'r+b') as f:
+                f.truncate(21)  # Rotated while the view is open: reads come back short
+            self.assertEqual(view.lines(2, 1)['content'], 'line 2\n')
+            self.assertEqual(view.lines(1, 5)['content'], 'line 1\nline 2\nline 3\n')
+            self.assertEqual(view.tail(2)['content'], 'line 2\nline 3\n')
+            self.assertEqual(view.follow(14)['content'], 'line 3\n')
+            self.assertEqual(view.byte_range(500)['content'], '')
+            self.assertIsNone(view.index.locate(view.reader, 900))
+
+        with self.view() as view:
+            self.assertEqual(view.index.count_lines(view.reader), 3)
+
+    def test_byte_ranges_and_empty_files(self):
+        with self.view() as view:
+            self.assertEqual(view.byte_range(7, 6)['content'], 'line 2')
+
+        self.write('')
+        with self.view() as view:
+            self.assertEqual(view.lines()['content'], '')
+            self.assertEqual(view.tail()['content'], '')
+
+
+class ViewFileRouteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.user = User(username='vieweruser', email='viewer@example.com')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = self.user.id
+            sess['_fresh'] = True
+
+        self.directory = tempfile.mkdtemp(dir='/tmp')
+        self.path = os.path.join(self.directory, 'notes.txt')
+        with open(self.path, 'wb') as f:
+            f.write(b''.join(b'entry %d\n' % i for i in range(1, 2001)))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def view(self, **params):
+        return self.client.get('/file_manager/view_file', query_string=dict(params, path=self.path))
+
+    def test_pages(self):
+        data = self.view().get_json()
+        self.assertTrue(data['success'])
+        self.assertEqual(data['start_line'], 1)
+        self.assertEqual(data['line_count'], file_viewer.DEFAULT_PAGE_LINES)
+
+        data = self.view(start=1999, lines=5).get_json()
+        self.assertEqual(data['content'], 'entry 1999\nentry 2000\n')
+        self.assertTrue(data['eof'])
+
+        data = self.view(mode='tail', lines=1).get_json()
+        self.assertEqual(data['content'], 'entry 2000\n')
+        data = self.view(mode='follow', since=data['end_offset']).get_json()
+        self.assertEqual(data['content'], '')
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.view(mode='edit').status_code, 400)
+        self.assertEqual(self.view(start=5000).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,218 @@
+import base64
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from app.metaspidey.ffuf_runner import FFUFRunner
+from app.metaspidey.fuzzer import NativeFuzzer
+from app.metaspidey.wordlists import iter_wordlist
+
+
+class FuzzTargetHandler(BaseHTTPRequestHandler):
+    """Stand-in web server with a few discoverable paths"""
+
+    pages = {
+        '/admin': (301, b'', '/admin/'),
+        '/admin/': (200, b'admin index', None),
+        '/admin/backup': (200, b'backup\nfile\n', None),
+        '/login': (200, b'please log in', None),
+        '/private': (403, b'forbidden', None),
+        '/soft404': (200, b'not here', None),
+    }
+
+    def log_message(self, format, *args):
+        pass  # Keep test output quiet
+
+    def do_GET(self):
+        if self.path == '/truncated':
+            # Announces more body than it sends, then closes the connection
+            self.send_response(200)
+            self.send_header('Content-Length', '100')
+            self.end_headers()
+            self.wfile.write(b'partial')
+            self.close_connection = True
+            return
+        status, body, location = self.pages.get(self.path, (404, b'missing', None))
+        self.send_response(status)
+        if location:
+            self.send_header('Location', location)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class NativeFuzzerTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FuzzTargetHandler)
+        cls.base_url = f'http://127.0.0.1:{cls.server.server_port}'
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        fd, self.wordlist = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(fd, 'w') as f:
+            f.write('# comment line\nadmin\nlogin\n\nprivate\nsoft404\nnothing\nbackup')
+
+    def tearDown(self):
+        os.remove(self.wordlist)
+
+    def _options(self, **overrides):
+        options = {
+            'fuzz_template': f'{self.base_url}/FUZZ',
+            'wordlist': self.wordlist,
+            'threads': 4,
+            'status_codes': [200, 301, 403],
+            'timeout': 5,
+        }
+        options.update(overrides)
+        return options
+
+    def test_iter_wordlist_skips_comments_and_blank_lines(self):
+        self.assertEqual(list(iter_wordlist(self.wordlist)),
+                         ['admin', 'login', 'private', 'soft404', 'nothing', 'backup'])
+
+    def test_matches_status_codes(self):
+        found = []
+        result = NativeFuzzer().run(self._options(), progress_callback=found.append)
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['engine'], 'native')
+        self.assertEqual(result['total_tested'], 6)
+        self.assertEqual(sorted(r['input']['FUZZ'] for r in result['results']),
+                         ['admin', 'login', 'private', 'soft404'])
+        self.assertEqual(len(found), 4)
+
+        admin = next(r for r in result['results'] if r['input']['FUZZ'] == 'admin')
+        self.assertEqual(admin['status'], 301)
+        self.assertEqual(admin['redirectlocation'], '/admin/')
+
+    def test_filters(self):
+        result = NativeFuzzer().run(self._options(filter_sizes=[8], filter_status=[403]))
+
+        self.assertEqual(sorted(r['input']['FUZZ'] for r in result['results']), ['admin', 'login'])
+
+    def test_recursion_into_redirected_directory(self):
+        result = NativeFuzzer().run(self._options(recursion=True, recursion_depth=1))
+
+        urls = {r['url']: r for r in result['results']}
+        backup = urls[f'{self.base_url}/admin/backup']
+        self.assertEqual(backup['depth'], 1)
+        self.assertEqual(backup['lines'], 3)
+        self.assertEqual(result['total_tested'], 12)
+
+    def test_broken_responses_are_counted_as_errors(self):
+        with open(self.wordlist, 'a') as f:
+            f.write('\ntruncated')
+
+        result = NativeFuzzer().run(self._options())
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['total_tested'], 7)
+        self.assertEqual(result['errors'], 1)
+        self.assertEqual(len(result['results']), 4)
+
+    def test_failing_candidate_does_not_end_the_run(self):
+        matches = NativeFuzzer._matches
+
+        def failing_matches(fuzzer, result, options):
+            if result['input']['FUZZ'] == 'login':
+                raise ValueError('broken candidate')
+            return matches(fuzzer, result, options)
+
+        with mock.patch.object(NativeFuzzer, '_matches', failing_matches):
+            result = NativeFuzzer().run(self._options())
+
+        self.assertTrue(result['success'])
+        self.assertEqual(result['errors'], 1)
+        self.assertEqual(sorted(r['input']['FUZZ'] for r in result['results']), ['admin', 'private', 'soft404'])
+
+    def test_stop_keeps_partial_results(self):
+        fuzzer = NativeFuzzer()
+        fuzzer.stop()
+
+        result = fuzzer.run(self._options())
+
+        self.assertTrue(result['success'])
+        self.assertTrue(result['stopped'])
+        self.assertEqual(result['results'], [])
+
+
+FAKE_FFUF = """#!/bin/sh
+[ "$1" = "-h" ] && exit 0
+echo "banner output"
+echo '{"input":{"FUZZ":"%s"},"url":"http://target/admin","status":200,"length":10,"words":2,"lines":1,"content-type":"text/html","redirectlocation":""}'
+sleep %s
+echo '{"input":{"FUZZ":"bG9naW4="},"url":"http://target/login","status":301,"length":0,"words":0,"lines":0,"content-type":"","redirectlocation":"/login/"}'
+"""
+
+
+class FFUFRunnerTestCase(unittest.TestCase):
+    """Runs FFUFRunner against a stand-in ffuf script that prints JSON lines"""
+
+    def setUp(self):
+        self.bin_dir = tempfile.mkdtemp()
+        self.path_patch = mock.patch.dict(os.environ, {'PATH': self.bin_dir + os.pathsep + os.environ['PATH']})
+        self.path_patch.start()
+
+    def tearDown(self):
+        self.path_patch.stop()
+        shutil.rmtree(self.bin_dir, ignore_errors=True)
+
+    def _install_ffuf(self, sleep_seconds):
+        script = os.path.join(self.bin_dir, 'ffuf')
+        with open(script, 'w') as f:
+            f.write(FAKE_FFUF % (base64.b64encode(b'admin').decode(), sleep_seconds))
+        os.chmod(script, os.stat(script).st_mode | stat.S_IEXEC)
+
+    def _options(self):
+        return {'fuzz_template': 'http://target/FUZZ', 'wordlist': '/dev/null', 'threads': 1}
+
+    def test_results_are_streamed_before_exit(self):
+        self._install_ffuf(1)
+        received = []
+        runner = FFUFRunner()
+        runner.run_ffuf(self._options(), lambda result: received.append((time.monotonic(), result)))
+
+        self.assertEqual([r['input']['FUZZ'] for _, r in received], ['admin', 'login'])
+        # The first result arrived while ffuf was still sleeping
+        self.assertGreater(received[1][0] - received[0][0], 0.5)
+
+    def test_stop_keeps_partial_results(self):
+        self._install_ffuf(30)
+        runner = FFUFRunner()
+        first_result = threading.Event()
+
+        def progress_callback(result):
+            first_result.set()
+
+        threading.Thread(target=lambda: first_result.wait(10) and runner.stop(), daemon=True).start()
+        started = time.monotonic()
+        result = runner.run_ffuf(self._options(), progress_callback)
+
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertTrue(result['success'])
+        self.assertTrue(result['stopped'])
+        self.assertEqual([r['url'] for r in result['results']], ['http://target/admin'])
+
+    def test_parse_ffuf_line_ignores_other_output(self):
+        runner = FFUFRunner()
+
+        self.assertIsNone(runner.parse_ffuf_line(':: Progress: [10/100]'))
+        self.assertIsNone(runner.parse_ffuf_line('{"broken"'))
+        self.assertEqual(runner.parse_ffuf_line('{"url": "http://t/x", "input": {"FUZZ": "x"}}')['input'], {'FUZZ': 'x'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,231 @@
+import hashlib
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from app.metaspidey.analysis_cache import AnalysisCache
+from app.metaspidey.file_view import FileView
+from app.metaspidey.metadata_analyzer import MetadataAnalyzer
+
+original_analyze_file = MetadataAnalyzer.analyze_file
+
+
+def slow_analyze_file(self, filepath, **kwargs):
+    """analyze_file that hangs on files named slow*, like a parser stuck on a malformed PDF"""
+    if os.path.basename(filepath).startswith('slow'):
+        while True:
+            time.sleep(0.05)
+    return original_analyze_file(self, filepath, **kwargs)
+
+
+def fork_pool_context():
+    """The patched analyze_file only reaches workers forked from the test process"""
+    return multiprocessing.get_context('fork')
+
+
+class BatchAnalyzeTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(6):
+            path = os.path.join(self.directory, f'file_{i}.txt')
+            with open(path, 'wb') as f:
+                f.write(f'sample {i}\n'.encode() * (i + 1) * 100)
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _comparable(self, result):
+        return (result['filename'], result['hashes']['SHA256'], result['categorization']['primary_category'])
+
+    def test_parallel_matches_sequential(self):
+        analyzer = MetadataAnalyzer()
+
+        sequential = analyzer.batch_analyze(self.paths, workers=1)
+        parallel = analyzer.batch_analyze(self.paths, workers=2, chunk_size=2)
+
+        self.assertEqual([self._comparable(r) for r in parallel['results']],
+                         [self._comparable(r) for r in sequential['results']])
+        self.assertEqual([r['batch_index'] for r in parallel['results']], list(range(6)))
+
+    def test_ordered_streaming(self):
+        streamed = []
+
+        MetadataAnalyzer().batch_analyze(self.paths, workers=3, chunk_size=1, ordered=True,
+                                         result_callback=streamed.append)
+
+        self.assertEqual([r['batch_index'] for r in streamed], list(range(6)))
+
+    def test_per_file_timeout_in_pool(self):
+        slow_path = os.path.join(self.directory, 'slow.pdf')
+        with open(slow_path, 'wb') as f:
+            f.write(b'%PDF-1.4 truncated')
+
+        with mock.patch.object(MetadataAnalyzer, 'analyze_file', slow_analyze_file), \
+                mock.patch('app.metaspidey.metadata_analyzer._pool_context', fork_pool_context):
+            started = time.monotonic()
+            result = MetadataAnalyzer().batch_analyze([slow_path] + self.paths, workers=2, timeout=1)
+
+        self.assertLess(time.monotonic() - started, 10)
+        self.assertTrue(result['results'][0]['timed_out'])
+        self.assertTrue(all('error' not in r for r in result['results'][1:]))
+
+    def test_per_file_timeout_in_process(self):
+        with mock.patch.object(MetadataAnalyzer, 'analyze_file', slow_analyze_file):
+            result = MetadataAnalyzer()._analyze_with_timeout(os.path.join(self.directory, 'slow.bin'), {}, 0.2)
+
+        self.assertTrue(result['timed_out'])
+
+    def test_per_file_timeout_off_the_main_thread(self):
+        slow_path = os.path.join(self.directory, 'slow.pdf')
+        with open(slow_path, 'wb') as f:
+            f.write(b'%PDF-1.4 truncated')
+        results = {}
+
+        def analyze():
+            # Like a background job: SIGALRM cannot reach this thread
+            analyzer = MetadataAnalyzer()
+            results['batch'] = analyzer.batch_analyze([slow_path, self.paths[0]], workers=1, timeout=1)
+            results['direct'] = analyzer._analyze_with_timeout(self.paths[0], {}, 1)
+
+        with mock.patch.object(MetadataAnalyzer, 'analyze_file', slow_analyze_file), \
+                mock.patch('app.metaspidey.metadata_analyzer._pool_context', fork_pool_context):
+            thread = threading.Thread(target=analyze)
+            thread.start()
+            thread.join(20)
+
+        self.assertFalse(thread.is_alive())
+        self.assertTrue(results['batch']['results'][0]['timed_out'])
+        self.assertNotIn('error', results['batch']['results'][1])
+        self.assertFalse(results['direct']['timeout_applied'])
+
+    def test_pool_does_not_fork_the_server(self):
+        from app.metaspidey.metadata_analyzer import _pool_context
+
+        # Workers come from a clean process, not a fork of the (threaded) caller
+        self.assertIn(_pool_context().get_start_method(), ('forkserver', 'spawn'))
+
+    def test_analyze_directory_in_parallel(self):
+        os.makedirs(os.path.join(self.directory, 'sub'))
+        os.link(self.paths[0], os.path.join(self.directory, 'sub', 'hardlink.txt'))
+        streamed = []
+
+        result = MetadataAnalyzer().analyze_directory(self.directory, workers=2, max_files=50,
+                                                      result_callback=streamed.append)
+
+        self.assertEqual(result['total_files_analyzed'], 6)
+        self.assertEqual(len(streamed), 6)
+        self.assertEqual(sorted(r['relative_path'] for r in result['results']),
+                         sorted(os.path.basename(p) for p in self.paths))
+
+
+class FileViewTestCase(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        self.data = os.urandom(3 * 1024 * 1024 + 17)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.data)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_slices_and_chunks(self):
+        with FileView(self.path) as view:
+            self.assertEqual(view.size, len(self.data))
+            self.assertEqual(view.head(32), self.data[:32])
+            self.assertEqual(view.tail(512), self.data[-512:])
+            self.assertEqual(view.read(1000, 24), self.data[1000:1024])
+            self.assertEqual(b''.join(bytes(c) for c in view.iter_chunks()), self.data)
+
+    def test_empty_file(self):
+        with open(self.path, 'wb'):
+            pass
+
+        with FileView(self.path) as view:
+            self.assertEqual(view.head(32), b'')
+            self.assertEqual(list(view.iter_chunks()), [])
+
+        result = MetadataAnalyzer().analyze_file(self.path, deep_analysis=True)
+        self.assertNotIn('error', result)
+        self.assertEqual(result['basic_info']['file_size'], 0)
+
+    def test_hashes_match_whole_file_digest(self):
+        result = MetadataAnalyzer().analyze_file(self.path)
+
+        self.assertEqual(result['hashes']['SHA256'], hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(result['signature_analysis']['file_header'], self.data[:32].hex())
+
+
+class AnalysisCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = AnalysisCache(os.path.join(self.directory, 'cache', 'analysis.db'))
+        self.path = os.path.join(self.directory, 'report.txt')
+        with open(self.path, 'wb') as f:
+            f.write(b'quarterly report\n' * 500)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_unchanged_file_is_not_reanalyzed(self):
+        analyzer = MetadataAnalyzer(cache=self.cache)
+        first = analyzer.analyze_file(self.path)
+
+        with mock.patch.object(MetadataAnalyzer, '_perform_security_analysis') as security:
+            second = analyzer.analyze_file(self.path)
+
+        security.assert_not_called()
+        self.assertNotIn('cache_hit', first)
+        self.assertEqual(second['cache_hit'], 'unchanged')
+        self.assertEqual(second['hashes'], first['hashes'])
+
+    def test_copied_file_reuses_content_analysis(self):
+        analyzer = MetadataAnalyzer(cache=self.cache)
+        first = analyzer.analyze_file(self.path)
+        copy_path = os.path.join(self.directory, 'copy.txt')
+        shutil.copyfile(self.path, copy_path)
+
+        with mock.patch.object(MetadataAnalyzer, '_perform_security_analysis') as security:
+            copy = analyzer.analyze_file(copy_path)
+
+        security.assert_not_called()
+        self.assertEqual(copy['cache_hit'], 'content')
+        self.assertEqual(copy['filename'], 'copy.txt')
+        self.assertEqual(copy['security_analysis'], first['security_analysis'])
+
+    def test_changed_file_and_new_version_miss(self):
+        MetadataAnalyzer(cache=self.cache).analyze_file(self.path)
+        with open(self.path, 'ab') as f:
+            f.write(b'appendix\n')
+
+        changed = MetadataAnalyzer(cache=self.cache).analyze_file(self.path)
+        self.assertNotIn('cache_hit', changed)
+
+        with mock.patch.object(MetadataAnalyzer, 'ANALYSIS_VERSION', '99'):
+            upgraded = MetadataAnalyzer(cache=self.cache).analyze_file(self.path)
+        self.assertNotIn('cache_hit', upgraded)
+        self.assertEqual(upgraded['analysis_version'], '99')
+
+    def test_pool_workers_share_cache(self):
+        paths = []
+        for i in range(4):
+            path = os.path.join(self.directory, f'file_{i}.txt')
+            with open(path, 'wb') as f:
+                f.write(f'sample {i}\n'.encode() * 100)
+            paths.append(path)
+        analyzer = MetadataAnalyzer(cache=self.cache)
+
+        analyzer.batch_analyze(paths, workers=2, chunk_size=1)
+        second = analyzer.batch_analyze(paths, workers=2, chunk_size=1)
+
+        self.assertEqual(second['cache_hits'], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from app.metaspidey.metadata_analyzer import MetadataAnalyzer, PIL_AVAILABLE
+from app.metaspidey.optional_imports import OptionalModule, availability
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+HEAVY_MODULES = ('numpy', 'PIL.Image', 'PyPDF2', 'docx', 'openpyxl', 'mutagen', 'exifread')
+
+
+class OptionalModuleTestCase(unittest.TestCase):
+    def test_missing_module(self):
+        module = OptionalModule('metaspidey_no_such_module', 'no-such-package')
+
+        self.assertFalse(module.available)
+        with self.assertRaisesRegex(ImportError, 'no-such-package'):
+            module.anything
+
+    def test_imports_on_first_attribute_use(self):
+        module = OptionalModule('json.decoder')
+
+        self.assertTrue(module.available)
+        self.assertFalse(module.loaded)
+        self.assertEqual(module.JSONDecoder.__name__, 'JSONDecoder')
+        self.assertTrue(module.loaded)
+
+    def test_analyzer_import_does_not_load_extractor_libraries(self):
+        code = ('import sys\n'
+                'import app.metaspidey.metadata_analyzer as m\n'
+                'm.MetadataAnalyzer()\n'
+                f'print(",".join(name for name in {HEAVY_MODULES!r} if name in sys.modules))\n')
+        output = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT, capture_output=True,
+                                text=True, check=True).stdout
+
+        self.assertEqual(output.strip(), '')
+        self.assertEqual(set(availability()), {'numpy', 'pil', 'pil_exif_tags', 'pypdf2', 'docx', 'openpyxl',
+                                               'mutagen', 'exifread'})
+
+    @unittest.skipUnless(PIL_AVAILABLE, 'Pillow not installed')
+    def test_image_extractor_loads_pillow(self):
+        from PIL import Image
+
+        fd, path = tempfile.mkstemp(suffix='.png')
+        os.close(fd)
+        try:
+            Image.new('RGB', (8, 4)).save(path)
+            metadata = MetadataAnalyzer().analyze_file(path)['image_metadata']
+        finally:
+            os.remove(path)
+
+        self.assertEqual((metadata['width'], metadata['height']), (8, 4))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from app import create_app, db
+from app.auth.models import User
+from app.config import TestingConfig
+from app.file_manager.path_policy import PathPolicy, PathResolver, PathTrie
+from app.file_manager.routes import ALLOWED_PATHS, RESTRICTED_PATHS
+
+
+class PathPolicyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir='/tmp')
+        self.policy = PathPolicy(ALLOWED_PATHS, RESTRICTED_PATHS, home='/home/analyst')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_trie_matches_whole_components(self):
+        trie = PathTrie(['/root', '/var/log'])
+        self.assertTrue(trie.matches('/root'))
+        self.assertTrue(trie.matches('/root/.ssh/id_rsa'))
+        self.assertFalse(trie.matches('/rootfs/etc'))
+        self.assertFalse(trie.matches('/var/logs'))
+        self.assertFalse(trie.matches('/var'))
+        self.assertTrue(PathTrie(['/']).matches('/anything'))
+
+    def test_roles(self):
+        self.assertFalse(self.policy.is_allowed('/proc/1/environ', admin=True))
+        self.assertFalse(self.policy.is_allowed('/root/.bash_history'))
+        self.assertTrue(self.policy.is_allowed('/root/.bash_history', admin=True))
+        self.assertTrue(self.policy.is_allowed('/usr/bin', admin=True))
+        self.assertFalse(self.policy.is_allowed('/usr/bin'))
+        self.assertTrue(self.policy.is_allowed('/usr/local/bin'))
+        self.assertTrue(self.policy.is_allowed('/home/analyst/loot'))
+        self.assertTrue(self.policy.is_allowed('/tmp/../etc/hosts'))
+        self.assertFalse(self.policy.is_allowed('/tmp/../proc/self'))
+
+    def test_prefix_is_not_a_component(self):
+        os.makedirs('/tmp/rootfs_policy_test', exist_ok=True)
+        try:
+            policy = PathPolicy(['/tmp'], ['/tmp/rootfs_policy'])
+            self.assertTrue(policy.is_allowed('/tmp/rootfs_policy_test'))
+            self.assertFalse(policy.is_allowed('/tmp/rootfs_policy/x'))
+        finally:
+            os.rmdir('/tmp/rootfs_policy_test')
+
+    def test_symlink_cannot_escape(self):
+        os.symlink('/proc', os.path.join(self.directory, 'proc_link'))
+        os.symlink('/usr/bin', os.path.join(self.directory, 'bin_link'))
+        os.symlink(self.directory, os.path.join(self.directory, 'self_link'))
+        resolver = PathResolver()
+
+        for admin in (False, True):
+            self.assertFalse(self.policy.is_allowed(os.path.join(self.directory, 'proc_link', 'self'), admin))
+            self.assertFalse(self.policy.is_allowed(os.path.join(self.directory, 'proc_link'), admin, resolver))
+        self.assertFalse(self.policy.is_allowed(os.path.join(self.directory, 'bin_link', 'sh'), False, resolver))
+        self.assertTrue(self.policy.is_allowed(os.path.join(self.directory, 'bin_link', 'sh'), True, resolver))
+        self.assertTrue(self.policy.is_allowed(os.path.join(self.directory, 'self_link', 'notes.txt'), False, resolver))
+
+    def test_resolver_matches_realpath(self):
+        os.makedirs(os.path.join(self.directory, 'a', 'b'))
+        os.symlink('a/b', os.path.join(self.directory, 'link'))
+        os.symlink('../link', os.path.join(self.directory, 'a', 'up'))
+        resolver = PathResolver()
+        for name in ('a/b/file', 'link', 'link/file', 'a/up', 'a/up/file', 'missing/file'):
+            path = os.path.join(self.directory, name)
+            self.assertEqual(resolver.resolve(path), os.path.realpath(path))
+
+
+class PathPolicyRouteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir='/tmp')
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.user = User(username='policyuser', email='policy@example.com')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = self.user.id
+            sess['_fresh'] = True
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_restricted_and_symlinked_paths(self):
+        os.symlink('/proc', os.path.join(self.directory, 'proc_link'))
+        self.assertEqual(self.client.get('/file_manager/api/list', query_string={'path': '/proc'}).status_code, 403)
+        response = self.client.get('/file_manager/api/list', query_string={'path': os.path.join(self.directory, 'proc_link')})
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get('/file_manager/api/list', query_string={'path': self.directory})
+        self.assertEqual(response.status_code, 200)
+
+    def test_decisions_follow_the_user(self):
+        response = self.client.get('/file_manager/api/list', query_string={'path': '/root'})
+        self.assertEqual(response.status_code, 403)
+
+        # The app context outlives requests here; answers of the last request must not be reused
+        self.user.role = 'admin'
+        db.session.commit()
+        response = self.client.get('/file_manager/api/list', query_string={'path': '/root'})
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import unittest
+from unittest import mock
+
+from app.metaspidey import patterns
+
+
+class RepeatedSequencesTestCase(unittest.TestCase):
+    def setUp(self):
+        # Distinct repeat counts so the top sequences have no ties
+        self.data = (os.urandom(50000) + b'\xde\xad\xbe\xef' * 40 + os.urandom(1000) +
+                     b'0123456789abcdefXYZ' * 25 + os.urandom(1000))
+
+    def _by_length(self, results, length):
+        return [(r['sequence'], r['count']) for r in results if r['length'] == length]
+
+    def test_finds_overlapping_repeats(self):
+        results = patterns.top_repeated_sequences(self.data, top=1)
+
+        self.assertEqual(self._by_length(results, 4), [(b'\xde\xad\xbe\xef'.hex(), 40)])
+        sequence, count = self._by_length(results, 16)[0]
+        # Overlapping 16-byte windows of the period-4 run
+        self.assertIn(sequence, (b'\xde\xad\xbe\xef' * 5).hex())
+        self.assertEqual(count, self.data.count(bytes.fromhex(sequence)[:4]) - 3)
+
+    def test_numpy_matches_python(self):
+        vectorized = patterns.top_repeated_sequences(self.data, lengths=(4, 12, 16), top=1)
+        with mock.patch.object(patterns, 'NUMPY_AVAILABLE', False):
+            fallback = patterns.top_repeated_sequences(self.data, lengths=(4, 12, 16), top=1)
+
+        self.assertEqual([r['count'] for r in vectorized], [r['count'] for r in fallback])
+
+    def test_short_input(self):
+        self.assertEqual(patterns.top_repeated_sequences(b'abc'), [])
+
+
+class ExtractStringsTestCase(unittest.TestCase):
+    def test_single_scan_classifies_strings(self):
+        data = (b'\x00\x01see https://example.com/a/b?x=1 and mail admin@example.org from 10.0.0.1 '
+                b'config at /etc/passwd or C:\\Windows\\system32\\cmd.exe\xff')
+
+        found = patterns.extract_strings(data)
+
+        self.assertEqual(found['url'], ['https://example.com/a/b?x=1'])
+        self.assertEqual(found['email'], ['admin@example.org'])
+        self.assertEqual(found['ip'], ['10.0.0.1'])
+        self.assertEqual(found['path'], ['/etc/passwd', 'C:\\Windows\\system32\\cmd.exe'])
+
+    def test_limits(self):
+        found = patterns.extract_strings(b' 1.2.3.4 ' * 100, limits={'ip': 3, 'url': 1})
+
+        self.assertEqual(found, {'ip': ['1.2.3.4'] * 3, 'url': []})
+
+
+if __name__ == '__main__':
+    unittest.main()
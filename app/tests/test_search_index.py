@@ -0,0 +1,180 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+from app import create_app, db
+from app.auth.models import User
+from app.config import TestingConfig
+from app.file_manager.search_index import FilenameIndex, name_matcher
+
+
+class FilenameIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir='/tmp')
+        for relative_path in ('src/report.py', 'src/Report.txt', 'docs/report', 'docs/old_report.md',
+                              'src/.git/report_hidden', 'notes.md'):
+            self.touch(relative_path)
+        self.index = FilenameIndex(os.path.join(self.directory, 'index', 'files.db'),
+                                   exclude=[os.path.join(self.directory, 'index')])
+        self.index.refresh(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def touch(self, relative_path):
+        path = os.path.join(self.directory, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, 'w').close()
+
+    def names(self, query, **options):
+        return [item['name'] for item in self.index.search(self.directory, query, **options)['items']]
+
+    def test_substring_ranking(self):
+        # Exact name, then prefix matches (shorter first), then matches anywhere
+        self.assertEqual(self.names('report'), ['report', 'report.py', 'Report.txt', 'old_report.md'])
+        self.assertEqual(self.names('RE'), self.names('re'))
+        self.assertIn('report_hidden', self.names('report', show_hidden=True))
+
+    def test_glob_regex_and_scope(self):
+        self.assertEqual(sorted(self.names('*.md', mode='glob')), ['notes.md', 'old_report.md'])
+        self.assertEqual(self.names('^R', mode='regex'), ['Report.txt'])
+        found = self.index.search(os.path.join(self.directory, 'docs'), 'report')
+        self.assertEqual(found['total'], 2)
+        with self.assertRaises(ValueError):
+            self.index.search(self.directory, '(', mode='regex')
+
+    def test_hidden_is_relative_to_the_search_base(self):
+        self.touch('.cfg/sub/target.conf')
+        self.touch('.cfg/.cache/target.tmp')
+        self.index.refresh(self.directory)
+
+        self.assertEqual(self.names('target'), [])
+        found = self.index.search(os.path.join(self.directory, '.cfg'), 'target')
+        self.assertEqual([item['name'] for item in found['items']], ['target.conf'])
+        self.assertEqual(found['total'], 1)
+        self.assertEqual(len(self.names('target', show_hidden=True)), 2)
+
+    def test_glob_follows_fnmatch(self):
+        for name in ('a1.log', 'b1.log', '!1.log', 'x[1.log'):
+            self.touch(f'globs/{name}')
+        self.index.refresh(self.directory)
+
+        self.assertEqual(sorted(self.names('[!a]1.log', mode='glob')), ['!1.log', 'b1.log'])
+        self.assertEqual(sorted(self.names('[ab]1.log', mode='glob')), ['a1.log', 'b1.log'])
+        self.assertEqual(self.names('x[1.log', mode='glob'), ['x[1.log'])  # An unterminated [ is literal
+
+    def test_excluded_subtrees(self):
+        found = self.index.search(self.directory, 'report', show_hidden=True,
+                                  exclude=[os.path.join(self.directory, 'src'), '/proc'])
+        self.assertEqual(sorted(item['name'] for item in found['items']), ['old_report.md', 'report'])
+        self.assertEqual(found['total'], 2)
+        self.assertEqual(self.names('src', exclude=[os.path.join(self.directory, 'src')]), [])
+
+    def test_pagination(self):
+        first = self.index.search(self.directory, 'report', offset=0, limit=3)
+        rest = self.index.search(self.directory, 'report', offset=3, limit=3)
+        self.assertEqual(first['total'], 4)
+        self.assertEqual(len(first['items']) + len(rest['items']), 4)
+
+    def test_incremental_refresh(self):
+        os.remove(os.path.join(self.directory, 'src', 'report.py'))
+        shutil.rmtree(os.path.join(self.directory, 'docs'))
+        self.touch('src/new_report.py')
+
+        self.index.refresh(self.directory)
+
+        self.assertEqual(self.names('report'), ['Report.txt', 'new_report.py'])
+        self.assertEqual(self.index.covering_root(os.path.join(self.directory, 'src')), self.directory)
+
+    def test_name_matcher(self):
+        self.assertTrue(name_matcher('REP')('report.py'))
+        self.assertTrue(name_matcher('*.py', 'glob')('report.py'))
+        self.assertFalse(name_matcher('*.PY', 'glob')('report.py'))
+        with self.assertRaises(ValueError):
+            name_matcher('x', 'fuzzy')
+
+
+class SearchRouteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.user = User(username='searchuser', email='search@example.com')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = self.user.id
+            sess['_fresh'] = True
+
+        self.directory = tempfile.mkdtemp(dir='/tmp')
+        for i in range(5):
+            open(os.path.join(self.directory, f'match_{i}.log'), 'w').close()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def search(self, **params):
+        return self.client.get('/file_manager/search', query_string=dict(params, path=self.directory)).get_json()
+
+    def test_walk_without_index(self):
+        data = self.search(query='match', limit=2, page=3)
+        self.assertEqual(data['source'], 'walk')
+        self.assertEqual(data['total'], 5)
+        self.assertEqual([item['name'] for item in data['items']], ['match_4.log'])
+        self.assertFalse(data['has_more'])
+
+    def test_search_from_index(self):
+        from app.file_manager.routes import get_search_index
+
+        self.app.config['FILE_MANAGER_SEARCH_INDEX'] = os.path.join(self.directory, '.index', 'files.db')
+        get_search_index().refresh(self.directory)
+
+        data = self.search(query='match_*.log', mode='glob', limit=2)
+        self.assertEqual(data['source'], 'index')
+        self.assertEqual(data['total'], 5)
+        self.assertEqual(len(data['items']), 2)
+        self.assertTrue(data['has_more'])
+
+        denied = os.path.join(self.directory, 'match_0.log')
+        with mock.patch('app.file_manager.routes.is_path_allowed', lambda path: path != denied):
+            data = self.search(query='match_0', limit=2)
+        self.assertEqual(data['items'], [])
+        self.assertEqual(data['total'], 1)
+        self.assertTrue(data['total_approximate'])
+
+        self.assertEqual(self.client.get('/file_manager/search', query_string={
+            'path': self.directory, 'query': '[', 'mode': 'regex'}).status_code, 400)
+
+    def test_walk_when_sqlite_fails(self):
+        path = os.path.join(self.directory, '.index', 'files.db')
+        self.app.config['FILE_MANAGER_SEARCH_INDEX'] = path
+        no_trigram = sqlite3.OperationalError('no such tokenizer: trigram')
+        with mock.patch.object(FilenameIndex, '__init__', side_effect=no_trigram) as init:
+            self.assertEqual(self.search(query='match')['source'], 'walk')
+            self.assertEqual(self.search(query='match')['total'], 5)
+        init.assert_called_once()  # Not retried on every search
+
+        path = os.path.join(self.directory, '.index', 'other.db')
+        self.app.config['FILE_MANAGER_SEARCH_INDEX'] = path
+        from app.file_manager.routes import get_search_index
+        get_search_index().refresh(self.directory)
+        with mock.patch.object(FilenameIndex, 'search', side_effect=no_trigram):
+            data = self.search(query='match')
+        self.assertTrue(data['success'])
+        self.assertEqual(data['source'], 'walk')
+        self.assertEqual(data['total'], 5)
+        self.assertIsNone(get_search_index())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from app.metaspidey.metadata_analyzer import MetadataAnalyzer
+from app.metaspidey.threat_scanner import ThreatScanner, load_rules, parse_rules
+
+RULES = r'''
+// Sample rules
+rule Dropper : windows loader {
+    meta:
+        description = "PE dropper launching a shell"
+        severity = "high"
+    strings:
+        $mz = { 4D 5A ?? 00 }
+        $cmd = "CMD.EXE" nocase
+        $ps = "powershell" wide ascii
+        $url = /https?:\/\/[a-z0-9.]+\/payload/
+    condition:
+        $mz and ($cmd or $ps) and #url >= 2
+}
+
+rule AnyMarker {
+    strings:
+        $a1 = "marker-one"
+        $a2 = "marker-two"
+        $b = "other"
+    condition:
+        any of ($a*) and not $b
+}
+'''
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class ThreatScannerTestCase(unittest.TestCase):
+    def test_counts_and_offsets_across_chunk_boundaries(self):
+        scanner = ThreatScanner([b'eval(', b'powershell'])
+        data = b'x' * 98 + b'eval(' + b'y' * 50 + b'powershell' + b'eval('
+
+        result = scanner.scan(chunked(data, 100))
+
+        self.assertEqual(result['indicators']['eval(']['count'], 2)
+        self.assertEqual(result['indicators']['eval(']['offsets'], [98, 163])
+        self.assertEqual(result['indicators']['powershell']['offsets'], [153])
+        self.assertEqual(result['bytes_scanned'], len(data))
+
+    def test_chunking_does_not_change_results(self):
+        rules = parse_rules(RULES)
+        scanner = ThreatScanner([b'eval(', b'cmd.exe'], rules)
+        data = (os.urandom(3000) + b'MZ\x90\x00 cmd.exe http://evil.example/payload eval(' +
+                'powershell'.encode('utf-16-le') + b' https://evil.example/payload') * 3
+
+        whole = scanner.scan([data])
+        for size in (7, 64, 1000):
+            self.assertEqual(scanner.scan(chunked(data, size)), whole)
+
+        self.assertEqual([rule['rule'] for rule in whole['rules']], ['Dropper'])
+        dropper = whole['rules'][0]
+        self.assertEqual(dropper['severity'], 'high')
+        self.assertEqual(dropper['tags'], ['windows', 'loader'])
+        self.assertEqual(dropper['strings']['$cmd']['count'], 3)
+        self.assertEqual(dropper['strings']['$url']['count'], 6)
+
+    def test_conditions(self):
+        scanner = ThreatScanner(rules=parse_rules(RULES))
+
+        self.assertEqual([r['rule'] for r in scanner.scan([b'marker-two'])['rules']], ['AnyMarker'])
+        self.assertEqual(scanner.scan([b'marker-one other'])['rules'], [])
+
+    def test_nested_and_overlapping_literals(self):
+        scanner = ThreatScanner([b'exec(', b'shell_exec', b'shell'])
+        result = scanner.scan([b'shell_exec($_GET[1])'])
+        self.assertEqual({name: match['offsets'] for name, match in result['indicators'].items()},
+                         {'shell_exec': [0], 'shell': [0], 'exec(': [6]})
+
+        # A literal cut by a chunk boundary is counted once, with its prefix literals
+        data = b'x' * 95 + b'shell_exec(' + b'y' * 20
+        for size in (7, 96, 100, 103):
+            self.assertEqual(scanner.scan(chunked(data, size)), scanner.scan([data]))
+        self.assertEqual(ThreatScanner([b'aa']).scan([b'aaaa'])['indicators']['aa']['count'], 3)
+
+    def test_rule_strings_do_not_hide_indicators(self):
+        rules = parse_rules('rule R {\n strings:\n $a = "powershell -enc"\n $b = "script" nocase\n'
+                            ' condition:\n all of them\n}')
+        scanner = ThreatScanner([b'powershell', b'<script'], rules)
+        result = scanner.scan([b'powershell -enc SQBFAFgA <script>x</script>'])
+
+        self.assertEqual(result['indicators']['powershell']['offsets'], [0])
+        self.assertEqual(result['indicators']['<script']['count'], 1)
+        self.assertEqual(result['rules'][0]['strings']['$a']['offsets'], [0])
+        self.assertEqual(result['rules'][0]['strings']['$b']['offsets'], [26, 36])
+
+    def test_single_line_rules(self):
+        rules = parse_rules('rule r { strings: $a = "x}" $h = { 4D 5A } condition: $a and $h } '
+                            'rule s : web { meta: note = "condition: none" condition: true }')
+        self.assertEqual([(rule.name, rule.tags) for rule in rules], [('r', []), ('s', ['web'])])
+        self.assertEqual(rules[1].meta, {'note': 'condition: none'})
+        self.assertEqual([r['rule'] for r in ThreatScanner(rules=rules).scan([b'MZ x}'])['rules']], ['r', 's'])
+
+    def test_unparsed_rule_text_is_an_error(self):
+        for text in ('rule r { strings: $a = "x" condition: $a',
+                     'rule r { condition: true } stray text',
+                     'rule r { strings: $a = unquoted condition: $a }'):
+            with self.assertRaises(ValueError):
+                parse_rules(text)
+
+    def test_invalid_rules(self):
+        with self.assertRaises(ValueError):
+            parse_rules('rule Broken {\n strings:\n $a = "x"\n condition:\n $b\n}')
+
+        directory = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(directory, 'good.yar'), 'w') as f:
+                f.write(RULES)
+            with open(os.path.join(directory, 'bad.yar'), 'w') as f:
+                f.write('rule Bad {\n condition:\n $missing\n}')
+
+            self.assertEqual([rule.name for rule in load_rules(directory)], ['Dropper', 'AnyMarker'])
+        finally:
+            shutil.rmtree(directory)
+
+
+class SecurityAnalysisTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.rules_path = os.path.join(self.directory, 'rules.yar')
+        with open(self.rules_path, 'w') as f:
+            f.write(RULES)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_scans_past_first_megabyte(self):
+        path = os.path.join(self.directory, 'late.txt')
+        with open(path, 'wb') as f:
+            f.write(b'a' * (3 * 1024 * 1024) + b' marker-one eval( ')
+
+        security = MetadataAnalyzer(rules_path=self.rules_path).analyze_file(path)['security_analysis']
+
+        self.assertEqual(security['threat_indicators_found'], ['eval('])
+        self.assertEqual(security['threat_matches']['eval(']['offsets'], [3 * 1024 * 1024 + 12])
+        self.assertEqual([r['rule'] for r in security['rule_matches']], ['AnyMarker'])
+        self.assertEqual(security['risk_level'], 'medium')
+
+
+if __name__ == '__main__':
+    unittest.main()
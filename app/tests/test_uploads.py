@@ -0,0 +1,181 @@
+import base64
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from app import create_app, db
+from app.auth.models import User
+from app.config import TestingConfig
+from app.file_manager.uploads import UploadError, UploadStore
+
+
+class UploadStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir='/tmp')
+        self.store = UploadStore(os.path.join(self.directory, '.state'))
+        self.data = os.urandom(300000)
+        self.checksum = 'sha256:' + hashlib.sha256(self.data).hexdigest()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def create(self, **options):
+        return self.store.create(self.directory, 'capture.pcap', len(self.data), user_id=1, **options)
+
+    def test_chunks_and_finalize(self):
+        session = self.create(checksum=self.checksum)
+        offset = 0
+        for start in range(0, len(self.data), 100000):
+            offset = self.store.write_chunk(session, offset, io.BytesIO(self.data[start:start + 100000]))
+
+        self.assertEqual(offset, len(self.data))
+        path = self.store.finalize(session)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertEqual(sorted(os.listdir(self.directory)), ['.state', 'capture.pcap'])  # .part file and state are gone
+        self.assertEqual(os.listdir(self.store.state_dir), [])
+
+    def test_resume_in_another_process(self):
+        session = self.create(checksum=self.checksum)
+        self.store.write_chunk(session, 0, io.BytesIO(self.data[:1000]))
+
+        # A fresh store (another worker, or after a restart) knows the upload and rehashes at the end
+        store = UploadStore(self.store.state_dir)
+        session = store.get(session.id)
+        self.assertEqual(session.offset, 1000)
+        with self.assertRaises(UploadError) as raised:
+            store.write_chunk(session, 0, io.BytesIO(self.data))
+        self.assertEqual((raised.exception.status, raised.exception.offset), (409, 1000))
+
+        store.write_chunk(session, 1000, io.BytesIO(self.data[1000:]))
+        self.assertTrue(os.path.exists(store.finalize(session)))
+
+    def test_chunk_checksum_and_size(self):
+        session = self.create()
+        chunk = self.data[:5000]
+        good = 'sha256 ' + base64.b64encode(hashlib.sha256(chunk).digest()).decode()
+        bad = 'sha256 ' + base64.b64encode(hashlib.sha256(b'other').digest()).decode()
+
+        with self.assertRaises(UploadError) as raised:
+            self.store.write_chunk(session, 0, io.BytesIO(chunk), chunk_checksum=bad)
+        self.assertEqual(raised.exception.status, 460)
+        self.assertEqual(session.offset, 0)  # The corrupt chunk was discarded
+
+        self.assertEqual(self.store.write_chunk(session, 0, io.BytesIO(chunk), chunk_checksum=good), 5000)
+        with self.assertRaises(UploadError) as raised:
+            self.store.write_chunk(session, 5000, io.BytesIO(self.data + b'extra'))
+        self.assertEqual(raised.exception.status, 413)
+        self.assertEqual(session.offset, 5000)
+
+    def test_file_checksum_mismatch_discards_upload(self):
+        session = self.create(checksum='sha256:' + '0' * 64)
+        self.store.write_chunk(session, 0, io.BytesIO(self.data))
+
+        with self.assertRaises(UploadError):
+            self.store.finalize(session)
+        self.assertIsNone(self.store.get(session.id))
+        self.assertEqual(os.listdir(self.directory), ['.state'])
+
+    def test_incomplete_and_existing(self):
+        session = self.create()
+        with self.assertRaises(UploadError) as raised:
+            self.store.finalize(session)
+        self.assertEqual(raised.exception.status, 409)
+
+        open(os.path.join(self.directory, 'capture.pcap'), 'w').close()
+        with self.assertRaises(UploadError):
+            self.create()
+        with self.assertRaises(UploadError):
+            self.store.create(self.directory, 'x', 1, user_id=1, checksum='crc32:00')
+
+
+class UploadRouteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir='/tmp')
+        self.app = create_app(TestingConfig)
+        self.app.config['FILE_MANAGER_UPLOAD_STATE_DIR'] = os.path.join(self.directory, '.state')
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.user = User(username='uploaduser', email='upload@example.com')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        db.session.commit()
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = self.user.id
+            sess['_fresh'] = True
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_upload_protocol(self):
+        data = os.urandom(50000)
+        response = self.client.post('/file_manager/uploads', data={
+            'path': self.directory, 'filename': 'wordlist.txt', 'size': len(data),
+            'checksum': 'sha256:' + hashlib.sha256(data).hexdigest()})
+        self.assertEqual(response.status_code, 201)
+        url = response.headers['Location']
+
+        response = self.client.patch(url, data=data[:20000], headers={'Upload-Offset': '0'})
+        self.assertEqual(response.headers['Upload-Offset'], '20000')
+        self.assertEqual(self.client.patch(url, data=data, headers={'Upload-Offset': '0'}).status_code, 409)
+        self.assertEqual(self.client.head(url).headers['Upload-Offset'], '20000')
+
+        self.client.patch(url, data=data[20000:], headers={'Upload-Offset': '20000'})
+        response = self.client.post(url + '/finalize')
+        self.assertTrue(response.get_json()['success'])
+        with open(os.path.join(self.directory, 'wordlist.txt'), 'rb') as f:
+            self.assertEqual(f.read(), data)
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_cancel(self):
+        response = self.client.post('/file_manager/uploads', data={
+            'path': self.directory, 'filename': 'big.bin', 'size': 10})
+        url = response.headers['Location']
+
+        self.assertTrue(self.client.delete(url).get_json()['success'])
+        self.assertEqual(os.listdir(self.directory), ['.state'])
+
+    def test_destination_no_longer_allowed(self):
+        response = self.client.post('/file_manager/uploads', data={
+            'path': self.directory, 'filename': 'late.bin', 'size': 4})
+        url = response.headers['Location']
+        self.client.patch(url, data=b'data', headers={'Upload-Offset': '0'})
+
+        denied = PermissionError(f"Access to {self.directory} is restricted")
+        with mock.patch('app.file_manager.routes.get_safe_path', side_effect=denied):
+            for response in (self.client.get(url), self.client.post(url + '/finalize'), self.client.delete(url)):
+                self.assertEqual(response.status_code, 403)
+                self.assertFalse(response.get_json()['success'])
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'late.bin')))
+
+    def test_finalize_error(self):
+        response = self.client.post('/file_manager/uploads', data={
+            'path': self.directory, 'filename': 'full.bin', 'size': 4})
+        url = response.headers['Location']
+        self.client.patch(url, data=b'data', headers={'Upload-Offset': '0'})
+
+        with mock.patch('app.file_manager.uploads.os.fsync', side_effect=OSError(28, 'No space left on device')):
+            response = self.client.post(url + '/finalize')
+        self.assertEqual(response.status_code, 500)
+        self.assertIn('No space left on device', response.get_json()['error'])
+        self.assertTrue(self.client.post(url + '/finalize').get_json()['success'])  # Can be retried
+
+    def test_single_post_upload(self):
+        response = self.client.post('/file_manager/upload_file', data={
+            'path': self.directory, 'file': (io.BytesIO(b'admin\nroot\n'), 'users.txt')})
+        self.assertTrue(response.get_json()['success'])
+        self.assertEqual(os.path.getsize(os.path.join(self.directory, 'users.txt')), 11)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,212 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from app import create_app, db, socketio
+from app.auth.models import User
+from app.config import TestingConfig
+from app.file_manager.events import LiveDirectories
+from app.file_manager.listing import DirectoryListingCache
+from app.file_manager.watcher import DirectoryWatcher, GONE, RESCAN, merge_change
+
+
+class RecordingSocketIO:
+    """Stand-in for flask_socketio.SocketIO that records emitted events"""
+
+    server = object()
+
+    def __init__(self):
+        self.emitted = []
+        self.received = threading.Event()
+
+    def emit(self, event, data, to=None, namespace=None):
+        self.emitted.append((event, data, to, namespace))
+        self.received.set()
+
+
+class Batches:
+    """on_change callback collecting the batches of a DirectoryWatcher"""
+
+    def __init__(self):
+        self.batches = []
+        self.condition = threading.Condition()
+
+    def __call__(self, directory, changes):
+        with self.condition:
+            self.batches.append((directory, changes))
+            self.condition.notify_all()
+
+    def changes(self):
+        return {(change['type'], change.get('name')) for _, changes in self.batches for change in changes}
+
+    def wait_for(self, *expected, timeout=5):
+        with self.condition:
+            self.condition.wait_for(lambda: set(expected) <= self.changes(), timeout)
+        return self.changes()
+
+
+class DirectoryWatcherTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir='/tmp')
+        self.batches = Batches()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def watcher(self, **options):
+        options.setdefault('batch_delay', 0.05)
+        return DirectoryWatcher(self.batches, **options)
+
+    def check_changes(self, watcher):
+        path = os.path.join(self.directory, 'scan.xml')
+        with open(path, 'w') as f:
+            f.write('<nmaprun>')
+        changes = self.batches.wait_for(('created', 'scan.xml'))
+        self.assertEqual(changes, {('created', 'scan.xml')})  # One change for create and write
+
+        with open(path, 'a') as f:
+            f.write('</nmaprun>')
+        os.mkdir(os.path.join(self.directory, 'loot'))
+        self.batches.wait_for(('modified', 'scan.xml'), ('created', 'loot'))
+
+        os.remove(path)
+        self.assertIn(('deleted', 'scan.xml'), self.batches.wait_for(('deleted', 'scan.xml')))
+        watcher.unwatch(self.directory)
+        self.assertEqual(watcher.watched(), {})
+
+    def test_inotify(self):
+        watcher = self.watcher()
+        backend = watcher.watch(self.directory)
+        if backend != 'inotify':
+            self.skipTest('inotify is not available')
+        self.check_changes(watcher)
+
+    def test_polling_fallback(self):
+        watcher = self.watcher(use_inotify=False, poll_interval=0.05)
+        self.assertEqual(watcher.watch(self.directory), 'polling')
+        self.check_changes(watcher)
+
+    def test_subscribers_are_counted(self):
+        watcher = self.watcher(use_inotify=False)
+        watcher.watch(self.directory)
+        watcher.watch(self.directory)
+        watcher.unwatch(self.directory)
+        self.assertEqual(watcher.watched(), {self.directory: 1})
+        watcher.unwatch(self.directory)
+        self.assertEqual(watcher.watched(), {})
+
+    def test_large_batches_ask_for_a_rescan(self):
+        for use_inotify in (True, False):
+            batches = Batches()
+            watcher = DirectoryWatcher(batches, poll_interval=0.05, batch_delay=0.3, max_batch=10,
+                                       use_inotify=use_inotify)
+            watcher.watch(self.directory)
+            for i in range(50):
+                open(os.path.join(self.directory, f'{use_inotify}_{i}.txt'), 'w').close()
+            self.assertEqual(batches.wait_for((RESCAN, None)), {(RESCAN, None)})
+            watcher.unwatch(self.directory)
+
+    def test_removed_directory(self):
+        watcher = self.watcher(poll_interval=0.05)
+        watcher.watch(self.directory)
+        shutil.rmtree(self.directory)
+        self.assertIn((GONE, None), self.batches.wait_for((GONE, None)))
+        self.assertEqual(watcher.watched(), {})
+
+    def test_merge_change(self):
+        self.assertEqual(merge_change(None, 'modified'), 'modified')
+        self.assertEqual(merge_change('created', 'modified'), 'created')
+        self.assertIsNone(merge_change('created', 'deleted'))
+        self.assertEqual(merge_change('deleted', 'created'), 'modified')
+        self.assertEqual(merge_change('modified', 'deleted'), 'deleted')
+
+
+class LiveDirectoriesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir='/tmp')
+        self.socketio = RecordingSocketIO()
+        self.invalidated = []
+        self.live = LiveDirectories(self.socketio, describe=lambda path: {'name': os.path.basename(path)},
+                                    invalidate=self.invalidated.append)
+        self.live.watcher.batch_delay = 0.05
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_changes_are_pushed_to_the_directory_room(self):
+        self.live.subscribe('sid1', self.directory)
+        self.live.subscribe('sid2', self.directory)
+        self.assertEqual(self.live.watcher.watched(), {self.directory: 2})
+
+        open(os.path.join(self.directory, 'hashes.txt'), 'w').close()
+        self.assertTrue(self.socketio.received.wait(5))
+        event, data, room, namespace = self.socketio.emitted[0]
+        self.assertEqual((event, room, namespace), ('changes', LiveDirectories.room(self.directory), '/file_manager'))
+        self.assertEqual(data, {'path': self.directory, 'changes': [
+            {'type': 'created', 'name': 'hashes.txt', 'item': {'name': 'hashes.txt'}}]})
+        self.assertEqual(self.invalidated, [self.directory])
+
+        self.live.disconnect('sid1')
+        self.live.unsubscribe('sid2', self.directory)
+        self.assertEqual(self.live.watcher.watched(), {})
+
+    def test_listing_cache_invalidate(self):
+        cache = DirectoryListingCache()
+        scans = []
+        scan = lambda directory, show_hidden: scans.append(directory) or []
+        cache.snapshot(self.directory, False, scan)
+        cache.snapshot(self.directory, False, scan)
+        cache.invalidate(self.directory)
+        cache.snapshot(self.directory, False, scan)
+        self.assertEqual(len(scans), 2)
+
+
+class WatchHandlerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir='/tmp')
+        self.app = create_app(TestingConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.user = User(username='watchuser', email='watch@example.com')
+        self.user.set_password('password123')
+        db.session.add(self.user)
+        db.session.commit()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_watch_requires_login(self):
+        client = socketio.test_client(self.app, namespace='/file_manager', flask_test_client=self.client)
+        reply = client.emit('watch', {'path': self.directory}, namespace='/file_manager', callback=True)
+        self.assertFalse(reply['success'])
+        client.disconnect(namespace='/file_manager')
+
+    def test_watch(self):
+        from app.file_manager.routes import live_directories
+
+        with self.client.session_transaction() as sess:
+            sess['_user_id'] = self.user.id
+            sess['_fresh'] = True
+        client = socketio.test_client(self.app, namespace='/file_manager', flask_test_client=self.client)
+        reply = client.emit('watch', {'path': '/proc'}, namespace='/file_manager', callback=True)
+        self.assertFalse(reply['success'])
+
+        reply = client.emit('watch', {'path': self.directory}, namespace='/file_manager', callback=True)
+        self.assertTrue(reply['success'])
+        self.assertIn(reply['backend'], ('inotify', 'polling'))
+        self.assertEqual(live_directories.watcher.watched().get(self.directory), 1)
+
+        client.disconnect(namespace='/file_manager')
+        self.assertNotIn(self.directory, live_directories.watcher.watched())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from app.metaspidey.wordlists import WordlistCatalog, iter_wordlist
+
+
+class WordlistCatalogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, 'Web-Content'))
+        self.common = self._write('Web-Content/common.txt', 'admin\nlogin\nbackup\n')
+        self.extra = self._write('Web-Content/extra.txt', 'login\nzeta\n# comment\nadmin\napi')
+        self._write('Web-Content/readme.md', 'not a wordlist\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def _write(self, relative_path, content):
+        path = os.path.join(self.root, relative_path)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_refresh_indexes_wordlists(self):
+        entries = WordlistCatalog(self.root).refresh()
+
+        self.assertEqual([e['name'] for e in entries], ['common.txt', 'extra.txt'])
+        common = entries[0]
+        self.assertEqual(common['lines'], 3)
+        self.assertEqual(common['category'], 'Web-Content')
+        with open(self.common, 'rb') as f:
+            self.assertEqual(common['sha256'], hashlib.sha256(f.read()).hexdigest())
+        self.assertEqual(entries[1]['lines'], 5)
+        self.assertTrue(os.path.exists(os.path.join(self.root, WordlistCatalog.INDEX_FILE)))
+
+    def test_unchanged_files_are_not_rescanned(self):
+        WordlistCatalog(self.root).refresh()
+        self._write('Web-Content/new.txt', 'one\n')
+
+        with mock.patch.object(WordlistCatalog, '_scan', wraps=WordlistCatalog(self.root)._scan) as scan:
+            entries = WordlistCatalog(self.root).refresh()
+
+        self.assertEqual(len(entries), 3)
+        self.assertEqual(scan.call_count, 1)
+
+    def test_entries_are_loaded_from_persisted_index(self):
+        WordlistCatalog(self.root).refresh()
+
+        with mock.patch.object(WordlistCatalog, 'refresh') as refresh:
+            entries = WordlistCatalog(self.root).entries()
+
+        refresh.assert_not_called()
+        self.assertEqual(len(entries), 2)
+
+    def test_merge_sorts_and_deduplicates(self):
+        catalog = WordlistCatalog(self.root)
+        catalog.MERGE_RUN_ENTRIES = 2  # Force several sorted runs
+
+        merged = catalog.merge([self.common, self.extra])
+
+        self.assertEqual(list(iter_wordlist(merged['path'])), ['admin', 'api', 'backup', 'login', 'zeta'])
+        self.assertEqual(merged['lines'], 5)
+        self.assertEqual(catalog.find(merged['path'])['sha256'], merged['sha256'])
+        self.assertEqual([f for f in os.listdir(os.path.dirname(merged['path']))], [merged['name']])
+
+        # The same selection reuses the merged file
+        mtime = os.stat(merged['path']).st_mtime_ns
+        again = catalog.merge([self.extra, self.common])
+        self.assertEqual(again['path'], merged['path'])
+        self.assertEqual(os.stat(again['path']).st_mtime_ns, mtime)
+
+    def test_merge_rejects_uncatalogued_paths(self):
+        with self.assertRaises(ValueError):
+            WordlistCatalog(self.root).merge([self.common, '/etc/passwd'])
+
+    def test_missing_index_is_built_in_the_background(self):
+        catalog = WordlistCatalog(self.root)
+        scan = catalog._scan
+        release = threading.Event()
+
+        def slow_scan(path):
+            release.wait(5)
+            return scan(path)
+
+        with mock.patch.object(WordlistCatalog, '_scan', side_effect=slow_scan):
+            self.assertEqual(catalog.entries(background=True), [])
+            self.assertTrue(catalog.building)
+            self.assertFalse(catalog.refresh_async())  # One build per root
+            release.set()
+            deadline = time.monotonic() + 5
+            while catalog.building and time.monotonic() < deadline:
+                time.sleep(0.01)
+
+        self.assertFalse(catalog.building)
+        self.assertEqual(len(catalog.entries(background=True)), 2)
+
+    def test_concurrent_merges(self):
+        catalog = WordlistCatalog(self.root)
+        other = self._write('Web-Content/other.txt', 'zeta\nomega\n')
+        catalog.refresh()
+        selections = [[self.common, self.extra]] * 3 + [[self.common, other]] * 3
+        merged, errors = [], []
+
+        def merge(selection):
+            try:
+                merged.append(WordlistCatalog(self.root).merge(selection)['path'])
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=merge, args=(selection,)) for selection in selections]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(set(merged)), 2)
+        self.assertEqual(sorted(os.listdir(os.path.dirname(merged[0]))), sorted(map(os.path.basename, set(merged))))
+        self.assertTrue(all(catalog.find(path) for path in merged))  # No merge lost another's entry
+        self.assertEqual([f for f in os.listdir(self.root) if f.startswith(WordlistCatalog.INDEX_FILE)],
+                         [WordlistCatalog.INDEX_FILE])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+Benchmark for streaming directory archives
+
+Compares building a temporary archive with shutil.make_archive and then
+sending it, against the streaming generators used by download_archive:
+total time, time to the first byte and the temporary disk space needed.
+
+Usage:
+    python -m benchmarks.bench_archive [megabytes] [files]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from app.file_manager.archive import stream_tar, stream_zip
+
+
+def temp_archive(path, archive_format):
+    """The approach without streaming: write the archive, then read it back"""
+    work = tempfile.mkdtemp(prefix='archive_bench_tmp_')
+    try:
+        started = time.perf_counter()
+        archive = shutil.make_archive(os.path.join(work, 'out'), archive_format, path)
+        first_byte = time.perf_counter() - started
+        size = os.path.getsize(archive)
+        with open(archive, 'rb') as f:
+            while f.read(1024 * 1024):
+                pass
+        return time.perf_counter() - started, first_byte, size
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def streamed(chunks):
+    started = time.perf_counter()
+    first_byte = None
+    for chunk in chunks:
+        if first_byte is None and chunk:
+            first_byte = time.perf_counter() - started
+    return time.perf_counter() - started, first_byte, 0
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    files = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    root = tempfile.mkdtemp(prefix='archive_bench_')
+
+    try:
+        per_file = megabytes * 1024 * 1024 // files
+        line = b'user=admin password=hunter2 host=10.0.0.1 note=' + b'x' * 60 + b'\n'
+        for i in range(files):
+            directory = os.path.join(root, f'dir_{i % 40:02d}')
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f'file_{i:05d}.txt'), 'wb') as f:
+                f.write((line * (per_file // len(line) + 1))[:per_file])
+
+        rows = [
+            ('make_archive tar, then send', temp_archive(root, 'tar')),
+            ('stream_tar', streamed(stream_tar(root))),
+            ('make_archive gztar, then send', temp_archive(root, 'gztar')),
+            ('stream_tar, gzip', streamed(stream_tar(root, compress=True))),
+            ('make_archive zip, then send', temp_archive(root, 'zip')),
+            ('stream_zip', streamed(stream_zip(root))),
+        ]
+
+        print(f"Tree: {files} files, {megabytes} MB")
+        print(f"{'method':<32} {'total s':>9} {'first byte s':>13} {'temp MB':>9}")
+        for name, (total, first_byte, temp_size) in rows:
+            print(f"{name:<32} {total:>9.3f} {first_byte:>13.4f} {temp_size / 1024 ** 2:>9.1f}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
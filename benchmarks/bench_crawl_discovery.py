@@ -0,0 +1,63 @@
+"""
+Benchmark for FileDownloader.crawl_and_discover_files deduplication
+
+Pages and links are generated in memory so only the discovery bookkeeping
+is measured. Every page repeats a share of earlier file URLs (with shuffled
+query strings and fragments) to exercise canonical deduplication.
+
+Usage:
+    python -m benchmarks.bench_crawl_discovery
+"""
+import contextlib
+import io
+import time
+
+from app.metaspidey.downloader import FileDownloader
+
+PAGES = 200
+
+
+class SyntheticSiteDownloader(FileDownloader):
+    """FileDownloader whose pages are generated instead of fetched"""
+
+    def __init__(self, files_per_page):
+        super().__init__()
+        self.files_per_page = files_per_page
+
+    def _analyze_page_for_files(self, url, depth, allowed_extensions=None, fuzzing_patterns=None):
+        page = int(url.rsplit('/', 1)[-1] or 0)
+        files = []
+        for i in range(self.files_per_page):
+            # Every fourth entry points back at a file from the previous page
+            file_id = (page - 1) * self.files_per_page + i if i % 4 == 0 and page else page * self.files_per_page + i
+            files.append({
+                'url': f'https://bench.local/files/{file_id}.pdf?b=2&a=1#p{page}',
+                'filename': f'{file_id}.pdf',
+                'extension': '.pdf',
+                'estimated_type': 'Document'
+            })
+        return {'url': url, 'files': files}
+
+    def _extract_page_links_improved(self, url, current_depth):
+        page = int(url.rsplit('/', 1)[-1] or 0)
+        return [f'https://bench.local/page/{n}' for n in range(page + 1, page + 30)]
+
+
+def run(target_files):
+    downloader = SyntheticSiteDownloader(files_per_page=target_files // PAGES * 2)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = downloader.crawl_and_discover_files('https://bench.local/page/0', max_depth=5,
+                                                     delay=0, max_files=target_files)
+    return result['total_files_found'], time.perf_counter() - started
+
+
+def main():
+    print(f"{'max_files':>10} {'found':>8} {'seconds':>9} {'us/file':>9}")
+    for target in (5000, 10000, 20000, 40000, 80000):
+        found, elapsed = run(target)
+        print(f"{target:>10} {found:>8} {elapsed:>9.3f} {elapsed / found * 1e6:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
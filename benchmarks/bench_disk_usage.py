@@ -0,0 +1,79 @@
+"""
+Benchmark for the file manager disk usage calculation
+
+Builds a directory tree and compares the previous synchronous calculation
+(os.walk plus os.access and os.path.getsize per file) with a DiskUsageJob
+on an empty cache, and again once every directory is cached.
+
+Usage:
+    python -m benchmarks.bench_disk_usage [directories] [files_per_directory]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from app.file_manager.disk_usage import DiskUsageCache, DiskUsageJob
+
+
+def legacy_disk_usage(path):
+    total_size = file_count = folder_count = 0
+    for root, dirs, files in os.walk(path):
+        if not os.access(root, os.R_OK):
+            continue
+        folder_count += len(dirs)
+        file_count += len(files)
+        for file in files:
+            try:
+                file_path = os.path.join(root, file)
+                if os.access(file_path, os.R_OK):
+                    total_size += os.path.getsize(file_path)
+            except OSError:
+                continue
+    return total_size, file_count, folder_count
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - started, result
+
+
+def run_job(path, cache):
+    job = DiskUsageJob(path, cache)
+    job.run()
+    return job.snapshot()
+
+
+def main():
+    directories = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    files_per_directory = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    root = tempfile.mkdtemp(prefix='disk_usage_bench_')
+
+    try:
+        for d in range(directories):
+            directory = os.path.join(root, f'group_{d % 20:02d}', f'dir_{d:05d}')
+            os.makedirs(directory)
+            for f in range(files_per_directory):
+                with open(os.path.join(directory, f'file_{f:03d}.dat'), 'wb') as handle:
+                    handle.write(b'x' * (f + 1))
+
+        cache = DiskUsageCache()
+        legacy_elapsed, (size, files, folders) = timed(legacy_disk_usage, root)
+        cold_elapsed, cold = timed(run_job, root, cache)
+        warm_elapsed, warm = timed(run_job, root, cache)
+        assert (cold['total_size_bytes'], cold['file_count'], cold['folder_count']) == (size, files, folders)
+        assert warm['total_size_bytes'] == size
+
+        print(f"Tree: {folders} directories, {files} files")
+        print(f"{'method':<34} {'seconds':>9}")
+        print(f"{'os.walk + access + getsize':<34} {legacy_elapsed:>9.3f}")
+        print(f"{'DiskUsageJob, empty cache':<34} {cold_elapsed:>9.3f}")
+        print(f"{'DiskUsageJob, cached directories':<34} {warm_elapsed:>9.3f}  ({warm['cached_directories']} cached)")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
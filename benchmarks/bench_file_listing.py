@@ -0,0 +1,131 @@
+"""
+Benchmark for the file manager directory listing
+
+Builds a directory with many entries and compares the previous listing
+(os.listdir, an isdir call per entry in the sort key, then separate
+stat/isdir/stat/stat/access calls per entry) with scan_directory.
+Syscalls are counted with strace when it is installed. Also times the
+paginated listing API: the first page (which scans the directory), a
+following page from the cached snapshot, and the size of one page
+against the whole listing.
+
+Usage:
+    python -m benchmarks.bench_file_listing [entries] [runs]
+"""
+import grp
+import json
+import os
+import pwd
+import shutil
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from app.file_manager.listing import DEFAULT_PAGE_SIZE, DirectoryListingCache
+from app.file_manager.routes import format_file_size, iter_directory, scan_directory
+
+
+def legacy_file_info(file_path):
+    """get_file_info as it was: stat, isdir, stat for permissions, stat for owner, three access calls"""
+    stat_info = os.stat(file_path)
+    is_dir = os.path.isdir(file_path)
+    st = os.stat(file_path)
+    permissions = stat.filemode(st.st_mode)
+    st = os.stat(file_path)
+    try:
+        owner = pwd.getpwuid(st.st_uid).pw_name
+    except KeyError:
+        owner = str(st.st_uid)
+    try:
+        group = grp.getgrgid(st.st_gid).gr_name
+    except KeyError:
+        group = str(st.st_gid)
+    return {
+        'name': os.path.basename(file_path),
+        'is_dir': is_dir,
+        'size': format_file_size(stat_info.st_size) if not is_dir else None,
+        'modified': datetime.fromtimestamp(stat_info.st_mtime).strftime('%Y-%m-%d %H:%M:%S'),
+        'permissions': permissions,
+        'owner': f"{owner}:{group}",
+        'is_readable': os.access(file_path, os.R_OK),
+        'is_writable': os.access(file_path, os.W_OK),
+        'is_executable': os.access(file_path, os.X_OK),
+    }
+
+
+def legacy_listing(directory):
+    names = [name for name in os.listdir(directory) if not name.startswith('.')]
+    names.sort(key=lambda x: (not os.path.isdir(os.path.join(directory, x)), x.lower()))
+    return [legacy_file_info(os.path.join(directory, name)) for name in names]
+
+
+def best_of(runs, function, directory):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        function(directory)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def count_syscalls(method, directory):
+    """Total syscalls made by one listing in a child process, or None without strace"""
+    if not shutil.which('strace'):
+        return None
+    code = (f'from benchmarks.bench_file_listing import {method}; {method}({directory!r})')
+    result = subprocess.run(['strace', '-f', '-c', '-o', '/dev/stdout', sys.executable, '-c', code],
+                            capture_output=True, text=True)
+    for line in result.stdout.splitlines():
+        if line.strip().endswith('total'):
+            return int(line.split()[2])
+    return None
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    directory = tempfile.mkdtemp(prefix='file_listing_bench_')
+
+    try:
+        for i in range(entries):
+            if i % 10 == 0:
+                os.mkdir(os.path.join(directory, f'dir_{i:06d}'))
+            else:
+                with open(os.path.join(directory, f'file_{i:06d}.txt'), 'w') as f:
+                    f.write('x')
+
+        print(f"Directory: {entries} entries, best of {runs}")
+        print(f"{'method':<30} {'seconds':>9} {'syscalls':>10}")
+        for label, function, method in (('listdir + per-path calls', legacy_listing, 'legacy_listing'),
+                                        ('scan_directory', scan_directory, 'scan_directory')):
+            elapsed = best_of(runs, function, directory)
+            syscalls = count_syscalls(method, directory)
+            print(f"{label:<30} {elapsed:>9.3f} {syscalls if syscalls is not None else 'n/a':>10}")
+
+        cache = DirectoryListingCache()
+        started = time.perf_counter()
+        first = cache.page(directory, False, iter_directory)
+        first_elapsed = time.perf_counter() - started
+        started = time.perf_counter()
+        cache.page(directory, False, iter_directory, cursor=first['next_cursor'])
+        next_elapsed = time.perf_counter() - started
+        started = time.perf_counter()
+        cache.page(directory, False, iter_directory, sort='size', descending=True)
+        resort_elapsed = time.perf_counter() - started
+
+        page_bytes = len(json.dumps(first['items']))
+        full_bytes = len(json.dumps(scan_directory(directory)))
+        print(f"\nPaginated API ({DEFAULT_PAGE_SIZE} entries per page)")
+        print(f"{'first page (scan + sort)':<30} {first_elapsed:>9.3f}")
+        print(f"{'next page (cached)':<30} {next_elapsed:>9.3f}")
+        print(f"{'first page by size (cached)':<30} {resort_elapsed:>9.3f}")
+        print(f"{'page / full listing JSON':<30} {page_bytes / 1024:>8.0f}K {full_bytes / 1048576:>9.1f}M")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
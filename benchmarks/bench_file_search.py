@@ -0,0 +1,70 @@
+"""
+Benchmark for file manager search
+
+Builds a directory tree and compares a search that walks the tree (as
+search_files does without an index) with FilenameIndex queries. Also
+times the initial index build and an incremental refresh where nothing
+changed.
+
+Usage:
+    python -m benchmarks.bench_file_search [directories] [files_per_directory]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from app.file_manager.search_index import FilenameIndex, name_matcher
+
+QUERIES = (('substring', 'report_4242'), ('substring', 'report'), ('substring', '42'), ('glob', 'data_1*.csv'), ('regex', r'^log_\d+7\.txt$'))
+
+
+def walk_search(base, query, mode):
+    matches = name_matcher(query, mode)
+    results = []
+    for root, dirs, files in os.walk(base):
+        results.extend(os.path.join(root, name) for name in dirs + files if matches(name))
+    return results
+
+
+def timed(function, *args, **kwargs):
+    started = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def main():
+    directories = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    files_per_directory = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    workdir = tempfile.mkdtemp(prefix='file_search_bench_')
+    root = os.path.join(workdir, 'tree')
+
+    try:
+        names = ('report_{}.pdf', 'data_{}.csv', 'log_{}.txt', 'image_{}.png', 'notes_{}.md')
+        for d in range(directories):
+            directory = os.path.join(root, f'project_{d % 40:02d}', f'module_{d:05d}')
+            os.makedirs(directory)
+            for f in range(files_per_directory):
+                open(os.path.join(directory, names[f % len(names)].format(d * files_per_directory + f)), 'w').close()
+
+        index = FilenameIndex(os.path.join(workdir, 'index.db'))
+        build_elapsed, _ = timed(index.refresh, root)
+        refresh_elapsed, _ = timed(index.refresh, root)
+        entries = index.root_status(root)['entries']
+
+        print(f"Tree: {entries} entries")
+        print(f"{'index build':<32} {build_elapsed:>9.3f} s")
+        print(f"{'incremental refresh (no change)':<32} {refresh_elapsed:>9.3f} s")
+        print(f"\n{'query':<32} {'walk s':>9} {'index ms':>9} {'matches':>9}")
+        for mode, query in QUERIES:
+            walk_elapsed, found = timed(walk_search, root, query, mode)
+            index_elapsed, result = timed(index.search, root, query, mode, limit=100)
+            assert result['total'] == len(found), (query, result['total'], len(found))
+            print(f"{mode + ' ' + query:<32} {walk_elapsed:>9.3f} {index_elapsed * 1000:>9.1f} {result['total']:>9}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
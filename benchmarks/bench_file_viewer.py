@@ -0,0 +1,76 @@
+"""
+Benchmark for the file manager viewer
+
+Writes a large log file and times the previous viewer (the whole file
+read into a string) against TextFileView pages: the first page, a page
+in the middle (building the line index that far), the same page again
+from the cached index, the tail, and a follow poll.
+
+Usage:
+    python -m benchmarks.bench_file_viewer [megabytes]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from app.file_manager.file_viewer import LineIndexCache, TextFileView
+
+
+def legacy_view(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except UnicodeDecodeError:
+        with open(path, 'r', encoding='latin-1') as f:
+            return f.read()
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - started, result
+
+
+def page(path, cache, method, *args):
+    with TextFileView(path, cache) as view:
+        return getattr(view, method)(*args)
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    directory = tempfile.mkdtemp(prefix='file_viewer_bench_')
+    path = os.path.join(directory, 'big.log')
+    line = '2024-01-01 12:00:00 INFO request {:09d} handled in 12ms from 10.0.0.1\n'
+
+    try:
+        lines = megabytes * 1024 * 1024 // len(line.format(0))
+        with open(path, 'w') as f:
+            for start in range(0, lines, 100000):
+                f.write(''.join(line.format(i) for i in range(start, min(lines, start + 100000))))
+        middle = lines // 2
+        cache = LineIndexCache()
+
+        rows = [
+            ('previous viewer (read whole file)', timed(legacy_view, path)[0]),
+            ('first page', timed(page, path, cache, 'lines', 1, 500)[0]),
+        ]
+        elapsed, result = timed(page, path, cache, 'lines', middle, 500)
+        assert result['content'].startswith(line.format(middle - 1))
+        rows.append((f'line {middle:,}, index built', elapsed))
+        rows.append((f'line {middle:,}, index cached', timed(page, path, cache, 'lines', middle, 500)[0]))
+        elapsed, tail = timed(page, path, cache, 'tail', 500)
+        rows.append(('tail', elapsed))
+        rows.append(('follow poll', timed(page, path, cache, 'follow', tail['end_offset'])[0]))
+
+        print(f"File: {os.path.getsize(path) / 1024 ** 2:.0f} MB, {lines:,} lines")
+        print(f"{'method':<36} {'seconds':>9}")
+        for name, elapsed in rows:
+            print(f"{name:<36} {elapsed:>9.4f}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
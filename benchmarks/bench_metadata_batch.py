@@ -0,0 +1,95 @@
+"""
+Benchmark for MetadataAnalyzer.batch_analyze worker pools
+
+Generates a corpus of mixed files (random binaries, text, ZIP archives,
+PNG images and PDFs when Pillow/PyPDF2 are installed) and analyzes it
+with deep analysis enabled, once per worker count, then twice more
+through an analysis cache to compare a cold run with a repeat run.
+
+Usage:
+    python -m benchmarks.bench_metadata_batch [files] [max_workers]
+"""
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+from app.metaspidey.analysis_cache import AnalysisCache
+from app.metaspidey.metadata_analyzer import MetadataAnalyzer, PIL_AVAILABLE, PYPDF2_AVAILABLE
+
+
+def generate_corpus(directory, count):
+    """Write count files of assorted types; returns their paths"""
+    paths = []
+    for i in range(count):
+        kind = i % 5
+        if kind == 0:
+            path = os.path.join(directory, f'random_{i}.bin')
+            with open(path, 'wb') as f:
+                f.write(os.urandom(512 * 1024))
+        elif kind == 1:
+            path = os.path.join(directory, f'text_{i}.txt')
+            with open(path, 'w') as f:
+                f.write(f'line {i} eval( javascript: powershell\n' * 20000)
+        elif kind == 2:
+            path = os.path.join(directory, f'archive_{i}.zip')
+            with zipfile.ZipFile(path, 'w') as zf:
+                for n in range(50):
+                    zf.writestr(f'member_{n}.txt', os.urandom(4096))
+        elif kind == 3 and PIL_AVAILABLE:
+            from PIL import Image
+            path = os.path.join(directory, f'image_{i}.png')
+            Image.frombytes('RGB', (256, 256), os.urandom(256 * 256 * 3)).save(path)
+        elif kind == 4 and PYPDF2_AVAILABLE:
+            import PyPDF2
+            path = os.path.join(directory, f'document_{i}.pdf')
+            writer = PyPDF2.PdfWriter()
+            for _ in range(20):
+                writer.add_blank_page(width=612, height=792)
+            writer.add_metadata({'/Author': 'bench', '/Title': f'doc {i}'})
+            with open(path, 'wb') as f:
+                writer.write(f)
+        else:
+            path = os.path.join(directory, f'filler_{i}.dat')
+            with open(path, 'wb') as f:
+                f.write(b'\0' * 256 * 1024 + os.urandom(256 * 1024))
+        paths.append(path)
+    return paths
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else (os.cpu_count() or 1)
+    directory = tempfile.mkdtemp(prefix='metaspidey_bench_')
+
+    try:
+        paths = generate_corpus(directory, count)
+        print(f"Corpus: {len(paths)} files in {directory} ({os.cpu_count()} CPUs)")
+        print(f"{'workers':>8} {'seconds':>9} {'files/s':>9}")
+
+        worker_counts = sorted({1, 2, 4, max_workers} & set(range(1, max_workers + 1)))
+        for workers in worker_counts:
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                MetadataAnalyzer().batch_analyze(paths, workers=workers, deep_analysis=True, timeout=60)
+            elapsed = time.perf_counter() - started
+            print(f"{workers:>8} {elapsed:>9.2f} {len(paths) / elapsed:>9.1f}")
+
+        analyzer = MetadataAnalyzer(cache=AnalysisCache(os.path.join(directory, '.cache', 'analysis.db')))
+        print(f"{'cache':>8} {'seconds':>9} {'files/s':>9} {'hits':>6}")
+        for label in ('cold', 'warm'):
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = analyzer.batch_analyze(paths, workers=max_workers, deep_analysis=True, timeout=60)
+            elapsed = time.perf_counter() - started
+            print(f"{label:>8} {elapsed:>9.2f} {len(paths) / elapsed:>9.1f} {result['cache_hits']:>6}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
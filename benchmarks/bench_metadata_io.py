@@ -0,0 +1,58 @@
+"""
+Benchmark for the I/O performed by MetadataAnalyzer.analyze_file
+
+Analyzes one large file with hashing and deep analysis enabled and reports
+the bytes and read() calls charged to the process (/proc/self/io, Linux
+only) together with the wall time.
+
+Usage:
+    python -m benchmarks.bench_metadata_io [size_mb] [runs]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from app.metaspidey.metadata_analyzer import MetadataAnalyzer
+
+
+def read_io_counters():
+    counters = {}
+    with open('/proc/self/io') as f:
+        for line in f:
+            key, value = line.split(':')
+            counters[key] = int(value)
+    return counters
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    fd, path = tempfile.mkstemp(suffix='.bin', prefix='metaspidey_io_')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            block = os.urandom(1024 * 1024)
+            for _ in range(size_mb):
+                f.write(block)
+
+        analyzer = MetadataAnalyzer()
+        print(f"File: {size_mb} MB, {runs} runs (page cache warm)")
+        print(f"{'run':>4} {'read MB':>9} {'read calls':>11} {'seconds':>9}")
+        for run in range(1, runs + 1):
+            before = read_io_counters()
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                analyzer.analyze_file(path, calculate_hashes=True, deep_analysis=True)
+            elapsed = time.perf_counter() - started
+            after = read_io_counters()
+            print(f"{run:>4} {(after['rchar'] - before['rchar']) / 1024 / 1024:>9.1f} "
+                  f"{after['syscr'] - before['syscr']:>11} {elapsed:>9.2f}")
+    finally:
+        os.unlink(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Benchmark for deep analysis pattern detection
+
+Times the previous per-length dict-of-slices scan with a full sort and
+four separate regex passes against patterns.top_repeated_sequences and
+the combined string scan, on the same text-and-binary sample.
+
+Usage:
+    python -m benchmarks.bench_patterns [size_kb ...]
+"""
+import os
+import re
+import sys
+import time
+from unittest import mock
+
+from app.metaspidey import patterns
+
+
+def dict_scan(content):
+    """Repeated-sequence and string detection as _analyze_patterns did it before"""
+    found = []
+    for seq_len in [4, 8, 16]:
+        sequences = {}
+        for i in range(len(content) - seq_len):
+            seq = content[i:i + seq_len]
+            sequences[seq] = sequences.get(seq, 0) + 1
+        found.extend(sorted(sequences.items(), key=lambda x: x[1], reverse=True)[:3])
+    text = content.decode('utf-8', errors='ignore')
+    re.findall(r'https?://[^\s<>"]+', text)
+    re.findall(r'[A-Za-z]:\\[^<>"|?*\s]+|/[^<>"|?*\s]+', text)
+    re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', text)
+    re.findall(r'\b\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}\b', text)
+    return found
+
+
+def kernel_scan(content):
+    patterns.top_repeated_sequences(content)
+    patterns.extract_strings(content)
+
+
+def sample(size):
+    text = b'GET https://example.com/login user=admin@example.org from 192.168.1.10 /var/log/app.log\n'
+    data = bytearray()
+    while len(data) < size:
+        data += text * 8 + os.urandom(2048)
+    return bytes(data[:size])
+
+
+def timed(function, content):
+    started = time.perf_counter()
+    function(content)
+    return time.perf_counter() - started
+
+
+def main():
+    sizes_kb = [int(arg) for arg in sys.argv[1:]] or [32, 1024, 4096]
+    print(f"NumPy available: {patterns.NUMPY_AVAILABLE}")
+    print(f"{'size KB':>8} {'dict scan':>10} {'Counter':>10} {'NumPy':>10}")
+    for size_kb in sizes_kb:
+        content = sample(size_kb * 1024)
+        before = timed(dict_scan, content)
+        with mock.patch.object(patterns, 'NUMPY_AVAILABLE', False):
+            fallback = timed(kernel_scan, content)
+        vectorized = timed(kernel_scan, content) if patterns.NUMPY_AVAILABLE else float('nan')
+        print(f"{size_kb:>8} {before:>10.3f} {fallback:>10.3f} {vectorized:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Benchmark for application startup cost
+
+Runs create_app() in fresh interpreters and reports wall time, peak RSS,
+the number of loaded modules and which optional extractor libraries were
+imported along the way.
+
+Usage:
+    python -m benchmarks.bench_startup [runs]
+"""
+import json
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = '''
+import json, resource, sys, time
+started = time.perf_counter()
+from app import create_app
+create_app()
+elapsed = time.perf_counter() - started
+optional = ('numpy', 'PIL.Image', 'PyPDF2', 'docx', 'openpyxl', 'mutagen', 'exifread')
+print(json.dumps({
+    'seconds': elapsed,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'modules': len(sys.modules),
+    'optional_loaded': [name for name in optional if name in sys.modules],
+}))
+'''
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', PROBE], cwd=PROJECT_ROOT, capture_output=True,
+                                text=True, check=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    seconds = sorted(sample['seconds'] for sample in samples)
+    print(f"create_app over {runs} runs: median {seconds[len(seconds) // 2]:.3f}s, best {seconds[0]:.3f}s")
+    print(f"peak RSS {max(sample['rss_mb'] for sample in samples):.1f} MB, {samples[-1]['modules']} modules")
+    print(f"optional libraries loaded: {', '.join(samples[-1]['optional_loaded']) or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
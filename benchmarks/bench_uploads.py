@@ -0,0 +1,100 @@
+"""
+Benchmark for resumable uploads
+
+Sends a file through UploadStore in 8 MB chunks, the way the file manager
+client does, and reports throughput and peak Python memory (tracemalloc).
+Finalizing is timed with the whole-file hash kept up to date while chunks
+arrive, and with the hash recomputed from disk (chunks written by another
+worker process).
+
+Usage:
+    python -m benchmarks.bench_uploads [megabytes]
+"""
+import base64
+import hashlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from app.file_manager.uploads import UploadStore
+
+CHUNK = 8 * 1024 * 1024
+
+
+class ChunkReader(io.RawIOBase):
+    """Stands in for the request stream of one PATCH: reads length bytes of the source file"""
+
+    def __init__(self, source, length):
+        self.source = source
+        self.remaining = length
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.source.read(size)
+        self.remaining -= len(data)
+        return data
+
+
+def upload(store, directory, source_path, name, checksum, chunk_checksums, rehash=False):
+    size = os.path.getsize(source_path)
+    session = store.create(directory, name, size, user_id=1, checksum=checksum)
+    started = time.perf_counter()
+    offset = 0
+    with open(source_path, 'rb') as source:
+        while offset < size:
+            length = min(CHUNK, size - offset)
+            header = None
+            if chunk_checksums:
+                data = source.read(length)
+                header = 'sha256 ' + base64.b64encode(hashlib.sha256(data).digest()).decode()
+                source.seek(offset)
+            offset = store.write_chunk(session, offset, ChunkReader(source, length), header)
+    written = time.perf_counter() - started
+    if rehash:
+        store = UploadStore(store.state_dir)  # Forgets the running hash
+        session = store.get(session.id)
+    started = time.perf_counter()
+    store.finalize(session)
+    return written, time.perf_counter() - started
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    directory = tempfile.mkdtemp(prefix='upload_bench_')
+    source_path = os.path.join(directory, 'source.bin')
+
+    try:
+        digest = hashlib.sha256()
+        with open(source_path, 'wb') as f:
+            for _ in range(megabytes):
+                block = os.urandom(1024 * 1024)
+                digest.update(block)
+                f.write(block)
+        checksum = 'sha256:' + digest.hexdigest()
+        store = UploadStore(os.path.join(directory, 'state'))
+
+        print(f"File: {megabytes} MB in {CHUNK // 1024 ** 2} MB chunks")
+        print(f"{'method':<36} {'write s':>8} {'MB/s':>7} {'finalize s':>11} {'peak MB':>8}")
+        for i, (name, chunk_checksums, rehash) in enumerate([
+                ('chunks, file sha256', False, False),
+                ('chunks + chunk sha256, file sha256', True, False),
+                ('chunks, file sha256 rehashed', False, True)]):
+            tracemalloc.start()
+            written, finalized = upload(store, directory, source_path, f'upload_{i}.bin', checksum,
+                                        chunk_checksums, rehash)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{name:<36} {written:>8.3f} {megabytes / written:>7.0f} {finalized:>11.3f} {peak / 1024 ** 2:>8.1f}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
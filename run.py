@@ -2,7 +2,9 @@ import os
 import subprocess
 from app import create_app, socketio
 
-app = create_app()
+# Worker processes started with spawn or forkserver (e.g. the MetaSpidey analysis
+# pool) re-import this file as __mp_main__; only the server builds the app
+app = create_app() if __name__ != '__mp_main__' else None
 
 if app:  # Ensure app object was created successfully
     # Import log_system_event if it's not already imported at the top of run.py